@@ -0,0 +1,424 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""
+======================
+desitarget.brickimages
+======================
+
+Read-through access to, and aperture photometry on, the images of a
+Legacy Surveys brick.
+
+A :class:`BrickImages` object opens each image file once, only
+decompresses the tiles of tile-compressed (fpack) images that contain
+the pixels that are looked up, and builds the WCS of each pixel grid
+once. Passing the same object to, e.g.,
+:func:`desitarget.randoms.quantities_at_positions_in_a_brick` and
+:func:`desitarget.skyfibers.sky_fibers_for_brick` reads each coadd of a
+brick once for both randoms and skies.
+"""
+import os
+import numpy as np
+import fitsio
+import astropy.io.fits as fits
+from astropy.wcs import WCS
+
+# ADM the header cards that define the pixel grid of an image.
+gridcards = ["NAXIS1", "NAXIS2", "CTYPE1", "CTYPE2", "CRVAL1", "CRVAL2",
+             "CRPIX1", "CRPIX2", "CD1_1", "CD1_2", "CD2_1", "CD2_2"]
+
+
+class BrickImages(object):
+    """Read-through cache of the images of one brick.
+
+    Parameters
+    ----------
+    tilefrac : :class:`float`, optional, defaults to 0.2
+        If pixel look-ups in a tile-compressed image touch more than
+        this fraction of its tiles, read the whole image instead (which
+        is quicker than reading each of many tiles).
+    keep : :class:`bool`, optional, defaults to ``True``
+        If ``False``, don't cache images or tiles (only headers and WCS),
+        so each image can be freed as soon as the caller is done with it.
+        Use this for a cache that is private to one look-up.
+
+    Attributes
+    ----------
+    nread : :class:`dict`
+        The number of reads of each (filename, extension), where reading
+        any number of tiles of an image in one look-up counts as one.
+
+    Notes
+    -----
+        - Images are cached until the object is deleted or
+          :meth:`clear` is called, so use one object per brick. A brick
+          has ~20 images, so a cache that is shared across look-ups can
+          hold several GB at production densities.
+        - Extensions default to the first extension with data, as for
+          :func:`fitsio.read`.
+    """
+    def __init__(self, tilefrac=0.2, keep=True):
+        self.tilefrac = tilefrac
+        self.keep = keep
+        self.nread = {}
+        self.clear()
+
+    def clear(self):
+        """Close all of the files and empty the cache."""
+        for fx in getattr(self, "_fits", {}).values():
+            fx.close()
+        self._fits, self._images, self._tiles = {}, {}, {}
+        self._headers, self._wcs, self._pix = {}, {}, {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.clear()
+
+    def _key(self, filename, ext):
+        """The open fitsio HDU, and (filename, extension) cache key."""
+        filename = os.path.abspath(filename)
+        if filename not in self._fits:
+            self._fits[filename] = fitsio.FITS(filename)
+        fx = self._fits[filename]
+        if ext is None:
+            ext = [hdu.has_data() for hdu in fx].index(True)
+        return fx[ext], (filename, ext)
+
+    def _count(self, key):
+        self.nread[key] = self.nread.get(key, 0) + 1
+
+    def header(self, filename, ext=None):
+        """The (image) header of an extension of a file.
+
+        Parameters
+        ----------
+        filename : :class:`str`
+            Name of an image file.
+        ext : :class:`int`, optional, defaults to ``None``
+            The extension to read.
+
+        Returns
+        -------
+        :class:`~astropy.io.fits.Header`
+            The header, which is that of the image (not of its
+            compressed table) for tile-compressed images.
+        """
+        _, key = self._key(filename, ext)
+        if key not in self._headers:
+            self._headers[key] = fits.getheader(*key)
+
+        return self._headers[key]
+
+    def wcs(self, filename, ext=None):
+        """The WCS of an image, shared by all images on the same grid.
+
+        Parameters
+        ----------
+        filename : :class:`str`
+            Name of an image file.
+        ext : :class:`int`, optional, defaults to ``None``
+            The extension of the image.
+
+        Returns
+        -------
+        :class:`~astropy.wcs.WCS`
+            The WCS.
+        """
+        hdr = self.header(filename, ext)
+        grid = tuple(hdr.get(card) for card in gridcards)
+        if grid not in self._wcs:
+            self._wcs[grid] = WCS(hdr)
+
+        return self._wcs[grid]
+
+    def world2pix(self, filename, ras, decs, ext=None):
+        """Pixel coordinates on the grid of an image, as for
+        :meth:`~astropy.wcs.WCS.all_world2pix` with an origin of 0.
+
+        Parameters
+        ----------
+        filename : :class:`str`
+            Name of an image file.
+        ras, decs : :class:`~numpy.ndarray`
+            Right Ascensions and Declinations (degrees).
+        ext : :class:`int`, optional, defaults to ``None``
+            The extension of the image.
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            The x pixel coordinates.
+        :class:`~numpy.ndarray`
+            The y pixel coordinates.
+
+        Notes
+        -----
+            - The coordinates of the last positions passed for a grid
+              are cached, as the inverse transformation is iterative.
+        """
+        w = self.wcs(filename, ext)
+        cached = self._pix.get(id(w))
+        if cached is not None and np.array_equal(cached[0], ras) \
+           and np.array_equal(cached[1], decs):
+            return cached[2], cached[3]
+        x, y = w.all_world2pix(ras, decs, 0)
+        self._pix[id(w)] = np.array(ras), np.array(decs), x, y
+
+        return x, y
+
+    def image(self, filename, ext=None):
+        """The entire image in an extension of a file.
+
+        Parameters
+        ----------
+        filename : :class:`str`
+            Name of an image file.
+        ext : :class:`int`, optional, defaults to ``None``
+            The extension to read.
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            The image.
+        """
+        _, key = self._key(filename, ext)
+        if key in self._images:
+            return self._images[key]
+
+        # ADM astropy decompresses whole images faster than fitsio.
+        img = fits.getdata(*key)
+        self._count(key)
+        if self.keep:
+            self._images[key] = img
+            # ADM tiles are no longer needed once the image is read.
+            self._tiles.pop(key, None)
+
+        return img
+
+    def values(self, filename, x, y, ext=None):
+        """Image values at pixel positions.
+
+        Parameters
+        ----------
+        filename : :class:`str`
+            Name of an image file.
+        x, y : :class:`~numpy.ndarray`
+            Integer pixel positions (columns and rows).
+        ext : :class:`int`, optional, defaults to ``None``
+            The extension to read.
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            The image values at (`y`, `x`).
+
+        Notes
+        -----
+            - Only the tiles of a tile-compressed image that contain the
+              positions are decompressed, unless that's most of them.
+        """
+        hdu, key = self._key(filename, ext)
+        x, y = np.asarray(x), np.asarray(y)
+        if key in self._images or not hdu.is_compressed():
+            return self.image(filename, ext)[y, x]
+
+        # ADM the tiling of the image, which defaults to rows.
+        hdr = hdu.read_header()
+        ny, nx = hdu.get_dims()
+        tx, ty = hdr.get("ZTILE1", nx), hdr.get("ZTILE2", 1)
+        # ADM let numpy deal with pixels off the image (wrap or raise).
+        if np.any((x < 0) | (x >= nx) | (y < 0) | (y >= ny)):
+            return self.image(filename, ext)[y, x]
+
+        tiles = self._tiles.get(key, {})
+        if self.keep:
+            self._tiles[key] = tiles
+        ntx, nty = (nx + tx - 1) // tx, (ny + ty - 1) // ty
+        itile = (y // ty) * ntx + x // tx
+        utile = np.unique(itile)
+        needed = [i for i in utile if i not in tiles]
+        if len(needed) + len(tiles) > self.tilefrac * ntx * nty:
+            return self.image(filename, ext)[y, x]
+
+        # ADM decompress the tiles that haven't been read.
+        if len(needed) > 0:
+            self._count(key)
+        for i in needed:
+            ylo, xlo = (i // ntx) * ty, (i % ntx) * tx
+            tiles[i] = hdu[ylo:ylo+ty, xlo:xlo+tx]
+
+        if len(x) == 0:
+            return hdu[0:1, 0:1].ravel()[:0]
+
+        # ADM look up the positions in each tile.
+        vals = np.empty(len(x), dtype=tiles[utile[0]].dtype)
+        order = np.argsort(itile, kind="stable")
+        bounds = np.searchsorted(itile[order], utile)
+        for i, ii in zip(utile, np.split(order, bounds[1:])):
+            vals[ii] = tiles[i][y[ii] - (i // ntx) * ty, x[ii] - (i % ntx) * tx]
+
+        return vals
+
+
+def _segment_integral(u, r):
+    """Integral of sqrt(r^2 - t^2) from 0 to u, for -r <= u <= r."""
+    return 0.5 * (u * np.sqrt(np.maximum(r**2 - u**2, 0.)) +
+                  r**2 * np.arcsin(np.clip(u / r, -1., 1.)))
+
+
+def _quadrant_area(x, y, r):
+    """Area of the part of a circle (radius r, centered at the origin)
+    with abscissa < `x` and ordinate < `y`.
+
+    `x` and `y` must broadcast against each other, and the square roots
+    and arcsines are only evaluated on each of them, not on the grid.
+    """
+    x, y = np.clip(x, -r, r), np.clip(y, -r, r)
+    # ADM |t| < a is where the chord at abscissa t is longer than 2|y|.
+    a = np.sqrt(r**2 - y**2)
+    sx, sa = _segment_integral(x, r), _segment_integral(a, r)
+    left, right = x <= -a, x >= a
+    # ADM the area in which the chords are cut at ordinate y...
+    area = np.where(left, 0., np.where(right, 2*(y*a + sa), y*(x + a) + sx + sa))
+    # ADM ...plus the full chords at |t| > a if y > 0.
+    full = np.where(left, sx + np.pi*r**2/4,
+                    np.pi*r**2/4 - sa + np.where(right, sx - sa, 0.))
+
+    return area + np.where(y > 0, 2*full, 0.)
+
+
+def aperture_weights(dx, dy, radius):
+    """Exact overlap of circular apertures with the pixels around them.
+
+    Parameters
+    ----------
+    dx, dy : :class:`~numpy.ndarray`
+        Offsets of the aperture centers from the centers of their
+        nearest pixels, in pixels (so, in the range -0.5 to 0.5).
+    radius : :class:`float`
+        The radius of the apertures, in pixels.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        An array of shape (len(`dx`), 2R+1, 2R+1), where R is
+        ``ceil(radius) + 1``, of the area of each aperture in each pixel
+        in a box centered on its nearest pixel, indexed as [y, x].
+    """
+    dx, dy = np.atleast_1d(dx), np.atleast_1d(dy)
+    R = int(np.ceil(radius)) + 1
+    # ADM the pixel corners relative to the aperture centers.
+    edges = np.arange(-R, R + 2) - 0.5
+    ex = edges[np.newaxis, :] - dx[:, np.newaxis]
+    ey = edges[np.newaxis, :] - dy[:, np.newaxis]
+    area = _quadrant_area(ex[:, np.newaxis, :], ey[:, :, np.newaxis], radius)
+    weights = area[:, 1:, 1:] - area[:, :-1, 1:] - area[:, 1:, :-1] + area[:, :-1, :-1]
+    # ADM pixels that only touch the aperture have no weight, not round-off.
+    weights[weights < 1e-10] = 0.
+
+    return weights
+
+
+def aperture_photometry(image, x, y, radius, ivar=None, batchsize=2**22):
+    """Sum an image in circular apertures, as for the "exact" method of
+    :func:`photutils.aperture_photometry`.
+
+    Parameters
+    ----------
+    image : :class:`~numpy.ndarray`
+        A 2-D image.
+    x, y : :class:`~numpy.ndarray`
+        Positions of the aperture centers (columns and rows) in pixels,
+        where the center of the first pixel is at (0, 0).
+    radius : :class:`float`
+        The radius of the apertures, in pixels.
+    ivar : :class:`~numpy.ndarray`, optional, defaults to ``None``
+        The inverse variance image corresponding to `image`, from which
+        to propagate errors. Pixels with zero `ivar` have no error.
+    batchsize : :class:`int`, optional, defaults to 2**22
+        The (approximate) maximum number of pixels to gather at once.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        The sum of `image` in each aperture.
+    :class:`~numpy.ndarray`
+        The error on each sum (only returned if `ivar` is passed).
+
+    Notes
+    -----
+        - The pixel weights are computed once for all apertures
+          centered at the same offset from a pixel (e.g., once per
+          `radius` for apertures centered on pixels) and applied to
+          batches of apertures at once.
+        - Pixels off the image are ignored. Apertures that don't overlap
+          the image at all have NaN sums and errors.
+    """
+    x, y = np.atleast_1d(x).astype(float), np.atleast_1d(y).astype(float)
+    ny, nx = image.shape
+    R = int(np.ceil(radius)) + 1
+    box = np.arange(-R, R + 1)
+    flatimage = image.ravel()
+    flativar = ivar.ravel() if ivar is not None else None
+
+    # ADM the nearest pixel, and the offset from it, for each aperture.
+    ix, iy = np.floor(x + 0.5).astype(int), np.floor(y + 0.5).astype(int)
+    dx, dy = x - ix, y - iy
+
+    flux = np.zeros(len(x))
+    var = np.zeros(len(x))
+    overlap = np.zeros(len(x), dtype=bool)
+    step = max(batchsize // len(box)**2, 1)
+    for start in range(0, len(x), step):
+        s = slice(start, start + step)
+        # ADM the weights for each distinct offset from a pixel center,
+        # ADM only retaining pixels in the box that are ever used.
+        offsets, inv = np.unique(np.vstack([dx[s], dy[s]]), axis=1,
+                                 return_inverse=True)
+        weights = aperture_weights(offsets[0], offsets[1], radius)
+        weights = weights.reshape(len(weights), -1)
+        support = np.any(weights > 0, axis=0)
+        weights = weights[:, support]
+        # ADM the pixels around each aperture, and if they're on the image.
+        px = (ix[s, np.newaxis] + box)[:, np.newaxis, :]
+        py = (iy[s, np.newaxis] + box)[:, :, np.newaxis]
+        onimage = ((px >= 0) & (px < nx) & (py >= 0) & (py < ny))
+        onimage = onimage.reshape(len(onimage), -1)[:, support]
+        pix = (np.clip(py, 0, ny - 1) * nx + np.clip(px, 0, nx - 1))
+        pix = pix.reshape(len(pix), -1)[:, support]
+        # ADM apertures that hang off the image have fewer pixels, and
+        # ADM pixels with no weight don't contribute (even NaNs).
+        edge = ~np.all(onimage, axis=1)
+        if len(weights) == 1:
+            w = weights[0] * onimage[edge]
+        else:
+            w = weights[inv.ravel()] * onimage
+        overlap[s] = np.any(w > 0, axis=1) if len(weights) > 1 else True
+        if len(weights) == 1:
+            overlap[s][edge] = np.any(w > 0, axis=1)
+        # ADM gather the pixels, and sum them with their weights. Use a
+        # ADM matrix product where apertures share the same weights.
+        for arr, out in (flatimage, flux), (flativar, var):
+            if arr is None:
+                continue
+            vals = arr.take(pix)
+            if arr is flativar:
+                # ADM ivars->variances, guard against 1/0.
+                with np.errstate(divide='ignore'):
+                    vals = np.where(vals > 0, 1. / vals, 0.)
+            if len(weights) == 1:
+                out[s] = vals.dot(weights[0])
+                out[s][edge] = np.einsum(
+                    'ij,ij->i', np.where(w > 0, vals[edge], 0.), w)
+            else:
+                out[s] = np.einsum('ij,ij->i', np.where(w > 0, vals, 0.), w)
+
+    flux[~overlap] = np.nan
+    if ivar is None:
+        return flux
+
+    err = np.sqrt(var)
+    err[~overlap] = np.nan
+
+    return flux, err
@@ -19,9 +19,6 @@ from glob import glob
 import numpy as np
 import numpy.lib.recfunctions as rfn
 
-from astropy.coordinates import SkyCoord
-from astropy import units as u
-
 from matplotlib.patches import Polygon
 from matplotlib.collections import PatchCollection
 
@@ -30,8 +27,11 @@ from desitarget.internal import sharedmem
 from desitarget.targetmask import desi_mask, targetid_mask
 from desitarget.targets import encode_targetid, decode_targetid
 from desitarget.gaiamatch import find_gaia_files, get_gaia_nside_brick
+from desitarget.gaiamatch import read_gaia_file_cached, gaia_cache_shared_by
+from desitarget.crossmatch import search_around_variable
 from desitarget.geomask import circles, cap_area, circle_boundaries, is_in_hp
-from desitarget.geomask import ellipses, ellipse_boundary, is_in_ellipse
+from desitarget.geomask import ellipses, ellipse_boundary
+from desitarget.geomask import ellipse_matrix, is_in_ellipse_pairs
 from desitarget.geomask import radec_match_to, rewind_coords, add_hp_neighbors
 from desitarget.cuts import _psflike
 from desitarget.tychomatch import get_tycho_dir, get_tycho_nside
@@ -236,14 +236,20 @@ def make_bright_star_mask_in_hp(nside, pixnum, verbose=True, gaiaepoch=2015.5,
     # ADM read in the associated Gaia files. Also grab
     # ADM neighboring pixels to prevent edge effects.
     gaiafns = find_gaia_files(tychoobjs, neighbors=True)
+    # ADM (neighboring pixels are shared by adjacent mask pixels, so
+    # ADM use the cache of Gaia files in desitarget.gaiamatch).
     gaiaobjs = []
-    cols = 'SOURCE_ID', 'RA', 'DEC', 'PHOT_G_MEAN_MAG', 'PMRA', 'PMDEC'
+    cols = ['REF_ID', 'GAIA_RA', 'GAIA_DEC', 'GAIA_PHOT_G_MEAN_MAG',
+            'PMRA', 'PMDEC']
     for fn in gaiafns:
         if os.path.exists(fn):
-            gaiaobjs.append(fitsio.read(fn, ext='GAIAHPX', columns=cols))
+            gaia, _ = read_gaia_file_cached(fn)
+            gaiaobjs.append(rfn.repack_fields(gaia[cols]))
 
     gaiaobjs = np.concatenate(gaiaobjs)
-    gaiaobjs = rfn.rename_fields(gaiaobjs, {"SOURCE_ID": "REF_ID"})
+    gaiaobjs = rfn.rename_fields(
+        gaiaobjs, {"GAIA_RA": "RA", "GAIA_DEC": "DEC",
+                   "GAIA_PHOT_G_MEAN_MAG": "PHOT_G_MEAN_MAG"})
     # ADM limit Gaia objects to 3 magnitudes fainter than the passed
     # ADM limit. This leaves some (!) leeway when matching to Tycho.
     gaiaobjs = gaiaobjs[gaiaobjs['PHOT_G_MEAN_MAG'] < maglim + 3]
@@ -465,7 +471,7 @@ def make_bright_star_mask(maglim=12., matchrad=1., numproc=32,
     # ADM Parallel process across HEALPixels.
     if numproc > 1:
         pool = sharedmem.MapReduce(np=numproc)
-        with pool:
+        with pool, gaia_cache_shared_by(numproc):
             mask = pool.map(_make_bright_star_mx, pixels, reduce=_update_status)
     else:
         mask = list()
@@ -586,20 +592,24 @@ def is_in_bright_mask(targs, sourcemask, inonly=False):
     used_in_mask = np.zeros(len(sourcemask), dtype=bool)
     used_near_mask = np.zeros(len(sourcemask), dtype=bool)
 
-    # ADM turn the mask and target coordinates into SkyCoord objects.
-    ctargs = SkyCoord(targs["RA"]*u.degree, targs["DEC"]*u.degree)
-    cmask = SkyCoord(sourcemask["RA"]*u.degree, sourcemask["DEC"]*u.degree)
+    # ADM need to differentiate targets that are in ellipse-on-the-sky
+    # ADM masks from targets that are in circle-on-the-sky masks.
+    rex_or_psf = _rexlike(sourcemask["TYPE"]) | _psflike(sourcemask["TYPE"])
 
-    # ADM this is the largest search radius we should need to consider.
-    # ADM In the future an obvious speed up is to split on radius
-    # ADM as large radii are rarer but take longer.
-    maxrad = max(sourcemask["IN_RADIUS"])*u.arcsec
+    # ADM the search radius for each mask. Pad the radius of elliptical
+    # ADM masks to allow for the small-angle approximation used when
+    # ADM testing whether targets are in an ellipse.
+    searchrad = sourcemask["IN_RADIUS"].astype('f8')
     if not inonly:
-        maxrad = max(sourcemask["NEAR_RADIUS"])*u.arcsec
+        searchrad = np.maximum(searchrad, sourcemask["NEAR_RADIUS"])
+    searchrad[~rex_or_psf] *= 1.1
 
-    # ADM coordinate match the masks and the targets.
-    # ADM assuming all of the masks are circles-on-the-sky.
-    idtargs, idmask, d2d, d3d = cmask.search_around_sky(ctargs, maxrad)
+    # ADM coordinate match the masks and the targets, assuming all of
+    # ADM the masks are circles-on-the-sky. Masks are searched in bins
+    # ADM of radius, as large radii are rarer but take longer.
+    idtargs, idmask, d2d = search_around_variable(
+        targs["RA"], targs["DEC"], sourcemask["RA"], sourcemask["DEC"],
+        searchrad)
 
     # ADM catch the case where nothing fell in a mask.
     if len(idmask) == 0:
@@ -607,50 +617,31 @@ def is_in_bright_mask(targs, sourcemask, inonly=False):
             return [in_mask], [used_in_mask]
         return [in_mask, near_mask], [used_in_mask, used_near_mask]
 
-    # ADM need to differentiate targets that are in ellipse-on-the-sky
-    # ADM masks from targets that are in circle-on-the-sky masks.
-    rex_or_psf = _rexlike(sourcemask[idmask]["TYPE"]) | _psflike(
-        sourcemask[idmask]["TYPE"])
-    w_ellipse = np.where(~rex_or_psf)
+    rex_or_psf = rex_or_psf[idmask]
+    w_ellipse = np.where(~rex_or_psf)[0]
 
     # ADM only continue if there are any elliptical masks.
-    if len(w_ellipse[0]) > 0:
+    if len(w_ellipse) > 0:
         idelltargs = idtargs[w_ellipse]
         idellmask = idmask[w_ellipse]
 
         log.info('Testing {} targets against {} elliptical masks...t={:.1f}s'
                  .format(len(set(idelltargs)), len(set(idellmask)), time()-t0))
 
-        # ADM to speed the calculation, make a dictionary of which
-        # ADM targets (the values) associate with each mask (the keys).
-        targidineachmask = {}
-        # ADM first initiate a list for each relevant key (mask ID).
-        for maskid in set(idellmask):
-            targidineachmask[maskid] = []
-        # ADM then append those lists until they contain the IDs of each
-        # ADM relevant target as the values.
-        for index, targid in enumerate(idelltargs):
-            targidineachmask[idellmask[index]].append(targid)
-
-        # ADM loop through the masks and determine which relevant points
-        # ADM occupy them for both the IN_RADIUS and the NEAR_RADIUS.
-        for maskid in targidineachmask:
-            targids = targidineachmask[maskid]
-            ellras, elldecs = targs[targids]["RA"], targs[targids]["DEC"]
-            mask = sourcemask[maskid]
-            # ADM Refine being in a mask based on the elliptical masks.
-            in_ell = is_in_ellipse(
-                ellras, elldecs, mask["RA"], mask["DEC"],
-                mask["IN_RADIUS"], mask["E1"], mask["E2"])
-            in_mask[targids] |= in_ell
-            used_in_mask[maskid] |= np.any(in_ell)
-            if not inonly:
-                in_ell = is_in_ellipse(ellras, elldecs,
-                                       mask["RA"], mask["DEC"],
-                                       mask["NEAR_RADIUS"],
-                                       mask["E1"], mask["E2"])
-                near_mask[targids] |= in_ell
-                used_near_mask[maskid] |= np.any(in_ell)
+        # ADM test every (target, mask) pair at once, for both the
+        # ADM IN_RADIUS and the NEAR_RADIUS.
+        ellras, elldecs = targs["RA"][idelltargs], targs["DEC"][idelltargs]
+        mask = sourcemask[idellmask]
+        radcols = ["IN_RADIUS"]
+        if not inonly:
+            radcols.append("NEAR_RADIUS")
+        for radius, ismask, used in zip(radcols, [in_mask, near_mask],
+                                        [used_in_mask, used_near_mask]):
+            G = ellipse_matrix(mask[radius], mask["E1"], mask["E2"])
+            in_ell = is_in_ellipse_pairs(ellras, elldecs,
+                                         mask["RA"], mask["DEC"], G)
+            ismask[idelltargs[in_ell]] = True
+            used[idellmask[in_ell]] = True
 
         log.info('Done with elliptical masking...t={:1f}s'.format(time()-t0))
 
@@ -658,12 +649,12 @@ def is_in_bright_mask(targs, sourcemask, inonly=False):
     # ADM trumps any information about just being in an elliptical mask.
     # ADM Find separations less than the mask radius for circle masks
     # ADM matches meeting these criteria are in at least one circle mask.
-    w_in = (d2d.arcsec < sourcemask[idmask]["IN_RADIUS"]) & (rex_or_psf)
+    w_in = (d2d < sourcemask[idmask]["IN_RADIUS"]) & (rex_or_psf)
     in_mask[idtargs[w_in]] = True
     used_in_mask[idmask[w_in]] = True
 
     if not inonly:
-        w_near = (d2d.arcsec < sourcemask[idmask]["NEAR_RADIUS"]) & (rex_or_psf)
+        w_near = (d2d < sourcemask[idmask]["NEAR_RADIUS"]) & (rex_or_psf)
         near_mask[idtargs[w_near]] = True
         used_near_mask[idmask[w_near]] = True
         return [in_mask, near_mask], [used_in_mask, used_near_mask]
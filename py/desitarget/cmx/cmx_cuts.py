@@ -28,7 +28,7 @@ from pkg_resources import resource_filename
 from desitarget import io
 from desitarget.cuts import _psflike, _is_row, _get_colnames, _prepare_gaia
 from desitarget.cuts import _prepare_optical_wise, _check_BGS_targtype_sv
-from desitarget.cuts import shift_photo_north
+from desitarget.cuts import _getColors, Photometry
 from desitarget.internal import sharedmem
 from desitarget.targets import finalize, resolve
 from desitarget.cmx.cmx_targetmask import cmx_mask
@@ -72,39 +72,6 @@ def _get_cmxdir(cmxdir=None):
     return cmxdir
 
 
-def _getColors(nbEntries, nfeatures, gflux, rflux, zflux, w1flux, w2flux):
-
-    limitInf = 1.e-04
-    gflux = gflux.clip(limitInf)
-    rflux = rflux.clip(limitInf)
-    zflux = zflux.clip(limitInf)
-    w1flux = w1flux.clip(limitInf)
-    w2flux = w2flux.clip(limitInf)
-
-    g = np.where(gflux > limitInf, 22.5-2.5*np.log10(gflux), 0.)
-    r = np.where(rflux > limitInf, 22.5-2.5*np.log10(rflux), 0.)
-    z = np.where(zflux > limitInf, 22.5-2.5*np.log10(zflux), 0.)
-    W1 = np.where(w1flux > limitInf, 22.5-2.5*np.log10(w1flux), 0.)
-    W2 = np.where(w2flux > limitInf, 22.5-2.5*np.log10(w2flux), 0.)
-
-    photOK = (g > 0.) & (r > 0.) & (z > 0.) & (W1 > 0.) & (W2 > 0.)
-
-    colors = np.zeros((nbEntries, nfeatures))
-    colors[:, 0] = g-r
-    colors[:, 1] = r-z
-    colors[:, 2] = g-z
-    colors[:, 3] = g-W1
-    colors[:, 4] = r-W1
-    colors[:, 5] = z-W1
-    colors[:, 6] = g-W2
-    colors[:, 7] = r-W2
-    colors[:, 8] = z-W2
-    colors[:, 9] = W1-W2
-    colors[:, 10] = r
-
-    return colors, r, photOK
-
-
 def passesSTD_logic(gfracflux=None, rfracflux=None, zfracflux=None,
                     objtype=None, gaia=None, pmra=None, pmdec=None,
                     aen=None, dupsource=None, paramssolved=None,
@@ -512,12 +479,16 @@ def isSV0_LRG(gflux=None, rflux=None, zflux=None, w1flux=None,
               rfiberflux=None, zfiberflux=None,
               gflux_snr=None, rflux_snr=None, zflux_snr=None, w1flux_snr=None,
               gnobs=None, rnobs=None, znobs=None, maskbits=None,
-              primary=None):
+              primary=None, phot=None):
     """Target Definition of an SV0-like LRG. Returns a boolean array.
 
     Parameters
     ----------
-    See :func:`~desitarget.cuts.set_target_bits`.
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cmx.cmx_cuts.apply_cuts()`. Built on-the-fly
+        from the passed fluxes if not sent.
+    See :func:`~desitarget.cuts.set_target_bits` for other parameters.
 
     Returns
     -------
@@ -546,7 +517,7 @@ def isSV0_LRG(gflux=None, rflux=None, zflux=None, w1flux=None,
     # ADM sources that weren't in a mask/logic cut.
     lrg, _, _, _, _ = isLRG_colors(
         gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
-        zfiberflux=zfiberflux, south=False, primary=lrg
+        zfiberflux=zfiberflux, south=False, primary=lrg, phot=phot
     )
 
     # ADM isLRG_colors() forces arrays, so catch the single-object case.
@@ -586,7 +557,7 @@ def notinLRG_mask(primary=None, rflux=None, zflux=None, w1flux=None,
 
 
 def isLRG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
-                 zfiberflux=None, south=True, primary=None):
+                 zfiberflux=None, south=True, primary=None, phot=None):
     """See :func:`~desitarget.sv1.sv1_cuts.isLRG` for details.
     """
     if primary is None:
@@ -594,12 +565,16 @@ def isLRG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
     lrg = primary.copy()
     lrginit, lrgsuper = np.tile(primary, [2, 1])
 
-    gmag = 22.5 - 2.5 * np.log10(gflux.clip(1e-7))
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          w1flux=w1flux, zfiberflux=zfiberflux)
+
+    gmag = phot.mag("g", clip=1e-7)
     # ADM safe as these fluxes are set to > 0 in notinLRG_mask.
-    rmag = 22.5 - 2.5 * np.log10(rflux.clip(1e-7))
-    zmag = 22.5 - 2.5 * np.log10(zflux.clip(1e-7))
-    w1mag = 22.5 - 2.5 * np.log10(w1flux.clip(1e-7))
-    zfibermag = 22.5 - 2.5 * np.log10(zfiberflux.clip(1e-7))
+    rmag = phot.mag("r", clip=1e-7)
+    zmag = phot.mag("z", clip=1e-7)
+    w1mag = phot.mag("w1", clip=1e-7)
+    zfibermag = phot.mag("zfiber", clip=1e-7)
 
     if south:
 
@@ -695,12 +670,16 @@ def isLRG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
 def isSV0_QSO(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
               gsnr=None, rsnr=None, zsnr=None, w1snr=None, w2snr=None,
               gnobs=None, rnobs=None, znobs=None, maskbits=None,
-              dchisq=None, objtype=None, primary=None):
+              dchisq=None, objtype=None, primary=None, phot=None):
     """Target Definition of an SV0-like QSO. Returns a boolean array.
 
     Parameters
     ----------
-    See :func:`~desitarget.cuts.set_target_bits`.
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cmx.cmx_cuts.apply_cuts()`. Built on-the-fly
+        from the passed fluxes if not sent.
+    See :func:`~desitarget.cuts.set_target_bits` for other parameters.
 
     Returns
     -------
@@ -722,13 +701,18 @@ def isSV0_QSO(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
     if primary is None:
         primary = np.ones_like(rflux, dtype='?')
 
+    # ADM share the shifted fluxes and colors between the QSO classes.
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          w1flux=w1flux, w2flux=w2flux)
+
     qsocolor_north = isQSO_cuts(
         primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
         w1flux=w1flux, w2flux=w2flux,
         gnobs=gnobs, rnobs=rnobs, znobs=znobs,
         dchisq=dchisq, maskbits=maskbits,
         objtype=objtype, w1snr=w1snr, w2snr=w2snr,
-        south=False
+        south=False, phot=phot
         )
 
     qsorf_north = isQSO_randomforest(
@@ -736,7 +720,7 @@ def isSV0_QSO(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
         w1flux=w1flux, w2flux=w2flux,
         gnobs=gnobs, rnobs=rnobs, znobs=znobs,
         dchisq=dchisq, maskbits=maskbits,
-        objtype=objtype, south=False
+        objtype=objtype, south=False, phot=phot
         )
 
     qsohizf_north = isQSO_highz_faint(
@@ -744,12 +728,12 @@ def isSV0_QSO(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
         w1flux=w1flux, w2flux=w2flux,
         gnobs=gnobs, rnobs=rnobs, znobs=znobs,
         dchisq=dchisq, maskbits=maskbits,
-        objtype=objtype, south=False
+        objtype=objtype, south=False, phot=phot
         )
 
     qsocolor_high_z_north = isQSO_color_high_z(
         gflux=gflux, rflux=rflux, zflux=zflux,
-        w1flux=w1flux, w2flux=w2flux, south=False
+        w1flux=w1flux, w2flux=w2flux, south=False, phot=phot
         )
 
     qsoz5_north = isQSOz5_cuts(
@@ -758,7 +742,7 @@ def isSV0_QSO(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
         gnobs=gnobs, rnobs=rnobs, znobs=znobs,
         w1flux=w1flux, w2flux=w2flux, w1snr=w1snr, w2snr=w2snr,
         dchisq=dchisq, maskbits=maskbits, objtype=objtype,
-        south=False
+        south=False, phot=phot
         )
 
     qsocolor_highz_north = (qsocolor_north & qsocolor_high_z_north)
@@ -779,7 +763,8 @@ def isSV0_QSO(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
 def isQSO_cuts(gflux=None, rflux=None, zflux=None,
                w1flux=None, w2flux=None, w1snr=None, w2snr=None,
                dchisq=None, maskbits=None, objtype=None,
-               gnobs=None, rnobs=None, znobs=None, primary=None, south=True):
+               gnobs=None, rnobs=None, znobs=None, primary=None, south=True,
+               phot=None):
     """Definition of QSO target classes from color cuts. Returns a boolean array.
 
     Parameters
@@ -787,6 +772,10 @@ def isQSO_cuts(gflux=None, rflux=None, zflux=None,
     south : :class:`boolean`, defaults to ``True``
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS) if ``south=False``,
         otherwise use cuts appropriate to the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cmx.cmx_cuts.apply_cuts()`. Built on-the-fly
+        from the passed fluxes if not sent.
 
     Returns
     -------
@@ -798,7 +787,9 @@ def isQSO_cuts(gflux=None, rflux=None, zflux=None,
     - See :func:`~desitarget.cuts.set_target_bits` for other parameters.
     """
     if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+        if phot is None:
+            phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+        gflux, rflux, zflux = [phot.flux(band, shift=True) for band in "grz"]
 
     if primary is None:
         primary = np.ones_like(rflux, dtype='?')
@@ -894,10 +885,15 @@ def isQSO_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
 
 
 def isQSO_color_high_z(gflux=None, rflux=None, zflux=None,
-                       w1flux=None, w2flux=None, south=True):
+                       w1flux=None, w2flux=None, south=True, phot=None):
     """
     Color cut to select Highz QSO (z>~2.)
     """
+    if not south:
+        if phot is None:
+            phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+        gflux, rflux, zflux = [phot.flux(band, shift=True) for band in "grz"]
+
     # ADM the np.atleast_1d's are to catch the single-object case.
     gflux = np.atleast_1d(gflux)
     rflux = np.atleast_1d(rflux)
@@ -905,9 +901,6 @@ def isQSO_color_high_z(gflux=None, rflux=None, zflux=None,
     w1flux = np.atleast_1d(w1flux)
     w2flux = np.atleast_1d(w2flux)
 
-    if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
-
     wflux = 0.75*w1flux + 0.25*w2flux
     grzflux = (gflux + 0.8*rflux + 0.5*zflux) / 2.3
 
@@ -934,7 +927,7 @@ def isQSO_color_high_z(gflux=None, rflux=None, zflux=None,
 def isQSO_randomforest(gflux=None, rflux=None, zflux=None, w1flux=None,
                        w2flux=None, objtype=None, release=None, dchisq=None,
                        maskbits=None, gnobs=None, rnobs=None, znobs=None,
-                       primary=None, south=True):
+                       primary=None, south=True, phot=None):
     """Definition of QSO target class using random forest. Returns a boolean array.
 
     Parameters
@@ -942,6 +935,10 @@ def isQSO_randomforest(gflux=None, rflux=None, zflux=None, w1flux=None,
     south : :class:`boolean`, defaults to ``True``
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS) if ``south=False``,
         otherwise use cuts appropriate to the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cmx.cmx_cuts.apply_cuts()`. Built on-the-fly
+        from the passed fluxes if not sent.
 
     Returns
     -------
@@ -960,11 +957,15 @@ def isQSO_randomforest(gflux=None, rflux=None, zflux=None, w1flux=None,
     nFeatures = 11  # Number of attributes describing each object to be classified by the rf.
     nbEntries = rflux.size
     # ADM shift the northern photometry to the southern system.
-    if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          w1flux=w1flux, w2flux=w2flux)
+    gflux, rflux, zflux = [phot.flux(band, shift=not south) for band in "grz"]
 
     # ADM photOK here should ensure (g > 0.) & (r > 0.) & (z > 0.) & (W1 > 0.) & (W2 > 0.)
-    colors, r, photOK = _getColors(nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux)
+    colors, r, photOK = phot.cached(
+        _getColors, nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux,
+        key=not south)
     r = np.atleast_1d(r)
 
     # ADM Preselection to speed up the process
@@ -1051,7 +1052,7 @@ def isQSO_randomforest(gflux=None, rflux=None, zflux=None, w1flux=None,
 def isQSO_highz_faint(gflux=None, rflux=None, zflux=None, w1flux=None,
                       w2flux=None, objtype=None, release=None, dchisq=None,
                       gnobs=None, rnobs=None, znobs=None,
-                      maskbits=None, primary=None, south=True):
+                      maskbits=None, primary=None, south=True, phot=None):
     """Definition of QSO target for highz (z>2.0) faint QSOs. Returns a boolean array.
 
     Parameters
@@ -1059,6 +1060,10 @@ def isQSO_highz_faint(gflux=None, rflux=None, zflux=None, w1flux=None,
     south : :class:`boolean`, defaults to ``True``
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS) if ``south=False``,
         otherwise use cuts appropriate to the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cmx.cmx_cuts.apply_cuts()`. Built on-the-fly
+        from the passed fluxes if not sent.
 
     Returns
     -------
@@ -1077,11 +1082,15 @@ def isQSO_highz_faint(gflux=None, rflux=None, zflux=None, w1flux=None,
     nFeatures = 11  # Number of attributes describing each object to be classified by the rf.
     nbEntries = rflux.size
     # ADM shift the northern photometry to the southern system.
-    if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          w1flux=w1flux, w2flux=w2flux)
+    gflux, rflux, zflux = [phot.flux(band, shift=not south) for band in "grz"]
 
     # ADM photOK here should ensure (g > 0.) & (r > 0.) & (z > 0.) & (W1 > 0.) & (W2 > 0.).
-    colors, r, photOK = _getColors(nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux)
+    colors, r, photOK = phot.cached(
+        _getColors, nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux,
+        key=not south)
     r = np.atleast_1d(r)
 
     # ADM Preselection to speed up the process.
@@ -1163,7 +1172,7 @@ def isQSOz5_cuts(gflux=None, rflux=None, zflux=None,
                  gnobs=None, rnobs=None, znobs=None,
                  w1flux=None, w2flux=None, w1snr=None, w2snr=None,
                  dchisq=None, maskbits=None, objtype=None, primary=None,
-                 south=True):
+                 south=True, phot=None):
     """Definition of z~5 QSO target classes from color cuts. Returns a boolean array.
 
     Parameters
@@ -1171,6 +1180,10 @@ def isQSOz5_cuts(gflux=None, rflux=None, zflux=None,
     south : :class:`boolean`, defaults to ``True``
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS) if ``south=False``,
         otherwise use cuts appropriate to the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cmx.cmx_cuts.apply_cuts()`. Built on-the-fly
+        from the passed fluxes if not sent.
 
     Returns
     -------
@@ -1182,7 +1195,11 @@ def isQSOz5_cuts(gflux=None, rflux=None, zflux=None,
     - See :func:`~desitarget.cuts.set_target_bits` for other parameters.
     """
     if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+        if phot is None:
+            phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+        # ADM copy, as isQSOz5_colors() modifies the fluxes in-place.
+        gflux, rflux, zflux = [phot.flux(band, shift=True).copy()
+                               for band in "grz"]
 
     if primary is None:
         primary = np.ones_like(rflux, dtype='?')
@@ -1300,12 +1317,16 @@ def isQSOz5_colors(gflux=None, rflux=None, zflux=None,
 def isSV0_ELG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
               gsnr=None, rsnr=None, zsnr=None, gfiberflux=None,
               gnobs=None, rnobs=None, znobs=None,
-              maskbits=None, primary=None):
+              maskbits=None, primary=None, phot=None):
     """Definition of an SV0-like ELG target. Returns a boolean array.
 
     Parameters
     ----------
-    See :func:`~desitarget.cuts.set_target_bits`.
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cmx.cmx_cuts.apply_cuts()`. Built on-the-fly
+        from the passed fluxes if not sent.
+    See :func:`~desitarget.cuts.set_target_bits` for other parameters.
 
     Returns
     -------
@@ -1327,7 +1348,7 @@ def isSV0_ELG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
 
     svgtot, svgfib, fdrgtot, fdrgfib = isELG_colors(
         gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux, w2flux=w2flux,
-        gfiberflux=gfiberflux, south=False, primary=elg
+        gfiberflux=gfiberflux, south=False, primary=elg, phot=phot
     )
 
     return svgtot | svgfib | fdrgtot | fdrgfib
@@ -1356,7 +1377,7 @@ def notinELG_mask(maskbits=None, gsnr=None, rsnr=None, zsnr=None,
 
 
 def isELG_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
-                 gfiberflux=None, primary=None, south=True):
+                 gfiberflux=None, primary=None, south=True, phot=None):
     """Color cuts for ELG target selection classes
     (see, e.g., :func:`desitarget.cuts.set_target_bits` for parameters).
     """
@@ -1376,12 +1397,15 @@ def isELG_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
 
     # ADM work in magnitudes not fluxes. THIS IS ONLY OK AS the snr cuts
     # ADM in notinELG_mask ENSURE positive fluxes in all of g, r and z.
-    g = 22.5 - 2.5*np.log10(gflux.clip(1e-16))
-    r = 22.5 - 2.5*np.log10(rflux.clip(1e-16))
-    z = 22.5 - 2.5*np.log10(zflux.clip(1e-16))
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          gfiberflux=gfiberflux)
+    g = phot.mag("g")
+    r = phot.mag("r")
+    z = phot.mag("z")
 
     # ADM gfiberflux can be zero but is never negative. So this is safe.
-    gfib = 22.5 - 2.5*np.log10(gfiberflux.clip(1e-16))
+    gfib = phot.mag("gfiber")
 
     # ADM these are safe as the snr cuts in notinELG_mask ENSURE positive
     # ADM fluxes in all of g, r and z...so things near colors of zero but
@@ -1427,7 +1451,8 @@ def isSV0_STD(gflux=None, rflux=None, zflux=None, primary=None,
               gfluxivar=None, rfluxivar=None, zfluxivar=None, objtype=None,
               gaia=None, astrometricexcessnoise=None, paramssolved=None,
               pmra=None, pmdec=None, parallax=None, dupsource=None,
-              gaiagmag=None, gaiabmag=None, gaiarmag=None, bright=False):
+              gaiagmag=None, gaiabmag=None, gaiarmag=None, bright=False,
+              phot=None):
     """Select STD targets using color cuts and photometric quality cuts.
 
     Parameters
@@ -1435,6 +1460,10 @@ def isSV0_STD(gflux=None, rflux=None, zflux=None, primary=None,
     bright : :class:`boolean`, defaults to ``False``
         if ``True`` apply magnitude cuts for "bright" conditions; otherwise,
         choose "normal" brightness standards. Cut is performed on `gaiagmag`.
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cmx.cmx_cuts.apply_cuts()`. Built on-the-fly
+        from the passed fluxes if not sent.
 
     Returns
     -------
@@ -1467,7 +1496,8 @@ def isSV0_STD(gflux=None, rflux=None, zflux=None, primary=None,
             std &= fracmasked[bandint] < 0.6
 
     # ADM apply the Legacy Surveys (optical) magnitude and color cuts.
-    std &= isSTD_colors(primary=primary, zflux=zflux, rflux=rflux, gflux=gflux)
+    std &= isSTD_colors(primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
+                        phot=phot)
 
     # ADM apply the Gaia quality cuts.
     std &= isSTD_gaia(primary=primary, gaia=gaia,
@@ -1489,7 +1519,7 @@ def isSV0_STD(gflux=None, rflux=None, zflux=None, primary=None,
 
 
 def isSTD_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
-                 primary=None):
+                 primary=None, phot=None):
     """Select STD stars based on Legacy Surveys color cuts. Returns a boolean array.
     see :func:`~desitarget.sv1.sv1_cuts.isSTD` for other details.
     """
@@ -1497,15 +1527,14 @@ def isSTD_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
         primary = np.ones_like(gflux, dtype='?')
     std = primary.copy()
 
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+
     # Clip to avoid warnings from negative numbers.
     # ADM we're pretty bright for the STDs, so this should be safe.
-    gflux = gflux.clip(1e-16)
-    rflux = rflux.clip(1e-16)
-    zflux = zflux.clip(1e-16)
-
     # ADM optical colors for halo TO or bluer.
-    grcolor = 2.5 * np.log10(rflux / gflux)
-    rzcolor = 2.5 * np.log10(zflux / rflux)
+    grcolor = phot.color("g", "r", clip=1e-16)
+    rzcolor = phot.color("r", "z", clip=1e-16)
     std &= rzcolor < 0.2
     std &= grcolor > 0.
     std &= grcolor < 0.35
@@ -2258,13 +2287,20 @@ def apply_cuts(objects, cmxdir=None, noqso=False):
         galb=galb, gaia=gaia, primary=primary
     )
 
+    # ADM magnitudes, colors, etc. shared by the SV0 classes. isSV0_QSO()
+    # ADM zeroes some W1 fluxes in-place, so the Main Survey classes
+    # ADM build their own Photometry, below, from the updated fluxes.
+    sv0phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
+                         w2flux=w2flux, gfiberflux=gfiberflux,
+                         zfiberflux=zfiberflux)
+
     # ADM determine if an object is SV0_LRG.
     sv0_lrg = isSV0_LRG(
         gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
         rfiberflux=rfiberflux, zfiberflux=zfiberflux,
         gflux_snr=gsnr, rflux_snr=rsnr, zflux_snr=zsnr, w1flux_snr=w1snr,
         gnobs=gnobs, rnobs=rnobs, znobs=znobs, maskbits=maskbits,
-        primary=primary
+        primary=primary, phot=sv0phot
     )
 
     # ADM determine if an object is SV0_ELG.
@@ -2272,7 +2308,7 @@ def apply_cuts(objects, cmxdir=None, noqso=False):
         gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux, w2flux=w2flux,
         gsnr=gsnr, rsnr=rsnr, zsnr=zsnr, gfiberflux=gfiberflux,
         gnobs=gnobs, rnobs=rnobs, znobs=znobs,
-        maskbits=maskbits, primary=primary
+        maskbits=maskbits, primary=primary, phot=sv0phot
     )
 
     # ADM determine if an object is SV0_QSO.
@@ -2285,7 +2321,7 @@ def apply_cuts(objects, cmxdir=None, noqso=False):
             w1flux=w1flux, w2flux=w2flux,
             gsnr=gsnr, rsnr=rsnr, zsnr=zsnr, w1snr=w1snr, w2snr=w2snr,
             gnobs=gnobs, rnobs=rnobs, znobs=znobs,
-            objtype=objtype, dchisq=dchisq, maskbits=maskbits
+            objtype=objtype, dchisq=dchisq, maskbits=maskbits, phot=sv0phot
         )
 
     # ADM run the SV0 STD target types for both faint and bright.
@@ -2302,7 +2338,8 @@ def apply_cuts(objects, cmxdir=None, noqso=False):
                 gfluxivar=gfluxivar, rfluxivar=rfluxivar, zfluxivar=zfluxivar,
                 gaia=gaia, astrometricexcessnoise=gaiaaen, paramssolved=gaiaparamssolved,
                 pmra=pmra, pmdec=pmdec, parallax=parallax, dupsource=gaiadupsource,
-                gaiagmag=gaiagmag, gaiabmag=gaiabmag, gaiarmag=gaiarmag, bright=bright
+                gaiagmag=gaiagmag, gaiabmag=gaiabmag, gaiarmag=gaiarmag, bright=bright,
+                phot=sv0phot
             )
         )
     sv0_std_faint, sv0_std_bright = sv0_std_classes
@@ -2316,6 +2353,11 @@ def apply_cuts(objects, cmxdir=None, noqso=False):
     # ADM of the southern cuts.
     south_cuts = [False, True]
 
+    # ADM magnitudes, colors, etc. shared by the Main Survey classes.
+    phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
+                      w2flux=w2flux, gfiberflux=gfiberflux,
+                      rfiberflux=rfiberflux, zfiberflux=zfiberflux)
+
     # ADM Main Survey LRGs.
     # ADM initially set everything to arrays of False for the LRGs
     # ADM the zeroth element stores northern targets bits (south=False).
@@ -2326,7 +2368,7 @@ def apply_cuts(objects, cmxdir=None, noqso=False):
             gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
             zfiberflux=zfiberflux, gnobs=gnobs, rnobs=rnobs, znobs=znobs,
             rfluxivar=rfluxivar, zfluxivar=zfluxivar, w1fluxivar=w1fluxivar,
-            maskbits=maskbits, south=south
+            maskbits=maskbits, south=south, phot=phot
         )
     lrg_north, lrg_south = lrg_classes
     # ADM combine LRG target bits for an LRG target based on any imaging.
@@ -2341,7 +2383,7 @@ def apply_cuts(objects, cmxdir=None, noqso=False):
             primary=primary, gflux=gflux, rflux=rflux, zflux=zflux,
             gsnr=gsnr, rsnr=rsnr, zsnr=zsnr,
             gnobs=gnobs, rnobs=rnobs, znobs=znobs, maskbits=maskbits,
-            south=south
+            south=south, phot=phot
         )
     elg_north, elg_south = elg_classes
     # ADM combine ELG target bits for an ELG target based on any imaging.
@@ -2358,7 +2400,8 @@ def apply_cuts(objects, cmxdir=None, noqso=False):
                 primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
                 w1flux=w1flux, w2flux=w2flux, deltaChi2=deltaChi2,
                 maskbits=maskbits, gnobs=gnobs, rnobs=rnobs, znobs=znobs,
-                objtype=objtype, release=release, ra=ra, dec=dec, south=south
+                objtype=objtype, release=release, ra=ra, dec=dec, south=south,
+                phot=phot
             )
     qso_north, qso_hiz_north = qso_classes[0]
     qso_south, qso_hiz_south = qso_classes[1]
@@ -2379,7 +2422,8 @@ def apply_cuts(objects, cmxdir=None, noqso=False):
             gfracin=gfracin, rfracin=rfracin, zfracin=zfracin,
             gfluxivar=gfluxivar, rfluxivar=rfluxivar, zfluxivar=zfluxivar,
             maskbits=maskbits, Grr=Grr, refcat=refcat, w1snr=w1snr, gaiagmag=gaiagmag,
-            objtype=objtype, primary=primary, south=south, targtype="bright"
+            objtype=objtype, primary=primary, south=south, targtype="bright",
+            phot=phot
         )
     bgs_north, bgs_south = bgs_classes
 
@@ -2578,8 +2622,12 @@ def select_targets(infiles, numproc=4, cmxdir=None, noqso=False,
     # -Parallel process input files
     if numproc > 1:
         pool = sharedmem.MapReduce(np=numproc)
+        # ADM start with the largest files so they aren't left to the end.
         with pool:
-            targets = pool.map(_select_targets_file, infiles, reduce=_update_status)
+            targets = pool.map(_select_targets_file, infiles,
+                               reduce=_update_status, cost='size')
+        for i, secs in pool.slowest(3):
+            log.info('Slowest files: {} took {:.1f} secs'.format(infiles[i], secs))
     else:
         targets = list()
         for x in infiles:
@@ -0,0 +1,233 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""
+=====================
+desitarget.crossmatch
+=====================
+
+Fast matching of coordinates on the sky, using KD-trees built from
+unit vectors.
+
+The functions in this module follow the return conventions of the
+equivalent :class:`~astropy.coordinates.SkyCoord` methods, but take
+RA/Dec arrays in DEGREES and return separations in ARCSECONDS. They
+avoid the (substantial) overhead of creating SkyCoord objects, which
+matters for the tens of millions of rows processed by desitarget.
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def radec2xyz(ra, dec):
+    """Convert RA/Dec to Cartesian unit vectors.
+
+    Parameters
+    ----------
+    ra, dec : :class:`~numpy.ndarray` or `float`
+        Right Ascension and Declination in DEGREES.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        An (N, 3) array of unit vectors.
+    """
+    theta = np.radians(90-np.atleast_1d(np.asarray(dec, dtype='f8')))
+    phi = np.radians(np.atleast_1d(np.asarray(ra, dtype='f8')))
+    sintheta = np.sin(theta)
+
+    return np.vstack([sintheta*np.cos(phi), sintheta*np.sin(phi),
+                      np.cos(theta)]).T
+
+
+def sep2chord(sep):
+    """Convert angular separations to chord lengths on the unit sphere.
+
+    Parameters
+    ----------
+    sep : :class:`~numpy.ndarray` or `float`
+        Angular separation(s) in ARCSECONDS.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray` or `float`
+        The equivalent separation(s) between unit vectors.
+    """
+    return 2*np.sin(np.radians(np.asarray(sep)/3600.)/2)
+
+
+def chord2sep(chord):
+    """Convert chord lengths on the unit sphere to angular separations.
+
+    Parameters
+    ----------
+    chord : :class:`~numpy.ndarray` or `float`
+        Separation(s) between unit vectors.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray` or `float`
+        The equivalent angular separation(s) in ARCSECONDS.
+    """
+    return 3600.*np.degrees(2*np.arcsin(np.clip(np.asarray(chord)/2, 0, 1)))
+
+
+def match_nearest(ra1, dec1, ra2, dec2, sep=None):
+    """Find the nearest object in a catalog for each of a set of objects.
+
+    Parameters
+    ----------
+    ra1, dec1 : :class:`~numpy.ndarray`
+        Coordinates (DEGREES) of the objects to match.
+    ra2, dec2 : :class:`~numpy.ndarray`
+        Coordinates (DEGREES) of the catalog to match to.
+    sep : :class:`float`, optional, defaults to ``None``
+        If passed, only search for matches within `sep` ARCSECONDS,
+        which is much faster than finding the nearest object at any
+        separation.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        For each of the objects, the index of the nearest object in the
+        catalog. If `sep` is passed, objects with no match within `sep`
+        have an index of ``len(ra2)``.
+    :class:`~numpy.ndarray`
+        The separation of each match in ARCSECONDS. If `sep` is passed,
+        objects with no match within `sep` have a separation of ``inf``.
+
+    Notes
+    -----
+        - Analogous to :meth:`~astropy.coordinates.SkyCoord.match_to_catalog_sky`.
+    """
+    xyz1, xyz2 = radec2xyz(ra1, dec1), radec2xyz(ra2, dec2)
+    n1, n2 = len(xyz1), len(xyz2)
+
+    # ADM catch the corner case of an empty catalog.
+    if n1 == 0 or n2 == 0:
+        return np.zeros(n1, dtype='int') + n2, np.zeros(n1) + np.inf
+
+    bound = np.inf
+    if sep is not None:
+        bound = sep2chord(sep)
+
+    chord, idx2 = cKDTree(xyz2).query(xyz1, distance_upper_bound=bound)
+    d2d = np.zeros(n1) + np.inf
+    ii = idx2 < n2
+    d2d[ii] = chord2sep(chord[ii])
+
+    return idx2, d2d
+
+
+def search_around(ra1, dec1, ra2, dec2, sep):
+    """Find all pairs of objects in two sets that are within a separation.
+
+    Parameters
+    ----------
+    ra1, dec1 : :class:`~numpy.ndarray`
+        Coordinates (DEGREES) of the first set of objects.
+    ra2, dec2 : :class:`~numpy.ndarray`
+        Coordinates (DEGREES) of the second set of objects.
+    sep : :class:`float`
+        The maximum separation (ARCSECONDS) of a pair.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Indexes of the first set of objects for each pair.
+    :class:`~numpy.ndarray`
+        Indexes of the second set of objects for each pair.
+    :class:`~numpy.ndarray`
+        The separation of each pair in ARCSECONDS.
+
+    Notes
+    -----
+        - Analogous to ``coords2.search_around_sky(coords1, sep)`` (or
+          :func:`~astropy.coordinates.search_around_sky`).
+        - Pairs are sorted by the first index and then the second index.
+        - Passing the same set of objects twice returns self-matches.
+    """
+    xyz1, xyz2 = radec2xyz(ra1, dec1), radec2xyz(ra2, dec2)
+
+    # ADM catch the corner case of an empty set of objects.
+    if len(xyz1) == 0 or len(xyz2) == 0:
+        return np.zeros(0, dtype='int'), np.zeros(0, dtype='int'), np.zeros(0)
+
+    # ADM only build one tree when matching a set of objects to itself.
+    tree1 = cKDTree(xyz1)
+    tree2 = tree1
+    if ra2 is not ra1 or dec2 is not dec1:
+        tree2 = cKDTree(xyz2)
+    pairs = tree1.sparse_distance_matrix(tree2, sep2chord(sep),
+                                         output_type='ndarray')
+
+    # ADM sort pairs so the output is reproducible.
+    ii = np.lexsort([pairs['j'], pairs['i']])
+    pairs = pairs[ii]
+
+    return (pairs['i'].astype('int'), pairs['j'].astype('int'),
+            chord2sep(pairs['v']))
+
+
+def search_around_variable(ra1, dec1, ra2, dec2, sep2):
+    """Find pairs of objects within a radius defined for the second set.
+
+    Parameters
+    ----------
+    ra1, dec1 : :class:`~numpy.ndarray`
+        Coordinates (DEGREES) of the first set of objects (e.g. targets).
+    ra2, dec2 : :class:`~numpy.ndarray`
+        Coordinates (DEGREES) of the second set of objects (e.g. masks).
+    sep2 : :class:`~numpy.ndarray` or `float`
+        The radius (ARCSECONDS) of each object in the second set.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Indexes of the first set of objects for each pair.
+    :class:`~numpy.ndarray`
+        Indexes of the second set of objects for each pair.
+    :class:`~numpy.ndarray`
+        The separation of each pair in ARCSECONDS.
+
+    Notes
+    -----
+        - Pairs are only returned if the separation is strictly less
+          than the radius of the object in the second set.
+        - Pairs are sorted by the first index and then the second index.
+        - The second set is split into bins of radius that each span a
+          factor of 2, and each bin is searched at its own maximum
+          radius. This is much faster than searching at the maximum
+          radius when large radii are rare (e.g. bright star masks).
+    """
+    xyz1, xyz2 = radec2xyz(ra1, dec1), radec2xyz(ra2, dec2)
+    sep2 = np.broadcast_to(np.asarray(sep2, dtype='f8'), len(xyz2))
+
+    # ADM only objects with a positive radius can contain anything.
+    ok = sep2 > 0
+    if len(xyz1) == 0 or not np.any(ok):
+        return np.zeros(0, dtype='int'), np.zeros(0, dtype='int'), np.zeros(0)
+
+    # ADM the bin of radius for each object in the second set.
+    binnum = np.zeros(len(sep2), dtype='int')
+    binnum[ok] = np.floor(np.log2(sep2[ok]))
+
+    tree1 = cKDTree(xyz1)
+    idx1, idx2, d2d = [], [], []
+    for b in np.unique(binnum[ok]):
+        ii = np.where(ok & (binnum == b))[0]
+        pairs = tree1.sparse_distance_matrix(
+            cKDTree(xyz2[ii]), sep2chord(np.max(sep2[ii])),
+            output_type='ndarray')
+        j = ii[pairs['j']]
+        sep = chord2sep(pairs['v'])
+        # ADM limit to the radius of each object in the bin.
+        keep = sep < sep2[j]
+        idx1.append(pairs['i'][keep])
+        idx2.append(j[keep])
+        d2d.append(sep[keep])
+    idx1, idx2, d2d = [np.concatenate(i) for i in [idx1, idx2, d2d]]
+
+    # ADM sort pairs so the output is reproducible.
+    ii = np.lexsort([idx2, idx1])
+
+    return idx1[ii].astype('int'), idx2[ii].astype('int'), d2d[ii]
@@ -15,12 +15,16 @@ flux passes a given selection criterion (*e.g.* LRG, ELG or QSO).
 import warnings
 from time import time
 import os.path
+import shutil
+import hashlib
+import inspect
 
 import numbers
 import sys
 
 import numpy as np
 import healpy as hp
+import fitsio
 from pkg_resources import resource_filename
 import numpy.lib.recfunctions as rfn
 from importlib import import_module
@@ -29,13 +33,16 @@ from astropy.table import Table, Row
 
 from desitarget import io
 from desitarget.internal import sharedmem
-from desitarget.gaiamatch import match_gaia_to_primary
+from desitarget.gaiamatch import match_gaia_to_primary, gaia_cache_shared_by
 from desitarget.gaiamatch import pop_gaia_coords, pop_gaia_columns
 from desitarget.gaiamatch import gaia_dr_from_ref_cat, is_in_Galaxy
+from desitarget.gaiamatch import gaiadatamodel
+from desitarget.gaiamatch import _get_gaia_nside, find_gaia_files_hp
 from desitarget.targets import finalize, resolve
 from desitarget.geomask import bundle_bricks, pixarea2nside, sweep_files_touch_hp
 from desitarget.geomask import box_area, hp_in_box, is_in_box, is_in_hp
 from desitarget.geomask import cap_area, hp_in_cap, is_in_cap, imaging_mask
+from desitarget.geomask import nside2nside
 
 # ADM set up the DESI default logger
 from desiutil.log import get_logger
@@ -44,6 +51,90 @@ log = get_logger()
 # ADM start the clock
 start = time()
 
+# ADM the sweeps columns that are always needed for target selection,
+# ADM e.g. by finalize() and resolve() or to seed BGS_FAINT_HIP.
+basecolumns = ["RELEASE", "BRICKID", "BRICKNAME", "OBJID", "TYPE", "RA", "DEC",
+               "MASKBITS", "REF_ID", "REF_CAT", "FLUX_Z", "MW_TRANSMISSION_Z"]
+
+# ADM the additional sweeps columns needed by each target class. These
+# ADM are derived from the quantities that set_target_bits() passes to
+# ADM each class (see _prepared_columns). The cuts raise an error if a
+# ADM class is passed a quantity derived from columns that weren't read.
+tccolumns = {
+    "LRG": ["FIBERFLUX_Z", "FLUX_G", "FLUX_IVAR_R", "FLUX_IVAR_W1",
+            "FLUX_IVAR_Z", "FLUX_R", "FLUX_W1", "FLUX_Z", "MASKBITS",
+            "MW_TRANSMISSION_G", "MW_TRANSMISSION_R", "MW_TRANSMISSION_W1",
+            "MW_TRANSMISSION_Z", "NOBS_G", "NOBS_R", "NOBS_Z"],
+    "ELG": ["FLUX_G", "FLUX_IVAR_G", "FLUX_IVAR_R", "FLUX_IVAR_Z", "FLUX_R",
+            "FLUX_Z", "MASKBITS", "MW_TRANSMISSION_G", "MW_TRANSMISSION_R",
+            "MW_TRANSMISSION_Z", "NOBS_G", "NOBS_R", "NOBS_Z"],
+    "QSO": ["DCHISQ", "DEC", "FLUX_G", "FLUX_IVAR_W1", "FLUX_IVAR_W2",
+            "FLUX_R", "FLUX_W1", "FLUX_W2", "FLUX_Z", "MASKBITS",
+            "MW_TRANSMISSION_G", "MW_TRANSMISSION_R", "MW_TRANSMISSION_W1",
+            "MW_TRANSMISSION_W2", "MW_TRANSMISSION_Z", "NOBS_G", "NOBS_R",
+            "NOBS_Z", "RA", "RELEASE", "TYPE"],
+    "BGS": ["FIBERFLUX_R", "FLUX_G", "FLUX_IVAR_G", "FLUX_IVAR_R",
+            "FLUX_IVAR_W1", "FLUX_IVAR_Z", "FLUX_R", "FLUX_W1", "FLUX_W2",
+            "FLUX_Z", "FRACFLUX_G", "FRACFLUX_R", "FRACFLUX_Z", "FRACIN_G",
+            "FRACIN_R", "FRACIN_Z", "FRACMASKED_G", "FRACMASKED_R",
+            "FRACMASKED_Z", "GAIA_PHOT_G_MEAN_MAG", "MASKBITS",
+            "MW_TRANSMISSION_G", "MW_TRANSMISSION_R", "MW_TRANSMISSION_W1",
+            "MW_TRANSMISSION_W2", "MW_TRANSMISSION_Z", "NOBS_G", "NOBS_R",
+            "NOBS_Z", "REF_CAT", "TYPE"],
+    "MWS": ["DEC", "FLUX_G", "FLUX_R", "FRACMASKED_G", "FRACMASKED_R",
+            "GAIA_ASTROMETRIC_EXCESS_NOISE", "GAIA_ASTROMETRIC_PARAMS_SOLVED",
+            "GAIA_ASTROMETRIC_SIGMA5D_MAX", "GAIA_DUPLICATED_SOURCE",
+            "GAIA_PHOT_BP_MEAN_MAG", "GAIA_PHOT_BP_RP_EXCESS_FACTOR",
+            "GAIA_PHOT_G_MEAN_MAG", "GAIA_PHOT_RP_MEAN_MAG", "MW_TRANSMISSION_G",
+            "MW_TRANSMISSION_R", "NOBS_G", "NOBS_R", "PARALLAX", "PARALLAX_IVAR",
+            "PMDEC", "PMRA", "PMRA_IVAR", "RA", "REF_CAT", "REF_ID", "TYPE"],
+    "STD": ["DEC", "FLUX_G", "FLUX_IVAR_G", "FLUX_IVAR_R", "FLUX_IVAR_Z",
+            "FLUX_R", "FLUX_Z", "FRACFLUX_G", "FRACFLUX_R", "FRACFLUX_Z",
+            "FRACMASKED_G", "FRACMASKED_R", "FRACMASKED_Z",
+            "GAIA_ASTROMETRIC_EXCESS_NOISE", "GAIA_ASTROMETRIC_PARAMS_SOLVED",
+            "GAIA_ASTROMETRIC_SIGMA5D_MAX", "GAIA_DUPLICATED_SOURCE",
+            "GAIA_PHOT_BP_MEAN_MAG", "GAIA_PHOT_BP_RP_EXCESS_FACTOR",
+            "GAIA_PHOT_G_MEAN_MAG", "GAIA_PHOT_RP_MEAN_MAG", "MW_TRANSMISSION_G",
+            "MW_TRANSMISSION_R", "MW_TRANSMISSION_Z", "NOBS_G", "NOBS_R",
+            "NOBS_Z", "PARALLAX", "PARALLAX_IVAR", "PMDEC", "PMRA", "PMRA_IVAR",
+            "RA", "REF_CAT", "REF_ID", "TYPE"]
+}
+
+# ADM the sweeps columns from which each of the quantities passed to the
+# ADM target classes by set_target_bits() are derived (see, e.g.,
+# ADM _prepare_optical_wise() and _prepare_gaia()).
+_prepared_columns = {
+    "obs_rflux": ["FLUX_R"], "objtype": ["TYPE"], "release": ["RELEASE"],
+    "ra": ["RA"], "dec": ["DEC"], "galb": ["RA", "DEC"],
+    "deltaChi2": ["DCHISQ"], "dchisq": ["DCHISQ"], "maskbits": ["MASKBITS"],
+    "refcat": ["REF_CAT"], "gaia": ["REF_ID"], "pmra": ["PMRA"],
+    "pmdec": ["PMDEC"], "parallax": ["PARALLAX"],
+    "parallaxovererror": ["PARALLAX", "PARALLAX_IVAR"],
+    "parallaxerr": ["PARALLAX_IVAR"], "gaiagmag": ["GAIA_PHOT_G_MEAN_MAG"],
+    "gaiabmag": ["GAIA_PHOT_BP_MEAN_MAG"], "gaiarmag": ["GAIA_PHOT_RP_MEAN_MAG"],
+    "gaiaaen": ["GAIA_ASTROMETRIC_EXCESS_NOISE"],
+    "gaiadupsource": ["GAIA_DUPLICATED_SOURCE"],
+    "gaiaparamssolved": ["PMRA", "PMRA_IVAR"],
+    "Grr": ["GAIA_PHOT_G_MEAN_MAG", "FLUX_R"]
+}
+for band in ["G", "R", "Z", "W1", "W2"]:
+    b = band.lower()
+    _prepared_columns["{}flux".format(b)] = [
+        "FLUX_{}".format(band), "MW_TRANSMISSION_{}".format(band)]
+    _prepared_columns["{}snr".format(b)] = [
+        "FLUX_{}".format(band), "FLUX_IVAR_{}".format(band)]
+    _prepared_columns["{}fluxivar".format(b)] = ["FLUX_IVAR_{}".format(band)]
+for band in ["G", "R", "Z"]:
+    b = band.lower()
+    _prepared_columns["{}fiberflux".format(b)] = [
+        "FIBERFLUX_{}".format(band), "MW_TRANSMISSION_{}".format(band)]
+    for col in ["NOBS", "FRACFLUX", "FRACMASKED", "FRACIN", "ALLMASK"]:
+        _prepared_columns["{}{}".format(b, col.lower())] = [
+            "{}_{}".format(col, band)]
+
+# ADM cache of the dtypes of every column in the sweeps data model.
+_sweep_dtypes = None
+
 
 def _gal_coords(ra, dec):
     """Shift RA, Dec to Galactic coordinates.
@@ -138,6 +229,258 @@ def shift_photo_north(gflux=None, rflux=None, zflux=None):
     return gshift, rshift, zshift
 
 
+class Photometry(object):
+    """Lazily evaluated, cached photometric quantities for a set of objects.
+
+    Parameters
+    ----------
+    gflux, rflux, zflux, w1flux, w2flux : :class:`~numpy.ndarray`
+        The flux in nano-maggies of g, r, z, W1 and W2 bands.
+    gfiberflux, rfiberflux, zfiberflux : :class:`~numpy.ndarray`
+        Predicted fiber flux in 1 arcsecond seeing in g/r/z-band.
+
+    Notes
+    -----
+        - Built once per batch of objects by, e.g.,
+          :func:`~desitarget.cuts.set_target_bits()`, and passed to the
+          selection functions as `phot`, so that quantities such as
+          magnitudes, colors and fluxes shifted by
+          :func:`~desitarget.cuts.shift_photo_north()` are only
+          calculated once, however many target classes need them.
+        - Bands are referred to as "g", "r", "z", "w1", "w2", "gfiber",
+          "rfiber" and "zfiber".
+        - The returned arrays are shared between calls, so should NOT be
+          modified in-place.
+    """
+    def __init__(self, gflux=None, rflux=None, zflux=None, w1flux=None,
+                 w2flux=None, gfiberflux=None, rfiberflux=None,
+                 zfiberflux=None):
+        self.fluxes = {"g": gflux, "r": rflux, "z": zflux, "w1": w1flux,
+                       "w2": w2flux, "gfiber": gfiberflux,
+                       "rfiber": rfiberflux, "zfiber": zfiberflux}
+        self._cache = {}
+
+    def cached(self, func, *args, key=None):
+        """Return `func(*args)`, calling `func` only on the first request.
+
+        Parameters
+        ----------
+        func : :class:`function`
+            The function that calculates the quantity.
+        *args
+            The arguments to pass to `func`.
+        key : hashable, optional, defaults to ``None``
+            Distinguishes between calls to `func` with different `args`.
+
+        Returns
+        -------
+        The (cached) output of `func(*args)`.
+        """
+        key = (func, key)
+        if key not in self._cache:
+            self._cache[key] = func(*args)
+        return self._cache[key]
+
+    def flux(self, band, shift=False):
+        """The flux in a band.
+
+        Parameters
+        ----------
+        band : :class:`str`
+            The band, e.g. "g" or "rfiber".
+        shift : :class:`bool`, optional, defaults to ``False``
+            If ``True``, shift g, r and z fluxes from the northern to the
+            southern system using :func:`shift_photo_north()`.
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            The flux in `band`.
+        """
+        if not shift or band not in ["g", "r", "z"]:
+            return self.fluxes[band]
+        shifted = self.cached(shift_photo_north, self.fluxes["g"],
+                              self.fluxes["r"], self.fluxes["z"])
+        return shifted["grz".index(band)]
+
+    def mag(self, band, clip=1e-16, shift=False):
+        """The magnitude in a band, 22.5 - 2.5*log10(flux.clip(`clip`)).
+
+        Parameters
+        ----------
+        band : :class:`str`
+            The band, e.g. "g" or "rfiber".
+        clip : :class:`float`, optional, defaults to 1e-16
+            The flux is clipped to this value before taking the log.
+        shift : :class:`bool`, optional, defaults to ``False``
+            As for :func:`flux()`.
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            The magnitude in `band`.
+        """
+        key = ("mag", band, clip, shift)
+        if key not in self._cache:
+            flux = self.flux(band, shift=shift)
+            self._cache[key] = 22.5 - 2.5*np.log10(flux.clip(clip))
+        return self._cache[key]
+
+    def color(self, band1, band2, clip=1e-16, shift=False):
+        """The color `band1` - `band2` from the ratio of clipped fluxes.
+
+        Parameters
+        ----------
+        band1, band2 : :class:`str`
+            The bands, e.g. "g" and "r" for a g-r color.
+        clip : :class:`float`, optional, defaults to 1e-16
+            The fluxes are clipped to this value before taking the ratio.
+        shift : :class:`bool`, optional, defaults to ``False``
+            As for :func:`flux()`.
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            2.5*log10(flux2/flux1) for the clipped fluxes in the bands.
+        """
+        key = ("color", band1, band2, clip, shift)
+        if key not in self._cache:
+            flux1 = self.flux(band1, shift=shift).clip(clip)
+            flux2 = self.flux(band2, shift=shift).clip(clip)
+            self._cache[key] = 2.5 * np.log10(flux2 / flux1)
+        return self._cache[key]
+
+    def subset(self, rows):
+        """A new (empty-cache) :class:`Photometry` for a subset of objects.
+
+        Parameters
+        ----------
+        rows : :class:`~numpy.ndarray`
+            Indices (or a boolean mask) of the objects to retain.
+
+        Returns
+        -------
+        :class:`Photometry`
+            Photometry for just the objects in `rows`.
+        """
+        fluxes = {band: None if flux is None else flux[rows]
+                  for band, flux in self.fluxes.items()}
+        return Photometry(gflux=fluxes["g"], rflux=fluxes["r"],
+                          zflux=fluxes["z"], w1flux=fluxes["w1"],
+                          w2flux=fluxes["w2"], gfiberflux=fluxes["gfiber"],
+                          rfiberflux=fluxes["rfiber"],
+                          zfiberflux=fluxes["zfiber"])
+
+
+def _photsys_cutter(photsys_south, south, partition=False, phot=None,
+                    blocksize=None, missing=None):
+    """Function to apply the cuts for one photometric system.
+
+    Parameters
+    ----------
+    photsys_south : :class:`~numpy.ndarray` or `bool`
+        ``True`` for objects that were drawn from southern imaging.
+    south : :class:`bool`
+        ``True`` for the southern (DECaLS) cuts, ``False`` for the
+        northern (BASS/MzLS) cuts. Only used if `partition` is ``True``.
+    partition : :class:`bool`, optional, defaults to ``False``
+        If ``True``, only apply the cuts to objects from the photometric
+        system that matches `south`.
+    phot : :class:`Photometry`, optional
+        Cached photometry for all of the objects.
+    blocksize : :class:`int`, optional, defaults to ``None``
+        If passed, apply the cuts to blocks of (at most) this many
+        objects at a time, rather than to all objects at once.
+    missing : :class:`dict`, optional, defaults to ``None``
+        Quantities that were derived from columns that weren't read (see
+        :func:`_missing_quantities`). A ``ValueError`` is raised if any
+        of these are passed to `func`.
+
+    Returns
+    -------
+    :class:`function`
+        Function with signature `cutter(func, **kwargs)` that returns
+        `func(**kwargs)`. If `partition` is ``True``, or `blocksize` is
+        passed, `func` is instead called for each block of objects
+        from the photometric system that matches `south`. Any array in
+        `kwargs` with one entry per object is limited to the block, any
+        `phot` in `kwargs` is replaced by the equivalent
+        :class:`Photometry`, and the (``False``-padded) output for each
+        block is scattered back to all objects.
+
+    Notes
+    -----
+        - If all objects are from the same photometric system, the cuts
+          are applied as if `partition` were ``False``.
+        - The :class:`Photometry` for each block is retained between
+          calls, so it is shared by the target classes.
+        - Working on blocks of objects keeps the many temporary arrays
+          created by the cuts small enough to stay in the CPU cache. A
+          `blocksize` of ~10,000 objects is a reasonable choice.
+    """
+    def _check(func, kwargs):
+        # ADM a target class mustn't use columns that weren't read.
+        if missing:
+            needs = sorted(kw for kw in kwargs if kw in missing)
+            if len(needs) > 0:
+                cols = sorted(set(sum([missing[kw] for kw in needs], [])))
+                msg = "{} needs columns that weren't read ({}): {}".format(
+                    func.__name__, needs, cols)
+                log.critical(msg)
+                raise ValueError(msg)
+
+    nobjs = np.size(photsys_south)
+    rows = None
+    if partition and not np.isscalar(photsys_south):
+        rows = np.flatnonzero(photsys_south == south)
+        if len(rows) == nobjs:
+            rows = None
+
+    # ADM the blocks of objects to which to apply the cuts.
+    if rows is not None:
+        blocksize = blocksize or max(len(rows), 1)
+        # ADM always at least one (possibly empty) block, so the cuts are
+        # ADM still called if no objects are in this photometric system.
+        blocks = [rows[i:i+blocksize]
+                  for i in range(0, max(len(rows), 1), blocksize)]
+    elif blocksize is not None and not np.isscalar(photsys_south) \
+            and nobjs > blocksize:
+        blocks = [slice(i, i+blocksize) for i in range(0, nobjs, blocksize)]
+    else:
+        def cutter(func, **kwargs):
+            _check(func, kwargs)
+            return func(**kwargs)
+        return cutter
+
+    subphots = [None if phot is None else phot.subset(block)
+                for block in blocks]
+
+    def _scatter(results):
+        # ADM recurse through the tuple/list output of some cuts.
+        if isinstance(results[0], (tuple, list)):
+            return type(results[0])(_scatter(res) for res in zip(*results))
+        full = np.zeros(nobjs, dtype=np.asarray(results[0]).dtype)
+        for block, res in zip(blocks, results):
+            full[block] = res
+        return full
+
+    def cutter(func, **kwargs):
+        _check(func, kwargs)
+        results = []
+        for block, subphot in zip(blocks, subphots):
+            blockkw = {}
+            for kw, val in kwargs.items():
+                if isinstance(val, np.ndarray) and val.ndim > 0 and len(val) == nobjs:
+                    val = val[block]
+                blockkw[kw] = val
+            if "phot" in kwargs:
+                blockkw["phot"] = subphot
+            results.append(func(**blockkw))
+        return _scatter(results)
+
+    return cutter
+
+
 def isBACKUP(ra=None, dec=None, gaiagmag=None, primary=None):
     """BACKUP targets based on Gaia magnitudes.
 
@@ -200,7 +543,7 @@ def isBACKUP(ra=None, dec=None, gaiagmag=None, primary=None):
 def isLRG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
           zfiberflux=None, rfluxivar=None, zfluxivar=None, w1fluxivar=None,
           gnobs=None, rnobs=None, znobs=None, maskbits=None, primary=None,
-          south=True):
+          south=True, phot=None):
     """
     Parameters
     ----------
@@ -208,6 +551,10 @@ def isLRG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS)
         if ``south=False``, otherwise use cuts appropriate to the
         Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cuts.set_target_bits()`. Built on-the-fly from
+        the passed fluxes if not sent.
 
     Returns
     -------
@@ -235,7 +582,7 @@ def isLRG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
     # ADM color-based selection of LRGs.
     lrg &= isLRG_colors(
         gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
-        zfiberflux=zfiberflux, south=south, primary=primary
+        zfiberflux=zfiberflux, south=south, primary=primary, phot=phot
     )
 
     return lrg
@@ -276,7 +623,7 @@ def notinLRG_mask(primary=None, rflux=None, zflux=None, w1flux=None,
 
 def isLRG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
                  zfiberflux=None, ggood=None,
-                 w2flux=None, primary=None, south=True):
+                 w2flux=None, primary=None, south=True, phot=None):
     """(see, e.g., :func:`~desitarget.cuts.isLRG`).
 
     Notes:
@@ -292,12 +639,16 @@ def isLRG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
         log.warning('Setting zfiberflux to zflux!!!')
         zfiberflux = zflux.copy()
 
-    gmag = 22.5 - 2.5 * np.log10(gflux.clip(1e-7))
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          w1flux=w1flux, zfiberflux=zfiberflux)
+
+    gmag = phot.mag("g", clip=1e-7)
     # ADM safe as these fluxes are set to > 0 in notinLRG_mask.
-    rmag = 22.5 - 2.5 * np.log10(rflux.clip(1e-7))
-    zmag = 22.5 - 2.5 * np.log10(zflux.clip(1e-7))
-    w1mag = 22.5 - 2.5 * np.log10(w1flux.clip(1e-7))
-    zfibermag = 22.5 - 2.5 * np.log10(zfiberflux.clip(1e-7))
+    rmag = phot.mag("r", clip=1e-7)
+    zmag = phot.mag("z", clip=1e-7)
+    w1mag = phot.mag("w1", clip=1e-7)
+    zfibermag = phot.mag("zfiber", clip=1e-7)
 
     if south:
         lrg &= zmag - w1mag > 0.8 * (rmag-zmag) - 0.6    # non-stellar cut.
@@ -323,7 +674,7 @@ def isLRG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
 
 def isELG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
           gsnr=None, rsnr=None, zsnr=None, gnobs=None, rnobs=None, znobs=None,
-          maskbits=None, south=True, primary=None):
+          maskbits=None, south=True, primary=None, phot=None):
     """Definition of ELG target classes. Returns a boolean array.
     (see :func:`~desitarget.cuts.set_target_bits` for parameters).
 
@@ -338,7 +689,7 @@ def isELG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
                          gnobs=gnobs, rnobs=rnobs, znobs=znobs, primary=primary)
 
     elg &= isELG_colors(gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
-                        w2flux=w2flux, south=south, primary=primary)
+                        w2flux=w2flux, south=south, primary=primary, phot=phot)
 
     return elg
 
@@ -365,7 +716,7 @@ def notinELG_mask(maskbits=None, gsnr=None, rsnr=None, zsnr=None,
 
 
 def isELG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
-                 w2flux=None, south=True, primary=None):
+                 w2flux=None, south=True, primary=None, phot=None):
     """Color cuts for ELG target selection classes
     (see, e.g., :func:`desitarget.cuts.set_target_bits` for parameters).
     """
@@ -373,11 +724,14 @@ def isELG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
         primary = np.ones_like(rflux, dtype='?')
     elg = primary.copy()
 
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+
     # ADM work in magnitudes instead of fluxes. NOTE THIS IS ONLY OK AS
     # ADM the snr masking in ALL OF g, r AND z ENSURES positive fluxes.
-    g = 22.5 - 2.5*np.log10(gflux.clip(1e-16))
-    r = 22.5 - 2.5*np.log10(rflux.clip(1e-16))
-    z = 22.5 - 2.5*np.log10(zflux.clip(1e-16))
+    g = phot.mag("g")
+    r = phot.mag("r")
+    z = phot.mag("z")
 
     # ADM cuts shared by the northern and southern selections.
     elg &= g > 20                       # bright cut.
@@ -398,7 +752,7 @@ def isELG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
 
 
 def isSTD_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
-                 primary=None, south=True):
+                 primary=None, south=True, phot=None):
     """Select STD stars based on Legacy Surveys color cuts. Returns a boolean array.
 
     Args:
@@ -410,6 +764,8 @@ def isSTD_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
         south: boolean, defaults to ``True``
             Use color-cuts based on photometry from the "south" (DECaLS) as
             opposed to the "north" (MzLS+BASS).
+        phot: :class:`~desitarget.cuts.Photometry`, optional
+            Cached photometric quantities for the passed fluxes.
 
     Returns:
         mask : boolean array, True if the object has colors like a STD star target
@@ -422,15 +778,14 @@ def isSTD_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
         primary = np.ones_like(gflux, dtype='?')
     std = primary.copy()
 
-    # Clip to avoid warnings from negative numbers.
-    # ADM we're pretty bright for the STDs, so this should be safe.
-    gflux = gflux.clip(1e-16)
-    rflux = rflux.clip(1e-16)
-    zflux = zflux.clip(1e-16)
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
 
-    # ADM optical colors for halo TO or bluer.
-    grcolor = 2.5 * np.log10(rflux / gflux)
-    rzcolor = 2.5 * np.log10(zflux / rflux)
+    # ADM optical colors for halo TO or bluer. Fluxes are clipped to
+    # ADM avoid warnings from negative numbers. We're pretty bright
+    # ADM for the STDs, so this should be safe.
+    grcolor = phot.color("g", "r", clip=1e-16)
+    rzcolor = phot.color("r", "z", clip=1e-16)
     # Currently no difference in north vs south color-cuts.
     if south:
         std &= rzcolor < 0.2
@@ -524,7 +879,7 @@ def isSTD(gflux=None, rflux=None, zflux=None, primary=None,
           gaia=None, astrometricexcessnoise=None, paramssolved=None,
           pmra=None, pmdec=None, parallax=None, dupsource=None,
           gaiagmag=None, gaiabmag=None, gaiarmag=None, bright=False,
-          usegaia=True, south=True):
+          usegaia=True, south=True, phot=None):
     """Select STD targets using color cuts and photometric quality cuts (PSF-like
     and fracflux).  See isSTD_colors() for additional info.
 
@@ -570,6 +925,8 @@ def isSTD(gflux=None, rflux=None, zflux=None, primary=None,
         south: boolean, defaults to ``True``
             Use color-cuts based on photometry from the "south" (DECaLS) as
             opposed to the "north" (MzLS+BASS).
+        phot: :class:`~desitarget.cuts.Photometry`, optional
+            Cached photometric quantities for the passed fluxes.
 
     Returns:
         mask : boolean array, True if the object has colors like a STD star.
@@ -584,7 +941,8 @@ def isSTD(gflux=None, rflux=None, zflux=None, primary=None,
     std = primary.copy()
 
     # ADM apply the Legacy Surveys (optical) magnitude and color cuts.
-    std &= isSTD_colors(primary=primary, zflux=zflux, rflux=rflux, gflux=gflux, south=south)
+    std &= isSTD_colors(primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
+                        south=south, phot=phot)
 
     # ADM apply the Gaia quality cuts.
     if usegaia:
@@ -970,7 +1328,8 @@ def isBGS(rfiberflux=None, gflux=None, rflux=None, zflux=None, w1flux=None, w2fl
           gnobs=None, rnobs=None, znobs=None, gfracmasked=None, rfracmasked=None, zfracmasked=None,
           gfracflux=None, rfracflux=None, zfracflux=None, gfracin=None, rfracin=None, zfracin=None,
           gfluxivar=None, rfluxivar=None, zfluxivar=None, maskbits=None, Grr=None, refcat=None,
-          w1snr=None, gaiagmag=None, objtype=None, primary=None, south=True, targtype=None):
+          w1snr=None, gaiagmag=None, objtype=None, primary=None, south=True, targtype=None,
+          phot=None):
     """Definition of BGS target classes. Returns a boolean array.
 
     Args
@@ -979,6 +1338,10 @@ def isBGS(rfiberflux=None, gflux=None, rflux=None, zflux=None, w1flux=None, w2fl
         Pass ``bright`` to use colors appropriate to the ``BGS_BRIGHT`` selection
         or ``faint`` to use colors appropriate to the ``BGS_FAINT`` selection
         or ``wise`` to use colors appropriate to the ``BGS_WISE`` selection.
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cuts.set_target_bits()`. Built on-the-fly from
+        the passed fluxes if not sent.
 
     Returns
     -------
@@ -1005,7 +1368,8 @@ def isBGS(rfiberflux=None, gflux=None, rflux=None, zflux=None, w1flux=None, w2fl
                          gaiagmag=gaiagmag, maskbits=maskbits, targtype=targtype)
 
     bgs &= isBGS_colors(rfiberflux=rfiberflux, gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
-                        w2flux=w2flux, south=south, targtype=targtype, primary=primary)
+                        w2flux=w2flux, south=south, targtype=targtype, primary=primary,
+                        phot=phot)
 
     bgs |= isBGS_lslga(gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux, refcat=refcat,
                        maskbits=maskbits, south=south, targtype=targtype)
@@ -1050,7 +1414,7 @@ def notinBGS_mask(gnobs=None, rnobs=None, znobs=None, primary=None,
 
 
 def isBGS_colors(rfiberflux=None, gflux=None, rflux=None, zflux=None, w1flux=None,
-                 w2flux=None, south=True, targtype=None, primary=None):
+                 w2flux=None, south=True, targtype=None, primary=None, phot=None):
     """Standard set of color-based cuts used by all BGS target selection classes
     (see, e.g., :func:`~desitarget.cuts.isBGS` for parameters).
     """
@@ -1077,10 +1441,12 @@ def isBGS_colors(rfiberflux=None, gflux=None, rflux=None, zflux=None, w1flux=Non
         bgs &= zflux > rflux * 10**(-1.0/2.5)
         bgs &= zflux < rflux * 10**(4.0/2.5)
 
-    g = 22.5 - 2.5*np.log10(gflux.clip(1e-16))
-    r = 22.5 - 2.5*np.log10(rflux.clip(1e-16))
-    z = 22.5 - 2.5*np.log10(zflux.clip(1e-16))
-    rfib = 22.5 - 2.5*np.log10(rfiberflux.clip(1e-16))
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          rfiberflux=rfiberflux)
+
+    r = phot.mag("r")
+    rfib = phot.mag("rfiber")
 
     # Fibre Magnitude Cut (FMC) -- This is a low surface brightness cut
     # with the aim of increase the redshift success rate.
@@ -1144,7 +1510,8 @@ def isBGS_lslga(gflux=None, rflux=None, zflux=None, w1flux=None, refcat=None,
 def isQSO_cuts(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
                w1snr=None, w2snr=None, deltaChi2=None, maskbits=None,
                gnobs=None, rnobs=None, znobs=None,
-               release=None, objtype=None, primary=None, optical=False, south=True):
+               release=None, objtype=None, primary=None, optical=False, south=True,
+               phot=None):
     """Definition of QSO target classes from color cuts. Returns a boolean array.
 
     Parameters
@@ -1154,6 +1521,10 @@ def isQSO_cuts(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
     south : :class:`boolean`, defaults to ``True``
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS) if ``south=False``,
         otherwise use cuts appropriate to the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cuts.set_target_bits()`. Built on-the-fly from
+        the passed fluxes if not sent.
 
     Returns
     -------
@@ -1167,7 +1538,9 @@ def isQSO_cuts(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
     """
 
     if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+        if phot is None:
+            phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+        gflux, rflux, zflux = [phot.flux(band, shift=True) for band in "grz"]
 
     qso = isQSO_colors(gflux=gflux, rflux=rflux, zflux=zflux,
                        w1flux=w1flux, w2flux=w2flux,
@@ -1244,7 +1617,8 @@ def isQSO_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
 def isQSO_randomforest(gflux=None, rflux=None, zflux=None, maskbits=None,
                        w1flux=None, w2flux=None, objtype=None, release=None,
                        gnobs=None, rnobs=None, znobs=None, deltaChi2=None,
-                       primary=None, ra=None, dec=None, south=True, return_probs=False):
+                       primary=None, ra=None, dec=None, south=True, return_probs=False,
+                       phot=None):
     """Define QSO targets from a Random Forest. Returns a boolean array.
 
     Parameters
@@ -1256,6 +1630,10 @@ def isQSO_randomforest(gflux=None, rflux=None, zflux=None, maskbits=None,
         If ``True``, return the QSO/high-z QSO probabilities in addition
         to the QSO target booleans. Only coded up for DR8 or later of the
         Legacy Surveys. Will return arrays of zeros for earlier DRs.
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.cuts.set_target_bits()`. Built on-the-fly from
+        the passed fluxes if not sent.
 
     Returns
     -------
@@ -1288,10 +1666,14 @@ def isQSO_randomforest(gflux=None, rflux=None, zflux=None, maskbits=None,
     # Build variables for random forest
     nFeatures = 11   # Number of attributes describing each object to be classified by the rf
     nbEntries = rflux.size
-    if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
-
-    colors, r, photOK = _getColors(nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux)
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          w1flux=w1flux, w2flux=w2flux)
+    gflux, rflux, zflux = [phot.flux(band, shift=not south) for band in "grz"]
+
+    colors, r, photOK = phot.cached(
+        _getColors, nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux,
+        key=not south)
     r = np.atleast_1d(r)
 
     # Preselection to speed up the process
@@ -1574,6 +1956,107 @@ def _get_colnames(objects):
     return colnames
 
 
+def _get_column(objects, colname, colnames):
+    """Return a column, or zeros in the sweeps data model if it's missing.
+
+    Parameters
+    ----------
+    objects : :class:`~numpy.ndarray`
+        numpy structured array (or row) with UPPERCASE columns.
+    colname : :class:`str`
+        The name of the column to return.
+    colnames : :class:`list`
+        The columns in `objects`, as returned by :func:`_get_colnames`.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        `objects[colname]`, or zeros of the appropriate dtype and shape
+        if `colname` isn't in `objects`, e.g. because only the columns
+        needed for certain target classes were read (see
+        :func:`columns_for_tcnames`). The cuts raise an error if such
+        zeros are passed to a target class (see :func:`_missing_quantities`).
+    """
+    if colname in colnames:
+        return objects[colname]
+
+    global _sweep_dtypes
+    if _sweep_dtypes is None:
+        _sweep_dtypes = {}
+        for dm in [io.basetsdatamodel, io.dr9addedcols, io.dr8addedcols,
+                   gaiadatamodel]:
+            for col in dm.dtype.names:
+                _sweep_dtypes[col] = dm.dtype[col]
+
+    dt = _sweep_dtypes[colname]
+    if _is_row(objects):
+        return np.zeros(dt.shape, dtype=dt.base)[()]
+
+    return np.zeros((len(objects),) + dt.shape, dtype=dt.base)
+
+
+def columns_for_tcnames(tcnames=["ELG", "QSO", "LRG", "MWS", "BGS", "STD"],
+                        survey='main'):
+    """The sweeps columns needed to select a list of target classes.
+
+    Parameters
+    ----------
+    tcnames : :class:`list`, defaults to all target classes
+        A list of strings, e.g. ['QSO','LRG']. Options include
+        ["ELG", "QSO", "LRG", "MWS", "BGS", "STD"].
+    survey : :class:`str`, defaults to ``'main'``
+        Use the column dependencies for the main survey (``'main'``)
+        or an iteration of SV (``'svX'``, where X is 1, 2, 3 etc.).
+
+    Returns
+    -------
+    :class:`list`
+        The columns that are needed from the sweeps (or tractor) files
+        to run the selection for `tcnames` (including columns that are
+        always needed, see `basecolumns`).
+    """
+    if survey == 'main':
+        survcolumns = tccolumns
+    elif survey[:2] == 'sv':
+        targcuts = import_module("desitarget.{}.{}_cuts".format(survey, survey))
+        survcolumns = targcuts.tccolumns
+    else:
+        msg = "survey must be either 'main'or 'svX', not {}!!!".format(survey)
+        log.critical(msg)
+        raise ValueError(msg)
+
+    columns = list(basecolumns)
+    for tcname in tcnames:
+        columns += [col for col in survcolumns[tcname] if col not in columns]
+
+    return columns
+
+
+def _missing_quantities(objects):
+    """Quantities for target selection derived from unread columns.
+
+    Parameters
+    ----------
+    objects : :class:`~numpy.ndarray`
+        numpy structured array (or row) with UPPERCASE columns.
+
+    Returns
+    -------
+    :class:`dict`
+        The names of the quantities passed to the target classes by
+        :func:`set_target_bits()` (see `_prepared_columns`) that are
+        derived from columns that aren't in `objects`, and those columns.
+    """
+    colnames = set(_get_colnames(objects))
+    missing = {}
+    for name, cols in _prepared_columns.items():
+        unread = [col for col in cols if col not in colnames]
+        if len(unread) > 0:
+            missing[name] = unread
+
+    return missing
+
+
 def _prepare_optical_wise(objects, mask=True):
     """Process the Legacy Surveys inputs for target selection.
 
@@ -1583,6 +2066,9 @@ def _prepare_optical_wise(objects, mask=True):
         Send ``False`` to turn off any masking cuts based on the `MASKBITS` column. The
         default behavior is to always mask using `MASKBITS`.
     """
+    # ADM As we need the column names.
+    colnames = _get_colnames(objects)
+
     # ADM flag whether we're using northen (BASS/MZLS) or
     # ADM southern (DECaLS) photometry
     photsys_north = _isonnorthphotsys(objects["PHOTSYS"])
@@ -1606,10 +2092,10 @@ def _prepare_optical_wise(objects, mask=True):
 
     # ADM the observed r-band flux (used for F standards and MWS, below)
     # ADM make copies of values that we may reassign due to NaNs
-    obs_rflux = objects['FLUX_R']
+    obs_rflux = _get_column(objects, 'FLUX_R', colnames)
 
     # - undo Milky Way extinction
-    flux = unextinct_fluxes(objects)
+    flux = unextinct_fluxes(objects, colnames=colnames)
 
     gflux = flux['GFLUX']
     rflux = flux['RFLUX']
@@ -1619,53 +2105,58 @@ def _prepare_optical_wise(objects, mask=True):
     gfiberflux = flux['GFIBERFLUX']
     rfiberflux = flux['RFIBERFLUX']
     zfiberflux = flux['ZFIBERFLUX']
-    objtype = objects['TYPE']
-    release = objects['RELEASE']
-
-    ra = objects['RA']
-    dec = objects['DEC']
-
-    gfluxivar = objects['FLUX_IVAR_G']
-    rfluxivar = objects['FLUX_IVAR_R']
-    zfluxivar = objects['FLUX_IVAR_Z']
-    w1fluxivar = objects['FLUX_IVAR_W1']
-
-    gnobs = objects['NOBS_G']
-    rnobs = objects['NOBS_R']
-    znobs = objects['NOBS_Z']
-
-    gfracflux = objects['FRACFLUX_G']
-    rfracflux = objects['FRACFLUX_R']
-    zfracflux = objects['FRACFLUX_Z']
-
-    gfracmasked = objects['FRACMASKED_G']
-    rfracmasked = objects['FRACMASKED_R']
-    zfracmasked = objects['FRACMASKED_Z']
-
-    gfracin = objects['FRACIN_G']
-    rfracin = objects['FRACIN_R']
-    zfracin = objects['FRACIN_Z']
-
-    gallmask = objects['ALLMASK_G']
-    rallmask = objects['ALLMASK_R']
-    zallmask = objects['ALLMASK_Z']
-
-    gsnr = objects['FLUX_G'] * np.sqrt(objects['FLUX_IVAR_G'])
-    rsnr = objects['FLUX_R'] * np.sqrt(objects['FLUX_IVAR_R'])
-    zsnr = objects['FLUX_Z'] * np.sqrt(objects['FLUX_IVAR_Z'])
-    w1snr = objects['FLUX_W1'] * np.sqrt(objects['FLUX_IVAR_W1'])
-    w2snr = objects['FLUX_W2'] * np.sqrt(objects['FLUX_IVAR_W2'])
-
-    refcat = objects['REF_CAT']
-
-    maskbits = objects['MASKBITS']
+    objtype = _get_column(objects, 'TYPE', colnames)
+    release = _get_column(objects, 'RELEASE', colnames)
+
+    ra = _get_column(objects, 'RA', colnames)
+    dec = _get_column(objects, 'DEC', colnames)
+
+    gfluxivar = _get_column(objects, 'FLUX_IVAR_G', colnames)
+    rfluxivar = _get_column(objects, 'FLUX_IVAR_R', colnames)
+    zfluxivar = _get_column(objects, 'FLUX_IVAR_Z', colnames)
+    w1fluxivar = _get_column(objects, 'FLUX_IVAR_W1', colnames)
+
+    gnobs = _get_column(objects, 'NOBS_G', colnames)
+    rnobs = _get_column(objects, 'NOBS_R', colnames)
+    znobs = _get_column(objects, 'NOBS_Z', colnames)
+
+    gfracflux = _get_column(objects, 'FRACFLUX_G', colnames)
+    rfracflux = _get_column(objects, 'FRACFLUX_R', colnames)
+    zfracflux = _get_column(objects, 'FRACFLUX_Z', colnames)
+
+    gfracmasked = _get_column(objects, 'FRACMASKED_G', colnames)
+    rfracmasked = _get_column(objects, 'FRACMASKED_R', colnames)
+    zfracmasked = _get_column(objects, 'FRACMASKED_Z', colnames)
+
+    gfracin = _get_column(objects, 'FRACIN_G', colnames)
+    rfracin = _get_column(objects, 'FRACIN_R', colnames)
+    zfracin = _get_column(objects, 'FRACIN_Z', colnames)
+
+    gallmask = _get_column(objects, 'ALLMASK_G', colnames)
+    rallmask = _get_column(objects, 'ALLMASK_R', colnames)
+    zallmask = _get_column(objects, 'ALLMASK_Z', colnames)
+
+    gsnr = _get_column(objects, 'FLUX_G', colnames) * np.sqrt(
+        _get_column(objects, 'FLUX_IVAR_G', colnames))
+    rsnr = _get_column(objects, 'FLUX_R', colnames) * np.sqrt(
+        _get_column(objects, 'FLUX_IVAR_R', colnames))
+    zsnr = _get_column(objects, 'FLUX_Z', colnames) * np.sqrt(
+        _get_column(objects, 'FLUX_IVAR_Z', colnames))
+    w1snr = _get_column(objects, 'FLUX_W1', colnames) * np.sqrt(
+        _get_column(objects, 'FLUX_IVAR_W1', colnames))
+    w2snr = _get_column(objects, 'FLUX_W2', colnames) * np.sqrt(
+        _get_column(objects, 'FLUX_IVAR_W2', colnames))
+
+    refcat = _get_column(objects, 'REF_CAT', colnames)
+
+    maskbits = _get_column(objects, 'MASKBITS', colnames)
     # ADM if we asked to turn off masking behavior, turn it off.
     if not mask:
-        maskbits = objects['MASKBITS'].copy()
+        maskbits = _get_column(objects, 'MASKBITS', colnames).copy()
         maskbits[...] = 0
 
     # Delta chi2 between PSF and SIMP morphologies; note the sign....
-    dchisq = objects['DCHISQ']
+    dchisq = _get_column(objects, 'DCHISQ', colnames)
     deltaChi2 = dchisq[..., 0] - dchisq[..., 1]
 
     # ADM remove handful of NaN values from DCHISQ values and make them unselectable.
@@ -1700,11 +2191,11 @@ def _prepare_gaia(objects, colnames=None):
     gaia = objects['REF_ID'] > 0
     if "REF_CAT" in colnames:
         gaia = (objects['REF_CAT'] == b'G2') | (objects['REF_CAT'] == 'G2')
-    pmra = objects['PMRA']
-    pmdec = objects['PMDEC']
-    pmraivar = objects['PMRA_IVAR']
-    parallax = objects['PARALLAX']
-    parallaxivar = objects['PARALLAX_IVAR']
+    pmra = _get_column(objects, 'PMRA', colnames)
+    pmdec = _get_column(objects, 'PMDEC', colnames)
+    pmraivar = _get_column(objects, 'PMRA_IVAR', colnames)
+    parallax = _get_column(objects, 'PARALLAX', colnames)
+    parallaxivar = _get_column(objects, 'PARALLAX_IVAR', colnames)
     # ADM derive the parallax/parallax_error, but set to 0 where the error is bad
     parallaxovererror = np.where(parallaxivar > 0., parallax*np.sqrt(parallaxivar), 0.)
 
@@ -1713,27 +2204,28 @@ def _prepare_gaia(objects, colnames=None):
     notzero = parallaxivar > 0
     if np.sum(notzero) > 0:
         parallaxerr[notzero] = 1 / np.sqrt(parallaxivar[notzero])
-    gaiagmag = objects['GAIA_PHOT_G_MEAN_MAG']
-    gaiabmag = objects['GAIA_PHOT_BP_MEAN_MAG']
-    gaiarmag = objects['GAIA_PHOT_RP_MEAN_MAG']
-    gaiaaen = objects['GAIA_ASTROMETRIC_EXCESS_NOISE']
+    gaiagmag = _get_column(objects, 'GAIA_PHOT_G_MEAN_MAG', colnames)
+    gaiabmag = _get_column(objects, 'GAIA_PHOT_BP_MEAN_MAG', colnames)
+    gaiarmag = _get_column(objects, 'GAIA_PHOT_RP_MEAN_MAG', colnames)
+    gaiaaen = _get_column(objects, 'GAIA_ASTROMETRIC_EXCESS_NOISE', colnames)
     # ADM a mild hack, as GAIA_DUPLICATED_SOURCE was a 0/1 integer at some point.
-    gaiadupsource = objects['GAIA_DUPLICATED_SOURCE']
+    gaiadupsource = _get_column(objects, 'GAIA_DUPLICATED_SOURCE', colnames)
     if issubclass(gaiadupsource.dtype.type, np.integer):
         if len(set(np.atleast_1d(gaiadupsource)) - set([0, 1])) == 0:
-            gaiadupsource = objects['GAIA_DUPLICATED_SOURCE'].astype(bool)
+            gaiadupsource = gaiadupsource.astype(bool)
 
     # For BGS target selection.
     # ADM first guard against FLUX_R < 0 (I've checked this generates
     # ADM the same set of targets as Grr = NaN).
+    robsflux = _get_column(objects, 'FLUX_R', colnames)
     Grr = gaiagmag - 22.5 + 2.5*np.log10(1e-16)
-    ii = objects['FLUX_R'] > 0
+    ii = robsflux > 0
     # ADM catch the case where Grr is a scalar.
     if isinstance(Grr, np.float):
         if ii:
-            Grr = gaiagmag - 22.5 + 2.5*np.log10(objects['FLUX_R'])
+            Grr = gaiagmag - 22.5 + 2.5*np.log10(robsflux)
     else:
-        Grr[ii] = gaiagmag[ii] - 22.5 + 2.5*np.log10(objects['FLUX_R'][ii])
+        Grr[ii] = gaiagmag[ii] - 22.5 + 2.5*np.log10(robsflux[ii])
 
     # ADM If proper motion is not NaN, 31 parameters were solved for
     # ADM in Gaia astrometry. Or, gaiaparamssolved should be 3 for NaNs).
@@ -1768,19 +2260,25 @@ def _prepare_gaia(objects, colnames=None):
             gaiabprpfactor, gaiasigma5dmax, galb)
 
 
-def unextinct_fluxes(objects):
+def unextinct_fluxes(objects, colnames=None):
     """Calculate unextincted DECam and WISE fluxes.
 
     Args:
         objects: array or Table with columns FLUX_G, FLUX_R, FLUX_Z,
             MW_TRANSMISSION_G, MW_TRANSMISSION_R, MW_TRANSMISSION_Z,
             FLUX_W1, FLUX_W2, MW_TRANSMISSION_W1, MW_TRANSMISSION_W2
+        colnames: list of the columns in `objects`, derived if not passed.
+            Any flux for which a FLUX or MW_TRANSMISSION column is missing
+            is returned as zero.
 
     Returns:
         array or Table with columns GFLUX, RFLUX, ZFLUX, W1FLUX, W2FLUX
 
     Output type is Table if input is Table, otherwise numpy structured array
     """
+    if colnames is None:
+        colnames = _get_colnames(objects)
+
     dtype = [('GFLUX', 'f4'), ('RFLUX', 'f4'), ('ZFLUX', 'f4'),
              ('W1FLUX', 'f4'), ('W2FLUX', 'f4'),
              ('GFIBERFLUX', 'f4'), ('RFIBERFLUX', 'f4'), ('ZFIBERFLUX', 'f4')]
@@ -1789,14 +2287,16 @@ def unextinct_fluxes(objects):
     else:
         result = np.zeros(len(objects), dtype=dtype)
 
-    result['GFLUX'] = objects['FLUX_G'] / objects['MW_TRANSMISSION_G']
-    result['RFLUX'] = objects['FLUX_R'] / objects['MW_TRANSMISSION_R']
-    result['ZFLUX'] = objects['FLUX_Z'] / objects['MW_TRANSMISSION_Z']
-    result['W1FLUX'] = objects['FLUX_W1'] / objects['MW_TRANSMISSION_W1']
-    result['W2FLUX'] = objects['FLUX_W2'] / objects['MW_TRANSMISSION_W2']
-    result['GFIBERFLUX'] = objects['FIBERFLUX_G'] / objects['MW_TRANSMISSION_G']
-    result['RFIBERFLUX'] = objects['FIBERFLUX_R'] / objects['MW_TRANSMISSION_R']
-    result['ZFIBERFLUX'] = objects['FIBERFLUX_Z'] / objects['MW_TRANSMISSION_Z']
+    for band in ['G', 'R', 'Z', 'W1', 'W2']:
+        for fluxcol, outcol in [('FLUX_', '{}FLUX'),
+                                ('FIBERFLUX_', '{}FIBERFLUX')]:
+            col, trans = fluxcol+band, 'MW_TRANSMISSION_'+band
+            # ADM there are no WISE fiber fluxes.
+            if outcol.format(band) not in result.dtype.names:
+                continue
+            # ADM skip fluxes that weren't read, to avoid dividing 0/0.
+            if col in colnames and trans in colnames:
+                result[outcol.format(band)] = objects[col] / objects[trans]
 
     if isinstance(objects, Table):
         return Table(result)
@@ -1804,6 +2304,79 @@ def unextinct_fluxes(objects):
         return result
 
 
+def _uniform_from_radec(ra, dec):
+    """A number in [0, 1) for each source, seeded by its RA/Dec.
+
+    Parameters
+    ----------
+    ra, dec : :class:`~numpy.ndarray` or `float`
+        Right Ascension and Declination of each source.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray` or `float`
+        A number for each source, uniformly distributed in [0, 1). The
+        same coordinates always give the same number.
+    """
+    def _mix(z):
+        # ADM the "splitmix64" finalizer, which scrambles the bits.
+        z = z + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+    rabits = np.atleast_1d(np.asarray(ra, dtype='<f8')).view('<u8')
+    decbits = np.atleast_1d(np.asarray(dec, dtype='<f8')).view('<u8')
+    # ADM integer overflow is intended, here.
+    with np.errstate(over='ignore'):
+        z = _mix(_mix(rabits) ^ decbits)
+    # ADM use the top 53 bits, the precision of a double.
+    uniform = (z >> np.uint64(11)) * 2.**-53
+
+    if np.isscalar(ra):
+        return uniform[0]
+    return uniform
+
+
+def _bgs_faint_hip(bgs_faint, zflux, ra, dec, hipradec=False):
+    """Choose the 10% of BGS_FAINT sources that are BGS_FAINT_HIP.
+
+    Parameters
+    ----------
+    bgs_faint : :class:`~numpy.ndarray` or `bool`
+        ``True`` for BGS_FAINT sources.
+    zflux, ra, dec : :class:`~numpy.ndarray` or `float`
+        The z-band flux and RA/Dec of each source.
+    hipradec : :class:`boolean`, optional, defaults to ``False``
+        If ``True``, use :func:`_uniform_from_radec` to draw a number
+        for each source. Otherwise, choose exactly 10% (rounded down)
+        of the `bgs_faint` sources, seeded by the mean of `zflux`.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray` or `bool`
+        ``True`` for BGS_FAINT_HIP sources.
+    """
+    if hipradec:
+        return bgs_faint & (_uniform_from_radec(ra, dec) < 0.1)
+
+    # ADM form a seed using RA/Dec in case we parallelized by HEALPixel.
+    # SJB seeds must be within 0 - 2**32-1
+    # SJB np1.18 scalar vs. vector support, but note that HIP won't be
+    #     set identically for vector vs. calling scalar N times.
+    uniqseed = int(np.mean(zflux)*1e5) % (2**32 - 1)
+    np.random.seed(uniqseed)
+    if np.isscalar(bgs_faint):
+        return bool(bgs_faint) and np.random.uniform(0, 1) < 0.1
+
+    hip = np.zeros_like(bgs_faint, dtype=bool)
+    w = np.where(bgs_faint)[0]
+    if len(w) > 0:
+        hip[np.random.choice(w, len(w)//10, replace=False)] = True
+
+    return hip
+
+
 def set_target_bits(photsys_north, photsys_south, obs_rflux,
                     gflux, rflux, zflux, w1flux, w2flux,
                     gfiberflux, rfiberflux, zfiberflux, objtype, release,
@@ -1816,7 +2389,9 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
                     gaiagmag, gaiabmag, gaiarmag, gaiaaen, gaiadupsource,
                     gaiaparamssolved, gaiabprpfactor, gaiasigma5dmax, galb,
                     tcnames, qso_optical_cuts, qso_selection,
-                    maskbits, Grr, refcat, primary, resolvetargs=True):
+                    maskbits, Grr, refcat, primary, resolvetargs=True,
+                    partition=False, blocksize=None, missing=None,
+                    hipradec=False):
     """Perform target selection on parameters, return target mask arrays.
 
     Parameters
@@ -1892,6 +2467,27 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     resolvetargs : :class:`boolean`, optional, defaults to ``True``
         If ``True``, if only northern (southern) sources are passed then
         only apply the northern (southern) cuts to those sources.
+    partition : :class:`boolean`, optional, defaults to ``False``
+        If ``True``, and `resolvetargs` is ``True``, then when a mix of
+        northern and southern sources is passed, only apply the northern
+        (southern) cuts to the northern (southern) sources. The combined
+        bits (e.g. LRG) are unchanged, but the north/south-specific bits
+        (e.g. LRG_NORTH) are then only set for sources from the matching
+        imaging, as if the sources had been passed separately.
+    blocksize : :class:`int`, optional, defaults to ``None``
+        If passed, apply the cuts for each target class to blocks of
+        this many objects at a time, which keeps temporary arrays in
+        the CPU cache. The bits are unchanged. ~10,000 is a good choice.
+    missing : :class:`dict`, optional, defaults to ``None``
+        The passed quantities that are derived from columns that weren't
+        read (see :func:`_missing_quantities`). A ``ValueError`` is
+        raised if any of these are needed for a class in `tcnames`.
+    hipradec : :class:`boolean`, optional, defaults to ``False``
+        If ``True``, decide whether each `BGS_FAINT` source is also
+        `BGS_FAINT_HIP` from a hash of its RA/Dec, so that the bit
+        doesn't depend on how sources are split into files or chunks.
+        By default, exactly 10% (rounded down) of the passed `BGS_FAINT`
+        sources are chosen at random, seeded by their mean `zflux`.
     ra, dec : :class:`~numpy.ndarray`
         The Ra, Dec position of objects
 
@@ -1919,17 +2515,34 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     # ADM default for target classes we WON'T process is all False.
     tcfalse = primary & False
 
+    # ADM magnitudes, colors, etc. shared by the target classes.
+    phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
+                      w2flux=w2flux, gfiberflux=gfiberflux,
+                      rfiberflux=rfiberflux, zfiberflux=zfiberflux)
+
+    # ADM functions to apply the north/south cuts, limited to only the
+    # ADM northern/southern sources if partition is set.
+    cutters = {south: _photsys_cutter(photsys_south, south,
+                                      partition=resolvetargs and partition,
+                                      phot=phot, blocksize=blocksize,
+                                      missing=missing)
+               for south in south_cuts}
+    # ADM and to apply the cuts that don't depend on north/south.
+    blockcutter = _photsys_cutter(photsys_south, True, phot=phot,
+                                  blocksize=blocksize, missing=missing)
+
     # ADM initially set everything to arrays of False for the LRG selection
     # ADM the zeroth element stores the northern targets bits (south=False).
     lrg_classes = [tcfalse, tcfalse]
     if "LRG" in tcnames:
         for south in south_cuts:
-            lrg_classes[int(south)] = isLRG(
+            lrg_classes[int(south)] = cutters[south](
+                isLRG,
                 primary=primary,
                 gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
                 zfiberflux=zfiberflux, gnobs=gnobs, rnobs=rnobs, znobs=znobs,
                 rfluxivar=rfluxivar, zfluxivar=zfluxivar, w1fluxivar=w1fluxivar,
-                maskbits=maskbits, south=south
+                maskbits=maskbits, south=south, phot=phot
             )
     lrg_north, lrg_south = lrg_classes
 
@@ -1941,11 +2554,12 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     elg_classes = [tcfalse, tcfalse]
     if "ELG" in tcnames:
         for south in south_cuts:
-            elg_classes[int(south)] = isELG(
+            elg_classes[int(south)] = cutters[south](
+                isELG,
                 primary=primary, gflux=gflux, rflux=rflux, zflux=zflux,
                 gsnr=gsnr, rsnr=rsnr, zsnr=zsnr,
                 gnobs=gnobs, rnobs=rnobs, znobs=znobs, maskbits=maskbits,
-                south=south
+                south=south, phot=phot
             )
     elg_north, elg_south = elg_classes
 
@@ -1962,21 +2576,24 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
                 # ADM the [0] here is critical as isQSO_cuts only returns one bit
                 # ADM and the other bit (which is the "high-z" bit from the Random
                 # ADM Forest needs to be set to all "False".
-                qso_classes[int(south)][0] = isQSO_cuts(
+                qso_classes[int(south)][0] = cutters[south](
+                    isQSO_cuts,
                     primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
                     w1flux=w1flux, w2flux=w2flux,
                     deltaChi2=deltaChi2, maskbits=maskbits,
                     gnobs=gnobs, rnobs=rnobs, znobs=znobs,
                     objtype=objtype, w1snr=w1snr, w2snr=w2snr, release=release,
-                    optical=qso_optical_cuts, south=south
+                    optical=qso_optical_cuts, south=south, phot=phot
                 )
             elif qso_selection == 'randomforest':
                 # ADM determine quasar targets in the north and the south separately
-                qso_classes[int(south)] = isQSO_randomforest(
+                qso_classes[int(south)] = cutters[south](
+                    isQSO_randomforest,
                     primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
                     w1flux=w1flux, w2flux=w2flux, deltaChi2=deltaChi2,
                     maskbits=maskbits, gnobs=gnobs, rnobs=rnobs, znobs=znobs,
-                    objtype=objtype, release=release, ra=ra, dec=dec, south=south
+                    objtype=objtype, release=release, ra=ra, dec=dec, south=south,
+                    phot=phot
                 )
             else:
                 raise ValueError('Unknown qso_selection {}; valid options are {}'.format(
@@ -1997,7 +2614,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
             bgs_store = []
             for targtype in ["bright", "faint", "wise"]:
                 bgs_store.append(
-                    isBGS(
+                    cutters[south](
+                        isBGS,
                         rfiberflux=rfiberflux, gflux=gflux, rflux=rflux, zflux=zflux,
                         w1flux=w1flux, w2flux=w2flux, gnobs=gnobs, rnobs=rnobs, znobs=znobs,
                         gfracmasked=gfracmasked, rfracmasked=rfracmasked, zfracmasked=zfracmasked,
@@ -2005,7 +2623,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
                         gfracin=gfracin, rfracin=rfracin, zfracin=zfracin,
                         gfluxivar=gfluxivar, rfluxivar=rfluxivar, zfluxivar=zfluxivar,
                         maskbits=maskbits, Grr=Grr, refcat=refcat, w1snr=w1snr, gaiagmag=gaiagmag,
-                        objtype=objtype, primary=primary, south=south, targtype=targtype
+                        objtype=objtype, primary=primary, south=south, targtype=targtype,
+                        phot=phot
                     )
                 )
             bgs_classes[int(south)] = bgs_store
@@ -2018,35 +2637,22 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     bgs_wise = (bgs_wise_north & photsys_north) | (bgs_wise_south & photsys_south)
 
     # ADM 10% of the BGS_FAINT sources need the BGS_FAINT_HIP bit set.
-    # ADM form a seed using RA/Dec in case we parallelized by HEALPixel.
-    # SJB seeds must be within 0 - 2**32-1
-    # SJB np1.18 scalar vs. vector support, but note that HIP won't be
-    #     set identically for vector vs. calling scalar N times.
-    uniqseed = int(np.mean(zflux)*1e5) % (2**32 - 1)
-    np.random.seed(uniqseed)
-    hip = None
-    if np.isscalar(bgs_faint):
-        if bgs_faint:
-            nbgsf = 1
-            hip = np.random.uniform(0, 1) < 0.1
-    else:
-        w = np.where(bgs_faint)[0]
-        nbgsf = len(w)
-        if nbgsf > 0:
-            hip = np.random.choice(w, nbgsf//10, replace=False)
+    hip = _bgs_faint_hip(bgs_faint, zflux, ra, dec, hipradec=hipradec)
 
     # ADM initially set everything to arrays of False for the MWS selection
     # ADM the zeroth element stores the northern targets bits (south=False).
     mws_classes = [[tcfalse, tcfalse, tcfalse], [tcfalse, tcfalse, tcfalse]]
     mws_nearby = tcfalse
     if "MWS" in tcnames:
-        mws_nearby = isMWS_nearby(
+        mws_nearby = blockcutter(
+            isMWS_nearby,
             gaia=gaia, gaiagmag=gaiagmag, parallax=parallax,
             parallaxerr=parallaxerr, paramssolved=gaiaparamssolved
         )
         # ADM run the MWS target types for (potentially) both north and south.
         for south in south_cuts:
-            mws_classes[int(south)] = isMWS_main(
+            mws_classes[int(south)] = cutters[south](
+                    isMWS_main,
                     gaia=gaia, gaiaaen=gaiaaen, gaiadupsource=gaiadupsource,
                     gflux=gflux, rflux=rflux, obs_rflux=obs_rflux, objtype=objtype,
                     gnobs=gnobs, rnobs=rnobs, gfracmasked=gfracmasked,
@@ -2061,7 +2667,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     # ADM white dwarfs for standards and MWS science targets.
     mws_wd = tcfalse
     if "MWS" in tcnames or "STD" in tcnames:
-        mws_wd = isMWS_WD(
+        mws_wd = blockcutter(
+            isMWS_WD,
             gaia=gaia, galb=galb, astrometricexcessnoise=gaiaaen,
             pmra=pmra, pmdec=pmdec, parallax=parallax,
             parallaxovererror=parallaxovererror, paramssolved=gaiaparamssolved,
@@ -2078,7 +2685,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
         std_classes = []
         for bright in [False, True]:
             std_classes.append(
-                isSTD(
+                blockcutter(
+                    isSTD,
                     primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
                     gfracflux=gfracflux, rfracflux=rfracflux, zfracflux=zfracflux,
                     gfracmasked=gfracmasked, rfracmasked=rfracmasked, objtype=objtype,
@@ -2086,7 +2694,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
                     gfluxivar=gfluxivar, rfluxivar=rfluxivar, zfluxivar=zfluxivar,
                     gaia=gaia, astrometricexcessnoise=gaiaaen, paramssolved=gaiaparamssolved,
                     pmra=pmra, pmdec=pmdec, parallax=parallax, dupsource=gaiadupsource,
-                    gaiagmag=gaiagmag, gaiabmag=gaiabmag, gaiarmag=gaiarmag, bright=bright
+                    gaiagmag=gaiagmag, gaiabmag=gaiabmag, gaiarmag=gaiarmag, bright=bright,
+                    phot=phot
                 )
             )
         std_faint, std_bright = std_classes
@@ -2137,11 +2746,7 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     # ADM turn off BGS_WISE until we're sure we'll use it.
     # bgs_target |= bgs_wise * bgs_mask.BGS_WISE
     # ADM set 10% of the BGS_FAINT targets to BGS_FAINT_HIP.
-    if hip is not None:
-        if hip is True:
-            bgs_target |= bgs_mask.BGS_FAINT_HIP
-        else:
-            bgs_target[hip] |= bgs_mask.BGS_FAINT_HIP
+    bgs_target |= hip * bgs_mask.BGS_FAINT_HIP
 
     # ADM MWS main, nearby, and WD.
     mws_target = mws_broad * mws_mask.MWS_BROAD
@@ -2263,59 +2868,25 @@ def apply_cuts_gaia(numproc=4, survey='main', nside=None, pixlist=None):
     return desi_target, bgs_target, mws_target, gaiaobjs
 
 
-def apply_cuts(objects, qso_selection='randomforest', gaiamatch=False,
-               tcnames=["ELG", "QSO", "LRG", "MWS", "BGS", "STD"],
-               qso_optical_cuts=False, survey='main', resolvetargs=True,
-               mask=True):
-    """Perform target selection on objects, returning target mask arrays.
+def _prepare_inputs(objects, gaiamatch=False,
+                    tcnames=["ELG", "QSO", "LRG", "MWS", "BGS", "STD"],
+                    mask=True):
+    """Process the columns of objects that are needed to set target bits.
 
     Parameters
     ----------
-    objects : :class:`~numpy.ndarray` or `str`
-        numpy structured array with UPPERCASE columns needed for
-        target selection, OR a string tractor/sweep filename.
-    qso_selection : :class:`str`, optional, defaults to ``'randomforest'``
-        The algorithm to use for QSO selection; valid options are
-        ``'colorcuts'`` and ``'randomforest'``
-    gaiamatch : :class:`boolean`, optional, defaults to ``False``
-        If ``True``, match to Gaia DR2 chunks files and populate Gaia columns
-        to facilitate the MWS and STD selections.
-    tcnames : :class:`list`, defaults to running all target classes
-        A list of strings, e.g. ['QSO','LRG']. If passed, process targeting only
-        for those specific target classes. A useful speed-up when testing.
-        Options include ["ELG", "QSO", "LRG", "MWS", "BGS", "STD"].
-    qso_optical_cuts : :class:`boolean` defaults to ``False``
-        Apply just optical color-cuts when selecting QSOs with
-        ``qso_selection="colorcuts"``.
-    survey : :class:`str`, defaults to ``'main'``
-        Specifies which target masks yaml file and target selection cuts
-        to use. Options are ``'main'`` and ``'svX``' (where X is 1, 2, 3 etc.)
-        for the main survey and different iterations of SV, respectively.
-    resolvetargs : :class:`boolean`, optional, defaults to ``True``
-        If ``True``, if `objects` consists of all northern (southern) sources
-        then only apply the northern (southern) cuts.
-    mask : :class:`boolean`, optional, defaults to ``True``
-        Send ``False`` to turn off any masking cuts based on the `MASKBITS` column. The
-        default behavior is to always mask using `MASKBITS`.
+    objects : :class:`~numpy.ndarray` or `~astropy.table.Table`
+        Objects read from a sweep or Tractor file. May be modified
+        in-place (see :func:`apply_cuts()`).
+    gaiamatch, tcnames, mask
+        See :func:`apply_cuts()`.
 
     Returns
     -------
-    :class:`~numpy.ndarray`
-        (desi_target, bgs_target, mws_target) where each element is
-        an ndarray of target selection bitmask flags for each object.
-
-    Notes
-    -----
-    - If ``objects`` is an astropy Table with lowercase column names, this
-      converts them to UPPERCASE in-place, thus modifying the input table.
-      To avoid this, pass in ``objects.copy()`` instead.
-    - See :mod:`desitarget.targetmask` for the definition of each bit.
-
+    :class:`dict`
+        The inputs to :func:`set_target_bits()` that are derived from
+        `objects`, keyed by argument name (e.g. "gflux").
     """
-    # - Check if objects is a filename instead of the actual data
-    if isinstance(objects, str):
-        objects = io.read_tractor(objects)
-
     # ADM add Gaia information, if requested, and if we're going to actually
     # ADM process the target classes that need Gaia columns
     if gaiamatch and ("MWS" in tcnames or "STD" in tcnames):
@@ -2335,8 +2906,12 @@ def apply_cuts(objects, qso_selection='randomforest', gaiamatch=False,
              'GAIA_ASTROMETRIC_SIGMA5D_MAX', 'GAIA_ASTROMETRIC_PARAMS_SOLVED']
         )
         # ADM add the Gaia column information to the primary array.
+        # ADM (skipping any columns that weren't read from the sweeps,
+        # ADM see columns_for_tcnames()).
+        colnames = _get_colnames(objects)
         for col in gaiainfo.dtype.names:
-            objects[col] = gaiainfo[col]
+            if isinstance(objects, Table) or col in colnames:
+                objects[col] = gaiainfo[col]
 
     # - ensure uppercase column names if astropy Table.
     if isinstance(objects, (Table, Row)):
@@ -2369,6 +2944,262 @@ def apply_cuts(objects, qso_selection='randomforest', gaiamatch=False,
     else:
         primary = np.ones_like(objects, dtype=bool)
 
+    return dict(
+        photsys_north=photsys_north, photsys_south=photsys_south,
+        obs_rflux=obs_rflux, gflux=gflux, rflux=rflux, zflux=zflux,
+        w1flux=w1flux, w2flux=w2flux, gfiberflux=gfiberflux,
+        rfiberflux=rfiberflux, zfiberflux=zfiberflux, objtype=objtype,
+        release=release, ra=ra, dec=dec, gfluxivar=gfluxivar,
+        rfluxivar=rfluxivar, zfluxivar=zfluxivar, w1fluxivar=w1fluxivar,
+        gnobs=gnobs, rnobs=rnobs, znobs=znobs, gfracflux=gfracflux,
+        rfracflux=rfracflux, zfracflux=zfracflux, gfracmasked=gfracmasked,
+        rfracmasked=rfracmasked, zfracmasked=zfracmasked, gfracin=gfracin,
+        rfracin=rfracin, zfracin=zfracin, gallmask=gallmask, rallmask=rallmask,
+        zallmask=zallmask, gsnr=gsnr, rsnr=rsnr, zsnr=zsnr, w1snr=w1snr,
+        w2snr=w2snr, deltaChi2=deltaChi2, dchisq=dchisq, gaia=gaia, pmra=pmra,
+        pmdec=pmdec, parallax=parallax, parallaxovererror=parallaxovererror,
+        parallaxerr=parallaxerr, gaiagmag=gaiagmag, gaiabmag=gaiabmag,
+        gaiarmag=gaiarmag, gaiaaen=gaiaaen, gaiadupsource=gaiadupsource,
+        gaiaparamssolved=gaiaparamssolved, gaiabprpfactor=gaiabprpfactor,
+        gaiasigma5dmax=gaiasigma5dmax, galb=galb, maskbits=maskbits, Grr=Grr,
+        refcat=refcat, primary=primary
+    )
+
+
+def _prepared_sweep_key(filename, columns=None, rows=None, gaiamatch=False,
+                        mask=True, checksum=None):
+    """Key for a cache of the processed columns of a sweep file.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Full path to a sweep (or Tractor) file.
+    columns, rows, gaiamatch, mask, checksum
+        See :func:`read_prepared_sweep()`.
+
+    Returns
+    -------
+    :class:`str`
+        The sha256 hex digest of the checksum of `filename`, the
+        desitarget version, the source code of the functions that read
+        and process sweep files, and the passed options. If `gaiamatch`
+        is ``True``, also of $GAIA_DIR and the Gaia matching code.
+    """
+    from desitarget import __version__ as desitarget_version
+    # ADM the code that reads and processes the sweeps. Changes to these
+    # ADM functions invalidate the cache. Other changes are caught by the
+    # ADM desitarget version.
+    funcs = [io.read_tractor, io.add_photsys, io.release_to_photsys,
+             _prepare_inputs, _prepare_optical_wise, _prepare_gaia,
+             unextinct_fluxes, _gal_coords, _isonnorthphotsys]
+    items = [checksum, desitarget_version, columns, gaiamatch, mask]
+    if checksum is None:
+        items[0] = io.get_sha256sum(filename)
+    # ADM the Gaia columns also depend on the Gaia files and the code
+    # ADM that matches to them.
+    if gaiamatch:
+        from desitarget import gaiamatch as gm
+        funcs += [gm.find_gaia_files, gm.read_gaia_file,
+                  gm.read_gaia_file_cached, gm.match_gaia_to_primary,
+                  gm.match_gaia_to_primary_single]
+        items.append(os.path.abspath(gm.get_gaia_dir()))
+    h = hashlib.sha256()
+    for item in items:
+        h.update(str(item).encode())
+    for func in funcs:
+        h.update(inspect.getsource(func).encode())
+    if rows is not None:
+        h.update(np.asarray(rows, dtype='>i8').tobytes())
+
+    return h.hexdigest()
+
+
+def _load_npy(filename):
+    """Memory-map a .npy file copy-on-write (or read it, if empty)."""
+    try:
+        return np.load(filename, mmap_mode='c')
+    except ValueError:
+        # ADM mmap can't map an empty array.
+        return np.load(filename)
+
+
+def read_prepared_sweep(filename, cachedir=None, columns=None, rows=None,
+                        gaiamatch=False,
+                        tcnames=["ELG", "QSO", "LRG", "MWS", "BGS", "STD"],
+                        mask=True, checksum=None):
+    """Read a sweep file and process its columns, with an on-disk cache.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Full path to a sweep (or Tractor) file.
+    cachedir : :class:`str`, optional, defaults to ``None``
+        Directory in which to cache the processed columns. If ``None``,
+        then always read and process `filename`.
+    columns : :class:`list`, optional, defaults to ``None``
+        Passed to :func:`desitarget.io.read_tractor()`.
+    rows : :class:`list`, optional, defaults to ``None``
+        Passed to :func:`desitarget.io.read_tractor()`.
+    gaiamatch, tcnames, mask
+        See :func:`apply_cuts()`.
+    checksum : :class:`str`, optional, defaults to ``None``
+        The sha256 checksum of `filename`, if already known, e.g. when
+        reading a file in several chunks of `rows`. If ``None``, then
+        `filename` is read to compute the checksum.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        The objects in `filename`, including any Gaia columns that were
+        added for `gaiamatch`.
+    :class:`dict`
+        The processed columns of the objects, which can be passed to
+        :func:`apply_cuts()` as `prepared`.
+
+    Notes
+    -----
+        - Each sweep file is cached as a set of .npy files in its own
+          sub-directory of `cachedir`. The sub-directory is named for
+          `filename` and a key (see :func:`_prepared_sweep_key()`) that
+          changes with the contents of `filename` (via its sha256
+          checksum), the desitarget version, the code that processes
+          the sweeps, and `columns`, `rows`, `gaiamatch` and `mask`.
+          If `gaiamatch` is ``True`` the key also changes with $GAIA_DIR
+          and the code that matches to Gaia files. Any change to these
+          means the file is processed anew.
+        - Stale sub-directories are never read, and can be removed.
+        - Cached arrays are memory-mapped copy-on-write, so they are
+          only read from disk as needed, and changing them in memory
+          does not change the cache.
+    """
+    gaiamatch = gaiamatch and ("MWS" in tcnames or "STD" in tcnames)
+    if cachedir is None:
+        objects = io.read_tractor(filename, columns=columns, rows=rows)
+        prepared = _prepare_inputs(objects, gaiamatch=gaiamatch,
+                                   tcnames=tcnames, mask=mask)
+        return objects, prepared
+
+    key = _prepared_sweep_key(filename, columns=columns, rows=rows,
+                              gaiamatch=gaiamatch, mask=mask,
+                              checksum=checksum)
+    cachefn = os.path.join(cachedir, "{}-{}".format(
+        os.path.splitext(os.path.basename(filename))[0], key[:16]))
+    # ADM names.txt is written last, so marks a complete cache entry.
+    namesfn = os.path.join(cachefn, "names.txt")
+
+    if os.path.exists(namesfn):
+        log.info("Reading processed {} from {}".format(filename, cachefn))
+        objects = _load_npy(os.path.join(cachefn, "objects.npy"))
+        with open(namesfn) as f:
+            names = f.read().split()
+        prepared = {}
+        for name in names:
+            fn = os.path.join(cachefn, "{}.npy".format(name))
+            prepared[name] = _load_npy(fn) if os.path.exists(fn) else None
+        return objects, prepared
+
+    objects = io.read_tractor(filename, columns=columns, rows=rows)
+    prepared = _prepare_inputs(objects, gaiamatch=gaiamatch,
+                               tcnames=tcnames, mask=mask)
+
+    # ADM write to a temporary directory and rename it, so that parallel
+    # ADM processes never read a partially written cache entry.
+    tmpfn = "{}.tmp{}".format(cachefn, os.getpid())
+    os.makedirs(tmpfn, exist_ok=True)
+    np.save(os.path.join(tmpfn, "objects.npy"), objects)
+    for name, arr in prepared.items():
+        if arr is not None:
+            np.save(os.path.join(tmpfn, "{}.npy".format(name)), arr)
+    with open(os.path.join(tmpfn, "names.txt"), "w") as f:
+        f.write("\n".join(prepared) + "\n")
+    try:
+        os.rename(tmpfn, cachefn)
+        log.info("Cached processed {} in {}".format(filename, cachefn))
+    except OSError:
+        # ADM another process already cached this file.
+        shutil.rmtree(tmpfn)
+
+    return objects, prepared
+
+
+def apply_cuts(objects, qso_selection='randomforest', gaiamatch=False,
+               tcnames=["ELG", "QSO", "LRG", "MWS", "BGS", "STD"],
+               qso_optical_cuts=False, survey='main', resolvetargs=True,
+               mask=True, partition=False, blocksize=None, prepared=None,
+               hipradec=False):
+    """Perform target selection on objects, returning target mask arrays.
+
+    Parameters
+    ----------
+    objects : :class:`~numpy.ndarray` or `str`
+        numpy structured array with UPPERCASE columns needed for
+        target selection, OR a string tractor/sweep filename.
+    qso_selection : :class:`str`, optional, defaults to ``'randomforest'``
+        The algorithm to use for QSO selection; valid options are
+        ``'colorcuts'`` and ``'randomforest'``
+    gaiamatch : :class:`boolean`, optional, defaults to ``False``
+        If ``True``, match to Gaia DR2 chunks files and populate Gaia columns
+        to facilitate the MWS and STD selections.
+    tcnames : :class:`list`, defaults to running all target classes
+        A list of strings, e.g. ['QSO','LRG']. If passed, process targeting only
+        for those specific target classes. A useful speed-up when testing.
+        Options include ["ELG", "QSO", "LRG", "MWS", "BGS", "STD"].
+    qso_optical_cuts : :class:`boolean` defaults to ``False``
+        Apply just optical color-cuts when selecting QSOs with
+        ``qso_selection="colorcuts"``.
+    survey : :class:`str`, defaults to ``'main'``
+        Specifies which target masks yaml file and target selection cuts
+        to use. Options are ``'main'`` and ``'svX``' (where X is 1, 2, 3 etc.)
+        for the main survey and different iterations of SV, respectively.
+    resolvetargs : :class:`boolean`, optional, defaults to ``True``
+        If ``True``, if `objects` consists of all northern (southern) sources
+        then only apply the northern (southern) cuts.
+    mask : :class:`boolean`, optional, defaults to ``True``
+        Send ``False`` to turn off any masking cuts based on the `MASKBITS` column. The
+        default behavior is to always mask using `MASKBITS`.
+    partition : :class:`boolean`, optional, defaults to ``False``
+        If ``True``, and `resolvetargs` is ``True``, then only apply the
+        northern (southern) cuts to the northern (southern) sources in
+        `objects`. See :func:`~desitarget.cuts.set_target_bits()`. Note
+        that, for a mix of northern and southern sources, the per-imaging
+        bits (e.g. LRG_NORTH) then differ from a default run, as they're
+        only set for sources from the matching imaging. The combined bits
+        (e.g. LRG) are unchanged.
+    blocksize : :class:`int`, optional, defaults to ``None``
+        If passed, apply the cuts to blocks of this many objects at a
+        time. See :func:`~desitarget.cuts.set_target_bits()`.
+    prepared : :class:`dict`, optional, defaults to ``None``
+        The processed columns of `objects`, as returned by
+        :func:`read_prepared_sweep()`. If passed, `gaiamatch` and `mask`
+        are ignored, as they were already applied to `prepared`.
+    hipradec : :class:`boolean`, optional, defaults to ``False``
+        If ``True``, set `BGS_FAINT_HIP` from the RA/Dec of each source.
+        Only used for the main survey. See
+        :func:`~desitarget.cuts.set_target_bits()`.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        (desi_target, bgs_target, mws_target) where each element is
+        an ndarray of target selection bitmask flags for each object.
+
+    Notes
+    -----
+    - If ``objects`` is an astropy Table with lowercase column names, this
+      converts them to UPPERCASE in-place, thus modifying the input table.
+      To avoid this, pass in ``objects.copy()`` instead.
+    - See :mod:`desitarget.targetmask` for the definition of each bit.
+
+    """
+    # - Check if objects is a filename instead of the actual data
+    if isinstance(objects, str):
+        objects = io.read_tractor(objects)
+
+    # ADM process the columns needed to set the target bits.
+    if prepared is None:
+        prepared = _prepare_inputs(objects, gaiamatch=gaiamatch,
+                                   tcnames=tcnames, mask=mask)
+
     # ADM set different bits based on whether we're using the main survey
     # code or an iteration of SV.
     if survey == 'main':
@@ -2380,25 +3211,166 @@ def apply_cuts(objects, qso_selection='randomforest', gaiamatch=False,
         log.critical(msg)
         raise ValueError(msg)
 
+    # ADM BGS_FAINT_HIP is only set by the main survey cuts.
+    hipkwargs = {"hipradec": hipradec} if survey == 'main' else {}
+
     desi_target, bgs_target, mws_target = targcuts.set_target_bits(
-        photsys_north, photsys_south, obs_rflux,
-        gflux, rflux, zflux, w1flux, w2flux,
-        gfiberflux, rfiberflux, zfiberflux, objtype, release,
-        ra, dec, gfluxivar, rfluxivar, zfluxivar, w1fluxivar,
-        gnobs, rnobs, znobs, gfracflux, rfracflux, zfracflux,
-        gfracmasked, rfracmasked, zfracmasked,
-        gfracin, rfracin, zfracin, gallmask, rallmask, zallmask,
-        gsnr, rsnr, zsnr, w1snr, w2snr, deltaChi2, dchisq,
-        gaia, pmra, pmdec, parallax, parallaxovererror, parallaxerr,
-        gaiagmag, gaiabmag, gaiarmag, gaiaaen, gaiadupsource,
-        gaiaparamssolved, gaiabprpfactor, gaiasigma5dmax, galb,
-        tcnames, qso_optical_cuts, qso_selection,
-        maskbits, Grr, refcat, primary, resolvetargs=resolvetargs,
-        )
+        tcnames=tcnames, qso_optical_cuts=qso_optical_cuts,
+        qso_selection=qso_selection, resolvetargs=resolvetargs,
+        partition=partition, blocksize=blocksize,
+        missing=_missing_quantities(objects), **hipkwargs, **prepared
+    )
 
     return desi_target, bgs_target, mws_target
 
 
+def _dedupe_spool(spool, refs):
+    """Remove targets that duplicate a Gaia source from a spool.
+
+    Parameters
+    ----------
+    spool : :class:`~desitarget.io.HEALPixSpool`
+        Spool of targets from the sweeps.
+    refs : :class:`~numpy.ndarray`
+        The "TARGETID" and "REF_ID" of every spooled target that has a
+        `REF_ID` > 0, in the order of the input files (and of the rows
+        in each file).
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        The sorted, unique `REF_ID` values in the spool.
+
+    Notes
+    -----
+        - Only the first target for each `REF_ID` is retained, as for
+          the Gaia-only backup targets in :func:`select_targets()`
+          without `spooldir`.
+    """
+    refid, ii = np.unique(refs["REF_ID"], return_index=True)
+    drop = np.delete(refs["TARGETID"], ii)
+
+    # ADM only rewrite pixels that contain a duplicate.
+    if len(drop) > 0:
+        for pix in spool.pixels():
+            targetid = spool.read(pix, columns=["TARGETID"])["TARGETID"]
+            isdrop = np.isin(targetid, drop)
+            if np.any(isdrop):
+                spool.rewrite(pix, spool.read(pix)[~isdrop])
+
+    log.info('Removed {} spooled targets that duplicate a Gaia source'
+             .format(len(drop)))
+
+    return refid
+
+
+def _spool_backup_targets(spool, numproc=4, survey='main', finalizer=None,
+                          region=None, refid=None):
+    """Add Gaia-only backup targets to a spool, one Gaia file at a time.
+
+    Parameters
+    ----------
+    spool : :class:`~desitarget.io.HEALPixSpool`
+        Spool of targets from the sweeps. Gaia-only targets that are in
+        the spool (on `REF_ID`) are not added.
+    numproc : :class:`int`, optional, defaults to 4
+        The number of parallel processes to use. Limited to 4.
+    survey : :class:`str`, defaults to ``'main'``
+        Passed to :func:`apply_cuts_gaia()`.
+    finalizer : :class:`function`
+        Function that takes (objects, desi_target, bgs_target,
+        mws_target, gaiadr=gaiadr) and returns finalized targets.
+    region : :class:`function`, optional
+        Function that trims targets to a region of the sky.
+    refid : :class:`~numpy.ndarray`, optional
+        The sorted, unique `REF_ID` values in the spool, as returned by
+        :func:`_dedupe_spool()`. If ``None``, read them from the spool.
+
+    Returns
+    -------
+    :class:`int`
+        The number of Gaia-only targets that were added to the spool.
+
+    Notes
+    -----
+        - Each Gaia HEALPix file that overlaps the spool is read once.
+        - Duplicates are removed against every `REF_ID` in the spool,
+          not just those in the same pixel, as a star's sweep and Gaia
+          positions (which are at different epochs) can straddle a
+          pixel boundary.
+    """
+    # ADM force to numproc<=4 for I/O limited (Gaia-only) processes.
+    numproc4 = min(numproc, 4)
+
+    # ADM the Gaia files that overlap the spool (or the whole sky).
+    gaianside = _get_gaia_nside()
+    if spool.pixlist is None:
+        gaiapix = np.arange(hp.nside2npix(gaianside))
+    else:
+        gaiapix = np.unique(nside2nside(spool.nside, gaianside, spool.pixlist))
+    gaiafns = find_gaia_files_hp(gaianside, gaiapix, neighbors=False)
+    gaiapix = [pix for pix, fn in zip(gaiapix, gaiafns) if os.path.exists(fn)]
+
+    # ADM batch the spool pixels by the Gaia file that contains them.
+    batches = []
+    for gpix in gaiapix:
+        if spool.pixlist is None or spool.nside <= gaianside:
+            batches.append((gaianside, [gpix]))
+        else:
+            fac = (spool.nside//gaianside)**2
+            batches.append(
+                (spool.nside, spool.pixlist[spool.pixlist//fac == gpix]))
+
+    # ADM every REF_ID in the spool, so duplicates are removed even if
+    # ADM a star's sweep and Gaia positions are in different pixels.
+    if refid is None:
+        refid = [spool.read(pix, columns=["REF_ID"])["REF_ID"]
+                 for pix in spool.pixels()]
+        refid = np.concatenate(refid) if len(refid) > 0 else np.zeros(0, 'i8')
+        refid = np.unique(refid[refid > 0])
+
+    def _get_backup_targets(batch):
+        '''Returns finalized Gaia-only targets for a batch of pixels'''
+        nside, pixlist = batch
+        gaia_desi_target, gaia_bgs_target, gaia_mws_target, gaiaobjs = \
+            apply_cuts_gaia(numproc=1, survey=survey, nside=nside,
+                            pixlist=pixlist)
+        if len(gaiaobjs) == 0:
+            return None
+        gaiadr = gaia_dr_from_ref_cat(gaiaobjs["REF_CAT"])
+        gaiatargs = finalizer(gaiaobjs, gaia_desi_target, gaia_bgs_target,
+                              gaia_mws_target, gaiadr=gaiadr)
+        if region is not None:
+            gaiatargs = region(gaiatargs)
+        return gaiatargs
+
+    def _update_status(gaiatargs):
+        '''Removes duplicates and spools on the main parallel process'''
+        if gaiatargs is None:
+            return 0
+        # ADM remove duplicates, retaining information from the sweeps.
+        _, ii = np.unique(gaiatargs["REF_ID"], return_index=True)
+        gaiatargs = gaiatargs[ii]
+        gaiatargs = gaiatargs[~np.isin(gaiatargs["REF_ID"], refid)]
+        return spool.append(gaiatargs)
+
+    # ADM process the Gaia files in parallel.
+    if numproc4 > 1 and len(batches) > 0:
+        pool = sharedmem.MapReduce(np=numproc4)
+        with pool:
+            nadded = pool.map(_get_backup_targets, batches,
+                              reduce=_update_status)
+    else:
+        nadded = [_update_status(_get_backup_targets(batch))
+                  for batch in batches]
+    nadded = int(np.sum(nadded))
+
+    log.info('Spooled {} Gaia-only (backup) targets from {} Gaia files'
+             .format(nadded, len(batches)))
+
+    return nadded
+
+
 qso_selection_options = ['colorcuts', 'randomforest']
 
 
@@ -2407,7 +3379,9 @@ def select_targets(infiles, numproc=4, qso_selection='randomforest',
                    extra=None, radecbox=None, radecrad=None, mask=True,
                    tcnames=["ELG", "QSO", "LRG", "MWS", "BGS", "STD"],
                    survey='main', resolvetargs=True, backup=True,
-                   return_infiles=False):
+                   return_infiles=False, chunksize=None, spooldir=None,
+                   prunecols=False, partition=False, blocksize=None,
+                   cachedir=None, checkpointdir=None, hipradec=False):
     """Process input files in parallel to select targets.
 
     Parameters
@@ -2463,13 +3437,56 @@ def select_targets(infiles, numproc=4, qso_selection='randomforest',
         If ``True``, also return the actual files from `infile` processed.
         Useful when running with `pixlist`, `radecbox` or `radecrad` to
         see which files were actually required.
+    chunksize : :class:`int`, optional, defaults to `None`
+        If passed, read each input file in chunks of this many rows and
+        apply the cuts chunk-by-chunk, to limit the memory used by each
+        process. Otherwise, read and process each file all at once.
+        Unless `hipradec` is ``True``, `BGS_FAINT_HIP` is drawn for each
+        chunk, so differs from that of a run without `chunksize`.
+    spooldir : :class:`str`, optional, defaults to `None`
+        If passed, stream targets to HEALPixel-split files (at `nside`)
+        in this directory as each input file is processed, rather than
+        retaining them in memory. Requires `nside`. See Notes.
+    prunecols : :class:`boolean`, optional, defaults to ``False``
+        If ``True``, only read the columns needed to select `tcnames`
+        (see :func:`columns_for_tcnames`) from each input file to apply
+        the cuts. This reduces I/O and memory. All columns are then read
+        for just the objects that are targets, so the returned targets
+        have the full data model.
+    partition : :class:`boolean`, optional, defaults to ``False``
+        If ``True``, and `resolvetargs` is ``True``, only apply the
+        northern (southern) cuts to the northern (southern) sources in
+        each input file. Passed to :func:`apply_cuts()`. Note that, for
+        files that mix northern and southern sources, the per-imaging
+        bits (e.g. LRG_NORTH) then differ from a default run, as they're
+        only set for sources from the matching imaging. The combined bits
+        (e.g. LRG) are unchanged.
+    blocksize : :class:`int`, optional, defaults to ``None``
+        If passed, apply the cuts to blocks of this many objects at a
+        time. Passed to :func:`apply_cuts()`.
+    cachedir : :class:`str`, optional, defaults to ``None``
+        If passed, cache the processed columns of each input file in
+        this directory, and reuse them on subsequent runs for which the
+        input file, its processing, `prunecols`, `gaiamatch`, `mask`
+        and `chunksize` are unchanged. See :func:`read_prepared_sweep()`.
+    checkpointdir : :class:`str`, optional, defaults to ``None``
+        If passed, record the targets selected from each input file in
+        this directory as each file completes. A re-run with the same
+        inputs skips files that were already completed, e.g. to resume
+        a run that was interrupted. See :class:`~desitarget.io.Checkpoint`.
+    hipradec : :class:`boolean`, optional, defaults to ``False``
+        If ``True``, set `BGS_FAINT_HIP` from the RA/Dec of each source,
+        so that it doesn't depend on `chunksize` or on how the input
+        files are split. Passed to :func:`apply_cuts()`.
 
     Returns
     -------
-    :class:`~numpy.ndarray`
+    :class:`~numpy.ndarray` or `~desitarget.io.HEALPixSpool`
         The subset of input targets which pass the cuts, including extra
         columns for ``DESI_TARGET``, ``BGS_TARGET``, and ``MWS_TARGET`` target
-        selection bitmasks.
+        selection bitmasks. If `spooldir` is passed, instead return
+        a :class:`~desitarget.io.HEALPixSpool` from which to read the
+        targets one HEALPixel at a time.
     :class:`list`, only returned if `return_infiles` is ``True``
         A list of the input files that actually needed to be processed.
 
@@ -2478,6 +3495,18 @@ def select_targets(infiles, numproc=4, qso_selection='randomforest',
         - if numproc==1, use serial code instead of parallel.
         - only one of pixlist, radecbox, radecrad should be passed. They are all
           intended to denote regions on the sky, using different formalisms.
+        - With `spooldir`, the memory used by the parent process is
+          roughly constant regardless of the number of input files. The
+          Gaia-only backup targets are selected (and removed if they
+          duplicate a target from the sweeps) one Gaia file at a time.
+          As without `spooldir`, if `backup` is ``True`` then only the
+          first target from the sweeps for each Gaia source (`REF_ID`)
+          is retained. Targets are spooled in the order in which the
+          input files complete, so sort on TARGETID for reproducible
+          output.
+        - With `checkpointdir`, a resumed run returns the same targets,
+          in the same order, as an uninterrupted run. The Gaia-only
+          backup targets are not checkpointed, and are always rerun.
     """
     from desiutil.log import get_logger
     log = get_logger()
@@ -2502,6 +3531,19 @@ def select_targets(infiles, numproc=4, qso_selection='randomforest',
         log.critical(msg)
         raise ValueError(msg)
 
+    # ADM spooling to HEALPixel-split files needs an nside.
+    if spooldir is not None and nside is None:
+        msg = "nside must be passed to spool targets to HEALPixel files"
+        log.critical(msg)
+        raise ValueError(msg)
+    # ADM the HEALPixels in which to spool targets, as nside and pixlist
+    # ADM could otherwise be overwritten for radecbox or radecrad, below.
+    spoolnside, spoolpixlist = nside, pixlist
+    if spooldir is not None and radecbox is not None:
+        spoolpixlist = hp_in_box(spoolnside, radecbox)
+    if spooldir is not None and radecrad is not None:
+        spoolpixlist = hp_in_cap(spoolnside, radecrad)
+
     # ADM if radecbox was sent, determine which pixels touch the box.
     if radecbox is not None:
         nside = pixarea2nside(box_area(radecbox))
@@ -2538,7 +3580,7 @@ def select_targets(infiles, numproc=4, qso_selection='randomforest',
         # ADM a hack to ensure we have the correct targeting data model
         # ADM outside of the Legacy Surveys footprint.
         dummy = infiles[0]
-        infiles = list(set(np.hstack([filesperpixel[pix] for pix in pixlist])))
+        infiles = sorted(set(np.hstack([filesperpixel[pix] for pix in pixlist])))
         if len(infiles) == 0:
             log.info('ZERO sweep files in passed pixel list!!!')
             log.info('Run with dummy sweep file to write Gaia-only objects...')
@@ -2572,17 +3614,106 @@ def select_targets(infiles, numproc=4, qso_selection='randomforest',
 
         return targets
 
+    def _in_region(targets):
+        # ADM restrict to only targets in the requested region.
+        if pixlist is not None:
+            targets = targets[is_in_hp(targets, nside, pixlist)]
+        if radecbox is not None:
+            targets = targets[is_in_box(targets, radecbox)]
+        if radecrad is not None:
+            targets = targets[is_in_cap(targets, radecrad)]
+        return targets
+
+    # ADM only read the columns needed for the requested target classes.
+    columns = None
+    if prunecols:
+        columns = columns_for_tcnames(tcnames, survey=survey)
+        # ADM retain any Gaia columns that are matched from Gaia files.
+        if gaiamatch:
+            columns += [col for col in gaiadatamodel.dtype.names
+                        if col not in columns]
+        log.info("Reading {} columns for target classes {}".format(
+            len(columns), tcnames))
+
+    def _read_all_columns(filename, objects, rows, keep):
+        """All columns for the objects that are targets"""
+        # ADM the rows of the file that hold the targets.
+        if rows is None:
+            rows = np.arange(len(keep))
+        full = io.read_tractor(filename, rows=rows[keep])
+        # ADM retain the columns that were used to select the targets,
+        # ADM which include any that were matched to Gaia.
+        for col in objects.dtype.names:
+            full[col] = objects[col][keep]
+        return full
+
     # - functions to run on every brick/sweep file
     def _select_targets_file(filename):
         '''Returns targets in filename that pass the cuts'''
-        objects = io.read_tractor(filename)
-        desi_target, bgs_target, mws_target = apply_cuts(
-            objects, qso_selection=qso_selection, gaiamatch=gaiamatch,
-            tcnames=tcnames, survey=survey, resolvetargs=resolvetargs,
-            mask=mask
-        )
+        # ADM split the file into chunks of rows, if requested.
+        rowlist = [None]
+        if chunksize is not None:
+            nrows = fitsio.read_header(filename, 1)["NAXIS2"]
+            if nrows > 0:
+                rowlist = [np.arange(row, min(row+chunksize, nrows))
+                           for row in range(0, nrows, chunksize)]
+
+        # ADM checksum the file once, rather than once per chunk.
+        checksum = None
+        if cachedir is not None:
+            checksum = io.get_sha256sum(filename)
+
+        targets = []
+        for rows in rowlist:
+            objects, prepared = read_prepared_sweep(
+                filename, cachedir=cachedir, columns=columns, rows=rows,
+                gaiamatch=gaiamatch, tcnames=tcnames, mask=mask,
+                checksum=checksum
+            )
+            desi_target, bgs_target, mws_target = apply_cuts(
+                objects, qso_selection=qso_selection, tcnames=tcnames,
+                survey=survey, resolvetargs=resolvetargs,
+                partition=partition, blocksize=blocksize, prepared=prepared,
+                hipradec=hipradec
+            )
+            # ADM if columns were pruned, restore the full data model.
+            if prunecols:
+                keep = desi_target != 0
+                objects = _read_all_columns(filename, objects, rows, keep)
+                desi_target, bgs_target, mws_target = \
+                    desi_target[keep], bgs_target[keep], mws_target[keep]
+            targets.append(_finalize_targets(
+                objects, desi_target, bgs_target, mws_target))
+            # ADM release the memory for the chunk.
+            del objects, prepared
+
+        targets = np.concatenate(targets)
+        # ADM when spooling, trim to the region before returning.
+        if spooldir is not None:
+            targets = _in_region(targets)
 
-        return _finalize_targets(objects, desi_target, bgs_target, mws_target)
+        return targets
+
+    # ADM if checkpointing, reuse the targets from completed files. The
+    # ADM key covers every input that changes the targets for a file.
+    if checkpointdir is not None:
+        key = repr([io.desitarget_version, survey, qso_selection, gaiamatch,
+                    tcnames, resolvetargs, mask, columns, partition,
+                    chunksize, spooldir is not None, nside, pixlist,
+                    radecbox, radecrad, hipradec])
+        checkpoint = io.Checkpoint(checkpointdir, key)
+        ndone = np.sum([checkpoint.is_done(fn) for fn in infiles])
+        log.info("Checkpointing to {}; {}/{} files already completed".format(
+            checkpointdir, ndone, len(infiles)))
+        _run_file = _select_targets_file
+
+        def _select_targets_file(filename):
+            '''Returns targets in filename, recording them in checkpointdir'''
+            if checkpoint.is_done(filename):
+                return checkpoint.read(filename)
+            targets = _run_file(filename)
+            checkpoint.write(filename, targets)
+            return targets
 
     # Counter for number of bricks processed;
     # a numpy scalar allows updating nbrick in python 2
@@ -2601,18 +3732,57 @@ def select_targets(infiles, numproc=4, qso_selection='randomforest',
                      .format(nbrick, len(infiles), rate, elapsed/60.))
 
         nbrick[...] += 1    # this is an in-place modification
+
+        # ADM if we're spooling, write to disk and only retain a count
+        # ADM (and the IDs needed to remove duplicate Gaia sources).
+        if spool is not None:
+            ii = result["REF_ID"] > 0
+            refs = np.zeros(np.sum(ii), dtype=[('TARGETID', '>i8'),
+                                               ('REF_ID', '>i8')])
+            refs["TARGETID"] = result["TARGETID"][ii]
+            refs["REF_ID"] = result["REF_ID"][ii]
+            return spool.append(result), refs
         return result
 
+    # ADM set up HEALPixel-split files to stream targets, if requested.
+    spool = None
+    if spooldir is not None:
+        spool = io.HEALPixSpool(spooldir, spoolnside, pixlist=spoolpixlist)
+        log.info("Spooling targets to nside={} HEALPixels in {}"
+                 .format(spoolnside, spooldir))
+
     # - Parallel process input files
     if numproc > 1:
         pool = sharedmem.MapReduce(np=numproc)
-        with pool:
-            targets = pool.map(_select_targets_file, infiles, reduce=_update_status)
+        # ADM start with the largest files so they aren't left to the end.
+        with pool, gaia_cache_shared_by(numproc):
+            targets = pool.map(_select_targets_file, infiles,
+                               reduce=_update_status, cost='size',
+                               shared=True)
+        for i, secs in pool.slowest(3):
+            log.info('Slowest files: {} took {:.1f} secs'.format(infiles[i], secs))
     else:
         targets = list()
         for x in infiles:
             targets.append(_update_status(_select_targets_file(x)))
 
+    if spool is not None:
+        ntargs, refs = zip(*targets) if len(targets) > 0 else ([], [])
+        log.info('Spooled {} targets...t = {:.1f} mins'
+                 .format(np.sum(ntargs), (time()-t0)/60))
+        if backup:
+            # ADM remove duplicates, in the order of the input files, as
+            # ADM for the Gaia-only targets in the non-spooled code.
+            refid = None
+            if len(refs) > 0:
+                refid = _dedupe_spool(spool, np.concatenate(refs))
+            _spool_backup_targets(spool, numproc=numproc, survey=survey,
+                                  finalizer=_finalize_targets,
+                                  region=_in_region, refid=refid)
+        if return_infiles:
+            return spool, infiles
+        return spool
+
     targets = np.concatenate(targets)
 
     if backup:
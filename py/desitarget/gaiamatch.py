@@ -15,6 +15,8 @@ import fitsio
 import requests
 import pickle
 from glob import glob
+from collections import OrderedDict
+from contextlib import contextmanager
 from time import time
 import healpy as hp
 from os.path import basename
@@ -23,10 +25,12 @@ from desitarget.io import check_fitsio_version
 from desitarget.internal import sharedmem
 from desitarget.geomask import hp_in_box, add_hp_neighbors, pixarea2nside
 from desitarget.geomask import hp_beyond_gal_b, nside2nside
+from desitarget.crossmatch import radec2xyz, sep2chord
 from desimodel.footprint import radec2pix
 from astropy.coordinates import SkyCoord
 from astropy import units as u
 from astropy.io import ascii
+from scipy.spatial import cKDTree
 
 # ADM set up the DESI default logger
 from desiutil.log import get_logger
@@ -35,6 +39,15 @@ log = get_logger()
 # ADM start the clock
 start = time()
 
+# ADM a least-recently-used cache of Gaia HEALPix files (and KD-trees
+# ADM built from their coordinates) shared by calls within a process.
+# ADM see read_gaia_file_cached() and set_gaia_cache_size(). The memory
+# ADM budget is split between the processes of any parallel pool (see
+# ADM gaia_cache_shared_by()).
+_gaia_cache = OrderedDict()
+_gaia_cache_maxbytes = 2*1024**3
+_gaia_cache_nproc = 1
+
 # ADM the current data model for Gaia columns for READING from Gaia files
 ingaiadatamodel = np.array([], dtype=[
             ('SOURCE_ID', '>i8'), ('REF_CAT', 'S2'), ('RA', '>f8'), ('DEC', '>f8'),
@@ -646,6 +659,114 @@ def read_gaia_file(filename, header=False, addobjid=False):
         return outdata
 
 
+def set_gaia_cache_size(maxbytes):
+    """Set the maximum size of the cache of Gaia HEALPix files.
+
+    Parameters
+    ----------
+    maxbytes : :class:`int`
+        The maximum memory, in bytes, to use for Gaia data (and KD-trees)
+        cached by :func:`read_gaia_file_cached`. This is the total for
+        all of the processes in a parallel pool, which each get an equal
+        share (see :func:`gaia_cache_shared_by`). Pass 0 to disable (and
+        clear) the cache.
+
+    Returns
+    -------
+    Nothing, but least-recently-used files are dropped from the cache
+    until it is smaller than `maxbytes`.
+    """
+    global _gaia_cache_maxbytes
+    _gaia_cache_maxbytes = maxbytes
+    _trim_gaia_cache()
+
+
+@contextmanager
+def gaia_cache_shared_by(numproc):
+    """Share the cache size between the processes of a parallel pool.
+
+    Parameters
+    ----------
+    numproc : :class:`int`
+        The number of processes in the pool.
+
+    Notes
+    -----
+        - Use as, e.g., ``with pool, gaia_cache_shared_by(numproc):``.
+          Processes that are forked in the context each cache at most
+          1/`numproc` of the size set by :func:`set_gaia_cache_size`.
+    """
+    global _gaia_cache_nproc
+    oldnproc = _gaia_cache_nproc
+    _gaia_cache_nproc = max(int(numproc), 1)
+    _trim_gaia_cache()
+    try:
+        yield
+    finally:
+        _gaia_cache_nproc = oldnproc
+
+
+def _gaia_cache_limit():
+    """The maximum size of the Gaia cache in this process."""
+    return _gaia_cache_maxbytes // _gaia_cache_nproc
+
+
+def _trim_gaia_cache():
+    """Drop least-recently-used files until the Gaia cache fits."""
+    nbytes = sum([entry[2] for entry in _gaia_cache.values()])
+    while nbytes > _gaia_cache_limit() and len(_gaia_cache) > 0:
+        _, (_, _, entrybytes) = _gaia_cache.popitem(last=False)
+        nbytes -= entrybytes
+
+
+def read_gaia_file_cached(filename):
+    """Read a Gaia HEALPix file, and a KD-tree of its sources, via a cache.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        File name of a single Gaia "healpix-" file.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Gaia data as returned by :func:`read_gaia_file`. This array
+        is shared with the cache and so is READ-ONLY.
+    :class:`~scipy.spatial.cKDTree`
+        A KD-tree built on the unit vectors of the (GAIA_RA, GAIA_DEC)
+        coordinates of the Gaia sources (see
+        :func:`~desitarget.crossmatch.radec2xyz`). Query it with
+        distances converted using :func:`~desitarget.crossmatch.sep2chord`.
+
+    Notes
+    -----
+        - Recently used files are retained in memory (per process),
+          up to a share of the size set by :func:`set_gaia_cache_size`
+          (see :func:`gaia_cache_shared_by`). This means
+          that, e.g., adjacent sweeps files processed by the same worker
+          don't repeatedly read (and index) the same Gaia files.
+    """
+    key = os.path.abspath(filename)
+    if key in _gaia_cache:
+        _gaia_cache.move_to_end(key)
+        gaia, tree, _ = _gaia_cache[key]
+        return gaia, tree
+
+    gaia = read_gaia_file(filename)
+    tree = cKDTree(radec2xyz(gaia["GAIA_RA"], gaia["GAIA_DEC"]))
+    # ADM protect the cached data from being modified by a caller.
+    gaia.flags.writeable = False
+
+    # ADM the memory used is dominated by the data and the coordinates
+    # ADM and indexes stored by the KD-tree.
+    nbytes = gaia.nbytes + tree.data.nbytes + tree.indices.nbytes
+    if nbytes <= _gaia_cache_limit():
+        _gaia_cache[key] = (gaia, tree, nbytes)
+        _trim_gaia_cache()
+
+    return gaia, tree
+
+
 def find_gaia_files(objs, neighbors=True, radec=False):
     """Find full paths to Gaia healpix files for objects by RA/Dec.
 
@@ -909,26 +1030,26 @@ def match_gaia_to_primary(objs, matchrad=1., retaingaia=False,
         - If `retaingaia` is True then objects after the first len(objs) objects are
           Gaia objects that do not have a sweeps match but that are in the area
           bounded by `gaiabounds`
+        - If more than one Gaia source is within `matchrad` of an object
+          (in any of the Gaia files), the nearest Gaia source is the match.
+        - Gaia files (and KD-trees of their sources) are cached between
+          calls, see :func:`read_gaia_file_cached`.
     """
-    # ADM I'm getting this old Cython RuntimeWarning on search_around_sky ****:
-    # RuntimeWarning: numpy.dtype size changed, may indicate binary incompatibility. Expected 96, got 88
-    # ADM but it doesn't seem malicious, so I'm filtering. I think its caused
-    # ADM by importing a scipy compiled against an older numpy than is installed
-    # ADM e.g. https://stackoverflow.com/questions/40845304/runtimewarning-numpy-dtype-size-changed-may-indicate-binary-incompatibility
-    import warnings
-
     # ADM if retaingaia is True, retain all Gaia objects in a sweeps-like box.
     if retaingaia:
         ramin, ramax, decmin, decmax = gaiabounds
 
-    # ADM convert the coordinates of the input objects to a SkyCoord object.
-    cobjs = SkyCoord(objs["RA"]*u.degree, objs["DEC"]*u.degree)
-    nobjs = cobjs.size
-
     # ADM deal with the special case that only a single object was passed.
+    nobjs = np.size(objs["RA"])
     if nobjs == 1:
         return match_gaia_to_primary_single(objs, matchrad=matchrad)
 
+    # ADM convert the coordinates of the input objects to unit vectors.
+    xyzobjs = radec2xyz(objs["RA"], objs["DEC"])
+    chord = sep2chord(matchrad)
+    # ADM a KD-tree of the objects, built if needed for retaingaia.
+    objtree = None
+
     # ADM set up a zerod array of Gaia information for the passed objects.
     gaiainfo = np.zeros(nobjs, dtype=gaiadatamodel.dtype)
 
@@ -938,6 +1059,8 @@ def match_gaia_to_primary(objs, matchrad=1., retaingaia=False,
 
     # ADM objects without matches should have REF_ID of -1.
     gaiainfo['REF_ID'] = -1
+    # ADM the distance to the nearest match in any Gaia file so far.
+    dmatch = np.full(nobjs, np.inf)
 
     # ADM determine which Gaia files need to be considered.
     if retaingaia:
@@ -947,21 +1070,26 @@ def match_gaia_to_primary(objs, matchrad=1., retaingaia=False,
 
     # ADM loop through the Gaia files and match to the passed objects.
     for file in gaiafiles:
-        gaia = read_gaia_file(file)
-        cgaia = SkyCoord(gaia["GAIA_RA"]*u.degree, gaia["GAIA_DEC"]*u.degree)
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            # ADM ****here's where the warning occurs...
-            idobjs, idgaia, _, _ = cgaia.search_around_sky(cobjs, matchrad*u.arcsec)
+        gaia, tree = read_gaia_file_cached(file)
+        # ADM the nearest Gaia source within the matching radius.
+        d, idgaia = tree.query(xyzobjs, distance_upper_bound=chord)
+        # ADM only keep matches nearer than those in earlier files
+        # ADM (unmatched objects have an infinite distance).
+        idobjs = np.where(d < dmatch)[0]
+        idgaia = idgaia[idobjs]
+        dmatch[idobjs] = d[idobjs]
         # ADM assign the Gaia info to the array that corresponds to the passed objects.
         gaiainfo[idobjs] = gaia[idgaia]
 
         # ADM if retaingaia was set, also build an array of Gaia objects that
         # ADM don't have sweeps matches, but are within the RA/Dec bounds.
         if retaingaia:
-            # ADM find the Gaia IDs that didn't match the passed objects.
-            nomatch = set(np.arange(len(gaia)))-set(idgaia)
-            noidgaia = np.array(list(nomatch))
+            # ADM find the Gaia IDs that didn't match the passed objects
+            # ADM (i.e. that have no passed object within matchrad).
+            if objtree is None:
+                objtree = cKDTree(xyzobjs)
+            d, _ = objtree.query(tree.data, distance_upper_bound=chord)
+            noidgaia = np.where(np.isinf(d))[0]
             # ADM which Gaia objects with these IDs are within the bounds.
             if len(noidgaia) > 0:
                 suppg = gaia[noidgaia]
@@ -1000,16 +1128,9 @@ def match_gaia_to_primary_single(objs, matchrad=1.):
         - If the object does NOT have a match in the Gaia files, the "REF_ID"
           column is set to -1, and all other columns are zero
     """
-    # ADM I'm getting this old Cython RuntimeWarning on search_around_sky ****:
-    # RuntimeWarning: numpy.dtype size changed, may indicate binary incompatibility. Expected 96, got 88
-    # ADM but it doesn't seem malicious, so I'm filtering. I think its caused
-    # ADM by importing a scipy compiled against an older numpy than is installed
-    # ADM e.g. https://stackoverflow.com/questions/40845304/runtimewarning-numpy-dtype-size-changed-may-indicate-binary-incompatibility
-    import warnings
-
-    # ADM convert the coordinates of the input objects to a SkyCoord object.
-    cobjs = SkyCoord(objs["RA"]*u.degree, objs["DEC"]*u.degree)
-    nobjs = cobjs.size
+    # ADM convert the coordinates of the input object to a unit vector.
+    xyzobjs = radec2xyz(np.atleast_1d(objs["RA"]), np.atleast_1d(objs["DEC"]))
+    nobjs = len(xyzobjs)
     if nobjs > 1:
         log.error("Only matches one row but {} rows were sent".format(nobjs))
 
@@ -1024,16 +1145,11 @@ def match_gaia_to_primary_single(objs, matchrad=1.):
 
     # ADM loop through the Gaia files and match to the passed object.
     for file in gaiafiles:
-        gaia = read_gaia_file(file)
-        cgaia = SkyCoord(gaia["GAIA_RA"]*u.degree, gaia["GAIA_DEC"]*u.degree)
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            # ADM ****here's where the warning occurs...
-            sep = cobjs.separation(cgaia)
-            idgaia = np.where(sep < matchrad*u.arcsec)[0]
+        gaia, tree = read_gaia_file_cached(file)
+        idgaia = tree.query_ball_point(xyzobjs[0], sep2chord(matchrad))
         # ADM assign the Gaia info to the array that corresponds to the passed object.
         if len(idgaia) > 0:
-            gaiainfo = gaia[idgaia]
+            gaiainfo = gaia[np.sort(idgaia)]
 
     return gaiainfo
 
@@ -1130,8 +1246,12 @@ def write_gaia_matches(infiles, numproc=4, outdir="."):
     # - Parallel process input files.
     if numproc > 1:
         pool = sharedmem.MapReduce(np=numproc)
-        with pool:
-            _ = pool.map(_get_gaia_matches, infiles, reduce=_update_status)
+        # ADM start with the largest files so they aren't left to the end.
+        with pool, gaia_cache_shared_by(numproc):
+            _ = pool.map(_get_gaia_matches, infiles, reduce=_update_status,
+                         cost='size')
+        for i, secs in pool.slowest(3):
+            log.info('Slowest files: {} took {:.1f} secs'.format(infiles[i], secs))
     else:
         for file in infiles:
             _ = _update_status(_get_gaia_matches(file))
@@ -23,6 +23,7 @@ from desiutil import depend, brick
 from desitarget.targetmask import desi_mask, targetid_mask
 from desitarget.targets import encode_targetid, finalize
 from desitarget.internal import sharedmem
+from desitarget.crossmatch import match_nearest, search_around_variable
 
 import numpy.lib.recfunctions as rfn
 
@@ -330,6 +331,58 @@ def is_in_ellipse_matrix(ras, decs, RAcen, DECcen, G):
     return np.hypot(dx, dy) < 1
 
 
+def is_in_ellipse_pairs(ras, decs, RAcens, DECcens, G):
+    """Determine whether points lie within paired elliptical masks
+
+    Parameters
+    ----------
+    ras : :class:`~numpy.ndarray`
+        Array of Right Ascensions to test
+    decs : :class:`~numpy.ndarray`
+        Array of Declinations to test
+    RAcens : :class:`~numpy.ndarray`
+        Right Ascension of the center of the ellipse paired with each
+        point (DEGREES)
+    DECcens : :class:`~numpy.ndarray`
+        Declination of the center of the ellipse paired with each
+        point (DEGREES)
+    G : :class:`~numpy.ndarray`
+        Matrices to transform points measured in coordinates of the
+        effective-half-light-radius to RA/Dec offset coordinates for the
+        ellipse paired with each point, as generated by, e.g.,
+        :mod:`desitarget.geomask.ellipse_matrix`
+
+    Returns
+    -------
+    :class:`boolean`
+        An array that is the same length as ras/decs that is ``True``
+        for points that are in their paired mask and False for points
+        that are not in their paired mask
+
+    Notes
+    -----
+        - A vectorized version of :func:`is_in_ellipse_matrix` that
+          tests each point against a different ellipse, which avoids
+          looping over masks in Python.
+        - G should have a shape of (2,2,len(ras)).
+    """
+    # ADM invert each of the transformation matrices.
+    Ginv = np.linalg.inv(np.moveaxis(G, -1, 0))
+
+    # ADM remember to correct for the spherical projection in Dec
+    # ADM note that this is only true for the small angle approximation
+    # ADM but that's OK to < 0.3" for a < 3o diameter galaxy at dec < 60o
+    dra = (ras - RAcens)*np.cos(np.radians(decs))
+    ddec = decs - DECcens
+
+    # ADM test whether points are larger than the effective
+    # ADM circle of radius 1 generated in half-light-radius coordinates
+    dx = Ginv[:, 0, 0]*dra + Ginv[:, 0, 1]*ddec
+    dy = Ginv[:, 1, 0]*dra + Ginv[:, 1, 1]*ddec
+
+    return np.hypot(dx, dy) < 1
+
+
 def is_in_circle(ras, decs, RAcens, DECcens, r):
     """Whether a set of points is in a set of circular masks on the sky.
 
@@ -357,27 +410,12 @@ def is_in_circle(ras, decs, RAcens, DECcens, r):
     # ADM all matches start as False (nothing is yet in a circular mask).
     in_mask = np.zeros(len(ras), dtype=bool)
 
-    # ADM coordinates of masks and targets into SkyCoord objects.
-    ctargs = SkyCoord(ras*u.degree, decs*u.degree)
-    cstars = SkyCoord(RAcens*u.degree, DECcens*u.degree)
-
-    # ADM this is the largest search radius we should need to consider
-    # ADM in the future an obvious speed up is to split on radius
-    # ADM as large radii are rarer but take longer.
-    maxrad = max(r)*u.arcsec
-
-    # ADM coordinate match the star masks and the targets.
-    idtargs, idstars, d2d, d3d = cstars.search_around_sky(ctargs, maxrad)
-
-    # ADM catch the case where nothing fell in a mask.
-    if len(idstars) == 0:
-        return in_mask
-
-    # ADM for a match, find separations less than the mask radius.
-    w_in = np.where(d2d.arcsec < r[idstars])
+    # ADM coordinate match the star masks and the targets, retaining
+    # ADM matches at less than the radius of each mask.
+    idtargs, _, _ = search_around_variable(ras, decs, RAcens, DECcens, r)
 
     # ADM matches at less than the radius are in a mask (at least one).
-    in_mask[idtargs[w_in]] = True
+    in_mask[idtargs] = True
 
     return in_mask
 
@@ -689,6 +727,51 @@ def circle_boundaries(RAcens, DECcens, r, nloc):
     return np.hstack(ras), np.hstack(decs)
 
 
+def split_pixels(pixnum, nsplit):
+    """Split a set of HEALPixels into groups with balanced workloads.
+
+    Parameters
+    ----------
+    pixnum : :class:`np.array`
+        List of integers, e.g., HEALPixel numbers occupied by a set of
+        bricks or touched by a set of files. Each HEALPixel appears once
+        per brick (file), which sets its workload (as for the input to
+        :func:`~desitarget.geomask.bundle_bricks`).
+    nsplit : :class:`int`
+        The number of groups into which to split the HEALPixels (e.g.
+        the number of MPI ranks).
+
+    Returns
+    -------
+    :class:`list`
+        A list of `nsplit` sorted arrays of HEALPixels. Each HEALPixel
+        appears in exactly one array. Some arrays may be empty if there
+        are fewer HEALPixels than `nsplit`.
+
+    Notes
+    -----
+        - HEALPixels are assigned, largest workload first, to the group
+          with the smallest total workload so far. Ties are broken on
+          HEALPixel number and group number, so the split is the same
+          for every call with the same inputs.
+    """
+    # ADM the workload (numpix) in each pixel (pix).
+    pix, numpix = np.unique(pixnum, return_counts=True)
+
+    # ADM order by decreasing workload, then by increasing pixel number.
+    order = np.lexsort((pix, -numpix))
+
+    groups = [[] for i in range(nsplit)]
+    loads = np.zeros(nsplit, dtype='i8')
+    for i in order:
+        # ADM argmin returns the first (lowest-numbered) smallest load.
+        igroup = np.argmin(loads)
+        groups[igroup].append(pix[i])
+        loads[igroup] += numpix[i]
+
+    return [np.sort(np.array(group, dtype=pix.dtype)) for group in groups]
+
+
 def bundle_bricks(pixnum, maxpernode, nside, brickspersec=1., prefix='targets',
                   gather=False, surveydirs=None, extra=None, seed=None,
                   nchunks=10):
@@ -903,6 +986,16 @@ def bundle_bricks(pixnum, maxpernode, nside, brickspersec=1., prefix='targets',
                 "$CSCRATCH", dr=ddrr, flavor=prefix, seed=seed, nohp=True,
                 resolve=resolve, region=region)
             print("")
+            # ADM ranked randoms are split straight from the pixel-files
+            # ADM into the final catalogs, streaming over the files.
+            if "--rank" in extra:
+                adder = ""
+                if "addmtl" not in extra:
+                    adder = "--addmtl"
+                print("srun -N 1 split_randoms '{}' -n {} --outroot {} {} {} &"
+                      .format(";".join(outfiles), nchunks,
+                              outfn.replace(".fits", ""), adder, skip))
+                continue
             # ADM split each pixel-file into 10 smaller catalogs.
             for fn in outfiles:
                 adder = ""
@@ -1591,16 +1684,13 @@ def radec_match_to(matchto, objs, sep=1., radec=False, return_sep=False):
         ram, decm = matchto["RA"], matchto["DEC"]
         ra, dec = objs["RA"], objs["DEC"]
 
-    cmatchto = SkyCoord(ram*u.degree, decm*u.degree)
-    cobjs = SkyCoord(ra*u.degree, dec*u.degree)
-
-    idmatchto, d2d, _ = cobjs.match_to_catalog_sky(cmatchto)
-    idobjs = np.arange(len(cobjs))
+    idmatchto, d2d = match_nearest(ra, dec, ram, decm, sep=sep)
+    idobjs = np.arange(len(idmatchto))
 
-    ii = d2d < sep*u.arcsec
+    ii = d2d < sep
 
     if return_sep:
-        return idmatchto[ii], idobjs[ii], d2d[ii].arcsec
+        return idmatchto[ii], idobjs[ii], d2d[ii]
 
     return idmatchto[ii], idobjs[ii]
 
@@ -349,8 +349,12 @@ def all_gaia_in_tiles(maglim=18, numproc=4, allsky=False,
     # - Parallel process Gaia files.
     if numproc > 1 and nfiles > 0:
         pool = sharedmem.MapReduce(np=numproc)
+        # ADM start with the largest files so they aren't left to the end.
         with pool:
-            gfas = pool.map(_get_gaia_gfas, infiles, reduce=_update_status)
+            gfas = pool.map(_get_gaia_gfas, infiles, reduce=_update_status,
+                            cost='size')
+        for i, secs in pool.slowest(3):
+            log.info('Slowest files: {} took {:.1f} secs'.format(infiles[i], secs))
     else:
         gfas = list()
         for file in infiles:
@@ -584,7 +588,10 @@ def select_gfas(infiles, maglim=18, numproc=4, nside=None,
         if numproc4 > 1:
             pool = sharedmem.MapReduce(np=numproc4)
             with pool:
-                gfas = pool.map(_get_gfas, infiles, reduce=_update_status)
+                gfas = pool.map(_get_gfas, infiles, reduce=_update_status,
+                                cost='size')
+            for i, secs in pool.slowest(3):
+                log.info('Slowest files: {} took {:.1f} secs'.format(infiles[i], secs))
         else:
             gfas = list()
             for file in infiles:
@@ -89,6 +89,21 @@ pool.ordered can be used to require a block of code to be executed in order
 >>>            print(i)
 >>>    pool.map(work, range(10))
 
+Work can be scheduled largest first, e.g. by file size, so that a few large items
+do not leave most workers idle at the end. The results are still returned in the
+order of the sequence, and the time spent on each item is kept in pool.timings.
+
+>>> with MapReduce() as pool:
+>>>    r = pool.map(work, filenames, cost='size')
+>>> for i, t in pool.slowest(3):
+>>>    print(filenames[i], t)
+
+Large array results can be returned through shared memory rather than pickled
+through the result queue, by passing shared=True to map.
+
+>>> with MapReduce() as pool:
+>>>    r = pool.map(read_a_big_array, filenames, shared=True)
+
 pool.critical can be used to require a block of code to be executed in a critical
 section.
 
@@ -137,6 +152,9 @@ import threading
 import heapq
 import os
 import pickle
+import time
+import tempfile
+import shutil
 
 import numpy
 from multiprocessing import RawArray
@@ -409,6 +427,56 @@ class ProcessGroup(object):
         if not self.Errors.empty():
             raise WorkerException(*self.Errors.get())
 
+def _shmdir():
+    """ The directory used to hand arrays from workers to the coordinator.
+
+        /dev/shm is memory backed on Linux. Other systems fall back to
+        the default temporary directory, which is usually cached.
+    """
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+class SharedResult(object):
+    """ Descriptor of an array result handed over by a worker.
+
+        The array is written to a file in a memory-backed directory by
+        the worker; only this descriptor passes through the result queue.
+        :py:meth:`get` maps the file into the coordinator and removes it.
+    """
+    def __init__(self, array, dirname):
+        fd, self.filename = tempfile.mkstemp(dir=dirname, suffix='.npy')
+        self.dtype = array.dtype
+        self.shape = array.shape
+        with os.fdopen(fd, 'wb') as f:
+            numpy.ascontiguousarray(array).tofile(f)
+
+    def get(self):
+        if int(numpy.prod(self.shape)) == 0:
+            array = numpy.empty(self.shape, dtype=self.dtype)
+        else:
+            # the mapping stays valid after the file is removed.
+            array = numpy.memmap(self.filename, dtype=self.dtype, mode='r+',
+                    shape=self.shape).view(numpy.ndarray)
+        os.unlink(self.filename)
+        return array
+
+def _share(r, dirname):
+    """ Replace arrays in a worker result by :py:class:`SharedResult`. """
+    if isinstance(r, numpy.ndarray) and not r.dtype.hasobject:
+        return SharedResult(r, dirname)
+    if isinstance(r, tuple):
+        return tuple(_share(x, dirname) for x in r)
+    return r
+
+def _unshare(r):
+    """ Replace :py:class:`SharedResult` in a result by the arrays. """
+    if isinstance(r, SharedResult):
+        return r.get()
+    if isinstance(r, tuple):
+        return tuple(_unshare(x) for x in r)
+    return r
+
 class Ordered(object):
     def __init__(self, backend):
       #  self.counter = lambda : None
@@ -533,6 +601,17 @@ class MapReduce(object):
             the number of available cores on the computer. If np is 0, all operations
             are performed on the coordinator process -- no child processes are created.
 
+        Attributes
+        ----------
+        timings : list
+            The wall-clock time in seconds spent on each item of the
+            sequence passed to the last call of :py:meth:`map`, in the
+            order of the sequence.
+
+        order : list
+            The indexes of the sequence in the order in which they were
+            scheduled by the last call of :py:meth:`map`.
+
         Notes
         -----
         Always wrap the call to :py:meth:`map` in a context manager ('with') block.
@@ -544,8 +623,44 @@ class MapReduce(object):
             self.np = cpu_count()
         else:
             self.np = np
+        self.timings = []
+        self.order = []
+
+    def slowest(self, n=5):
+        """ The items of the last :py:meth:`map` that took the longest.
 
-    def _main(self, pg, Q, R, sequence, realfunc):
+            Parameters
+            ----------
+            n : int
+                The number of items to return.
+
+            Returns
+            -------
+            slowest : list
+                (index, seconds) for the n slowest items, slowest first,
+                where index is the position of the item in the sequence.
+        """
+        index = sorted(range(len(self.timings)),
+                key=lambda i: -self.timings[i])
+        return [(i, self.timings[i]) for i in index[:n]]
+
+    def _schedule(self, sequence, cost):
+        """ The order in which to feed the sequence to the workers.
+
+            Items are ordered by decreasing cost. Items with equal cost
+            keep their order in the sequence, so the schedule is
+            deterministic.
+        """
+        if cost is None:
+            return list(range(len(sequence)))
+        if cost == 'size':
+            cost = os.path.getsize
+        elif not callable(cost):
+            raise ValueError("cost must be None, 'size' or a callable")
+        costs = [cost(work) for work in sequence]
+        return sorted(range(len(sequence)), key=lambda i: -costs[i])
+
+    def _main(self, pg, Q, R, sequence, realfunc, shmdir):
         # get and put will raise WorkerException
         # and terminate the process.
         # the exception is muted in ProcessGroup,
@@ -554,14 +669,17 @@ class MapReduce(object):
             capsule = pg.get(Q)
             if capsule is None:
                 return
-            if len(capsule) == 1:
-                i, = capsule
+            if len(capsule) == 2:
+                pos, i = capsule
                 work = sequence[i]
             else:
-                i, work = capsule
-            self.ordered.move(i)
+                pos, i, work = capsule
+            self.ordered.move(pos)
+            t0 = time.time()
             r = realfunc(work)
-            pg.put(R, (i, r))
+            if shmdir is not None:
+                r = _share(r, shmdir)
+            pg.put(R, (i, r, time.time() - t0))
 
     def __enter__(self):
         self.critical = self.backend.LockFactory()
@@ -572,7 +690,8 @@ class MapReduce(object):
         self.ordered = None
         pass
 
-    def map(self, func, sequence, reduce=None, star=False):
+    def map(self, func, sequence, reduce=None, star=False, cost=None,
+            shared=False):
         """ Map-reduce with multile processes.
 
             Apply func to each item on the sequence, in parallel.
@@ -603,11 +722,29 @@ class MapReduce(object):
                 if True, the items in sequence are treated as positional
                 arguments of reduce.
 
+            cost : None, 'size' or callable, optional
+                Schedule the items of the sequence by decreasing cost,
+                so that expensive items are not left to the end. If
+                'size', the items are file names and the cost is the
+                size of the file on disk. If a callable, it is called
+                on each item and returns the cost. If None (the default)
+                items are scheduled in the order of the sequence.
+                Ordered sections (:py:attr:`ordered`) are executed in
+                the order in which the items are scheduled.
+
+            shared : boolean
+                If True, numpy array results of func (or arrays in a
+                tuple returned by func) are handed to the coordinator
+                through memory-backed files instead of being pickled
+                through the result queue. The coordinator receives
+                arrays that map those files, without further copies.
+
             Returns
             -------
             results : list
                 The list of reduced results from the map operation, in
-                the order of the arguments of sequence.
+                the order of the arguments of sequence, whatever the
+                schedule. Note that reduce is called as results arrive.
 
             Raises
             ------
@@ -628,9 +765,29 @@ class MapReduce(object):
             if star: return func(*i)
             else: return func(i)
 
+        if cost is not None and not hasattr(sequence, '__getitem__'):
+            sequence = list(sequence)
+
         if self.np == 0 or get_debug():
             #Do this in serial
-            return [realreduce(realfunc(i)) for i in sequence]
+            self.order = list(range(len(sequence)))
+            self.timings = []
+            rt = []
+            for work in sequence:
+                t0 = time.time()
+                rt.append(realreduce(realfunc(work)))
+                self.timings.append(time.time() - t0)
+            return rt
+
+        if hasattr(sequence, '__getitem__'):
+            self.order = self._schedule(sequence, cost)
+        else:
+            self.order = None
+        timings = {}
+
+        shmdir = None
+        if shared:
+            shmdir = tempfile.mkdtemp(prefix='sharedmem-', dir=_shmdir())
 
         Q = self.backend.QueueFactory(64)
         R = self.backend.QueueFactory(64)
@@ -638,7 +795,7 @@ class MapReduce(object):
 
         pg = ProcessGroup(main=self._main, np=self.np,
                 backend=self.backend,
-                args=(Q, R, sequence, realfunc))
+                args=(Q, R, sequence, realfunc, shmdir))
 
         pg.start()
 
@@ -648,12 +805,14 @@ class MapReduce(object):
             #   will fail silently if any error occurs.
             j = 0
             try:
-                for i, work in enumerate(sequence):
-                    if not hasattr(sequence, '__getitem__'):
-                        pg.put(Q, (i, work))
-                    else:
-                        pg.put(Q, (i, ))
-                    j = j + 1
+                if self.order is None:
+                    for i, work in enumerate(sequence):
+                        pg.put(Q, (i, i, work))
+                        j = j + 1
+                else:
+                    for pos, i in enumerate(self.order):
+                        pg.put(Q, (pos, i))
+                        j = j + 1
                 N.append(j)
 
                 for i in range(self.np):
@@ -676,7 +835,8 @@ class MapReduce(object):
                     continue
                 except StopProcessGroup:
                     raise pg.get_exception()
-                capsule = capsule[0], realreduce(capsule[1])
+                timings[capsule[0]] = capsule[2]
+                capsule = capsule[0], realreduce(_unshare(capsule[1]))
                 heapq.heappush(L, capsule)
                 count = count + 1
                 if len(N) > 0 and count == N[0]:
@@ -691,12 +851,18 @@ class MapReduce(object):
             pg.join()
             feeder.join()
             assert N[0] == len(rt)
+            self.timings = [timings[i] for i in range(len(rt))]
+            if self.order is None:
+                self.order = list(range(len(rt)))
             return rt
         except BaseException as e:
             pg.killall()
             pg.join()
             feeder.join()
             raise
+        finally:
+            if shmdir is not None:
+                shutil.rmtree(shmdir, ignore_errors=True)
 
 
 def empty_like(array, dtype=None):
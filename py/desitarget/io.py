@@ -22,7 +22,10 @@ from glob import glob, iglob
 from time import time
 from pkg_resources import resource_filename
 import yaml
+import json
 import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 from desiutil import depend
 from desitarget.geomask import hp_in_box, box_area, is_in_box
@@ -92,6 +95,11 @@ dr8addedcols = np.array([], dtype=[
     ('SHAPEEXP_R_IVAR', '>f4'), ('SHAPEEXP_E1_IVAR', '>f4'), ('SHAPEEXP_E2_IVAR', '>f4'),
     ])
 
+# ADM the identifying string at the start of binary MTL ledger files.
+_binary_ledger_magic = b"DESIMTL1"
+# ADM the data model for the index of the latest entry in each ledger.
+_ledger_index_dtype = np.dtype([('TARGETID', '<i8'), ('ROW', '<i8')])
+
 
 def desitarget_nside():
     """Default HEALPix Nside for all target selection algorithms."""
@@ -105,6 +113,56 @@ def desitarget_resolve_dec():
     return dec
 
 
+def _photsys_dtype():
+    """The data model for the PHOTSYS column, which depends on fitsio."""
+    # ADM the fitsio check is a hack for the v0.9 to v1.0 transition
+    # ADM (v1.0 now converts all byte strings to unicode strings).
+    from distutils.version import LooseVersion
+    if LooseVersion(fitsio.__version__) >= LooseVersion('1'):
+        return [('PHOTSYS', '<U1')]
+    return [('PHOTSYS', '|S1')]
+
+
+def _rstrip_in_place(data):
+    """Strip trailing spaces from the string columns of an array.
+
+    Parameters
+    ----------
+    data : :class:`~numpy.ndarray`
+        Numpy structured array. String columns are modified in-place.
+
+    Notes
+    -----
+        - Equivalent to ``data[col] = np.char.rstrip(data[col])`` for
+          space-padded strings (as read from FITS files), but avoids
+          creating new string arrays by replacing trailing spaces with
+          the null bytes that numpy already ignores.
+    """
+    # ADM the buffer must be contiguous to view its characters.
+    if not data.flags.c_contiguous or len(data) == 0:
+        for col in data.dtype.names:
+            if data.dtype[col].kind in 'SU':
+                data[col] = np.char.rstrip(data[col])
+        return
+
+    for col in data.dtype.names:
+        dt, offset = data.dtype.fields[col][:2]
+        if dt.kind not in 'SU' or dt.itemsize == 0 or dt.shape != ():
+            continue
+        # ADM view each string as an (nrows, nchar) array of characters.
+        ctype = np.dtype('u1') if dt.kind == 'S' else np.dtype(dt.str[0]+'u4')
+        nchar = dt.itemsize // ctype.itemsize
+        chars = np.ndarray((len(data), nchar), dtype=ctype, buffer=data,
+                           offset=offset, strides=(data.strides[0], ctype.itemsize))
+        # ADM working backwards, null out spaces that are only followed
+        # ADM by spaces or nulls.
+        trailing = np.ones(len(data), dtype=bool)
+        for i in range(nchar-1, -1, -1):
+            space = chars[:, i] == 32
+            trailing &= space | (chars[:, i] == 0)
+            chars[trailing & space, i] = 0
+
+
 def add_photsys(indata):
     """Add the PHOTSYS column to a sweeps-style array.
 
@@ -126,14 +184,7 @@ def add_photsys(indata):
     # ADM only add the PHOTSYS column if RELEASE exists.
     if 'RELEASE' in indata.dtype.names:
         # ADM add PHOTSYS to the data model.
-        # ADM the fitsio check is a hack for the v0.9 to v1.0 transition
-        # ADM (v1.0 now converts all byte strings to unicode strings).
-        from distutils.version import LooseVersion
-        if LooseVersion(fitsio.__version__) >= LooseVersion('1'):
-            pdt = [('PHOTSYS', '<U1')]
-        else:
-            pdt = [('PHOTSYS', '|S1')]
-        dt = indata.dtype.descr + pdt
+        dt = indata.dtype.descr + _photsys_dtype()
 
         # ADM create a new numpy array with the fields from the new data model...
         nrows = len(indata)
@@ -152,7 +203,7 @@ def add_photsys(indata):
     return outdata
 
 
-def read_tractor(filename, header=False, columns=None):
+def read_tractor(filename, header=False, columns=None, rows=None):
     """Read a tractor catalogue or sweeps file.
 
     Parameters
@@ -165,7 +216,11 @@ def read_tractor(filename, header=False, columns=None):
         Specify the desired Tractor catalog columns to read; defaults to
         desitarget.io.tsdatamodel.dtype.names + most of the columns in
         desitarget.gaiamatch.gaiadatamodel.dtype.names, where
-        tsdatamodel is, e.g., basetsdatamodel + dr9addedcols.
+        tsdatamodel is, e.g., basetsdatamodel + dr9addedcols. Columns
+        that aren't in `filename` are silently ignored.
+    rows : :class:`list` or `~numpy.ndarray`, optional
+        Only read these rows from `filename`. Useful for reading large
+        files in chunks to limit memory usage.
 
     Returns
     -------
@@ -174,17 +229,30 @@ def read_tractor(filename, header=False, columns=None):
     """
     check_fitsio_version()
 
+    # ADM only request columns that are actually in the file, so that
+    # ADM a generic list of columns works for any Data Release.
+    readcols = None
+    if columns is not None:
+        with fitsio.FITS(filename) as fx:
+            filecols = [col.upper() for col in fx[1].get_colnames()]
+        readcols = [col for col in columns if col.upper() in filecols]
+        # ADM MASKBITS used to be BRIGHTSTARINBLOB (see below).
+        if "MASKBITS" in columns and "BRIGHTSTARINBLOB" in filecols:
+            readcols.append("BRIGHTSTARINBLOB")
+
     # ADM read in the file information. Due to fitsio header bugs
     # ADM near v1.0.0, make absolutely sure the user wants the header.
     if header:
         indata, hdr = fitsio.read(filename, upper=True, header=True,
-                                  columns=columns)
+                                  columns=readcols, rows=rows)
     else:
-        indata = fitsio.read(filename, upper=True, columns=columns)
+        indata = fitsio.read(filename, upper=True, columns=readcols,
+                             rows=rows)
 
     # ADM form the final data model in a manner that maintains
     # ADM backwards-compatability with DR8.
-    if "FRACDEV" in indata.dtype.names:
+    if "FRACDEV" in indata.dtype.names or (
+            readcols is not None and "FRACDEV" in filecols):
         tsdatamodel = np.array(
             [], dtype=basetsdatamodel.dtype.descr + dr8addedcols.dtype.descr)
     else:
@@ -208,6 +276,13 @@ def read_tractor(filename, header=False, columns=None):
     if columns is not None:
         dt = [d for d, name in zip(dt, dtnames) if name in columns]
 
+    # ADM add the PHOTSYS column to unambiguously check whether we're
+    # ADM using imaging from the "North" or "South". Adding it to the
+    # ADM data model here (rather than via add_photsys()) means the
+    # ADM output array only needs to be allocated once.
+    if "RELEASE" in [d[0] for d in dt]:
+        dt += _photsys_dtype()
+
     # ADM set-up the output array.
     nrows = len(indata)
     data = np.zeros(nrows, dtype=dt)
@@ -215,9 +290,12 @@ def read_tractor(filename, header=False, columns=None):
     if "REF_ID" in data.dtype.names:
         data['REF_ID'] = -1
 
-    # ADM populate the common input/output columns.
-    for col in set(indata.dtype.names).intersection(set(data.dtype.names)):
-        data[col] = indata[col]
+    # ADM populate the common input/output columns. Assigning all of
+    # ADM the columns at once makes a single pass over the rows, which
+    # ADM is much faster than copying the columns one-by-one.
+    common = [col for col in data.dtype.names if col in indata.dtype.names]
+    if len(common) > 0:
+        data[common] = indata[common]
 
     # ADM MASKBITS used to be BRIGHTSTARINBLOB which was set to True/False
     # ADM and which represented the SECOND bit of MASKBITS.
@@ -225,16 +303,15 @@ def read_tractor(filename, header=False, columns=None):
         if "MASKBITS" in data.dtype.names:
             data["MASKBITS"] = indata["BRIGHTSTARINBLOB"] << 1
 
+    # ADM release the memory for the input data as soon as possible.
+    del indata
+
     # ADM To circumvent whitespace bugs on I/O from fitsio.
     # ADM need to strip any white space from string columns.
-    for colname in data.dtype.names:
-        kind = data[colname].dtype.kind
-        if kind == 'U' or kind == 'S':
-            data[colname] = np.char.rstrip(data[colname])
+    _rstrip_in_place(data)
 
-    # ADM add the PHOTSYS column to unambiguously check whether we're using imaging
-    # ADM from the "North" or "South".
-    data = add_photsys(data)
+    if "PHOTSYS" in data.dtype.names:
+        data["PHOTSYS"] = release_to_photsys(data["RELEASE"])
 
     if header:
         return data, hdr
@@ -286,7 +363,7 @@ def release_to_photsys(release):
     photstrings = np.array(list(releasedict.values()))
 
     # ADM explicitly check no unknown release numbers were passed.
-    unknown = set(release) - set(releasenums)
+    unknown = set(np.unique(release)) - set(releasenums)
     if bool(unknown):
         msg = 'Unknown release number {}'.format(unknown)
         log.critical(msg)
@@ -687,11 +764,16 @@ def write_targets(targdir, data, indir=None, indir2=None, nchunks=None,
             shatab = infiles
         fitsio.write(filename, shatab, extname="INFILES")
 
+    # ADM index the HEALPixels in the file for fast look-ups.
+    if hpxlist is not None:
+        _index_hp_file(filename, nsidefile, hpxlist, len(data))
+
     return ntargs, filename
 
 
 def write_mtl(mtldir, data, indir=None, survey="main", obscon=None,
-              nsidefile=None, hpxlist=None, extra=None, ecsv=True):
+              nsidefile=None, hpxlist=None, extra=None, ecsv=True,
+              binary=False):
     """Write Merged Target List ledgers or files.
 
     Parameters
@@ -720,6 +802,9 @@ def write_mtl(mtldir, data, indir=None, survey="main", obscon=None,
         values to the output header.
     ecsv : :class:`bool`, defaults to ``True``
         If ``True`` write a .ecsv file, if ``False`` with a .fits file.
+    binary : :class:`bool`, defaults to ``False``
+        If ``True`` write an append-only binary .bin ledger (see
+        :func:`write_binary_ledger`). Overrides `ecsv`.
 
     Returns
     -------
@@ -750,13 +835,12 @@ def write_mtl(mtldir, data, indir=None, survey="main", obscon=None,
     dr = np.unique(release//1000)
     if len(dr) == 0:
         drint = 'X'
+    elif len(dr) > 1:
+        msg = "Multiple data releases in MTL ({})".format(dr)
+        log.error(msg)
+        raise TypeError(msg)
     else:
-        try:
-            drint = int(dr)
-        except TypeError:
-            msg = "Multiple data releases in MTL ({})".format(dr)
-            log.error(msg)
-            raise TypeError(msg)
+        drint = int(dr[0])
     keys += ["DR"]
     vals += [drint]
 
@@ -767,6 +851,8 @@ def write_mtl(mtldir, data, indir=None, survey="main", obscon=None,
 
     # ADM set output format to ecsv if passed, or fits otherwise.
     form = 'ecsv'*ecsv + 'fits'*(not(ecsv))
+    if binary:
+        form = 'bin'
     fn = find_target_files(mtldir, dr=drint, flavor="mtl", survey=survey,
                            obscon=obscon, hp=hpx, ender=form)
     # ADM create necessary directories, if they don't exist.
@@ -780,7 +866,11 @@ def write_mtl(mtldir, data, indir=None, survey="main", obscon=None,
     # ADM sort the output file on TARGETID.
     data = data[np.argsort(data["TARGETID"])]
 
-    write_with_units(fn, data, extname='MTL', header=hdrdict, ecsv=ecsv)
+    if binary:
+        write_binary_ledger(fn, data, header=hdrdict)
+        read_mtl_ledger_index(fn, update=True)
+    else:
+        write_with_units(fn, data, extname='MTL', header=hdrdict, ecsv=ecsv)
 
     return ntargs, fn
 
@@ -835,6 +925,239 @@ def write_in_chunks(filename, data, nchunks, extname=None, header=None):
     return
 
 
+class HEALPixSpool(object):
+    """Spool targets to disk in (NESTED) HEALPixel-split files.
+
+    Parameters
+    ----------
+    spooldir : :class:`str`
+        Directory in which to write the spool files. Created if it
+        doesn't exist.
+    nside : :class:`int`
+        (NESTED) HEALPixel nside at which to split the targets.
+    pixlist : :class:`list` or `int`, optional, defaults to `None`
+        If passed, silently discard targets outside of these pixels.
+
+    Notes
+    -----
+        - Used to stream targets to disk in bounded memory, see, e.g.,
+          `spooldir` in :func:`~desitarget.cuts.select_targets()`.
+        - Spool files are named `spool-hp-X.fits` for HEALPixel X.
+          Existing spool files are OVERWRITTEN on the first append.
+    """
+    def __init__(self, spooldir, nside, pixlist=None):
+        self.spooldir = spooldir
+        self.nside = nside
+        self.pixlist = pixlist
+        if pixlist is not None:
+            self.pixlist = np.atleast_1d(pixlist)
+        # ADM the data model, set on the first append.
+        self.dtype = None
+        # ADM the number of rows spooled in each pixel.
+        self.nrows = {}
+        os.makedirs(spooldir, exist_ok=True)
+
+    def filename(self, pix):
+        """The name of the spool file for HEALPixel `pix`."""
+        return os.path.join(self.spooldir, "spool-hp-{}.fits".format(pix))
+
+    def pixels(self):
+        """A sorted list of the HEALPixels that contain spooled rows."""
+        return sorted([pix for pix in self.nrows if self.nrows[pix] > 0])
+
+    def append(self, data, pixnum=None):
+        """Append rows of `data` to the spool files for their HEALPixels.
+
+        Parameters
+        ----------
+        data : :class:`~numpy.ndarray`
+            Structured array with at least "RA" and "DEC" columns. If
+            the data model differs from that of the first append, only
+            columns in common are retained (others are set to zero).
+        pixnum : :class:`~numpy.ndarray`, optional
+            The (NESTED) HEALPixel of each row of `data` at the `nside`
+            of the spool. If passed, "RA" and "DEC" aren't needed.
+
+        Returns
+        -------
+        :class:`int`
+            The number of rows that were spooled.
+        """
+        if len(data) == 0:
+            return 0
+
+        if self.dtype is None:
+            self.dtype = data.dtype
+        elif data.dtype != self.dtype:
+            outdata = np.zeros(len(data), dtype=self.dtype)
+            for col in set(data.dtype.names).intersection(self.dtype.names):
+                outdata[col] = data[col]
+            data = outdata
+
+        if pixnum is None:
+            theta, phi = np.radians(90-data["DEC"]), np.radians(data["RA"])
+            pixnum = hp.ang2pix(self.nside, theta, phi, nest=True)
+        if self.pixlist is not None:
+            ii = np.isin(pixnum, self.pixlist)
+            data, pixnum = data[ii], pixnum[ii]
+
+        # ADM sort on pixel number to split the data efficiently.
+        ii = np.argsort(pixnum, kind="stable")
+        data, pixnum = data[ii], pixnum[ii]
+        pixels, starts = np.unique(pixnum, return_index=True)
+        ends = np.append(starts[1:], len(pixnum))
+        for pix, begin, end in zip(pixels, starts, ends):
+            fn = self.filename(pix)
+            # ADM clobber spool files from any earlier run.
+            if pix not in self.nrows:
+                fitsio.write(fn, data[begin:end], extname='SPOOL',
+                             clobber=True)
+                self.nrows[pix] = 0
+            else:
+                with fitsio.FITS(fn, 'rw') as fx:
+                    fx[-1].append(data[begin:end])
+            self.nrows[pix] += end - begin
+
+        return len(data)
+
+    def read(self, pix, columns=None):
+        """Read all of the spooled rows in HEALPixel `pix`.
+
+        Parameters
+        ----------
+        pix : :class:`int`
+            A (NESTED) HEALPixel at the `nside` of the spool.
+        columns : :class:`list`, optional
+            Only read these columns.
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            The spooled rows in `pix`. An empty array with the spool
+            data model if no rows were spooled in `pix`.
+        """
+        if self.nrows.get(pix, 0) == 0:
+            dt = self.dtype
+            if columns is not None and dt is not None:
+                dt = [(col, dt[col]) for col in columns]
+            return np.zeros(0, dtype=dt)
+        return fitsio.read(self.filename(pix), columns=columns)
+
+    def rewrite(self, pix, data):
+        """Replace all of the spooled rows in HEALPixel `pix` with `data`.
+
+        Parameters
+        ----------
+        pix : :class:`int`
+            A (NESTED) HEALPixel at the `nside` of the spool.
+        data : :class:`~numpy.ndarray`
+            The rows to retain in `pix`, with the spool data model.
+        """
+        fn = self.filename(pix)
+        if len(data) == 0:
+            if os.path.exists(fn):
+                os.remove(fn)
+            self.nrows.pop(pix, None)
+            return
+        fitsio.write(fn, data, extname='SPOOL', clobber=True)
+        self.nrows[pix] = len(data)
+
+    def cleanup(self):
+        """Remove all of the spool files."""
+        for pix in self.nrows:
+            fn = self.filename(pix)
+            if os.path.exists(fn):
+                os.remove(fn)
+        self.nrows = {}
+
+
+class Checkpoint(object):
+    """Record completed units of work so that an interrupted run can resume.
+
+    Parameters
+    ----------
+    checkpointdir : :class:`str`
+        Directory in which to write the checkpoint files. Created if it
+        doesn't exist.
+    key : :class:`str`
+        Identifies the settings of the run (e.g. a summary of the inputs
+        to a function). Results recorded for a different `key` are not
+        reused.
+
+    Notes
+    -----
+        - Used to resume interrupted runs, see, e.g., `checkpointdir` in
+          :func:`~desitarget.cuts.select_targets()`.
+        - The result for each unit of work (e.g. an input file) is saved
+          as `checkpoint-X.npy` where X is a hash of `key`, the name of
+          the unit and, for files, its size and modification time. The
+          result is written to a temporary file and renamed, so partial
+          results are never read.
+        - Each completed unit is then recorded as a line (hash, number of
+          rows, name) in `manifest.txt`. Lines are appended with a single
+          write, so parallel processes can safely record results.
+        - Checkpoint files are retained after a successful run, so that
+          the outputs can be regenerated. Remove `checkpointdir` to
+          reclaim the disk space.
+    """
+    def __init__(self, checkpointdir, key):
+        self.checkpointdir = checkpointdir
+        self.key = key
+        self.manifest = os.path.join(checkpointdir, "manifest.txt")
+        os.makedirs(checkpointdir, exist_ok=True)
+        # ADM the units of work that were completed by earlier runs.
+        self.completed = set()
+        if os.path.exists(self.manifest):
+            with open(self.manifest) as f:
+                self.completed = set([line.split()[0] for line in f])
+
+    def _hash(self, name):
+        """A hash of the key, the unit of work and, for files, their state."""
+        sha = hashlib.sha256(self.key.encode())
+        sha.update(name.encode())
+        if os.path.exists(name):
+            st = os.stat(name)
+            sha.update("{} {}".format(st.st_size, st.st_mtime_ns).encode())
+        return sha.hexdigest()
+
+    def filename(self, name):
+        """The name of the checkpoint file for the unit of work `name`."""
+        return os.path.join(self.checkpointdir,
+                            "checkpoint-{}.npy".format(self._hash(name)))
+
+    def is_done(self, name):
+        """``True`` if an earlier run recorded a result for `name`."""
+        return (self._hash(name) in self.completed
+                and os.path.exists(self.filename(name)))
+
+    def read(self, name):
+        """Read the recorded result for the unit of work `name`."""
+        return np.load(self.filename(name))
+
+    def write(self, name, data):
+        """Record the result for the unit of work `name`.
+
+        Parameters
+        ----------
+        name : :class:`str`
+            The unit of work, e.g. the full path to an input file.
+        data : :class:`~numpy.ndarray`
+            The result for `name`.
+        """
+        fn = self.filename(name)
+        tmpfn = "{}.tmp{}".format(fn, os.getpid())
+        with open(tmpfn, "wb") as f:
+            np.save(f, data)
+        os.rename(tmpfn, fn)
+
+        line = "{} {} {}\n".format(self._hash(name), len(data), name)
+        fd = os.open(self.manifest, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+
+
 def write_secondary(targdir, data, primhdr=None, scxdir=None, obscon=None,
                     drint='X'):
     """Write a catalogue of secondary targets.
@@ -1112,6 +1435,10 @@ def write_skies(targdir, data, indir=None, indir2=None, supp=False,
 
     write_with_units(filename, data, extname='SKY_TARGETS', header=hdr)
 
+    # ADM index the HEALPixels in the file for fast look-ups.
+    if nsidefile is not None:
+        _index_hp_file(filename, nsidefile, hpxlist, len(data))
+
     return len(data), filename
 
 
@@ -1347,6 +1674,10 @@ def write_randoms(targdir, data, indir=None, hdr=None, nside=None, supp=False,
 
     write_with_units(filename, data, extname='RANDOMS', header=hdr)
 
+    # ADM index the HEALPixels in the file for fast look-ups.
+    if nsidefile is not None:
+        _index_hp_file(filename, nsidefile, hpxlist, len(data))
+
     return nrands, filename
 
 
@@ -2031,6 +2362,88 @@ def decode_sweep_name(sweepname, nside=None, inclusive=True, fact=4):
     return pixnum
 
 
+# ADM the file that indexes the HEALPixels in each file in a directory.
+hpindexname = ".hpindex.json"
+# ADM results of check_hp_target_dir() in this process for each directory.
+_hpdirmemo = {}
+
+
+def _hp_file_entry(filename, nside=None, pixels=None, nrows=None):
+    """Index entry for a HEALPix-split file.
+
+    The entry records the size, mtime, nside, pixels and number of rows
+    of the file. If `nside` and `pixels` aren't passed, they (and the
+    number of rows) are read from the header.
+    """
+    st = os.stat(filename)
+    if nside is None:
+        hdr = read_targets_header(filename)
+        nside, pixels = hdr["FILENSID"], hdr["FILEHPX"]
+        nrows = hdr["NAXIS2"]
+        # ADM hdr["FILEHPX"] could be a str, depending on fitsio version.
+        if isinstance(pixels, str):
+            pixels = pixels.split(',')
+    # ADM if this is a one-pixel file, or interpreted as a tuple,
+    # ADM convert to a list.
+    pixels = [int(pix) for pix in np.atleast_1d(pixels)]
+
+    entry = {"size": st.st_size, "mtime": st.st_mtime_ns,
+             "nside": int(nside), "pixels": pixels}
+    if nrows is not None:
+        entry["nrows"] = int(nrows)
+
+    return entry
+
+
+def _read_hp_index(hpdirname):
+    """Read the HEALPixel index for a directory ({} if there isn't one)."""
+    try:
+        with open(os.path.join(hpdirname, hpindexname)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_hp_index(hpdirname, index):
+    """Write the HEALPixel index for a directory, if it's writable."""
+    fn = os.path.join(hpdirname, hpindexname)
+    tmpfn = "{}.tmp{}".format(fn, os.getpid())
+    try:
+        with open(tmpfn, "w") as f:
+            json.dump(index, f)
+        os.rename(tmpfn, fn)
+    except OSError:
+        # ADM e.g. a read-only directory, the index is just a speed-up.
+        if os.path.exists(tmpfn):
+            os.remove(tmpfn)
+
+
+def _index_hp_file(filename, nside, pixels, nrows):
+    """Add a newly written HEALPix-split file to its directory's index."""
+    hpdirname, basename = os.path.split(filename)
+    index = _read_hp_index(hpdirname)
+    index[basename] = _hp_file_entry(filename, nside, pixels, nrows)
+    _write_hp_index(hpdirname, index)
+
+
+def _hp_file_nrows(infiles):
+    """Number of rows in target files, from their index if it's current."""
+    indexes, nrows = {}, []
+    for fn in infiles:
+        hpdirname, basename = os.path.split(fn)
+        if hpdirname not in indexes:
+            indexes[hpdirname] = _read_hp_index(hpdirname)
+        entry = indexes[hpdirname].get(basename, {})
+        st = os.stat(fn)
+        if (entry.get("size") == st.st_size and "nrows" in entry and
+                entry.get("mtime") == st.st_mtime_ns):
+            nrows.append(entry["nrows"])
+        else:
+            nrows.append(None)
+
+    return nrows
+
+
 def check_hp_target_dir(hpdirname):
     """Check fidelity of a directory of HEALPixel-partitioned targets.
 
@@ -2054,33 +2467,47 @@ def check_hp_target_dir(hpdirname):
         - Checks that all files are at the same NSIDE.
         - Checks that no two files contain the same HEALPixels.
         - Checks that HEALPixel numbers are consistent with NSIDE.
+        - The NSIDE and HEALPixels of each file are indexed in the file
+          `.hpindex.json` in `hpdirname` (maintained by, e.g.,
+          :func:`write_targets`), so headers are only read for files
+          that are new or changed (in size or modification time) since
+          they were indexed. Results are also retained in memory for
+          repeated calls while no file changes.
     """
-    # ADM glob all the files in the directory, read the pixel
-    # ADM numbers and NSIDEs.
-    nside = []
-    pixlist = []
-    fns = glob(os.path.join(hpdirname, "*fits"))
+    # ADM the files in the directory, with their size and mtime.
+    fns = sorted(glob(os.path.join(hpdirname, "*fits")))
+    stats = [os.stat(fn) for fn in fns]
+    signature = [(fn, st.st_size, st.st_mtime_ns) for fn, st in zip(fns, stats)]
+
+    # ADM if no file changed since the last call, we're done.
+    if hpdirname in _hpdirmemo and _hpdirmemo[hpdirname][0] == signature:
+        nside, pixdict = _hpdirmemo[hpdirname][1]
+        return nside, dict(pixdict)
+
+    # ADM read the NSIDE and pixels for each file from the index, or
+    # ADM from the header for files that are new or changed.
+    index = _read_hp_index(hpdirname)
+    newindex = {}
+    for fn, size, mtime in signature:
+        basename = os.path.basename(fn)
+        entry = index.get(basename)
+        if entry is None or entry["size"] != size or entry["mtime"] != mtime:
+            entry = _hp_file_entry(fn)
+        newindex[basename] = entry
+    if newindex != index:
+        _write_hp_index(hpdirname, newindex)
+
+    # ADM create a look-up dictionary of file-for-each-pixel.
+    nside = np.array([newindex[os.path.basename(fn)]["nside"] for fn in fns])
+    pixlist = [newindex[os.path.basename(fn)]["pixels"] for fn in fns]
     pixdict = {}
-    for fn in fns:
-        hdr = read_targets_header(fn)
-        nside.append(hdr["FILENSID"])
-        pixels = hdr["FILEHPX"]
-        # ADM hdr["FILEHPX"] could be a str, depending on fitsio version.
-        if isinstance(pixels, str):
-            pixels = list(map(int, pixels.split(',')))
-        # ADM if this is a one-pixel file, or interpreted as a tuple,
-        # ADM convert to a list.
-        else:
-            pixels = list(np.atleast_1d(pixels))
+    for fn, pixels in zip(fns, pixlist):
         # ADM check we haven't stored a pixel string that is too long.
         _check_hpx_length(pixels)
-        # ADM create a look-up dictionary of file-for-each-pixel.
         for pix in pixels:
             pixdict[pix] = fn
-        pixlist.append(pixels)
-    nside = np.array(nside)
     # ADM as well as having just an array of all the pixels.
-    pixlist = np.hstack(pixlist)
+    pixlist = np.hstack(pixlist).astype(int)
 
     msg = None
     # ADM check all NSIDEs are the same.
@@ -2089,15 +2516,16 @@ def check_hp_target_dir(hpdirname):
             .format(hpdirname)
 
     # ADM check that no two files contain the same HEALPixels.
-    if not len(set(pixlist)) == len(pixlist):
-        dup = set([pix for pix in pixlist if list(pixlist).count(pix) > 1])
+    pix, cnt = np.unique(pixlist, return_counts=True)
+    if np.any(cnt > 1):
+        dup = set(pix[cnt > 1])
         msg = 'Duplicate pixel ({}) in files in {}'           \
             .format(dup, hpdirname)
 
     # ADM check that the pixels are consistent with the nside.
-    goodpix = np.arange(hp.nside2npix(nside[0]))
-    badpix = set(pixlist) - set(goodpix)
-    if len(badpix) > 0:
+    bad = (pix < 0) | (pix >= hp.nside2npix(nside[0]))
+    if np.any(bad):
+        badpix = set(pix[bad])
         msg = 'Pixel ({}) not allowed at NSIDE={} in {}'.     \
               format(badpix, nside[0], hpdirname)
 
@@ -2105,7 +2533,9 @@ def check_hp_target_dir(hpdirname):
         log.critical(msg)
         raise AssertionError(msg)
 
-    return nside[0], pixdict
+    _hpdirmemo[hpdirname] = signature, (nside[0], pixdict)
+
+    return nside[0], dict(pixdict)
 
 
 def _get_targ_dir():
@@ -2304,6 +2734,344 @@ def find_target_files(targdir, dr='X', flavor="targets", survey="main",
     return fn
 
 
+def _binary_ledger_layout(filename, ledgerid=False):
+    """Parse the header and layout of a binary MTL ledger file.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Name of a binary (.bin) MTL ledger file.
+    ledgerid : :class:`bool`, optional, defaults to ``False``
+        If ``True`` then also return the identifier of the file.
+
+    Returns
+    -------
+    :class:`dict`
+        The header of the file.
+    :class:`~numpy.dtype`
+        The data type of each record in the file.
+    :class:`int`
+        The byte offset at which the records begin.
+    :class:`int`
+        The number of complete records in the file.
+    :class:`str`
+        A unique identifier created each time the file was (re)written
+        by :func:`write_binary_ledger`, or ``None`` for files written
+        without an identifier. Only returned if `ledgerid` is ``True``.
+    """
+    with open(filename, "rb") as f:
+        magic = f.read(len(_binary_ledger_magic))
+        if magic != _binary_ledger_magic:
+            msg = "{} is not a binary MTL ledger".format(filename)
+            log.critical(msg)
+            raise IOError(msg)
+        hdrlen = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+        layout = json.loads(f.read(hdrlen).decode())
+    dt = np.dtype([tuple(field) for field in layout["DTYPE"]])
+    offset = len(_binary_ledger_magic) + 8 + hdrlen
+
+    # ADM any partial record at the end of the file is from an
+    # ADM interrupted append, and is ignored.
+    nbytes = os.path.getsize(filename) - offset
+    nrows, partial = divmod(nbytes, dt.itemsize)
+    if partial > 0:
+        log.warning("Ignoring {} bytes of partial record at end of {}".format(
+            partial, filename))
+
+    if ledgerid:
+        return layout["HEADER"], dt, offset, nrows, layout.get("LEDGERID")
+    return layout["HEADER"], dt, offset, nrows
+
+
+def write_binary_ledger(filename, data, header=None):
+    """Write an append-only binary MTL ledger file.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        The output file.
+    data : :class:`~numpy.ndarray`
+        The numpy structured array of data to write.
+    header : :class:`dict`, optional
+        Header keywords and values to write to the file.
+
+    Returns
+    -------
+    Nothing, but writes the `data` to `filename`.
+
+    Notes
+    -----
+        - The file is a short identifying string, then the (8-byte)
+          length of a JSON header recording the data type and `header`,
+          then the fixed-width records of `data`.
+        - New records can be appended in constant time with
+          :func:`append_binary_ledger`, and the file can be read as a
+          memory map with :func:`read_binary_ledger`.
+        - Always OVERWRITES existing files!
+        - Writes atomically. Any files that died mid-write will be
+          appended by ".tmp".
+        - Each write records a new, unique identifier in the file (see
+          :func:`read_mtl_ledger_index`).
+    """
+    if header is None:
+        header = {}
+    # ADM a new identifier for each write, so that, e.g., an index of a
+    # ADM previous version of the file isn't reused.
+    layout = {"DTYPE": data.dtype.descr, "HEADER": dict(header),
+              "LEDGERID": uuid.uuid4().hex}
+    # ADM numpy types can't be serialized to JSON, so convert them.
+    hdrbytes = json.dumps(
+        layout, default=lambda x: x.tolist() if hasattr(x, "tolist") else str(x)
+    ).encode()
+    # ADM pad the header so records start on a 64-byte boundary.
+    pad = -(len(_binary_ledger_magic) + 8 + len(hdrbytes)) % 64
+    hdrbytes += b" "*pad
+
+    with open(filename+'.tmp', "wb") as f:
+        f.write(_binary_ledger_magic)
+        f.write(np.array(len(hdrbytes), dtype='<u8').tobytes())
+        f.write(hdrbytes)
+        f.write(np.ascontiguousarray(data).tobytes())
+    os.rename(filename+'.tmp', filename)
+
+    return
+
+
+def append_binary_ledger(filename, data):
+    """Append records to a binary MTL ledger file.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Name of a binary (.bin) MTL ledger file, as made by, e.g.,
+        :func:`write_binary_ledger`.
+    data : :class:`~numpy.ndarray`
+        The numpy structured array of data to append. Must contain all
+        of the columns in the ledger.
+
+    Returns
+    -------
+    :class:`int`
+        The number of records in the ledger after appending `data`.
+
+    Notes
+    -----
+        - Takes a time that scales with the size of `data`, not with
+          the size of the ledger.
+    """
+    _, dt, offset, nrows = _binary_ledger_layout(filename)
+
+    # ADM convert the data to the data model of the ledger.
+    if data.dtype != dt:
+        missing = set(dt.names) - set(data.dtype.names)
+        if len(missing) > 0:
+            msg = "Columns {} are missing from data to append to {}".format(
+                missing, filename)
+            log.critical(msg)
+            raise ValueError(msg)
+        done = np.zeros(len(data), dtype=dt)
+        for col in dt.names:
+            done[col] = data[col]
+        data = done
+
+    with open(filename, "r+b") as f:
+        # ADM overwrite any partial record from an interrupted append.
+        f.seek(offset + nrows*dt.itemsize)
+        f.truncate()
+        f.write(np.ascontiguousarray(data).tobytes())
+
+    return nrows + len(data)
+
+
+def read_binary_ledger(filename, header=False):
+    """Read a binary MTL ledger file as a memory map.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Name of a binary (.bin) MTL ledger file, as made by, e.g.,
+        :func:`write_binary_ledger`.
+    header : :class:`bool`, optional, defaults to ``False``
+        If ``True`` then also return the header of the file.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        A read-only, memory-mapped, structured numpy array of the MTL.
+    :class:`dict`
+        The header of the file. Only returned if `header` is ``True``.
+    """
+    hdr, dt, offset, nrows = _binary_ledger_layout(filename)
+    if nrows == 0:
+        mtl = np.zeros(0, dtype=dt)
+    else:
+        mtl = np.memmap(filename, dtype=dt, mode="r", offset=offset,
+                        shape=(nrows,))
+
+    if header:
+        return mtl, hdr
+    return mtl
+
+
+def read_mtl_ledger_index(filename, update=False):
+    """Read the index of the latest entry for each target in a ledger.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Name of a binary (.bin) MTL ledger file.
+    update : :class:`bool`, optional, defaults to ``False``
+        If ``True`` then write the index (a sidecar ".idx" file next to
+        `filename`) if it is missing or out-of-date with the ledger.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        An array with columns "TARGETID" and "ROW", sorted on TARGETID,
+        where "ROW" is the row of the latest entry for each TARGETID in
+        the ledger in `filename`.
+
+    Notes
+    -----
+        - The index records how many rows of the ledger it covers. If
+          the ledger has grown since the index was written, only the
+          new rows are read to bring the index up-to-date. So, the
+          index only needs to be updated after a ledger is appended,
+          but an index that is out-of-date (e.g. because a process
+          died between appending and updating) is still safe to use.
+        - The index also records the identifier of the ledger (see
+          :func:`write_binary_ledger`), and is rebuilt if the ledger has
+          since been rewritten.
+    """
+    ledger = read_binary_ledger(filename)
+    nrows = len(ledger)
+    ledgerid = _binary_ledger_layout(filename, ledgerid=True)[-1]
+
+    # ADM read the existing index, if there is one.
+    idxfn = "{}.idx".format(os.path.splitext(filename)[0])
+    index, nindexed = np.zeros(0, dtype=_ledger_index_dtype), 0
+    uptodate = False
+    if os.path.exists(idxfn):
+        indexed, hdr = read_binary_ledger(idxfn, header=True)
+        # ADM only reuse an index of this version of the ledger.
+        if hdr.get("LEDGERID") == ledgerid and hdr["NROWS"] <= nrows:
+            index, nindexed = indexed, hdr["NROWS"]
+            uptodate = nindexed == nrows
+
+    # ADM add any new rows to the index.
+    if not uptodate:
+        # ADM the last entry for each TARGETID in the new rows. The
+        # ADM reverse is because np.unique retains the FIRST entry.
+        targetid = np.flip(ledger["TARGETID"][nindexed:])
+        targetid, ii = np.unique(targetid, return_index=True)
+        row = nrows - 1 - ii
+        # ADM update the rows of TARGETIDs that are already indexed...
+        index = np.array(index)
+        loc = np.searchsorted(index["TARGETID"], targetid)
+        found = np.zeros(len(targetid), dtype=bool)
+        inrange = loc < len(index)
+        found[inrange] = index["TARGETID"][loc[inrange]] == targetid[inrange]
+        index["ROW"][loc[found]] = row[found]
+        # ADM ...and insert new TARGETIDs, retaining the sort order.
+        new = np.zeros(np.sum(~found), dtype=_ledger_index_dtype)
+        new["TARGETID"], new["ROW"] = targetid[~found], row[~found]
+        index = np.insert(index, loc[~found], new)
+        if update:
+            write_binary_ledger(idxfn, index, header={"NROWS": nrows,
+                                                      "LEDGERID": ledgerid})
+
+    return index
+
+
+def convert_mtl_ledger(filename, outdirname=None, ledgerform="bin"):
+    """Convert an MTL ledger file to a different file format.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Name of a .ecsv, .fits or .bin ledger file.
+    outdirname : :class:`str`, optional
+        Directory to which to write the converted file. Defaults to
+        the directory that contains `filename`.
+    ledgerform : :class:`str`, optional, defaults to "bin"
+        The format to convert to, one of "ecsv", "fits" or "bin".
+
+    Returns
+    -------
+    :class:`str`
+        The name of the converted file, which has the same name as
+        `filename` but with the file extension for `ledgerform`.
+
+    Notes
+    -----
+        - Every entry in the ledger is retained, in the same order.
+    """
+    allowed = ["ecsv", "fits", "bin"]
+    if ledgerform not in allowed:
+        msg = "ledgerform must be {}, not {}".format(
+            ' or '.join(allowed), ledgerform)
+        log.critical(msg)
+        raise ValueError(msg)
+
+    # ADM read the full ledger and its header.
+    mtl = np.array(read_mtl_ledger(filename, unique=False))
+    hdr = read_mtl_ledger_header(filename)
+
+    if outdirname is None:
+        outdirname = os.path.dirname(filename)
+    outfn = os.path.join(outdirname, "{}.{}".format(
+        os.path.splitext(os.path.basename(filename))[0], ledgerform))
+    if ledgerform == "bin":
+        write_binary_ledger(outfn, mtl, header=hdr)
+        read_mtl_ledger_index(outfn, update=True)
+    else:
+        write_with_units(outfn, mtl, extname="MTL", header=hdr,
+                         ecsv=ledgerform == "ecsv")
+
+    return outfn
+
+
+def read_mtl_ledger_header(filename):
+    """Read the header of an individual MTL ledger file.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Name of a .ecsv, .fits or .bin ledger file.
+
+    Returns
+    -------
+    :class:`dict`
+        The header keywords (excluding those that describe the format
+        of FITS files) and their values.
+    """
+    if ".ecsv" in filename:
+        from astropy.table.meta import get_header_from_yaml
+        lines = []
+        with open(filename) as f:
+            for line in f:
+                if not line.startswith("#"):
+                    break
+                lines.append(line[2:].rstrip("\n"))
+        # ADM the first line is the ECSV version.
+        hdr = dict(get_header_from_yaml(lines[1:]).get("meta", {}))
+    elif ".fits" in filename:
+        fitshdr = fitsio.read_header(filename, "MTL")
+        fitskeys = re.compile(
+            "XTENSION|BITPIX|NAXIS|PCOUNT|GCOUNT|TFIELDS|TTYPE|TFORM|TUNIT")
+        hdr = {key: fitshdr[key] for key in fitshdr.keys()
+               if not fitskeys.match(key)}
+    elif ".bin" in filename:
+        hdr = _binary_ledger_layout(filename)[0]
+    else:
+        msg = "File not parsed ({}). Should be .fits, .ecsv or .bin".format(
+            filename)
+        log.error(msg)
+        raise IOError(msg)
+
+    return hdr
+
+
 def read_mtl_ledger(filename, unique=True):
     """Wrapper to read individual MTL ledger files.
 
@@ -2312,7 +3080,9 @@ def read_mtl_ledger(filename, unique=True):
     filename : :class:`str`
         Name of a ledger file containing a Merged Target List. If the
         filename contains ".ecsv" then it will be read as an ECSV file.
-        If it contains ".fits" then it will be read as a FITS file.
+        If it contains ".fits" then it will be read as a FITS file. If it
+        contains ".bin" it will be read as a binary ledger file (see
+        :func:`write_binary_ledger`).
     unique : :class:`bool`, optional, defaults to ``True``
         If ``True`` then only read targets with unique `TARGETID`, where
         the last occurrence of the target in the ledger is the one that
@@ -2330,9 +3100,11 @@ def read_mtl_ledger(filename, unique=True):
         names, forms = [], []
         with open(filename) as f:
             for line in f:
-                if "name" in line:
-                    l = line.split()
-                    name, form = l[3][:-1], l[5][:-1]
+                if "name:" in line and "datatype:" in line:
+                    # ADM parse by key, as the order of the keys (and
+                    # ADM whether there is a unit) can vary.
+                    name = re.search(r"name: ([^,}]+)", line).group(1)
+                    form = re.search(r"datatype: ([^,}]+)", line).group(1)
                     names.append(name)
                     if 'string' in form:
                         forms.append(mtldm[name].dtype.str)
@@ -2354,8 +3126,17 @@ def read_mtl_ledger(filename, unique=True):
             mtl[col] = prelim[col]
     elif ".fits" in filename:
         mtl = fitsio.read(filename, extension="MTL")
+    elif ".bin" in filename:
+        # ADM this is a memory map, so only rows that are needed for
+        # ADM the output are actually read.
+        mtl = read_binary_ledger(filename)
+        # ADM look up the latest entry for each target in the index.
+        if unique:
+            index = read_mtl_ledger_index(filename)
+            return np.array(mtl[index["ROW"]])
     else:
-        msg = "File not parsed ({}). Should be .fits or .ecsv".format(filename)
+        msg = "File not parsed ({}). Should be .fits, .ecsv or .bin".format(
+            filename)
         log.error(msg)
         raise IOError(msg)
 
@@ -2364,9 +3145,9 @@ def read_mtl_ledger(filename, unique=True):
         # ADM entry and we want the LAST unique entry.
         mtl = np.flip(mtl)
         _, ii = np.unique(mtl["TARGETID"], return_index=True)
-        return mtl[ii]
+        return np.array(mtl[ii])
     else:
-        return mtl
+        return np.array(mtl)
 
 
 def read_target_files(filename, columns=None, rows=None, header=False,
@@ -2411,11 +3192,13 @@ def read_target_files(filename, columns=None, rows=None, header=False,
 
     if downsample is not None and rows is None:
         np.random.seed(616)
-        ntargs = fitsio.read_header(filename, extname)["NAXIS2"]
+        ntargs = f[extname].get_nrows()
         rows = np.random.choice(ntargs, ntargs//downsample, replace=False)
 
-    targs, hdr = fitsio.read(filename, extname,
-                             columns=columns, rows=rows, header=True)
+    # ADM read from the already-open file, rather than reopening it.
+    targs = f[extname].read(columns=columns, rows=rows)
+    hdr = f[extname].read_header()
+    f.close()
 
     if verbose:
         log.info("Read {} targets from {}, extension {}...Took {:.1f}s".format(
@@ -2427,6 +3210,93 @@ def read_target_files(filename, columns=None, rows=None, header=False,
     return targs
 
 
+def _read_target_files_into(infiles, dtype, columns=None, downsample=None,
+                            verbose=False, numthreads=8):
+    """Read several target files into one array, using threads.
+
+    Parameters
+    ----------
+    infiles : :class:`list`
+        Target files to read.
+    dtype : :class:`~numpy.dtype`
+        The data model of the (`columns` of the) target files.
+    columns : :class:`list`, optional
+        Only read in these target columns.
+    downsample : :class:`int`, optional, defaults to `None`
+        If not `None`, downsample each file by this integer value, as
+        for :func:`read_target_files()`.
+    verbose : :class:`bool`, optional, defaults to ``False``
+        Passed to :func:`read_target_files()`.
+    numthreads : :class:`int`, optional, defaults to 8
+        The maximum number of files to read at once. Use 0 to read the
+        files serially.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        The targets in `infiles`, in the order of `infiles`.
+    :class:`dict`
+        The header of the last file in `infiles`.
+
+    Notes
+    -----
+        - The output array is allocated from the number of rows in each
+          file (recorded in the HEALPixel index of the directory by the
+          writers, see :func:`check_hp_target_dir()`) and each file is
+          read directly into its slice, avoiding a concatenation.
+        - fitsio releases the GIL while reading, so threads read files
+          concurrently. At most `numthreads` files are read at once.
+    """
+    def _map(func, sequence):
+        """Map over threads, or serially if numthreads is 0"""
+        if numthreads == 0:
+            return [func(item) for item in sequence]
+        with ThreadPoolExecutor(max_workers=numthreads) as executor:
+            return list(executor.map(func, sequence))
+
+    # ADM the number of rows in each file, from the HEALPixel index of
+    # ADM the directory or, if a file isn't indexed, from its header.
+    ntargs = _hp_file_nrows(infiles)
+    unknown = [i for i, ntarg in enumerate(ntargs) if ntarg is None]
+    for i, ntarg in zip(unknown, _map(
+            lambda i: fitsio.read_header(infiles[i], 1)["NAXIS2"], unknown)):
+        ntargs[i] = ntarg
+
+    # ADM the rows to read in each file. Choose the rows here, in
+    # ADM order, as the numpy random state isn't shared by threads.
+    rows = [None for infile in infiles]
+    nrows = ntargs
+    if downsample is not None:
+        rows = [np.random.RandomState(616).choice(
+            ntarg, ntarg//downsample, replace=False) for ntarg in ntargs]
+        nrows = [len(row) for row in rows]
+    stops = np.cumsum(nrows)
+    starts = stops - nrows
+
+    targets = np.zeros(np.sum(nrows, dtype=int), dtype=dtype)
+
+    def _read_into(i):
+        """Read the ith file into its slice of the output array"""
+        if nrows[i] == 0:
+            return i, fitsio.read_header(infiles[i], 1)
+        targs, hdr = read_target_files(
+            infiles[i], columns=columns, rows=rows[i], header=True,
+            verbose=verbose)
+        if len(targs) != nrows[i]:
+            msg = "{} has {} rows, but {} rows in its header!".format(
+                infiles[i], len(targs), nrows[i])
+            log.critical(msg)
+            raise IOError(msg)
+        targets[starts[i]:stops[i]] = targs
+        return i, hdr
+
+    # ADM read the largest files first, so no file is left to the end.
+    order = sorted(range(len(infiles)), key=lambda i: -nrows[i])
+    hdrs = dict(_map(_read_into, order))
+
+    return targets, hdrs[len(infiles)-1]
+
+
 def read_keyword_from_mtl_header(hpdirname, keyword):
     """Read in a header value from a Merget Target List ledger file.
 
@@ -2458,8 +3328,17 @@ def read_keyword_from_mtl_header(hpdirname, keyword):
                 gen = iglob(os.path.join(hpdirname, '*ecsv'))
                 hpdirname = next(gen)
             except StopIteration:
-                msg = "no FITS or ECSV files in {}...?!".format(hpdirname)
-                log.info(msg)
+                try:
+                    gen = iglob(os.path.join(hpdirname, '*bin'))
+                    hpdirname = next(gen)
+                except StopIteration:
+                    msg = "no FITS, ECSV or BIN files in {}...?!".format(
+                        hpdirname)
+                    log.info(msg)
+
+    # ADM binary ledgers have a JSON header that is quick to read.
+    if ".bin" in hpdirname:
+        return read_mtl_ledger_header(hpdirname)[keyword]
 
     # ADM this (rapidly) reads a single keyword from an ecsv file.
     with open(hpdirname) as f:
@@ -2469,6 +3348,38 @@ def read_keyword_from_mtl_header(hpdirname, keyword):
         return line.split(": ")[-1].split("}")[0]
 
 
+def find_mtl_ledger_format(hpdirname):
+    """Determine the file format of MTL ledgers in a directory.
+
+    Parameters
+    ----------
+    hpdirname : :class:`str`
+        Full path to either a directory containing MTLs that have been
+        partitioned by HEALPixel (i.e. as made by
+        :func:`desitarget.mtl.make_ledger_in_hp`). Or the name of a
+        single MTL ledger.
+
+    Returns
+    -------
+    :class:`str`
+        The file format of the ledger(s), "ecsv", "fits" or "bin". If
+        `hpdirname` is a directory that contains no ledgers, then
+        the default from :func:`desitarget.mtl.get_mtl_ledger_format`.
+    """
+    if not os.path.isdir(hpdirname):
+        return os.path.splitext(hpdirname)[-1][1:]
+
+    for ender in "ecsv", "fits", "bin":
+        try:
+            next(iglob(os.path.join(hpdirname, '*.{}'.format(ender))))
+            return ender
+        except StopIteration:
+            pass
+
+    from desitarget.mtl import get_mtl_ledger_format
+    return get_mtl_ledger_format()
+
+
 def find_mtl_file_format_from_header(hpdirname, returnoc=False):
     """Construct an MTL filename just from the header in the file
 
@@ -2494,14 +3405,13 @@ def find_mtl_file_format_from_header(hpdirname, returnoc=False):
 
     Notes
     -----
-        - Should work for both .ecsv and .fits files.
+        - Should work for .ecsv, .fits and .bin files.
     """
     # ADM grab information from the target directory.
     dr = read_keyword_from_mtl_header(hpdirname, "DR")
     surv = read_keyword_from_mtl_header(hpdirname, "SURVEY")
     oc = read_keyword_from_mtl_header(hpdirname, "OBSCON")
-    from desitarget.mtl import get_mtl_ledger_format
-    ender = get_mtl_ledger_format()
+    ender = find_mtl_ledger_format(hpdirname)
 
     # ADM construct the full directory path.
     hugefn = find_target_files(hpdirname, flavor="mtl", hp="{}", dr=dr,
@@ -2574,7 +3484,8 @@ def read_mtl_in_hp(hpdirname, nside, pixlist, unique=True, returnfn=False):
 
         # ADM if no mtls, look up the data model, return an empty array.
         if len(mtls) == 0:
-            fns = iglob(os.path.join(hpdirname, '*.{}'.format(ender)))
+            ender = os.path.splitext(fileform)[-1]
+            fns = iglob(os.path.join(hpdirname, '*{}'.format(ender)))
             fn = next(fns)
             mtl = read_mtl_ledger(fn)
             outly = np.zeros(0, dtype=mtl.dtype)
@@ -2598,7 +3509,7 @@ def read_mtl_in_hp(hpdirname, nside, pixlist, unique=True, returnfn=False):
 
 def read_targets_in_hp(hpdirname, nside, pixlist, columns=None, header=False,
                        quick=False, downsample=None, verbose=False,
-                       mtl=False, unique=True):
+                       mtl=False, unique=True, numthreads=8):
     """Read in targets in a set of HEALPixels.
 
     Parameters
@@ -2635,6 +3546,9 @@ def read_targets_in_hp(hpdirname, nside, pixlist, columns=None, header=False,
     unique : :class:`bool`, optional, defaults to ``True``
         If ``True`` then only read targets with unique `TARGETID` from
         MTL ledgers. Only used if `mtl` is ``True``.
+    numthreads : :class:`int`, optional, defaults to 8
+        The maximum number of files to read at once (in threads) if
+        `hpdirname` is a directory. Use 0 to read files serially.
 
     Returns
     -------
@@ -2694,22 +3608,19 @@ def read_targets_in_hp(hpdirname, nside, pixlist, columns=None, header=False,
         filepixlist = filepixlist[isindict]
 
         # ADM make sure each file is only read once.
-        infiles = set([filedict[pix] for pix in filepixlist])
+        infiles = sorted(set([filedict[pix] for pix in filepixlist]))
 
-        # ADM read in the files and concatenate the resulting targets.
-        targets = []
-        for infile in infiles:
-            targs, hdr = read_target_files(
-                infile, columns=columnscopy, header=True,
-                downsample=downsample, verbose=verbose)
-            targets.append(targs)
-        # ADM if targets is empty, return no targets.
-        if len(targets) == 0:
+        # ADM if there are no files, return no targets.
+        if len(infiles) == 0:
             if header:
                 return notargs, nohdr
             else:
                 return notargs
-        targets = np.concatenate(targets)
+
+        # ADM read the files into a single array of targets.
+        targets, hdr = _read_target_files_into(
+            infiles, notargs.dtype, columns=columnscopy,
+            downsample=downsample, verbose=verbose, numthreads=numthreads)
     # ADM ...otherwise just read in the targets.
     else:
         targets, hdr = read_target_files(
@@ -0,0 +1,263 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""
+===================
+desitarget.mpitools
+===================
+
+Utilities to run the target selection pipelines across MPI ranks.
+
+Each rank processes its own set of HEALPixels and writes its own output
+file(s). The functions in this module are passed an MPI communicator
+(e.g. ``mpi4py.MPI.COMM_WORLD``), so mpi4py is only needed by the code
+that creates the communicator.
+"""
+import os
+import sys
+import numpy as np
+import fitsio
+import healpy as hp
+
+from desiutil import depend
+
+from desitarget.geomask import split_pixels, sweep_files_touch_hp
+
+# ADM set up the DESI default logger.
+from desiutil.log import get_logger
+log = get_logger()
+
+
+def abort_on_error(comm):
+    """Abort all MPI ranks if any rank raises an uncaught exception.
+
+    Parameters
+    ----------
+    comm : :class:`mpi4py.MPI.Comm`
+        MPI communicator.
+
+    Returns
+    -------
+    Nothing, but replaces :func:`sys.excepthook` so that a failure on
+    one rank does not leave the other ranks waiting forever.
+    """
+    excepthook = sys.excepthook
+
+    def _abort(*args):
+        excepthook(*args)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        comm.Abort(1)
+
+    sys.excepthook = _abort
+
+
+def sweep_pixnum(nside, infiles, pixlist=None):
+    """HEALPixels touched by sweep files, once per file that touches them.
+
+    Parameters
+    ----------
+    nside : :class:`int`
+        (NESTED) HEALPixel nside.
+    infiles : :class:`list` or `str`
+        A list of input (sweep filenames) OR a single filename.
+    pixlist : :class:`list` or `int`, optional, defaults to ``None``
+        Only return these HEALPixels at `nside`. Defaults to all of the
+        HEALPixels touched by `infiles`.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        HEALPixels touched by `infiles`, in the format of the `pixnum`
+        input to :func:`~desitarget.geomask.split_pixels`.
+    """
+    if pixlist is None:
+        pixlist = np.arange(hp.nside2npix(nside))
+    _, pixlist, pixnum = sweep_files_touch_hp(nside, pixlist, infiles)
+
+    return pixnum[np.isin(pixnum, pixlist)]
+
+
+def brick_pixnum(nside, drdirs, pixlist=None):
+    """HEALPixels containing brick centers, once per brick in each survey.
+
+    Parameters
+    ----------
+    nside : :class:`int`
+        (NESTED) HEALPixel nside.
+    drdirs : :class:`list` or `str`
+        Legacy Surveys Data Release directories, as for
+        :func:`~desitarget.skyfibers.get_brick_info`.
+    pixlist : :class:`list` or `int`, optional, defaults to ``None``
+        Only return these HEALPixels at `nside`. Defaults to all of the
+        HEALPixels containing a brick center.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        HEALPixels of the bricks in `drdirs`, in the format of the
+        `pixnum` input to :func:`~desitarget.geomask.split_pixels`.
+    """
+    from desitarget.skyfibers import get_brick_info
+    brickdict = get_brick_info(drdirs, counts=True)
+    bra, bdec, _, _, _, _, cnts = np.vstack(list(brickdict.values())).T
+    theta, phi = np.radians(90-bdec), np.radians(bra)
+    pixnum = hp.ang2pix(nside, theta, phi, nest=True)
+    # ADM pixnum only contains unique bricks, need to add duplicates.
+    pixnum = np.repeat(pixnum, cnts.astype(int))
+
+    if pixlist is not None:
+        pixnum = pixnum[np.isin(pixnum, pixlist)]
+
+    return pixnum
+
+
+def split_pixels_across_ranks(comm, pixnum):
+    """Split HEALPixels across MPI ranks, balancing the work per rank.
+
+    Parameters
+    ----------
+    comm : :class:`mpi4py.MPI.Comm`
+        MPI communicator.
+    pixnum : :class:`~numpy.ndarray`
+        HEALPixels to process, once per file or brick that touches them
+        (e.g. from :func:`sweep_pixnum` or :func:`brick_pixnum`). Only
+        used on rank 0.
+
+    Returns
+    -------
+    :class:`list`
+        The HEALPixels for this rank to process. May be empty.
+    """
+    rank, size = comm.Get_rank(), comm.Get_size()
+
+    if rank == 0:
+        groups = split_pixels(pixnum, size)
+        for i, group in enumerate(groups):
+            log.info("Rank {} processes {} HEALPixels touched {} times: {}"
+                     .format(i, len(group), np.sum(np.isin(pixnum, group)),
+                             group))
+        groups = [[int(pix) for pix in group] for group in groups]
+    else:
+        groups = None
+
+    groups = comm.bcast(groups, root=0)
+
+    return groups[rank]
+
+
+def gather_outputs(comm, outfiles, infiles=None, summaryfile=None):
+    """Aggregate output headers and input checksums on MPI rank 0.
+
+    Parameters
+    ----------
+    comm : :class:`mpi4py.MPI.Comm`
+        MPI communicator.
+    outfiles : :class:`list`
+        The output files written by this rank. Files that don't exist
+        (writers skip empty outputs) are ignored.
+    infiles : :class:`~numpy.ndarray`, optional, defaults to ``None``
+        Checksums of the input files read by this rank, in the format
+        returned by :func:`~desitarget.io.get_checksums()`.
+    summaryfile : :class:`str`, optional, defaults to ``None``
+        If passed, rank 0 writes a summary of the run to this file. The
+        "OUTFILES" extension lists each output file (FILENAME) and its
+        number of rows (NROWS), and its header records the dependency
+        versions shared by all ranks. If there are input checksums, a
+        second "INFILES" extension holds them.
+
+    Returns
+    -------
+    :class:`dict`
+        On rank 0, a dictionary with keys "OUTFILES" (the output files
+        written by all ranks), "NROWS" (the total number of rows in the
+        output files) and "INFILES" (the checksums of all input files in
+        the format of :func:`~desitarget.io.get_checksums()`, or ``None``
+        if no checksums were passed). ``None`` on other ranks.
+
+    Notes
+    -----
+        - An IOError is raised on rank 0 if an input file has a different
+          checksum on different ranks (it changed during the run), or if
+          output files record different versions of a dependency in their
+          DEPNAM/DEPVER header cards (the ranks ran in different software
+          environments).
+    """
+    # ADM the number of rows and the dependencies for each output file.
+    outputs = []
+    for outfile in outfiles:
+        if not os.path.exists(outfile):
+            continue
+        hdr = fitsio.read_header(outfile, 1)
+        deps = {hdr[k]: hdr[k.replace("DEPNAM", "DEPVER")]
+                for k in hdr.keys() if k.startswith("DEPNAM")}
+        outputs.append((outfile, hdr["NAXIS2"], deps))
+
+    allout = comm.gather((outputs, infiles), root=0)
+    if comm.Get_rank() != 0:
+        return None
+
+    # ADM check that all ranks agree on the dependency versions.
+    outfiles, filerows, shadict, depdict = [], [], {}, {}
+    for outputs, infiles in allout:
+        for outfile, nrow, deps in outputs:
+            for dep in deps:
+                if depdict.setdefault(dep, (deps[dep], outfile))[0] != deps[dep]:
+                    msg = "{} is version {} in {} but {} in {}".format(
+                        dep, depdict[dep][0], depdict[dep][1], deps[dep],
+                        outfile)
+                    log.critical(msg)
+                    raise IOError(msg)
+            outfiles.append(outfile)
+            filerows.append(nrow)
+        # ADM check that all ranks agree on the input checksums.
+        if infiles is not None:
+            for fn, sha in zip(infiles["FILENAME"], infiles["SHA256"]):
+                if shadict.setdefault(fn, sha) != sha:
+                    msg = "Checksum for {} changed during the run!".format(fn)
+                    log.critical(msg)
+                    raise IOError(msg)
+
+    shatab = None
+    if len(shadict) > 0:
+        fns = sorted(shadict)
+        fntype = "U{}".format(np.max([len(fn) for fn in fns]))
+        shatype = "U{}".format(np.max([len(shadict[fn]) for fn in fns]))
+        shatab = np.zeros(len(fns), dtype=[('FILENAME', fntype),
+                                           ('SHA256', shatype)])
+        shatab['FILENAME'] = fns
+        shatab['SHA256'] = [shadict[fn] for fn in fns]
+
+    nrows = int(np.sum(filerows))
+    log.info("{} ranks wrote {} rows to {} files".format(
+        comm.Get_size(), nrows, len(outfiles)))
+
+    if summaryfile is not None:
+        _write_summary(summaryfile, outfiles, filerows, depdict, shatab,
+                       comm.Get_size())
+
+    return {"OUTFILES": outfiles, "NROWS": nrows, "INFILES": shatab}
+
+
+def _write_summary(summaryfile, outfiles, filerows, depdict, shatab, nranks):
+    """Write the summary file for :func:`gather_outputs`."""
+    fntype = "U{}".format(max([len(fn) for fn in outfiles] + [1]))
+    outtab = np.zeros(len(outfiles), dtype=[('FILENAME', fntype),
+                                            ('NROWS', '>i8')])
+    outtab['FILENAME'] = outfiles
+    outtab['NROWS'] = filerows
+
+    hdr = fitsio.FITSHDR()
+    hdr["NRANKS"] = nranks
+    hdr["NROWS"] = int(np.sum(filerows))
+    for dep in sorted(depdict):
+        depend.setdep(hdr, dep, depdict[dep][0])
+
+    # ADM write atomically so a partial summary never appears.
+    os.makedirs(os.path.dirname(os.path.abspath(summaryfile)), exist_ok=True)
+    tmpfile = summaryfile + '.tmp'
+    fitsio.write(tmpfile, outtab, extname='OUTFILES', header=hdr,
+                 clobber=True)
+    if shatab is not None:
+        fitsio.write(tmpfile, shatab, extname='INFILES')
+    os.rename(tmpfile, summaryfile)
+    log.info("Wrote summary of the MPI run to {}".format(summaryfile))
@@ -10,6 +10,7 @@ import numpy as np
 import healpy as hp
 import numpy.lib.recfunctions as rfn
 import sys
+from glob import glob
 from astropy.table import Table
 from astropy.io import ascii
 import fitsio
@@ -87,7 +88,8 @@ def get_mtl_ledger_format():
     Returns
     -------
     :class:`str`
-        The file format for MTL ledgers. Should be "ecsv" or "fits".
+        The file format for MTL ledgers. Should be "ecsv", "fits" or
+        "bin" (see :func:`desitarget.io.write_binary_ledger`).
     """
     # ff = "fits"
     ff = "ecsv"
@@ -297,8 +299,8 @@ def make_mtl(targets, obscon, zcat=None, scnd=None,
     return mtl
 
 
-def make_ledger_in_hp(targets, outdirname, nside, pixlist,
-                      obscon="DARK", indirname=None, verbose=True):
+def make_ledger_in_hp(targets, outdirname, nside, pixlist, obscon="DARK",
+                      indirname=None, verbose=True, ledgerform=None):
     """
     Make an initial MTL ledger file for targets in a set of HEALPixels.
 
@@ -323,6 +325,9 @@ def make_ledger_in_hp(targets, outdirname, nside, pixlist,
         of the output MTL files.
     verbose : :class:`bool`, optional, defaults to ``True``
         If ``True`` then log target and file information.
+    ledgerform : :class:`str`, optional
+        The file format for the ledgers, "ecsv", "fits" or "bin".
+        Defaults to :func:`get_mtl_ledger_format()`.
 
     Returns
     -------
@@ -331,6 +336,9 @@ def make_ledger_in_hp(targets, outdirname, nside, pixlist,
     """
     t0 = time()
 
+    if ledgerform is None:
+        ledgerform = get_mtl_ledger_format()
+
     # ADM in case an integer was passed.
     pixlist = np.atleast_1d(pixlist)
 
@@ -345,9 +353,9 @@ def make_ledger_in_hp(targets, outdirname, nside, pixlist,
     _, _, survey = main_cmx_or_sv(mtl)
     for pix in pixlist:
         inpix = mtlpix == pix
-        ecsv = get_mtl_ledger_format() == "ecsv"
         nt, fn = io.write_mtl(
-            outdirname, mtl[inpix].as_array(), indir=indirname, ecsv=ecsv,
+            outdirname, mtl[inpix].as_array(), indir=indirname,
+            ecsv=ledgerform == "ecsv", binary=ledgerform == "bin",
             survey=survey, obscon=obscon, nsidefile=nside, hpxlist=pix)
         if verbose:
             log.info('{} targets written to {}...t={:.1f}s'.format(
@@ -356,7 +364,8 @@ def make_ledger_in_hp(targets, outdirname, nside, pixlist,
     return
 
 
-def make_ledger(hpdirname, outdirname, obscon="DARK", numproc=1):
+def make_ledger(hpdirname, outdirname, obscon="DARK", numproc=1,
+                ledgerform=None):
     """
     Make initial MTL ledger files for all HEALPixels.
 
@@ -377,6 +386,9 @@ def make_ledger(hpdirname, outdirname, obscon="DARK", numproc=1):
         governs the sub-directory to which the ledger is written.
     numproc : :class:`int`, optional, defaults to 1 for serial
         Number of processes to parallelize across.
+    ledgerform : :class:`str`, optional
+        The file format for the ledgers, "ecsv", "fits" or "bin".
+        Defaults to :func:`get_mtl_ledger_format()`.
 
     Returns
     -------
@@ -431,8 +443,8 @@ def make_ledger(hpdirname, outdirname, obscon="DARK", numproc=1):
         pixlist = nside2nside(nside, mtlnside, pixnum)
         # ADM write MTLs for the targs split over HEALPixels in pixlist.
         return make_ledger_in_hp(
-            targs, outdirname, mtlnside, pixlist,
-            obscon=obscon, indirname=hpdirname, verbose=False)
+            targs, outdirname, mtlnside, pixlist, obscon=obscon,
+            indirname=hpdirname, verbose=False, ledgerform=ledgerform)
 
     # ADM this is just to count pixels in _update_status.
     npix = np.ones((), dtype='i8')
@@ -461,7 +473,8 @@ def make_ledger(hpdirname, outdirname, obscon="DARK", numproc=1):
     return
 
 
-def update_ledger(hpdirname, targets, zcat, obscon="DARK"):
+def update_ledger(hpdirname, targets, zcat, obscon="DARK", numproc=1,
+                  dryrun=False):
     """
     Update relevant HEALPixel-split ledger files for some targets.
 
@@ -482,10 +495,19 @@ def update_ledger(hpdirname, targets, zcat, obscon="DARK"):
         file (i.e. in `desitarget.targetmask.obsconditions`), e.g. "GRAY"
         Governs how priorities are set using "obsconditions". Basically a
         check on whether the files in `hpdirname` are as expected.
+    numproc : :class:`int`, optional, defaults to 1 for serial
+        Number of processes to parallelize across. Each process updates
+        a different set of HEALPixel-split ledger files.
+    dryrun : :class:`bool`, optional, defaults to ``False``
+        If ``True``, don't update any ledger files, just report which
+        files would be updated, and by how many rows.
 
     Returns
     -------
-    Nothing, but relevant ledger files are updated.
+    :class:`dict`
+        The ledger files that were (or, for `dryrun`, would be) updated,
+        with the number of rows added to each file as the values. The
+        relevant ledger files are also updated unless `dryrun` is passed.
     """
 # ADM in theory, here, fiberassign wouldn't need to carry much around at
 # ADM all. We could, instead, simply read the relevant MTL pixel-ledgers
@@ -495,6 +517,7 @@ def update_ledger(hpdirname, targets, zcat, obscon="DARK"):
 #    mtltargs, fndict = io.read_mtl_in_hp(hpdirname, nside, pixnum,
 #                                         unique=True, returnfn=True)
     # ADM then match between mtltargs and targets on TARGETID, etc.
+    t0 = time()
 
     # ADM find the general format for the ledger files in `hpdirname`.
     # ADM also returning the obsconditions.
@@ -514,26 +537,43 @@ def update_ledger(hpdirname, targets, zcat, obscon="DARK"):
     theta, phi = np.radians(90-mtl["DEC"]), np.radians(mtl["RA"])
     pixnum = hp.ang2pix(nside, theta, phi, nest=True)
 
-    # ADM loop through the pixels and update the ledger, depending
-    # ADM on whether we're working with .fits or .ecsv files.
-    ender = get_mtl_ledger_format()
-    for pix in set(pixnum):
-        # ADM grab the targets in the pixel.
-        ii = pixnum == pix
-        mtlpix = mtl[ii]
-
-        # ADM sorting on TARGETID is important for
-        # ADM io.read_mtl_ledger(unique=True)
-        mtlpix = mtlpix[np.argsort(mtlpix["TARGETID"])]
-
-        # ADM the correct filename for this pixel number.
-        fn = fileform.format(pix)
+    # ADM sort on HEALPixel, and on TARGETID within each HEALPixel,
+    # ADM so each pixel is a contiguous slice of the MTL. Sorting on
+    # ADM TARGETID is important for io.read_mtl_ledger(unique=True).
+    ii = np.lexsort([mtl["TARGETID"], pixnum])
+    mtl, pixnum = mtl[ii], pixnum[ii]
+    pixels, starts, counts = np.unique(
+        pixnum, return_index=True, return_counts=True)
+    fns = [fileform.format(pix) for pix in pixels]
+    nadded = dict(zip(fns, counts.tolist()))
+
+    if dryrun:
+        for fn in fns:
+            log.info("Would add {} rows to {}".format(nadded[fn], fn))
+        log.info("Dry run: would add {} rows to {} ledger files".format(
+            len(mtl), len(fns)))
+        return nadded
+
+    # ADM the function that is actually parallelized across. Each
+    # ADM pixel is a separate file, so processes never share a file.
+    ender = io.find_mtl_ledger_format(hpdirname)
+
+    def _update_ledger_in_hp(i):
+        """update the ledger in a single HEALPixel"""
+        # ADM the targets in the pixel, and the corresponding filename.
+        mtlpix = mtl[starts[i]:starts[i]+counts[i]]
+        fn = fns[i]
 
         # ADM if we're working with .ecsv, simply append to the ledger.
         if ender == 'ecsv':
             f = open(fn, "a")
             ascii.write(mtlpix, f, format='no_header', formats=mtlformatdict)
             f.close()
+        # ADM for binary ledgers, append the fixed-width records, then
+        # ADM update the index of the latest entry for each target.
+        elif ender == 'bin':
+            io.append_binary_ledger(fn, mtlpix.as_array())
+            io.read_mtl_ledger_index(fn, update=True)
         # ADM otherwise, for FITS, we'll have to read in the whole file.
         else:
             ledger, hd = fitsio.read(fn, extname="MTL", header=True)
@@ -541,7 +581,74 @@ def update_ledger(hpdirname, targets, zcat, obscon="DARK"):
             fitsio.write(fn+'.tmp', done, extname='MTL', header=hd, clobber=True)
             os.rename(fn+'.tmp', fn)
 
-    return
+        return
+
+    # ADM Parallel process across HEALPixels.
+    if numproc > 1:
+        pool = sharedmem.MapReduce(np=numproc)
+        with pool:
+            pool.map(_update_ledger_in_hp, np.arange(len(fns)))
+    else:
+        for i in range(len(fns)):
+            _update_ledger_in_hp(i)
+
+    log.info("Added {} rows to {} ledger files...t={:.1f}s".format(
+        len(mtl), len(fns), time()-t0))
+
+    return nadded
+
+
+def convert_ledger(hpdirname, outdirname, ledgerform="bin", numproc=1):
+    """
+    Convert a HEALPixel-split ledger to a different file format.
+
+    Parameters
+    ----------
+    hpdirname : :class:`str`
+        Full path to a directory containing an MTL ledger that has been
+        partitioned by HEALPixel (i.e. as made by `make_ledger`).
+    outdirname : :class:`str`
+        Output directory to which to write the converted ledger files.
+        Should not be `hpdirname`, as a directory should only contain
+        ledger files of one format.
+    ledgerform : :class:`str`, optional, defaults to "bin"
+        The format to convert to, one of "ecsv", "fits" or "bin".
+    numproc : :class:`int`, optional, defaults to 1 for serial
+        Number of processes to parallelize across.
+
+    Returns
+    -------
+    :class:`list`
+        The names of the converted files.
+    """
+    t0 = time()
+    if os.path.abspath(hpdirname) == os.path.abspath(outdirname):
+        msg = "Can't convert ledgers in {} in place".format(hpdirname)
+        log.critical(msg)
+        raise ValueError(msg)
+    os.makedirs(outdirname, exist_ok=True)
+
+    ender = io.find_mtl_ledger_format(hpdirname)
+    fns = sorted(glob(os.path.join(hpdirname, '*.{}'.format(ender))))
+    log.info("Converting {} .{} ledgers to .{}...t={:.1f}s".format(
+        len(fns), ender, ledgerform, time()-t0))
+
+    def _convert_ledger(fn):
+        """convert a single ledger file"""
+        return io.convert_mtl_ledger(fn, outdirname=outdirname,
+                                     ledgerform=ledgerform)
+
+    # ADM Parallel process across ledger files.
+    if numproc > 1:
+        pool = sharedmem.MapReduce(np=numproc)
+        with pool:
+            outfns = pool.map(_convert_ledger, fns)
+    else:
+        outfns = [_convert_ledger(fn) for fn in fns]
+
+    log.info("Done converting ledgers...t={:.1f}s".format(time()-t0))
+
+    return outfns
 
 
 def inflate_ledger(mtl, hpdirname, columns=None, header=False, strictcols=False):
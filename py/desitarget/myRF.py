@@ -4,10 +4,189 @@ desitarget.myRF
 
 This module computes the Random Forest probability
 and it stores the RF with our own persistency.
+
+Forests are packed once per process into contiguous node arrays (see
+:class:`PackedForest`) and are evaluated iteratively, level-by-level,
+for all trees and all rows at once.
 """
+import os
 import numpy as np
 import sys
 
+# ADM cache of (raw forest, packed forest) keyed on (filename, version,
+# ADM number of trees), so each forest is only read and packed once per
+# ADM process rather than once per sweep file.
+_forest_cache = {}
+
+# ADM the maximum number of (tree, row) pairs to traverse at once. This
+# ADM bounds the memory used for the traversal arrays (~50 MB).
+_max_pairs = 2**22
+
+
+class PackedForest(object):
+    """All of the trees in a forest, packed into contiguous node arrays.
+
+    Parameters
+    ----------
+    forest : :class:`~numpy.ndarray`
+        A forest as stored in the `rf_model_dr*.npz` files (i.e. the
+        `arr_0` entry), for either `version` 1 or 2 of the persistency.
+    numberOfTrees : :class:`int`
+        The number of trees in the forest.
+    version : :class:`int`, optional, defaults to 2
+        The version of the persistency used to write `forest`.
+
+    Notes
+    -----
+    - Node `i` of tree `t` is stored at `roots[t] + i` in the `feature`,
+      `threshold` and `value` arrays. The left and right children of
+      node `j` are stored at `children[2*j]` and `children[2*j+1]`, as
+      global indexes (i.e. offset by `roots[t]`). A child that is a leaf
+      is stored as `-(index+1)` so that traversal stops on reaching it.
+    - `value` is the per-leaf probability, computed exactly as in
+      :meth:`myRF.searchNodes`.
+    """
+    def __init__(self, forest, numberOfTrees, version=2):
+        if version == 1:
+            trees = [forest[iTree*2] for iTree in range(numberOfTrees)]
+            answers = [forest[iTree*2+1] for iTree in range(numberOfTrees)]
+        elif version == 2:
+            trees = [forest[iTree] for iTree in range(numberOfTrees)]
+        else:
+            print("unsupported version=", version)
+            sys.exit()
+
+        nnodes = np.array([len(tree) for tree in trees], dtype=np.int64)
+        self.nTrees = numberOfTrees
+        self.roots = np.concatenate([[0], np.cumsum(nnodes)[:-1]]).astype(np.int32)
+        offsets = np.repeat(self.roots, nnodes)
+
+        left = np.concatenate([tree[tree.dtype.names[0]] for tree in trees])
+        right = np.concatenate([tree[tree.dtype.names[1]] for tree in trees])
+        isleaf = left == -1
+        self.feature = np.concatenate(
+            [tree[tree.dtype.names[2]] for tree in trees]).astype(np.int32)
+        # ADM retain the on-disk precision of the thresholds so that the
+        # ADM comparisons are identical to those in searchNodes.
+        self.threshold = np.concatenate(
+            [tree[tree.dtype.names[3]] for tree in trees])
+
+        # ADM convert the per-tree child indexes to global indexes, and
+        # ADM flag children that are leaves as negative numbers.
+        left = np.where(isleaf, 0, left).astype(np.int32) + offsets
+        right = np.where(isleaf, 0, right).astype(np.int32) + offsets
+        left = np.where(isleaf[left], -left-1, left)
+        right = np.where(isleaf[right], -right-1, right)
+        self.children = np.empty(2*len(offsets), dtype=np.int32)
+        self.children[0::2] = left
+        self.children[1::2] = right
+        # ADM a tree whose root is a leaf (trivially) needs no traversal.
+        self.rootIsLeaf = isleaf[self.roots]
+
+        if version == 1:
+            value = np.zeros(len(offsets))
+            for iTree, answer in enumerate(answers):
+                leaves = np.flatnonzero(trees[iTree][trees[iTree].dtype.names[0]] == -1)
+                value[self.roots[iTree] + leaves] = \
+                    answer[leaves, 0, 1]*1./(answer[leaves, 0, 0]+answer[leaves, 0, 1])
+            self.value = value
+        else:
+            self.value = np.concatenate(
+                [tree[tree.dtype.names[4]] for tree in trees]).astype(np.float64)
+
+    def apply(self, data):
+        """The leaf reached in every tree for every row of `data`.
+
+        Parameters
+        ----------
+        data : :class:`~numpy.ndarray`
+            Array of shape (nrows, nfeatures) of features to classify.
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            Array of shape (nTrees, nrows) of global leaf indexes.
+        """
+        nrows, nfeatures = data.shape
+        flatData = np.ascontiguousarray(data).ravel()
+
+        leaves = np.repeat(self.roots, nrows)
+        # ADM only (tree, row) pairs that haven't reached a leaf are
+        # ADM tracked: node index, offset of the row in flatData and
+        # ADM position in the output array.
+        notLeaf = np.repeat(~self.rootIsLeaf, nrows)
+        pos = np.flatnonzero(notLeaf).astype(np.int32)
+        nodeIds = leaves[pos]
+        rowOffsets = (pos % nrows)*nfeatures
+
+        # ADM descend one level at a time for all trees and rows.
+        while nodeIds.size > 0:
+            goLeft = flatData[rowOffsets + self.feature[nodeIds]] <= self.threshold[nodeIds]
+            nodeIds = self.children[2*nodeIds + ~goLeft]
+            atLeaf = nodeIds < 0
+            leaves[pos[atLeaf]] = -nodeIds[atLeaf]-1
+            notLeaf = ~atLeaf
+            nodeIds, rowOffsets, pos = nodeIds[notLeaf], rowOffsets[notLeaf], pos[notLeaf]
+
+        return leaves.reshape(self.nTrees, nrows)
+
+    def predict_proba(self, data):
+        """The forest response (mean tree response) for each row of `data`.
+
+        Parameters
+        ----------
+        data : :class:`~numpy.ndarray`
+            Array of shape (nrows, nfeatures) of features to classify.
+
+        Returns
+        -------
+        :class:`~numpy.ndarray`
+            The forest probability for each row of `data`. Bit-identical
+            to the recursive :meth:`myRF.predict_proba_recursive`.
+        """
+        nrows = len(data)
+        bdtOutput = np.zeros(nrows)
+        # ADM process rows in batches to bound the memory footprint.
+        step = max(1, _max_pairs // max(1, self.nTrees))
+        for start in range(0, nrows, step):
+            leaves = self.apply(data[start:start+step])
+            out = bdtOutput[start:start+step]
+            # ADM sum in tree order to retain bit-identical results.
+            for iTree in range(self.nTrees):
+                out += self.value[leaves[iTree]]
+
+        bdtOutput /= self.nTrees
+        return bdtOutput
+
+
+def load_forest(forestFileName, numberOfTrees, version=2):
+    """Read and pack a forest, caching the result for this process.
+
+    Parameters
+    ----------
+    forestFileName : :class:`str`
+        Full path to a `rf_model_dr*.npz` forest file.
+    numberOfTrees : :class:`int`
+        The number of trees in the forest.
+    version : :class:`int`, optional, defaults to 2
+        The version of the persistency used to write the forest.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        The forest as stored in `forestFileName`.
+    :class:`~desitarget.myRF.PackedForest`
+        The packed version of the forest.
+    """
+    key = (os.path.abspath(forestFileName), version, numberOfTrees)
+    if key not in _forest_cache:
+        t = np.load(forestFileName, encoding='bytes', allow_pickle=True)
+        forest = t['arr_0']
+        _forest_cache[key] = forest, PackedForest(forest, numberOfTrees,
+                                                  version=version)
+
+    return _forest_cache[key]
+
 
 class myRF(object):
     """ Class for I/O operations and probability calculation for Random Forest
@@ -20,6 +199,7 @@ class myRF(object):
         self.modelDir = modelDir
         self.version = version
         self.nTrees = numberOfTrees
+        self.packedForest = None
         if self.version in [1, 2]:
             # print ("version is :",self.version)
             self.filesPerTree = 4  # for models-decals-dr3, (was 5 for models-decals)
@@ -77,6 +257,14 @@ class myRF(object):
         return
 
     def predict_proba(self):
+        # calculate the forest response using the packed version of the forest
+        if self.packedForest is None:
+            self.packedForest = PackedForest(self.forest, self.nTrees,
+                                             version=self.version)
+        self.bdtOutput = self.packedForest.predict_proba(self.data)
+        return self.bdtOutput
+
+    def predict_proba_recursive(self):
         # calculate the forest response using the average response of the trees in the forest
 
         for iTree in np.arange(self.nTrees):
@@ -89,9 +277,9 @@ class myRF(object):
         return self.bdtOutput
 
     def loadForest(self, forestFileName):
-        # loads forest
-        t = np.load(forestFileName, encoding='bytes')
-        self.forest = t['arr_0']
+        # loads forest (read and packed once per process)
+        self.forest, self.packedForest = load_forest(
+            forestFileName, self.nTrees, version=self.version)
         return
 
     def loadTreeFromForest(self, iTree):
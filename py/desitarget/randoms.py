@@ -8,21 +8,24 @@ desitarget.imagefootprint
 Monte Carlo Legacy Surveys imaging at the pixel level to model the imaging footprint
 """
 import os
+import shutil
+import tempfile
 import numpy as np
 import astropy.io.fits as fits
-from astropy.wcs import WCS
 from time import time
 import healpy as hp
 import fitsio
-import photutils
 from glob import glob, iglob
 
 from desitarget.gaiamatch import get_gaia_dir
 from desitarget.geomask import bundle_bricks, box_area
 from desitarget.geomask import get_imaging_maskbits, get_default_maskbits
 from desitarget.targets import resolve, main_cmx_or_sv, finalize
-from desitarget.skyfibers import get_brick_info
+from desitarget.skyfibers import get_brick_info, make_skies_for_a_brick
+from desitarget.skyfibers import _concatenate_skies
 from desitarget.io import read_targets_in_box, target_columns_from_header
+from desitarget.io import HEALPixSpool
+from desitarget.brickimages import BrickImages, aperture_photometry
 from desitarget.targetmask import desi_mask as dMx
 
 # ADM the parallelization script.
@@ -151,8 +154,151 @@ def add_default_mtl(randoms, seed):
     return randoms
 
 
+def downsample_randoms(randoms, density, maxdensity):
+    """Downsample a random catalog that has a `RANK` column.
+
+    Parameters
+    ----------
+    randoms : :class:`~numpy.ndarray`
+        A random catalog with a `RANK` column, as made by, e.g.,
+        :func:`select_randoms()` with `rank`=``True``.
+    density : :class:`float`
+        The density (per sq. deg.) of the desired random catalog.
+    maxdensity : :class:`float`
+        The density at which `randoms` was made (e.g. the "DENSITY"
+        keyword in the header of a random catalog).
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        The randoms with a `RANK` < `density`/`maxdensity`, which are a
+        random catalog at `density`.
+    """
+    if density > maxdensity:
+        msg = "can't downsample randoms made at density {} to density {}!!!" \
+            .format(maxdensity, density)
+        log.critical(msg)
+        raise ValueError(msg)
+
+    return randoms[randoms["RANK"] < density/maxdensity]
+
+
+def split_randoms_by_rank(infiles, outfiles, ranges, addmtl=False,
+                          chunksize=1000000):
+    """Stream random catalogs into files that each cover a range of RANK.
+
+    Parameters
+    ----------
+    infiles : :class:`list`
+        Random catalogs, made at the same density by, e.g.,
+        :func:`select_randoms()` with `rank`=``True``. Typically, the
+        (disjoint) HEALPixel-split files that cover a Data Release.
+    outfiles : :class:`list`
+        Names of the output files, one per entry in `ranges`.
+    ranges : :class:`list`
+        (minimum, maximum) pairs. The randoms with minimum <= `RANK` <
+        maximum are written to the corresponding entry in `outfiles`.
+        Must satisfy 0 <= minimum < maximum <= 1.
+    addmtl : :class:`bool`, optional, defaults to ``False``
+        If ``True`` then add the columns needed for MTL to the outputs,
+        see :func:`finalize_randoms()` and :func:`add_default_mtl()`.
+    chunksize : :class:`int`, optional, defaults to 1,000,000
+        The maximum number of rows to read from an input file at once.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        The number of randoms written to each of `outfiles`.
+
+    Notes
+    -----
+        - Only about `chunksize` rows are held in memory at once.
+        - For the output file covering ranks in (minimum, maximum), the
+          "DENSITY" in the header is that of `infiles` x (maximum -
+          minimum). "FILEHPX" combines the "FILEHPX" of `infiles`, as
+          for `bin/gather_targets`.
+        - Rows are written in the order of `infiles`, so use `RANK` (not
+          the row order) to further downsample an output file.
+    """
+    if len(outfiles) != len(ranges):
+        msg = "pass one output file for each rank range!"
+        log.critical(msg)
+        raise ValueError(msg)
+    # ADM ranks are in [0, 1), so wider ranges would overstate DENSITY.
+    for rankmin, rankmax in ranges:
+        if not 0 <= rankmin < rankmax <= 1:
+            msg = "rank range ({}, {}) isn't within [0, 1]!!!".format(
+                rankmin, rankmax)
+            log.critical(msg)
+            raise ValueError(msg)
+
+    # ADM check the inputs and combine their HEALPixel coverage.
+    hdr = fitsio.read_header(infiles[0], "RANDOMS")
+    density, seed = hdr["DENSITY"], hdr["SEED"]
+    hpx = []
+    for fn in infiles:
+        with fitsio.FITS(fn) as fx:
+            fnhdr = fx["RANDOMS"].read_header()
+            colnames = fx["RANDOMS"].get_colnames()
+        if "RANK" not in colnames or fnhdr["DENSITY"] != density:
+            msg = "{} has no RANK column or a DENSITY that isn't {}".format(
+                fn, density)
+            log.critical(msg)
+            raise ValueError(msg)
+        if "FILEHPX" in fnhdr:
+            hpx.append(str(fnhdr["FILEHPX"]))
+    if len(hpx) > 0:
+        hdr["FILEHPX"] = ",".join(hpx)
+    if addmtl:
+        hdr["MTLSPLIT"] = True
+
+    # ADM open each output file, writing to a temporary file first.
+    outs, hdrs = [], []
+    for outfile, (rankmin, rankmax) in zip(outfiles, ranges):
+        outhdr = fitsio.FITSHDR(hdr.records())
+        outhdr["DENSITY"] = int(round(density*(rankmax-rankmin)))
+        outhdr["RANKMIN"], outhdr["RANKMAX"] = rankmin, rankmax
+        hdrs.append(outhdr)
+        outs.append(fitsio.FITS(outfile+".tmp", "rw", clobber=True))
+
+    # ADM one stream of SUBPRIORITY per output, as if it was made at once.
+    rngs = [np.random.RandomState(616+seed) for outfile in outfiles]
+    nrands = np.zeros(len(outfiles), dtype='int64')
+    isnew = np.ones(len(outfiles), dtype='?')
+    for fn in infiles:
+        log.info("Splitting {} by rank...t = {:.1f}s".format(fn, time()-start))
+        with fitsio.FITS(fn) as fx:
+            nrows = fx["RANDOMS"].get_nrows()
+            # ADM read at least once, to set up the outputs.
+            for begin in range(0, max(nrows, 1), chunksize):
+                rands = fx["RANDOMS"][begin:begin+chunksize]
+                for i, (rankmin, rankmax) in enumerate(ranges):
+                    ii = (rands["RANK"] >= rankmin) & (rands["RANK"] < rankmax)
+                    outrands = rands[ii]
+                    if addmtl:
+                        outrands = add_default_mtl(
+                            finalize_randoms(outrands), seed=seed)
+                        outrands["SUBPRIORITY"] = rngs[i].random_sample(
+                            len(outrands))
+                    # ADM write the header with the first rows...
+                    if isnew[i]:
+                        outs[i].write(outrands, extname='RANDOMS',
+                                      header=hdrs[i])
+                        isnew[i] = False
+                    # ADM ...and then append.
+                    elif len(outrands) > 0:
+                        outs[i][-1].append(outrands)
+                    nrands[i] += len(outrands)
+
+    for outfile, out in zip(outfiles, outs):
+        out.close()
+        os.rename(outfile+".tmp", outfile)
+
+    return nrands
+
+
 def randoms_in_a_brick_from_edges(ramin, ramax, decmin, decmax, density=100000,
-                                  poisson=True, wrap=True, seed=1):
+                                  poisson=True, wrap=True, seed=1, rank=False):
     """For brick edges, return random (RA/Dec) positions in the brick.
 
     Parameters
@@ -179,12 +325,21 @@ def randoms_in_a_brick_from_edges(ramin, ramax, decmin, decmax, density=100000,
         Random seed to use when shuffling across brick boundaries.
         The actual np.random.seed defaults to:
             seed*int(1e7)+int(4*ramin)*1000+int(4*(decmin+90))
+    rank : :class:`bool`, optional, defaults to ``False``
+        If ``True``, also return a uniform random "rank" in [0, 1) for
+        each point. Drawn after the positions, so the positions are the
+        same whether or not `rank` is ``True``.
+
     Returns
     -------
     :class:`~numpy.array`
         Right Ascensions of random points in brick (degrees).
     :class:`~numpy.array`
         Declinations of random points in brick (degrees).
+    :class:`~numpy.array`
+        The rank of each random point (only returned if `rank` is
+        ``True``). The points with a rank < f are a random catalog at
+        f x `density`, see :func:`~desitarget.randoms.downsample_randoms`.
     """
     # ADM create a unique random seed on the basis of the brick.
     # ADM note this is only unique for bricksize=0.25 for bricks
@@ -222,6 +377,10 @@ def randoms_in_a_brick_from_edges(ramin, ramax, decmin, decmax, density=100000,
 #    log.info('Generated {} randoms in brick with bounds [{:.3f},{:.3f},{:.3f},{:.3f}]...t = {:.1f}s'
 #                 .format(nrand,ramin,ramax,decmin,decmax,time()-start))
 
+    if rank:
+        ranks = np.random.uniform(0., 1., nrand)
+        return ras, decs, ranks
+
     return ras, decs
 
 
@@ -320,7 +479,7 @@ def pre_or_post_dr8(drdir):
 
 
 def dr8_quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
-                                           aprad=0.75):
+                                           aprad=0.75, images=None):
     """Wrap `quantities_at_positions_in_a_brick` for DR8 and beyond.
 
     Notes
@@ -338,7 +497,7 @@ def dr8_quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
     qall = []
     for dd in drdirs:
         q = quantities_at_positions_in_a_brick(ras, decs, brickname, dd,
-                                               aprad=aprad)
+                                               aprad=aprad, images=images)
         # ADM don't count bricks where we never read a file header.
         if q is not None:
             qall.append(q)
@@ -356,7 +515,7 @@ def dr8_quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
 
 
 def quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
-                                       aprad=0.75, justlist=False):
+                                       aprad=0.75, justlist=False, images=None):
     """Observational quantities (per-band) at positions in a Legacy Surveys brick.
 
     Parameters
@@ -379,6 +538,11 @@ def quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
         If ``True``, return a MAXIMAL list of all POSSIBLE files needed
         to run for `brickname` and `drdir`. Overrides other inputs, but
         ra/dec still have to be passed as *something* (e.g., [1], [1]).
+    images : :class:`~desitarget.brickimages.BrickImages`, optional
+        Cache of the images of `brickname`. Pass the same object for
+        other look-ups in `brickname` (e.g. to make skies) to only
+        read each image once. Defaults to a new cache that doesn't
+        keep whole images.
 
     Returns
     -------
@@ -414,6 +578,11 @@ def quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
     # ADM the output dictionary.
     qdict = {}
 
+    # ADM only read the pixels we need from each image, once.
+    # ADM a private cache doesn't keep whole images, to bound memory.
+    if images is None:
+        images = BrickImages(keep=False)
+
     # as a speed up, we assume all images in different filters for the brick have the same WCS
     # -> if we have read it once (iswcs=True), we use this info
     iswcs = False
@@ -438,12 +607,11 @@ def quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
                 # ADM only process the WCS if there's a file for this filter.
                 # ADM also skip calculating aperture fluxes if aprad ~ 0.
                 if os.path.exists(fn) and not (qout == 'apflux' and aprad < 1e-8):
-                    img = fits.open(fn)[extn_nb]
                     if not iswcs:
                         # ADM store the instrument name, if it isn't stored.
-                        instrum = img.header["INSTRUME"].lower().strip()
-                        w = WCS(img.header)
-                        x, y = w.all_world2pix(ras, decs, 0)
+                        hdr = images.header(fn, extn_nb)
+                        instrum = hdr["INSTRUME"].lower().strip()
+                        x, y = images.world2pix(fn, ras, decs, extn_nb)
                         iswcs = True
                     # ADM get the quantity of interest at each location and
                     # ADM store in a dictionary with the filter and quantity.
@@ -451,25 +619,20 @@ def quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
                         # ADM special treatment to photometer sky.
                         # ADM Read in the ivar image.
                         fnivar = fileform.format(brickname, 'invvar', filt, extn)
-                        ivar = fits.open(fnivar)[extn_nb].data
-                        with np.errstate(divide='ignore', invalid='ignore'):
-                            # ADM ivars->errors, guard against 1/0.
-                            imsigma = 1./np.sqrt(ivar)
-                            imsigma[ivar == 0] = 0
+                        ivar = images.image(fnivar, extn_nb)
                         # ADM aperture photometry at requested radius (aprad).
-                        apxy = np.vstack((x, y)).T
-                        aper = photutils.CircularAperture(apxy, aprad)
-                        p = photutils.aperture_photometry(img.data, aper, error=imsigma)
+                        flux, err = aperture_photometry(
+                            images.image(fn, extn_nb), x, y, aprad, ivar=ivar)
                         # ADM store the results.
-                        qdict[qout+'_'+filt] = np.array(p.field('aperture_sum'))
-                        err = p.field('aperture_sum_err')
+                        qdict[qout+'_'+filt] = flux
                         with np.errstate(divide='ignore', invalid='ignore'):
                             # ADM errors->ivars, guard against 1/0.
                             ivar = 1./err**2.
                             ivar[err == 0] = 0.
                         qdict[qout+'_ivar_'+filt] = np.array(ivar)
                     else:
-                        qdict[qout+'_'+filt] = img.data[y.astype("int"), x.astype("int")]
+                        qdict[qout+'_'+filt] = images.values(
+                            fn, x.astype("int"), y.astype("int"), extn_nb)
                 # ADM if the file doesn't exist, set quantities to zero.
                 else:
                     if qout == 'apflux':
@@ -488,16 +651,16 @@ def quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
     else:
         for mextn, mout, mform in mnames:
             if os.path.exists(fn):
-                img = fits.open(fn)[mextn]
                 # ADM use the WCS for the per-filter quantities if it exists.
                 if not iswcs:
                     # ADM store the instrument name, if it isn't yet stored.
-                    instrum = img.header["INSTRUME"].lower().strip()
-                    w = WCS(img.header)
-                    x, y = w.all_world2pix(ras, decs, 0)
+                    hdr = images.header(fn, mextn)
+                    instrum = hdr["INSTRUME"].lower().strip()
+                    x, y = images.world2pix(fn, ras, decs, mextn)
                     iswcs = True
                 # ADM add the maskbits to the dictionary.
-                qdict[mout] = img.data[y.astype("int"), x.astype("int")]
+                qdict[mout] = images.values(
+                    fn, x.astype("int"), y.astype("int"), mextn)
             else:
                 # ADM if no files are found, populate with zeros.
                 qdict[mout] = np.zeros(npts, dtype=mform)
@@ -534,14 +697,13 @@ def quantities_at_positions_in_a_brick(ras, decs, brickname, drdir,
             else:
                 # ADM only process the WCS if there's a file for this band.
                 if os.path.exists(fn):
-                    img = fits.open(fn)[extn_nb]
                     # ADM calculate the WCS if it wasn't, already.
                     if not iswcs:
-                        w = WCS(img.header)
-                        x, y = w.all_world2pix(ras, decs, 0)
+                        x, y = images.world2pix(fn, ras, decs, extn_nb)
                         iswcs = True
                     # ADM get the inverse variance at each location.
-                    ivar = img.data[y.astype("int"), x.astype("int")]
+                    ivar = images.values(
+                        fn, x.astype("int"), y.astype("int"), extn_nb)
                     # ADM convert to WISE depth in AB. From Dustin Lang on the
                     # decam-chatter mailing list on 06/20/19, 1:59PM MST:
                     # psfdepth_Wx_AB = invvar_Wx * norm_Wx**2 / fluxfactor_Wx**2
@@ -677,7 +839,8 @@ def get_dust(ras, decs, scaling=1, dustdir=None):
 
 def get_quantities_in_a_brick(ramin, ramax, decmin, decmax, brickname,
                               density=100000, dustdir=None, aprad=0.75,
-                              zeros=False, drdir=None, seed=1):
+                              zeros=False, drdir=None, seed=1, images=None,
+                              rank=False):
     """NOBS, DEPTHS etc. (per-band) for random points in a brick of the Legacy Surveys
 
     Parameters
@@ -714,6 +877,12 @@ def get_quantities_in_a_brick(ramin, ramax, decmin, decmax, brickname,
         Only necessary to pass if zeros is ``False``.
     seed : :class:`int`, optional, defaults to 1
         See :func:`~desitarget.randoms.randoms_in_a_brick_from_edges`.
+    images : :class:`~desitarget.brickimages.BrickImages`, optional
+        Cache of the images of `brickname`, see
+        :func:`~desitarget.randoms.quantities_at_positions_in_a_brick`.
+    rank : :class:`bool`, optional, defaults to ``False``
+        If ``True``, add a `RANK` column, see
+        :func:`~desitarget.randoms.randoms_in_a_brick_from_edges`.
 
     Returns
     -------
@@ -742,6 +911,7 @@ def get_quantities_in_a_brick(ramin, ramax, decmin, decmax, brickname,
             EBV: E(B-V) at this location from the SFD dust maps.
             PHOTSYS: resolved north/south ('N' for an MzLS/BASS location,
               'S' for a DECaLS location).
+            RANK: uniform random number in [0, 1) (only if `rank`).
     """
     # ADM only intended to work on one brick, so die for larger arrays.
     if not isinstance(brickname, str):
@@ -749,15 +919,21 @@ def get_quantities_in_a_brick(ramin, ramax, decmin, decmax, brickname,
         raise ValueError
 
     # ADM generate random points in the brick at the requested density.
-    ras, decs = randoms_in_a_brick_from_edges(ramin, ramax, decmin, decmax,
-                                              density=density, wrap=False,
-                                              seed=seed)
+    ranks = None
+    if rank:
+        ras, decs, ranks = randoms_in_a_brick_from_edges(
+            ramin, ramax, decmin, decmax, density=density, wrap=False,
+            seed=seed, rank=True)
+    else:
+        ras, decs = randoms_in_a_brick_from_edges(
+            ramin, ramax, decmin, decmax, density=density, wrap=False,
+            seed=seed)
 
     # ADM only look up pixel-level quantities if zeros was not sent.
     if not zeros:
         # ADM retrieve the dictionary of quantities at each location.
-        qdict = dr8_quantities_at_positions_in_a_brick(ras, decs, brickname,
-                                                       drdir, aprad=aprad)
+        qdict = dr8_quantities_at_positions_in_a_brick(
+            ras, decs, brickname, drdir, aprad=aprad, images=images)
 
         # ADM catch where a coadd directory is completely missing.
         if len(qdict) > 0:
@@ -766,29 +942,28 @@ def get_quantities_in_a_brick(ramin, ramax, decmin, decmax, brickname,
             if len(qdict['photsys']) == 2*len(ras):
                 ras = np.concatenate([ras, ras])
                 decs = np.concatenate([decs, decs])
+                if rank:
+                    ranks = np.concatenate([ranks, ranks])
 
         # ADM the structured array to output.
-        qinfo = np.zeros(
-            len(ras),
-            dtype=[('RELEASE', '>i2'), ('BRICKID', '>i4'), ('BRICKNAME', 'S8'),
-                   ('OBJID', '>i4'), ('RA', '>f8'), ('DEC', 'f8'),
-                   ('NOBS_G', 'i2'), ('NOBS_R', 'i2'), ('NOBS_Z', 'i2'),
-                   ('PSFDEPTH_G', 'f4'), ('PSFDEPTH_R', 'f4'), ('PSFDEPTH_Z', 'f4'),
-                   ('GALDEPTH_G', 'f4'), ('GALDEPTH_R', 'f4'), ('GALDEPTH_Z', 'f4'),
-                   ('PSFDEPTH_W1', 'f4'), ('PSFDEPTH_W2', 'f4'),
-                   ('PSFSIZE_G', 'f4'), ('PSFSIZE_R', 'f4'), ('PSFSIZE_Z', 'f4'),
-                   ('APFLUX_G', 'f4'), ('APFLUX_R', 'f4'), ('APFLUX_Z', 'f4'),
-                   ('APFLUX_IVAR_G', 'f4'), ('APFLUX_IVAR_R', 'f4'), ('APFLUX_IVAR_Z', 'f4'),
-                   ('MASKBITS', 'i2'), ('WISEMASK_W1', '|u1'), ('WISEMASK_W2', '|u1'),
-                   ('EBV', 'f4'), ('PHOTSYS', '|S1')]
-        )
+        dt = [('RELEASE', '>i2'), ('BRICKID', '>i4'), ('BRICKNAME', 'S8'),
+              ('OBJID', '>i4'), ('RA', '>f8'), ('DEC', 'f8'),
+              ('NOBS_G', 'i2'), ('NOBS_R', 'i2'), ('NOBS_Z', 'i2'),
+              ('PSFDEPTH_G', 'f4'), ('PSFDEPTH_R', 'f4'), ('PSFDEPTH_Z', 'f4'),
+              ('GALDEPTH_G', 'f4'), ('GALDEPTH_R', 'f4'), ('GALDEPTH_Z', 'f4'),
+              ('PSFDEPTH_W1', 'f4'), ('PSFDEPTH_W2', 'f4'),
+              ('PSFSIZE_G', 'f4'), ('PSFSIZE_R', 'f4'), ('PSFSIZE_Z', 'f4'),
+              ('APFLUX_G', 'f4'), ('APFLUX_R', 'f4'), ('APFLUX_Z', 'f4'),
+              ('APFLUX_IVAR_G', 'f4'), ('APFLUX_IVAR_R', 'f4'), ('APFLUX_IVAR_Z', 'f4'),
+              ('MASKBITS', 'i2'), ('WISEMASK_W1', '|u1'), ('WISEMASK_W2', '|u1'),
+              ('EBV', 'f4'), ('PHOTSYS', '|S1')]
     else:
-        qinfo = np.zeros(
-            len(ras),
-            dtype=[('BRICKID', '>i4'), ('BRICKNAME', 'S8'), ('RA', 'f8'), ('DEC', 'f8'),
-                   ('NOBS_G', 'i2'), ('NOBS_R', 'i2'), ('NOBS_Z', 'i2'),
-                   ('EBV', 'f4')]
-        )
+        dt = [('BRICKID', '>i4'), ('BRICKNAME', 'S8'), ('RA', 'f8'), ('DEC', 'f8'),
+              ('NOBS_G', 'i2'), ('NOBS_R', 'i2'), ('NOBS_Z', 'i2'),
+              ('EBV', 'f4')]
+    if rank:
+        dt.append(('RANK', '>f8'))
+    qinfo = np.zeros(len(ras), dtype=dt)
 
     # ADM retrieve the E(B-V) values for each random point.
     ebv = get_dust(ras, decs, dustdir=dustdir)
@@ -811,20 +986,78 @@ def get_quantities_in_a_brick(ramin, ramax, decmin, decmax, brickname,
     # ADM add the dust values.
     qinfo["EBV"] = ebv
 
+    if rank:
+        qinfo["RANK"] = ranks
+
     return qinfo
 
 
+def randoms_and_skies_in_a_brick(ramin, ramax, decmin, decmax, brickname,
+                                 survey, density=100000, dustdir=None,
+                                 aprad=0.75, drdir=None, seed=1, rank=False,
+                                 nskiespersqdeg=None, bands=['g', 'r', 'z'],
+                                 apertures_arcsec=[0.75], images=None):
+    """Randoms and skies for one brick, reading each of its images once.
+
+    Parameters
+    ----------
+    ramin, ramax, decmin, decmax, brickname, density, dustdir, aprad, drdir, seed, rank
+        See :func:`~desitarget.randoms.get_quantities_in_a_brick`.
+    survey : :class:`object`
+        `LegacySurveyData` object for a given Data Release of the Legacy
+        Surveys, see :func:`~desitarget.skyfibers.make_skies_for_a_brick`.
+    nskiespersqdeg, bands, apertures_arcsec
+        See :func:`~desitarget.skyfibers.make_skies_for_a_brick`.
+    images : :class:`~desitarget.brickimages.BrickImages`, optional
+        Cache of the images of `brickname`. Defaults to a new cache that
+        is cleared before returning.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Randoms, as for :func:`~desitarget.randoms.get_quantities_in_a_brick`.
+    :class:`~numpy.ndarray`
+        Skies, as for :func:`~desitarget.skyfibers.make_skies_for_a_brick`
+        (``None`` if the brick has no blob map).
+
+    Notes
+    -----
+        - Skies read whole images, so they are made first. The randoms
+          then look up their pixels in the cached images.
+        - The cache holds all of the images of the brick until both
+          the randoms and the skies are made.
+    """
+    private = images is None
+    if private:
+        images = BrickImages()
+    try:
+        skies = make_skies_for_a_brick(
+            survey, brickname, nskiespersqdeg=nskiespersqdeg, bands=bands,
+            apertures_arcsec=apertures_arcsec, images=images)
+        randoms = get_quantities_in_a_brick(
+            ramin, ramax, decmin, decmax, brickname, density=density,
+            dustdir=dustdir, aprad=aprad, drdir=drdir, seed=seed,
+            images=images, rank=rank)
+    finally:
+        if private:
+            images.clear()
+
+    return randoms, skies
+
+
 def pixweight(randoms, density, nobsgrz=[0, 0, 0], nside=256,
-              outarea=True, maskbits=None):
+              outarea=True, maskbits=None, chunksize=1000000):
     """Fraction of area covered in HEALPixels by a random catalog.
 
     Parameters
     ----------
-    randoms : :class:`~numpy.ndarray` or `str`
+    randoms : :class:`~numpy.ndarray` or `str` or `list`
         A random catalog as made by, e.g., :func:`select_randoms()` or
         :func:`quantities_at_positions_in_a_brick()`, or a file that
         contains such a catalog. Must contain the columns RA, DEC,
-        NOBS_G, NOBS_R, NOBS_Z, MASKBITS.
+        NOBS_G, NOBS_R, NOBS_Z, MASKBITS. Can also be a list of files,
+        or a directory of files, of randoms, which are read `chunksize`
+        rows at a time (as in :func:`pixmap_randoms()`).
     density : :class:`int`
         The number of random points per sq. deg. At which the random
         catalog was generated (see also :func:`select_randoms()`).
@@ -844,6 +1077,8 @@ def pixweight(randoms, density, nobsgrz=[0, 0, 0], nside=256,
         If not ``None`` then restrict to only locations with these
         values of maskbits NOT set (bit inclusive, so for, e.g., 7,
         restrict to random points with none of 2**0, 2**1 or 2**2 set).
+    chunksize : :class:`int`, optional, defaults to 1,000,000
+        The maximum number of rows to read from a file at once.
 
     Returns
     -------
@@ -859,41 +1094,39 @@ def pixweight(randoms, density, nobsgrz=[0, 0, 0], nside=256,
           area with one or more observations.
         - The index of the returned array is the HEALPixel integer.
     """
-    # ADM if a file name was passed for the random catalog, read it in.
-    if isinstance(randoms, str):
-        randoms = fitsio.read(randoms)
-
-    # ADM extract the columns of interest
-    ras, decs = randoms["RA"], randoms["DEC"]
-    nobs_g = randoms["NOBS_G"]
-    nobs_r = randoms["NOBS_R"]
-    nobs_z = randoms["NOBS_Z"]
-
-    # ADM only retain points with one or more observations in all bands
-    # ADM and appropriate maskbits values.
-    ii = (nobs_g > nobsgrz[0])
-    ii &= (nobs_r > nobsgrz[1])
-    ii &= (nobs_z > nobsgrz[2])
-
-    # ADM also restrict to appropriate maskbits values, if passed.
-    if maskbits is not None:
-        mb = randoms["MASKBITS"]
-        ii &= (mb & maskbits) == 0
-
-    # ADM the counts in each HEALPixel in the survey.
-    if np.sum(ii) > 0:
-        pixnums = hp.ang2pix(nside, np.radians(90.-decs[ii]),
-                             np.radians(ras[ii]), nest=True)
-        pixnum, pixcnt = np.unique(pixnums, return_counts=True)
+    # ADM the counts in each HEALPixel in the survey, retaining zeros
+    # ADM for zero survey coverage. Only count points with more than
+    # ADM nobsgrz observations and, if passed, no maskbits set.
+    npix = hp.nside2npix(nside)
+    mbs = [] if maskbits is None else [maskbits]
+    if isinstance(randoms, np.ndarray):
+        pixnums = hp.ang2pix(nside, np.radians(90.-randoms["DEC"]),
+                             np.radians(randoms["RA"]), nest=True)
+        counts = _count_in_pixels(randoms, pixnums, npix, mbs, nobsgrz)
     else:
+        # ADM stream over files in chunks, rather than reading them in.
+        if isinstance(randoms, str):
+            if os.path.isdir(randoms):
+                randoms = sorted(glob(os.path.join(randoms, "*fits")))
+            else:
+                randoms = [randoms]
+        counts = np.zeros((1+len(mbs), npix), dtype='int64')
+        cols = ["RA", "DEC", "NOBS_G", "NOBS_R", "NOBS_Z", "MASKBITS"]
+        for fn in randoms:
+            with fitsio.FITS(fn) as fx:
+                nrows = fx[1].get_nrows()
+                for begin in range(0, nrows, chunksize):
+                    rands = fx[1][cols][begin:begin+chunksize]
+                    pixnums = hp.ang2pix(nside, np.radians(90.-rands["DEC"]),
+                                         np.radians(rands["RA"]), nest=True)
+                    counts += _count_in_pixels(rands, pixnums, npix, mbs,
+                                               nobsgrz)
+    pix_cnt = counts[-1]
+    if np.sum(pix_cnt) == 0:
         msg = "zero area based on randoms with passed constraints"
         log.error(msg)
         raise ValueError
 
-    # ADM whole-sky-counts to retain zeros for zero survey coverage.
-    npix = hp.nside2npix(nside)
-    pix_cnt = np.bincount(pixnum, weights=pixcnt, minlength=npix)
-
     # ADM expected area based on the HEALPixels at this nside.
     expected_cnt = hp.nside2pixarea(nside, degrees=True)*density
     # ADM weight map based on (actual counts)/(expected counts).
@@ -1049,16 +1282,288 @@ def get_targ_dens(targets, Mx, nside=256):
     return targdens
 
 
-def pixmap(randoms, targets, rand_density, nside=256, gaialoc=None):
+# ADM the columns of the randoms that pixmap() summarizes by their median.
+pixmapcols = ['EBV', 'PSFDEPTH_W1', 'PSFDEPTH_W2',
+              'PSFDEPTH_G', 'GALDEPTH_G', 'PSFSIZE_G',
+              'PSFDEPTH_R', 'GALDEPTH_R', 'PSFSIZE_R',
+              'PSFDEPTH_Z', 'GALDEPTH_Z', 'PSFSIZE_Z']
+
+
+def _pixmap_maskbits():
+    """The MASKBITS combinations for the FRACAREA_X columns of pixmap()."""
+    return [np.sum(2**np.array(get_imaging_maskbits(get_default_maskbits(bgs=bgs))))
+            for bgs in [False, True]]
+
+
+def _count_in_pixels(randoms, pixnums, npix, maskbits, nobsgrz=[0, 0, 0]):
+    """Count randoms with NOBS > `nobsgrz` in g, r and z in each HEALPixel.
+
+    Parameters
+    ----------
+    randoms : :class:`~numpy.ndarray`
+        Randoms with columns NOBS_G, NOBS_R, NOBS_Z, MASKBITS.
+    pixnums : :class:`~numpy.ndarray`
+        The HEALPixel of each random.
+    npix : :class:`int`
+        The number of HEALPixels in the sky.
+    maskbits : :class:`list`
+        Also count, separately, randoms with none of each of these
+        MASKBITS set (see `maskbits` in :func:`pixweight()`).
+    nobsgrz : :class:`list`, optional, defaults to [0,0,0]
+        See `nobsgrz` in :func:`pixweight()`.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Array of shape (1 + len(`maskbits`), `npix`) of the counts of
+        randoms in each HEALPixel, first for any `MASKBITS`, then for
+        each of `maskbits`.
+    """
+    ii = randoms["NOBS_G"] > nobsgrz[0]
+    ii &= randoms["NOBS_R"] > nobsgrz[1]
+    ii &= randoms["NOBS_Z"] > nobsgrz[2]
+    counts = [np.bincount(pixnums[ii], minlength=npix)]
+    for mb in maskbits:
+        jj = ii & ((randoms["MASKBITS"] & mb) == 0)
+        counts.append(np.bincount(pixnums[jj], minlength=npix))
+
+    return np.array(counts)
+
+
+def _median_in_pixels(pixnums, values):
+    """The median of values in each HEALPixel, as for :func:`np.median`.
+
+    Parameters
+    ----------
+    pixnums : :class:`~numpy.ndarray`
+        The HEALPixel of each value.
+    values : :class:`~numpy.ndarray`
+        The values.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        The (sorted) HEALPixels that contain values.
+    :class:`~numpy.ndarray`
+        The median of the values in each of those HEALPixels.
+    """
+    if len(values) == 0:
+        return np.zeros(0, dtype='int64'), np.zeros(0, dtype=values.dtype)
+
+    if values.dtype.kind == 'f' and values.dtype.itemsize == 4:
+        # ADM for 32-bit floats, sort on one 64-bit integer of pixel and
+        # ADM value, which is much faster than sorting on two keys. The
+        # ADM bits of the floats are flipped to sort in the same order.
+        values = values.astype('<f4')
+        values[np.isnan(values)] = np.nan
+        bits = values.view('<u4')
+        bits = np.where(bits >> 31, ~bits, bits | 0x80000000)
+        key = (pixnums.astype('u8') << 32) | bits
+        key.sort()
+        pixnums = (key >> 32).astype('int64')
+        bits = (key & 0xffffffff).astype('<u4')
+        values = np.where(bits >> 31, bits & 0x7fffffff, ~bits).view('<f4')
+    else:
+        # ADM sort on value within pixel. NaNs sort to the end of a pixel.
+        order = np.lexsort((values, pixnums))
+        pixnums, values = pixnums[order], values[order]
+
+    begins = np.append(0, np.flatnonzero(np.diff(pixnums)) + 1)
+    cnts = np.diff(np.append(begins, len(pixnums)))
+    # ADM the mean of the two middle values, as np.median does.
+    lo, hi = values[begins + (cnts-1)//2], values[begins + cnts//2]
+    medians = (lo + hi) / 2
+    # ADM and np.median is NaN for any NaNs.
+    medians[np.isnan(values[begins + cnts - 1])] = np.nan
+
+    return pixnums[begins], medians
+
+
+def _fracarea_from_counts(counts, rand_density, nside, maskbits):
+    """Convert counts of randoms to fractional areas, see pixweight()."""
+    if np.sum(counts[0]) == 0:
+        msg = "zero area based on randoms with passed constraints"
+        log.error(msg)
+        raise ValueError
+    pixarea = hp.nside2pixarea(nside, degrees=True)
+    fracarea = counts / (pixarea*rand_density)
+    for fa, mb in zip(fracarea, [None] + list(maskbits)):
+        log.info('Area of survey with NOBS > [0, 0, 0] in [g,r,z], maskbits of '
+                 '{} = {:.2f} sq. deg.'.format(mb, np.sum(fa)*pixarea))
+
+    return fracarea
+
+
+def pixmap_randoms(infiles, rand_density, nside=256, numproc=1, spooldir=None,
+                   spoolnside=8, chunksize=1000000):
+    """Areas and median systematics in HEALPixels, streaming over randoms.
+
+    Parameters
+    ----------
+    infiles : :class:`list` or `str`
+        Files of randoms as made by :func:`select_randoms()` (with the
+        columns listed for `randoms` in :func:`pixmap()`), or a single
+        such file. Typically, HEALPixel-split files that each fit in
+        memory. Any file may be larger than memory, as files are read
+        `chunksize` rows at a time.
+    rand_density : :class:`int`
+        Number of random points per sq. deg. at which the randoms were
+        generated (see also :func:`select_randoms()`).
+    nside : :class:`int`, optional, defaults to nside=256
+        Resolution (HEALPix nside) at which to build the (NESTED) map.
+    numproc : :class:`int`, optional, defaults to 1
+        The number of processes over which to parallelize.
+    spooldir : :class:`str`, optional
+        Directory in which to spool the randoms by HEALPixel, which
+        needs about as much space as the `pixmapcols` of the randoms.
+        Defaults to a temporary directory. Spool files are removed.
+    spoolnside : :class:`int`, optional, defaults to 8
+        (NESTED) HEALPixel nside at which to spool the randoms. Must be
+        <= `nside`. Memory use scales with the number of randoms in a
+        HEALPixel at `spoolnside`.
+    chunksize : :class:`int`, optional, defaults to 1,000,000
+        The maximum number of rows to read from a file at once.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        Array of shape (3, npix) of FRACAREA (as for :func:`pixweight()`)
+        and of FRACAREA for the MASKBITS of `FRACAREA_X` in
+        :func:`pixmap()`, in each pixel at `nside`.
+    :class:`dict`
+        The median of each of `pixmapcols` in each pixel at `nside`
+        (-1 for pixels that contain no randoms).
+
+    Notes
+    -----
+        - Runs in two passes. The first counts randoms in each pixel and
+          spools them by HEALPixel at `spoolnside`, in parallel across
+          `infiles`. The second finds the exact median in each pixel,
+          in parallel across spooled HEALPixels. Results are merged as
+          each file or HEALPixel finishes.
+        - The results are identical to those in :func:`pixmap()` for a
+          random catalog that is read into memory.
+    """
+    if isinstance(infiles, str):
+        infiles = [infiles]
+    if spoolnside > nside:
+        msg = "spoolnside ({}) must be <= nside ({})".format(spoolnside, nside)
+        log.critical(msg)
+        raise ValueError(msg)
+    npix = hp.nside2npix(nside)
+    mbcomb = _pixmap_maskbits()
+    # ADM nested pixels at nside become pixels at spoolnside by shifting.
+    shift = 2*int(np.log2(nside // spoolnside))
+
+    tmpdir = None
+    if spooldir is None:
+        tmpdir = tempfile.mkdtemp()
+        spooldir = tmpdir
+
+    def _spooldir(i):
+        """The spool directory for the ith input file"""
+        return os.path.join(spooldir, "randoms-{}".format(i))
+
+    def _count_and_spool(i):
+        """Count the randoms in the ith input file, and spool them"""
+        spool = HEALPixSpool(_spooldir(i), spoolnside)
+        counts = np.zeros((1+len(mbcomb), npix), dtype='int64')
+        cols = ["RA", "DEC", "NOBS_G", "NOBS_R", "NOBS_Z", "MASKBITS"]
+        with fitsio.FITS(infiles[i]) as fx:
+            nrows = fx["RANDOMS"].get_nrows()
+            for begin in range(0, nrows, chunksize):
+                rands = fx["RANDOMS"][cols + pixmapcols][begin:begin+chunksize]
+                pixnums = hp.ang2pix(nside, np.radians(90.-rands["DEC"]),
+                                     np.radians(rands["RA"]), nest=True)
+                counts += _count_in_pixels(rands, pixnums, npix, mbcomb)
+                # ADM only spool what's needed to find the medians.
+                spooled = np.zeros(len(rands), dtype=[('HPXPIXEL', '>i8')] +
+                                   [(col, rands[col].dtype.str) for col in pixmapcols])
+                spooled["HPXPIXEL"] = pixnums
+                for col in pixmapcols:
+                    spooled[col] = rands[col]
+                spool.append(spooled, pixnum=pixnums >> shift)
+        pixels = np.flatnonzero(counts.sum(axis=0))
+
+        return pixels, counts[:, pixels], np.array(spool.pixels(), dtype='int64')
+
+    def _medians(spoolpix):
+        """The medians for pixels in a HEALPixel at spoolnside"""
+        fns = [HEALPixSpool(_spooldir(i), spoolnside).filename(spoolpix)
+               for i in range(len(infiles))]
+        rands = np.concatenate([fitsio.read(fn) for fn in fns
+                                if os.path.exists(fn)])
+        medians = []
+        for col in pixmapcols:
+            pixels, med = _median_in_pixels(rands["HPXPIXEL"], rands[col])
+            medians.append(med)
+
+        return pixels, np.array(medians)
+
+    # ADM the merges, which happen on the main process.
+    counts = np.zeros((1+len(mbcomb), npix), dtype='int64')
+    spoolpixels = set()
+    medians = np.zeros((len(pixmapcols), npix), dtype='f4') - 1
+
+    def _merge_counts(pixels, pixcounts, pixspooled):
+        counts[:, pixels] += pixcounts
+        spoolpixels.update(pixspooled)
+        return len(pixels)
+
+    def _merge_medians(pixels, pixmedians):
+        medians[:, pixels] = pixmedians
+        return len(pixels)
+
+    try:
+        log.info('Counting and spooling randoms in {} files...t = {:.1f}s'
+                 .format(len(infiles), time()-start))
+        if numproc > 1:
+            pool = sharedmem.MapReduce(np=numproc)
+            with pool:
+                pool.map(_count_and_spool, range(len(infiles)),
+                         reduce=_merge_counts, shared=True,
+                         cost=lambda i: os.path.getsize(infiles[i]))
+        else:
+            for i in range(len(infiles)):
+                _merge_counts(*_count_and_spool(i))
+
+        spoolpixels = sorted(spoolpixels)
+        log.info('Finding medians in {} spooled HEALPixels...t = {:.1f}s'
+                 .format(len(spoolpixels), time()-start))
+        if numproc > 1:
+            pool = sharedmem.MapReduce(np=numproc)
+            with pool:
+                pool.map(_medians, spoolpixels, reduce=_merge_medians,
+                         shared=True)
+        else:
+            for spoolpix in spoolpixels:
+                _merge_medians(*_medians(spoolpix))
+    finally:
+        # ADM clean up the spool files.
+        for i in range(len(infiles)):
+            if os.path.exists(_spooldir(i)):
+                shutil.rmtree(_spooldir(i))
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir)
+
+    fracarea = _fracarea_from_counts(counts, rand_density, nside, mbcomb)
+
+    return fracarea, {col: med for col, med in zip(pixmapcols, medians)}
+
+
+def pixmap(randoms, targets, rand_density, nside=256, gaialoc=None,
+           numproc=1, spooldir=None):
     """HEALPix map of useful quantities for a Legacy Surveys Data Release
 
     Parameters
     ----------
-    randoms : :class:`~numpy.ndarray` or `str`
+    randoms : :class:`~numpy.ndarray` or `str` or `list`
         Catalog or file of randoms as made by :func:`select_randoms()` or
         :func:`quantities_at_positions_in_a_brick()`. Must contain the
         columns 'RA', 'DEC', 'EBV', 'PSFDEPTH_W1/W2/G/R/Z', 'NOBS_G/R/Z'
-        'GALDEPTH_G/R/Z', 'PSFSIZE_G/R/Z', 'MASKBITS'.
+        'GALDEPTH_G/R/Z', 'PSFSIZE_G/R/Z', 'MASKBITS'. Can also be a
+        list of files, or a directory of files, of randoms. Files are
+        processed in bounded memory with :func:`pixmap_randoms()`.
     targets : :class:`~numpy.ndarray` or `str`
         Corresponding (i.e. same Data Release) catalog or file of targets
         as made by, e.g., :func:`desitarget.cuts.select_targets()`, or
@@ -1074,6 +1579,11 @@ def pixmap(randoms, targets, rand_density, nside=256, gaialoc=None):
         Name of a FITS file that already contains a column "STARDENS",
         which is simply read in. If ``None``, the stellar density is
         constructed from files in $GAIA_DIR.
+    numproc : :class:`int`, optional, defaults to 1
+        The number of processes over which to parallelize when `randoms`
+        are files, see :func:`pixmap_randoms()`.
+    spooldir : :class:`str`, optional
+        See :func:`pixmap_randoms()`.
 
     Returns
     -------
@@ -1108,11 +1618,6 @@ def pixmap(randoms, targets, rand_density, nside=256, gaialoc=None):
     -----
         - If `gaialoc` is ``None`` then $GAIA_DIR must be set.
     """
-    # ADM if a file name was passed for the random catalog, read it in
-    if isinstance(randoms, str):
-        log.info('Reading in random catalog...t = {:.1f}s'.format(time()-start))
-        randoms = fitsio.read(randoms)
-
     # ADM if a file name was passed for the targets catalog, read it in
     if isinstance(targets, str):
         log.info('Reading in target catalog...t = {:.1f}s'.format(time()-start))
@@ -1125,26 +1630,28 @@ def pixmap(randoms, targets, rand_density, nside=256, gaialoc=None):
     # ADM change target column names, and retrieve associated survey information.
     _, Mx, survey, targets = main_cmx_or_sv(targets, rename=True)
 
-    # ADM determine the areal coverage of the randoms at this nside.
-    log.info('Determining footprint...t = {:.1f}s'.format(time()-start))
-    pw = pixweight(randoms, rand_density, nside=nside)
-    npix = len(pw)
-
-    # ADM areal coverage for some combinations of MASKBITS.
-    mbcomb = []
-    mbstore = []
-    for mb in [get_imaging_maskbits(get_default_maskbits()),
-               get_imaging_maskbits(get_default_maskbits(bgs=True))]:
-        bitint = np.sum(2**np.array(mb))
-        mbcomb.append(bitint)
-        log.info('Determining footprint for maskbits not in {}...t = {:.1f}s'
-                 .format(bitint, time()-start))
-        mbstore.append(pixweight(randoms, rand_density,
-                                 nside=nside, maskbits=bitint))
-
-    log.info('Determining footprint...t = {:.1f}s'.format(time()-start))
-    pw = pixweight(randoms, rand_density, nside=nside)
-    npix = len(pw)
+    # ADM the areal coverage of the randoms at this nside, including for
+    # ADM some combinations of MASKBITS, and the median systematics.
+    mbcomb = _pixmap_maskbits()
+    npix = hp.nside2npix(nside)
+    if isinstance(randoms, np.ndarray):
+        log.info('Determining footprint and medians of systematics...t = {:.1f}s'
+                 .format(time()-start))
+        pixnums = hp.ang2pix(nside, np.radians(90.-randoms["DEC"]),
+                             np.radians(randoms["RA"]), nest=True)
+        counts = _count_in_pixels(randoms, pixnums, npix, mbcomb)
+        fracarea = _fracarea_from_counts(counts, rand_density, nside, mbcomb)
+        medians = {}
+        for col in pixmapcols:
+            pixels, med = _median_in_pixels(pixnums, randoms[col])
+            medians[col] = np.zeros(npix, dtype='f4') - 1
+            medians[col][pixels] = med
+    else:
+        if isinstance(randoms, str) and os.path.isdir(randoms):
+            randoms = sorted(glob(os.path.join(randoms, "*fits")))
+        fracarea, medians = pixmap_randoms(randoms, rand_density, nside=nside,
+                                           numproc=numproc, spooldir=spooldir)
+    log.info('Determined footprint and medians...t = {:.1f}s'.format(time()-start))
 
     # ADM get the target densities.
     log.info('Calculating target densities...t = {:.1f}s'.format(time()-start))
@@ -1166,9 +1673,9 @@ def pixmap(randoms, targets, rand_density, nside=256, gaialoc=None):
 
     # ADM add the areal coverage, pixel information and target densities.
     hpxinfo['HPXPIXEL'] = np.arange(npix)
-    hpxinfo['FRACAREA'] = pw
-    for bitint, fracarea in zip(mbcomb, mbstore):
-        hpxinfo['FRACAREA_{}'.format(bitint)] = fracarea
+    hpxinfo['FRACAREA'] = fracarea[0]
+    for bitint, fa in zip(mbcomb, fracarea[1:]):
+        hpxinfo['FRACAREA_{}'.format(bitint)] = fa
     for col in targdens.dtype.names:
         hpxinfo[col] = targdens[col]
 
@@ -1185,36 +1692,8 @@ def pixmap(randoms, targets, rand_density, nside=256, gaialoc=None):
     hpxinfo["STARDENS"] = sd
 
     # ADM add the median values of all of the other systematics.
-    log.info('Calculating medians of systematics from random catalog...t = {:.1f}s'
-             .format(time()-start))
-    ras, decs = randoms["RA"], randoms["DEC"]
-    pixnums = hp.ang2pix(nside, np.radians(90.-decs), np.radians(ras), nest=True)
-
-    # ADM some sorting to order the values to extract the medians.
-    pixorder = np.argsort(pixnums)
-    pixels, pixcnts = np.unique(pixnums, return_counts=True)
-    pixcnts = np.insert(pixcnts, 0, 0)
-    pixcnts = np.cumsum(pixcnts)
-    log.info('Done sorting...t = {:.1f}s'.format(time()-start))
-    # ADM work through the ordered pixels to populate the median for
-    # ADM each quantity of interest.
-    cols = ['EBV', 'PSFDEPTH_W1', 'PSFDEPTH_W2',
-            'PSFDEPTH_G', 'GALDEPTH_G', 'PSFSIZE_G',
-            'PSFDEPTH_R', 'GALDEPTH_R', 'PSFSIZE_R',
-            'PSFDEPTH_Z', 'GALDEPTH_Z', 'PSFSIZE_Z']
-    t0 = time()
-    npix = len(pixcnts)
-    stepper = npix//50
-    for i in range(npix-1):
-        inds = pixorder[pixcnts[i]:pixcnts[i+1]]
-        pix = pixnums[inds][0]
-        for col in cols:
-            hpxinfo[col][pix] = np.median(randoms[col][inds])
-        if i % stepper == 0 and i > 0:
-            elapsed = time() - t0
-            rate = i / elapsed
-            log.info('{}/{} pixels; {:.1f} pix/sec; {:.1f} total mins elapsed'
-                     .format(i, npix, rate, elapsed/60.))
+    for col in pixmapcols:
+        hpxinfo[col] = medians[col]
 
     log.info('Done...t = {:.1f}s'.format(time()-start))
 
@@ -1223,7 +1702,8 @@ def pixmap(randoms, targets, rand_density, nside=256, gaialoc=None):
 
 def select_randoms_bricks(brickdict, bricknames, numproc=32, drdir=None,
                           zeros=False, nomtl=True, cnts=True, density=None,
-                          dustdir=None, aprad=None, seed=1):
+                          dustdir=None, aprad=None, seed=1, rank=False,
+                          skies=None):
 
     """Parallel-process a random catalog for a set of brick names.
 
@@ -1244,6 +1724,14 @@ def select_randoms_bricks(brickdict, bricknames, numproc=32, drdir=None,
         See :func:`~desitarget.skyfibers.get_brick_info`.
     seed : :class:`int`, optional, defaults to 1
         See :func:`~desitarget.randoms.randoms_in_a_brick_from_edges`.
+    rank : :class:`bool`, optional, defaults to ``False``
+        See :func:`~desitarget.randoms.get_quantities_in_a_brick`.
+    skies : :class:`dict`, optional, defaults to ``None``
+        If passed, also make skies in each brick, reading each image of
+        the brick once for both the randoms and the skies. A dictionary
+        of the `survey`, `nskiespersqdeg`, `bands` and `apertures_arcsec`
+        arguments of :func:`~desitarget.randoms.randoms_and_skies_in_a_brick`
+        (only `survey` is required). Not used with `zeros`.
 
     Returns
     -------
@@ -1252,6 +1740,9 @@ def select_randoms_bricks(brickdict, bricknames, numproc=32, drdir=None,
         :func:`~desitarget.randoms.get_quantities_in_a_brick`. If
         `zeros` and `nomtl` are both ``False`` additional columns are
         returned, as added by :func:`~desitarget.targets.finalize`.
+    :class:`~numpy.ndarray`
+        Only returned if `skies` is passed. The skies in the bricks, as
+        for :func:`~desitarget.skyfibers.select_skies`.
 
     Notes
     -----
@@ -1272,23 +1763,38 @@ def select_randoms_bricks(brickdict, bricknames, numproc=32, drdir=None,
             bra, bdec, bramin, bramax, bdecmin, bdecmax = brickdict[brickname]
 
         # ADM populate the brick with random points, and retrieve the quantities
-        # ADM of interest at those points.
-        randoms = get_quantities_in_a_brick(
-            bramin, bramax, bdecmin, bdecmax, brickname, drdir=drdir,
-            density=density, dustdir=dustdir, aprad=aprad, zeros=zeros,
-            seed=seed)
+        # ADM of interest at those points. If making skies, too, share
+        # ADM one cache of the brick's images.
+        if skies is not None and not zeros:
+            randoms, skytable = randoms_and_skies_in_a_brick(
+                bramin, bramax, bdecmin, bdecmax, brickname, drdir=drdir,
+                density=density, dustdir=dustdir, aprad=aprad, seed=seed,
+                rank=rank, **skies)
+            if not nomtl:
+                randoms = finalize_randoms(randoms)
+            return randoms, skytable
+
+        with BrickImages(keep=False) as images:
+            randoms = get_quantities_in_a_brick(
+                bramin, bramax, bdecmin, bdecmax, brickname, drdir=drdir,
+                density=density, dustdir=dustdir, aprad=aprad, zeros=zeros,
+                seed=seed, images=images, rank=rank)
 
         if zeros or nomtl:
             return randoms
         return finalize_randoms(randoms)
 
+    def _brick_area(brickname):
+        """the area of a brick, to schedule the largest bricks first"""
+        return box_area(brickdict[brickname][2:6])
+
     # ADM this is just to count bricks in _update_status.
     nbrick = np.zeros((), dtype='i8')
     t0 = time()
     # ADM write a total of 25 output messages during processing.
     interval = nbricks // 25
 
-    def _update_status(result):
+    def _update_status(result, skytable=None):
         ''' wrapper function for the critical reduction operation,
             that occurs on the main parallel process '''
         if nbrick % interval == 0 and nbrick > 0:
@@ -1303,17 +1809,31 @@ def select_randoms_bricks(brickdict, bricknames, numproc=32, drdir=None,
                 raise IOError(msg)
 
         nbrick[...] += 1    # this is an in-place modification.
+        if skies is not None and not zeros:
+            return result, skytable
         return result
 
     # - Parallel process input files.
     if numproc > 1:
         pool = sharedmem.MapReduce(np=numproc)
+        # ADM the number of randoms, and so the cost, scales with brick area.
         with pool:
-            qinfo = pool.map(_get_quantities, bricknames, reduce=_update_status)
+            qinfo = pool.map(_get_quantities, bricknames, reduce=_update_status,
+                             cost=_brick_area, shared=True)
+        for i, secs in pool.slowest(3):
+            log.info('Slowest bricks: {} took {:.1f} secs'.format(bricknames[i], secs))
     else:
         qinfo = list()
         for brickname in bricknames:
-            qinfo.append(_update_status(_get_quantities(brickname)))
+            result = _get_quantities(brickname)
+            if isinstance(result, tuple):
+                qinfo.append(_update_status(*result))
+            else:
+                qinfo.append(_update_status(result))
+
+    if skies is not None and not zeros:
+        qinfo, skytables = zip(*qinfo)
+        return np.concatenate(qinfo), _concatenate_skies(skytables)
 
     qinfo = np.concatenate(qinfo)
 
@@ -1321,7 +1841,7 @@ def select_randoms_bricks(brickdict, bricknames, numproc=32, drdir=None,
 
 
 def supplement_randoms(donebns, density=10000, numproc=32, dustdir=None,
-                       seed=1):
+                       seed=1, rank=False):
     """Random catalogs of "zeros" for missing bricks.
 
     Parameters
@@ -1337,6 +1857,9 @@ def supplement_randoms(donebns, density=10000, numproc=32, dustdir=None,
         Random seed to use when shuffling across brick boundaries.
         The actual np.random.seed defaults to 615+`seed`. Also see use
         in :func:`~desitarget.randoms.randoms_in_a_brick_from_edges`.
+    rank : :class:`bool`, optional, defaults to ``False``
+        If ``True``, add a `RANK` column, see
+        :func:`~desitarget.randoms.get_quantities_in_a_brick`.
 
     Returns
     -------
@@ -1358,7 +1881,7 @@ def supplement_randoms(donebns, density=10000, numproc=32, dustdir=None,
 
     qzeros = select_randoms_bricks(brickdict, bricknames, numproc=numproc,
                                    zeros=True, cnts=False, density=density,
-                                   dustdir=dustdir, seed=seed)
+                                   dustdir=dustdir, seed=seed, rank=rank)
 
     # ADM one last shuffle to randomize across brick boundaries.
     np.random.seed(615+seed)
@@ -1369,7 +1892,7 @@ def supplement_randoms(donebns, density=10000, numproc=32, dustdir=None,
 
 def select_randoms(drdir, density=100000, numproc=32, nside=None, pixlist=None,
                    bundlebricks=None, nchunks=10, brickspersec=2.5, extra=None,
-                   nomtl=True, dustdir=None, aprad=0.75, seed=1):
+                   nomtl=True, dustdir=None, aprad=0.75, seed=1, rank=False):
     """NOBS, DEPTHs (per-band), MASKs for random points in a Legacy Surveys DR.
 
     Parameters
@@ -1417,6 +1940,12 @@ def select_randoms(drdir, density=100000, numproc=32, nside=None, pixlist=None,
         Random seed to use when shuffling across brick boundaries.
         The actual np.random.seed defaults to 615+`seed`. See also use
         in :func:`~desitarget.randoms.randoms_in_a_brick_from_edges`.
+    rank : :class:`bool`, optional, defaults to ``False``
+        If ``True``, add a `RANK` column of uniform random numbers.
+        Randoms made at a high `density` with `rank` can be downsampled
+        to any lower density (without reprocessing the imaging) using
+        :func:`~desitarget.randoms.downsample_randoms` or
+        :func:`~desitarget.randoms.split_randoms_by_rank`.
 
     Returns
     -------
@@ -1473,7 +2002,8 @@ def select_randoms(drdir, density=100000, numproc=32, nside=None, pixlist=None,
     # ADM recover the pixel-level quantities in the DR bricks.
     randoms = select_randoms_bricks(brickdict, bricknames, numproc=numproc,
                                     drdir=drdir, density=density, nomtl=nomtl,
-                                    dustdir=dustdir, aprad=aprad, seed=seed)
+                                    dustdir=dustdir, aprad=aprad, seed=seed,
+                                    rank=rank)
 
     # ADM add columns that are added by MTL.
     if nomtl is False:
@@ -43,8 +43,6 @@ import healpy as hp
 
 import numpy.lib.recfunctions as rfn
 
-import astropy.units as u
-from astropy.coordinates import SkyCoord
 from astropy.table import Table, Row
 
 from time import time
@@ -55,6 +53,7 @@ from collections import defaultdict
 
 from desitarget.internal import sharedmem
 from desitarget.geomask import radec_match_to, add_hp_neighbors, is_in_hp
+from desitarget.crossmatch import search_around
 
 from desitarget.targets import encode_targetid, main_cmx_or_sv
 from desitarget.targets import set_obsconditions, initial_priority_numobs
@@ -687,10 +686,8 @@ def finalize_secondary(scxtargs, scnd_mask, survey='main', sep=1.,
     if len(w) > 0:
         log.info("Matching secondary targets to themselves...t={:.1f}s"
                  .format(time()-t0))
-        # ADM use astropy for the matching. At NERSC, astropy matches
-        # ADM ~20M objects to themselves in about 10 minutes.
-        c = SkyCoord(scxtargs["RA"][w]*u.deg, scxtargs["DEC"][w]*u.deg)
-        m1, m2, _, _ = c.search_around_sky(c, sep*u.arcsec)
+        ra, dec = scxtargs["RA"][w], scxtargs["DEC"][w]
+        m1, m2, _ = search_around(ra, dec, ra, dec, sep)
         log.info("Done with matching...t={:.1f}s".format(time()-t0))
         # ADM restrict only to unique matches (and exclude self-matches).
         uniq = m1 > m2
@@ -13,11 +13,10 @@ import numpy as np
 import fitsio
 from astropy.wcs import WCS
 from time import time
-import photutils
 import healpy as hp
 from glob import glob
-from scipy.ndimage.morphology import binary_dilation, binary_erosion
-from scipy.ndimage.measurements import label, find_objects, center_of_mass
+from scipy.ndimage.morphology import binary_dilation, distance_transform_cdt
+from scipy.ndimage.measurements import label, find_objects
 from scipy.ndimage.filters import gaussian_filter
 
 # ADM some utility code taken from legacypipe and astrometry.net.
@@ -33,6 +32,7 @@ from desitarget.geomask import is_in_gal_box, is_in_circle, is_in_hp
 
 # ADM the parallelization script.
 from desitarget.internal import sharedmem
+from desitarget.brickimages import BrickImages, aperture_photometry
 
 from desiutil import brick
 from desiutil.log import get_logger
@@ -173,7 +173,7 @@ def model_density_of_sky_fibers(margin=1.5):
 
 
 def make_skies_for_a_brick(survey, brickname, nskiespersqdeg=None, bands=['g', 'r', 'z'],
-                           apertures_arcsec=[0.75], write=False):
+                           apertures_arcsec=[0.75], write=False, images=None):
     """Generate skies for one brick in the typical format for DESI sky targets.
 
     Parameters
@@ -196,6 +196,8 @@ def make_skies_for_a_brick(survey, brickname, nskiespersqdeg=None, bands=['g', '
         the input `survey` object and is in the form:
         `%(survey.survey_dir)/metrics/%(brick).3s/skies-%(brick)s.fits.gz`
         which is returned by `survey.find_file('skies')`.
+    images : :class:`~desitarget.brickimages.BrickImages`, optional
+        Cache of the images of `brickname`, see :func:`sky_fibers_for_brick()`.
 
     Returns
     -------
@@ -238,7 +240,8 @@ def make_skies_for_a_brick(survey, brickname, nskiespersqdeg=None, bands=['g', '
 
     # ADM generate sky fiber information for this brick name.
     skytable = sky_fibers_for_brick(survey, brickname, nskies=nskies, bands=bands,
-                                    apertures_arcsec=apertures_arcsec)
+                                    apertures_arcsec=apertures_arcsec,
+                                    images=images)
     # ADM if the blob file doesn't exist, skip it.
     if skytable is None:
         return None
@@ -352,7 +355,8 @@ def make_skies_for_a_brick(survey, brickname, nskiespersqdeg=None, bands=['g', '
 
 
 def sky_fibers_for_brick(survey, brickname, nskies=144, bands=['g', 'r', 'z'],
-                         apertures_arcsec=[0.5, 0.75, 1., 1.5, 2., 3.5, 5., 7.]):
+                         apertures_arcsec=[0.5, 0.75, 1., 1.5, 2., 3.5, 5., 7.],
+                         images=None):
     """Produce DESI sky fiber locations in a brick, derived at the pixel-level
 
     Parameters
@@ -368,6 +372,11 @@ def sky_fibers_for_brick(survey, brickname, nskies=144, bands=['g', 'r', 'z'],
         List of bands to be used to define good sky locations.
     apertures_arcsec : :class:`list`, optional, defaults to [0.5,0.75,1.,1.5,2.,3.5,5.,7.]
         Radii in arcsec of apertures for which to derive flux at a sky location.
+    images : :class:`~desitarget.brickimages.BrickImages`, optional
+        Cache of the images of `brickname`. Pass the same object for
+        other look-ups in `brickname` (e.g. to make randoms) to only
+        read each image once. Defaults to a new cache that doesn't
+        keep whole images.
 
     Returns
     -------
@@ -392,11 +401,14 @@ def sky_fibers_for_brick(survey, brickname, nskies=144, bands=['g', 'r', 'z'],
     if not os.path.exists(fn):
         log.warning('blobmap {} does not exist!!!'.format(fn))
         return None
-    blobs = fitsio.read(fn)
+    # ADM read each image once, and only once.
+    # ADM a private cache doesn't keep whole images, to bound memory.
+    if images is None:
+        images = BrickImages(keep=False)
+    blobs = images.image(fn)
     # log.info('Blob maximum value and minimum value in brick {}: {} {}'
     #         .format(brickname,blobs.min(),blobs.max()))
-    header = fitsio.read_header(fn)
-    wcs = WCS(header)
+    wcs = images.wcs(fn)
 
     goodpix = (blobs == -1)
     # ADM while looping through bands, check there's an image in
@@ -408,7 +420,7 @@ def sky_fibers_for_brick(survey, brickname, nskies=144, bands=['g', 'r', 'z'],
         if not os.path.exists(fn):
             # Skip
             continue
-        nexp = fitsio.read(fn)
+        nexp = images.image(fn)
         goodpix[nexp == 0] = False
         onegoodband = True
     # ADM if there were no images in the passed bands, fail
@@ -465,18 +477,13 @@ def sky_fibers_for_brick(survey, brickname, nskies=144, bands=['g', 'r', 'z'],
         if not (os.path.exists(imfn) and os.path.exists(ivfn)):
             continue
 
-        coimg = fitsio.read(imfn)
-        coiv = fitsio.read(ivfn)
+        coimg = images.image(imfn)
+        coiv = images.image(ivfn)
 
-        with np.errstate(divide='ignore', invalid='ignore'):
-            imsigma = 1./np.sqrt(coiv)
-            imsigma[coiv == 0] = 0
-        apxy = np.vstack((skyfibers.x, skyfibers.y)).T
         for irad, rad in enumerate(apertures):
-            aper = photutils.CircularAperture(apxy, rad)
-            p = photutils.aperture_photometry(coimg, aper, error=imsigma)
-            apflux[:, irad] = p.field('aperture_sum')
-            err = p.field('aperture_sum_err')
+            flux, err = aperture_photometry(
+                coimg, skyfibers.x, skyfibers.y, rad, ivar=coiv)
+            apflux[:, irad] = flux
             # ADM where the error is 0, that actually means infinite error
             # ADM so, in reality, set the ivar to 0 for those cases and
             # ADM retain the true ivars where the error is non-zero.
@@ -514,57 +521,61 @@ def sky_fiber_locations(skypix, gridsize=300):
         - Implements the core trick of iteratively eroding the map of good sky
           locations to produce a distance-from-blobs map, and then return the max
           values in that map in each cell of a grid.
+        - The number of erosions that a pixel survives (plus one) is its
+          chessboard distance from the nearest blob (or the edge of the
+          brick), so the iterated erosions are computed in one pass with
+          a distance transform.
         - Initial version written by Dustin Lang (@dstndstn).
     """
-    nerosions = np.zeros(skypix.shape, np.int16)
-    nerosions += skypix
-    element = np.ones((3, 3), bool)
-    while True:
-        skypix = binary_erosion(skypix, structure=element)
-        nerosions += skypix
-#        log.info('After erosion: {} sky pixels'.format(np.sum(skypix)))
-        if not np.any(skypix.ravel()):
-            break
+    # ADM pad with blobs, as binary_erosion erodes from the edges.
+    nerosions = distance_transform_cdt(
+        np.pad(skypix, 1), metric='chessboard')[1:-1, 1:-1].astype(np.int16)
 
     # This is a hack to break ties in the integer 'nerosions' map.
     nerosions = gaussian_filter(nerosions.astype(np.float32), 1.0)
-    peaks = (nerosions > 1)
     H, W = skypix.shape
 
-    # find pixels that are larger than their 8 neighbors
-    peaks[1:-1, 1:-1] &= (nerosions[1:-1, 1:-1] >= nerosions[0:-2, 1:-1])
-    peaks[1:-1, 1:-1] &= (nerosions[1:-1, 1:-1] >= nerosions[2:, 1:-1])
-    peaks[1:-1, 1:-1] &= (nerosions[1:-1, 1:-1] >= nerosions[1:-1, 0:-2])
-    peaks[1:-1, 1:-1] &= (nerosions[1:-1, 1:-1] >= nerosions[1:-1, 2:])
-    peaks[1:-1, 1:-1] &= (nerosions[1:-1, 1:-1] >= nerosions[0:-2, 0:-2])
-    peaks[1:-1, 1:-1] &= (nerosions[1:-1, 1:-1] >= nerosions[0:-2, 2:])
-    peaks[1:-1, 1:-1] &= (nerosions[1:-1, 1:-1] >= nerosions[2:, 0:-2])
-    peaks[1:-1, 1:-1] &= (nerosions[1:-1, 1:-1] >= nerosions[2:, 2:])
-
     # Split the image into 300 x 300-pixel cells, choose the highest peak in each one
     # (note, this is ignoring the brick-to-brick margin in laying down the grid)
-    sx, sy = [], []
     xx = np.round(np.linspace(0, W, 1+np.ceil(W / gridsize).astype(int))).astype(int)
     yy = np.round(np.linspace(0, H, 1+np.ceil(H / gridsize).astype(int))).astype(int)
-    for ylo, yhi in zip(yy, yy[1:]):
-        for xlo, xhi in zip(xx, xx[1:]):
-            # Find max pixel in box
-            subne = nerosions[ylo:yhi, xlo:xhi]
-            I = np.argmax(subne)
-            # Find all pixels equal to the max and take the one closest to the center of mass.
-            maxval = subne.flat[I]
-            cy, cx = center_of_mass(subne == maxval)
-            xg = np.arange(xhi-xlo)
-            yg = np.arange(yhi-ylo)
-            dd = np.exp(-((yg[:, np.newaxis] - cy)**2 + (xg[np.newaxis, :] - cx)**2))
-            dd[subne != maxval] = 0
-            I = np.argmax(dd.flat)
-            iy, ix = np.unravel_index(I, subne.shape)
-            sx.append(ix + xlo)
-            sy.append(iy + ylo)
-
-    sx = np.array(sx)
-    sy = np.array(sy)
+
+    # ADM reduce over all of the cells at once.
+    def _cellreduce(ufunc, arr):
+        return ufunc.reduceat(ufunc.reduceat(arr, yy[:-1], axis=0),
+                              xx[:-1], axis=1)
+
+    # ADM the cell of each row and column, and the pixel in that cell.
+    iy = np.repeat(np.arange(len(yy)-1), np.diff(yy))
+    ix = np.repeat(np.arange(len(xx)-1), np.diff(xx))
+    yg = np.arange(H) - yy[iy]
+    xg = np.arange(W) - xx[ix]
+
+    # Find all pixels equal to the max in each cell...
+    maxval = _cellreduce(np.maximum, nerosions)
+    ismax = nerosions == maxval[iy][:, ix]
+
+    # ADM ...and their center of mass (the coordinates are integers, so
+    # ADM these sums are exact, as for scipy's center_of_mass).
+    n = _cellreduce(np.add, ismax.astype(np.float64))
+    cy = _cellreduce(np.add, ismax * yg[:, np.newaxis].astype(float)) / n
+    cx = _cellreduce(np.add, ismax * xg[np.newaxis, :].astype(float)) / n
+
+    # Take the pixel equal to the max that is closest to the center of mass.
+    dd = np.exp(-((yg[:, np.newaxis] - cy[iy][:, ix])**2 +
+                  (xg[np.newaxis, :] - cx[iy][:, ix])**2))
+    dd[~ismax] = 0
+    ddmax = _cellreduce(np.maximum, dd)
+
+    # ADM as for np.argmax, break ties with the first pixel in the cell.
+    wg = np.diff(xx)[ix]
+    first = yg[:, np.newaxis] * wg[np.newaxis, :] + xg[np.newaxis, :]
+    first[dd != ddmax[iy][:, ix]] = H*W
+    first = _cellreduce(np.minimum, first)
+    wcell = np.diff(xx)[np.newaxis, :]
+
+    sx = (first % wcell + xx[np.newaxis, :-1]).ravel()
+    sy = (first // wcell + yy[:-1, np.newaxis]).ravel()
     return sx, sy, nerosions[sy, sx]
 
 
@@ -1067,6 +1078,34 @@ def supplement_skies(nskiespersqdeg=None, numproc=16, gaiadir=None,
     return supp
 
 
+def _concatenate_skies(skies):
+    """Concatenate skies from :func:`make_skies_for_a_brick()` for many bricks.
+
+    Parameters
+    ----------
+    skies : :class:`list`
+        Skies for each brick. Bricks with no blob map are ``None``.
+
+    Returns
+    -------
+    :class:`~numpy.ndarray`
+        All of the skies that are within the true boundaries of their
+        bricks.
+    """
+    # ADM some missing blobs may have contaminated the array.
+    skies = [sk for sk in skies if sk is not None]
+    # ADM Concatenate the parallelized results into one rec array.
+    skies = np.concatenate(skies)
+
+    # ADM make_skies_for_a_brick is pixel-based, so the locations can
+    # ADM extend beyond the "true" geometric brick boundaries. Use the
+    # ADM brick look-up table to remove these cases.
+    brickid = bricks.brickid(skies["RA"], skies["DEC"])
+    inbrick = skies["BRICKID"] == brickid
+
+    return skies[inbrick]
+
+
 def select_skies(survey, numproc=16, nskiespersqdeg=None, bands=['g', 'r', 'z'],
                  apertures_arcsec=[0.75], nside=None, pixlist=None, writebricks=False):
     """Generate skies in parallel for bricks in a Legacy Surveys DR.
@@ -1141,11 +1180,13 @@ def select_skies(survey, numproc=16, nskiespersqdeg=None, bands=['g', 'r', 'z'],
     # ADM the critical function to run on every brick.
     def _get_skies(brickname):
         '''wrapper on make_skies_for_a_brick() given a brick name'''
-
-        return make_skies_for_a_brick(survey, brickname,
-                                      nskiespersqdeg=nskiespersqdeg, bands=bands,
-                                      apertures_arcsec=apertures_arcsec,
-                                      write=writebricks)
+        # ADM one cache of the images of each brick.
+        with BrickImages(keep=False) as images:
+            return make_skies_for_a_brick(survey, brickname,
+                                          nskiespersqdeg=nskiespersqdeg,
+                                          bands=bands,
+                                          apertures_arcsec=apertures_arcsec,
+                                          write=writebricks, images=images)
 
     # ADM this is just in order to count bricks in _update_status.
     nbrick = np.zeros((), dtype='i8')
@@ -1168,23 +1209,16 @@ def select_skies(survey, numproc=16, nskiespersqdeg=None, bands=['g', 'r', 'z'],
     if numproc > 1:
         pool = sharedmem.MapReduce(np=numproc)
         with pool:
-            skies = pool.map(_get_skies, bricknames, reduce=_update_status)
+            skies = pool.map(_get_skies, bricknames, reduce=_update_status,
+                             shared=True)
+        for i, secs in pool.slowest(3):
+            log.info('Slowest bricks: {} took {:.1f} secs'.format(bricknames[i], secs))
     else:
         skies = list()
         for brickname in bricknames:
             skies.append(_update_status(_get_skies(brickname)))
 
-    # ADM some missing blobs may have contaminated the array.
-    skies = [sk for sk in skies if sk is not None]
-    # ADM Concatenate the parallelized results into one rec array.
-    skies = np.concatenate(skies)
-
-    # ADM make_skies_for_a_brick is pixel-based, so the locations can
-    # ADM extend beyond the "true" geometric brick boundaries. Use the
-    # ADM brick look-up table to remove these cases.
-    brickid = bricks.brickid(skies["RA"], skies["DEC"])
-    inbrick = skies["BRICKID"] == brickid
-    skies = skies[inbrick]
+    skies = _concatenate_skies(skies)
 
     log.info('Done with (nside={}, HEALPixels={}, DRdir={})...t={:.1f}s'
              .format(nside, pixlist, survey.survey_dir, time()-start))
@@ -16,10 +16,12 @@ import numpy as np
 import warnings
 
 from time import time
+from copy import deepcopy
 from pkg_resources import resource_filename
 
 from desitarget.cuts import _getColors, _psflike, _check_BGS_targtype_sv
-from desitarget.cuts import shift_photo_north
+from desitarget.cuts import Photometry, _photsys_cutter
+from desitarget.cuts import tccolumns as maintccolumns
 from desitarget.gaiamatch import is_in_Galaxy
 from desitarget.geomask import imaging_mask
 
@@ -30,6 +32,15 @@ log = get_logger()
 # ADM start the clock
 start = time()
 
+# ADM the additional sweeps columns needed by each target class for SV1.
+# ADM see desitarget.cuts.columns_for_tcnames().
+tccolumns = deepcopy(maintccolumns)
+tccolumns["ELG"] += ["FIBERFLUX_G"]
+tccolumns["QSO"] += ["FLUX_IVAR_G", "FLUX_IVAR_R", "FLUX_IVAR_Z"]
+tccolumns["QSO"].remove("RELEASE")
+tccolumns["MWS"].remove("GAIA_ASTROMETRIC_PARAMS_SOLVED")
+tccolumns["MWS"].remove("PMRA_IVAR")
+
 
 def isBACKUP(ra=None, dec=None, gaiagmag=None, primary=None):
     """BACKUP targets based on Gaia magnitudes.
@@ -93,7 +104,7 @@ def isBACKUP(ra=None, dec=None, gaiagmag=None, primary=None):
 def isLRG(gflux=None, rflux=None, zflux=None, w1flux=None,
           zfiberflux=None, rfluxivar=None, zfluxivar=None, w1fluxivar=None,
           gnobs=None, rnobs=None, znobs=None, maskbits=None,
-          primary=None, south=True):
+          primary=None, south=True, phot=None):
     """Target Definition of LRG. Returns a boolean array.
 
     Parameters
@@ -102,6 +113,10 @@ def isLRG(gflux=None, rflux=None, zflux=None, w1flux=None,
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS)
         if ``south=False``, otherwise use cuts appropriate to the
         Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.sv1.sv1_cuts.set_target_bits()`. Built
+        on-the-fly from the passed fluxes if not sent.
 
     Returns
     -------
@@ -137,7 +152,7 @@ def isLRG(gflux=None, rflux=None, zflux=None, w1flux=None,
     # ADM sources that weren't in a mask/logic cut.
     lrg_opt, lrg_ir, lrg_sv_opt, lrg_sv_ir = isLRG_colors(
         gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
-        zfiberflux=zfiberflux, south=south, primary=lrg
+        zfiberflux=zfiberflux, south=south, primary=lrg, phot=phot
     )
 
     return lrg_opt, lrg_ir, lrg_sv_opt, lrg_sv_ir
@@ -177,7 +192,7 @@ def notinLRG_mask(primary=None, rflux=None, zflux=None, w1flux=None,
 
 
 def isLRG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
-                 zfiberflux=None, south=True, primary=None):
+                 zfiberflux=None, south=True, primary=None, phot=None):
     """See :func:`~desitarget.sv1.sv1_cuts.isLRG` for details.
     """
     if primary is None:
@@ -189,12 +204,16 @@ def isLRG_colors(gflux=None, rflux=None, zflux=None, w1flux=None,
         log.warning('Setting zfiberflux to zflux!!!')
         zfiberflux = zflux.copy()
 
-    gmag = 22.5 - 2.5 * np.log10(gflux.clip(1e-7))
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          w1flux=w1flux, zfiberflux=zfiberflux)
+
+    gmag = phot.mag("g", clip=1e-7)
     # ADM safe as these fluxes are set to > 0 in notinLRG_mask.
-    rmag = 22.5 - 2.5 * np.log10(rflux.clip(1e-7))
-    zmag = 22.5 - 2.5 * np.log10(zflux.clip(1e-7))
-    w1mag = 22.5 - 2.5 * np.log10(w1flux.clip(1e-7))
-    zfibermag = 22.5 - 2.5 * np.log10(zfiberflux.clip(1e-7))
+    rmag = phot.mag("r", clip=1e-7)
+    zmag = phot.mag("z", clip=1e-7)
+    w1mag = phot.mag("w1", clip=1e-7)
+    zfibermag = phot.mag("zfiber", clip=1e-7)
 
     if south:
 
@@ -288,7 +307,8 @@ def isSTD(gflux=None, rflux=None, zflux=None, primary=None,
           gfluxivar=None, rfluxivar=None, zfluxivar=None, objtype=None,
           gaia=None, astrometricexcessnoise=None, paramssolved=None,
           pmra=None, pmdec=None, parallax=None, dupsource=None,
-          gaiagmag=None, gaiabmag=None, gaiarmag=None, bright=False):
+          gaiagmag=None, gaiabmag=None, gaiarmag=None, bright=False,
+          phot=None):
     """Select STD targets using color cuts and photometric quality cuts.
 
     Parameters
@@ -296,6 +316,10 @@ def isSTD(gflux=None, rflux=None, zflux=None, primary=None,
     bright : :class:`boolean`, defaults to ``False``
         if ``True`` apply magnitude cuts for "bright" conditions; otherwise,
         choose "normal" brightness standards. Cut is performed on `gaiagmag`.
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.sv1.sv1_cuts.set_target_bits()`. Built
+        on-the-fly from the passed fluxes if not sent.
 
     Returns
     -------
@@ -328,7 +352,8 @@ def isSTD(gflux=None, rflux=None, zflux=None, primary=None,
             std &= fracmasked[bandint] < 0.6
 
     # ADM apply the Legacy Surveys (optical) magnitude and color cuts.
-    std &= isSTD_colors(primary=primary, zflux=zflux, rflux=rflux, gflux=gflux)
+    std &= isSTD_colors(primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
+                        phot=phot)
 
     # ADM apply the Gaia quality cuts.
     std &= isSTD_gaia(primary=primary, gaia=gaia,
@@ -350,7 +375,7 @@ def isSTD(gflux=None, rflux=None, zflux=None, primary=None,
 
 
 def isSTD_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
-                 primary=None):
+                 primary=None, phot=None):
     """Select STD stars based on Legacy Surveys color cuts. Returns a boolean array.
     see :func:`~desitarget.sv1.sv1_cuts.isSTD` for other details.
     """
@@ -358,15 +383,14 @@ def isSTD_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
         primary = np.ones_like(gflux, dtype='?')
     std = primary.copy()
 
-    # Clip to avoid warnings from negative numbers.
-    # ADM we're pretty bright for the STDs, so this should be safe.
-    gflux = gflux.clip(1e-16)
-    rflux = rflux.clip(1e-16)
-    zflux = zflux.clip(1e-16)
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
 
-    # ADM optical colors for halo TO or bluer.
-    grcolor = 2.5 * np.log10(rflux / gflux)
-    rzcolor = 2.5 * np.log10(zflux / rflux)
+    # ADM optical colors for halo TO or bluer. Fluxes are clipped to
+    # ADM avoid warnings from negative numbers. We're pretty bright
+    # ADM for the STDs, so this should be safe.
+    grcolor = phot.color("g", "r", clip=1e-16)
+    rzcolor = phot.color("r", "z", clip=1e-16)
     std &= rzcolor < 0.2
     std &= grcolor > 0.
     std &= grcolor < 0.35
@@ -424,7 +448,8 @@ def isSTD_gaia(primary=None, gaia=None, astrometricexcessnoise=None,
 def isQSO_cuts(gflux=None, rflux=None, zflux=None,
                w1flux=None, w2flux=None, w1snr=None, w2snr=None,
                dchisq=None, maskbits=None, objtype=None,
-               gnobs=None, rnobs=None, znobs=None, primary=None, south=True):
+               gnobs=None, rnobs=None, znobs=None, primary=None, south=True,
+               phot=None):
     """Definition of QSO target classes from color cuts. Returns a boolean array.
 
     Parameters
@@ -432,6 +457,10 @@ def isQSO_cuts(gflux=None, rflux=None, zflux=None,
     south : :class:`boolean`, defaults to ``True``
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS) if ``south=False``,
         otherwise use cuts appropriate to the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.sv1.sv1_cuts.set_target_bits()`. Built
+        on-the-fly from the passed fluxes if not sent.
 
     Returns
     -------
@@ -444,7 +473,11 @@ def isQSO_cuts(gflux=None, rflux=None, zflux=None,
     - See :func:`~desitarget.cuts.set_target_bits` for other parameters.
     """
     if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+        if phot is None:
+            phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+        # ADM copy, as isQSO_colors() modifies the fluxes in-place.
+        gflux, rflux, zflux = [phot.flux(band, shift=True).copy()
+                               for band in "grz"]
 
     if primary is None:
         primary = np.ones_like(rflux, dtype='?')
@@ -541,12 +574,14 @@ def isQSO_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
 
 
 def isQSO_color_high_z(gflux=None, rflux=None, zflux=None,
-                       w1flux=None, w2flux=None, south=True):
+                       w1flux=None, w2flux=None, south=True, phot=None):
     """
     Color cut to select Highz QSO (z>~2.)
     """
     if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+        if phot is None:
+            phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+        gflux, rflux, zflux = [phot.flux(band, shift=True) for band in "grz"]
 
     wflux = 0.75*w1flux + 0.25*w2flux
     grzflux = (gflux + 0.8*rflux + 0.5*zflux) / 2.3
@@ -575,7 +610,7 @@ def isQSO_randomforest(gflux=None, rflux=None, zflux=None, w1flux=None,
                        w2flux=None, objtype=None, release=None, dchisq=None,
                        maskbits=None, gnobs=None, rnobs=None, znobs=None,
                        ra=None, dec=None,
-                       primary=None, south=True):
+                       primary=None, south=True, phot=None):
     """Definition of QSO target class using random forest. Returns a boolean array.
 
     Parameters
@@ -583,6 +618,10 @@ def isQSO_randomforest(gflux=None, rflux=None, zflux=None, w1flux=None,
     south : :class:`boolean`, defaults to ``True``
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS) if ``south=False``,
         otherwise use cuts appropriate to the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.sv1.sv1_cuts.set_target_bits()`. Built
+        on-the-fly from the passed fluxes if not sent.
 
     Returns
     -------
@@ -602,11 +641,15 @@ def isQSO_randomforest(gflux=None, rflux=None, zflux=None, w1flux=None,
     nFeatures = 11  # Number of attributes describing each object to be classified by the rf.
     nbEntries = rflux.size
     # ADM shift the northern photometry to the southern system.
-    if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          w1flux=w1flux, w2flux=w2flux)
+    gflux, rflux, zflux = [phot.flux(band, shift=not south) for band in "grz"]
 
     # ADM photOK here should ensure (g > 0.) & (r > 0.) & (z > 0.) & (W1 > 0.) & (W2 > 0.)
-    colors, r, photOK = _getColors(nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux)
+    colors, r, photOK = phot.cached(
+        _getColors, nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux,
+        key=not south)
     r = np.atleast_1d(r)
 
     # ADM Preselection to speed up the process
@@ -700,7 +743,7 @@ def isQSO_highz_faint(gflux=None, rflux=None, zflux=None, w1flux=None,
                       w2flux=None, objtype=None, release=None, dchisq=None,
                       gnobs=None, rnobs=None, znobs=None,
                       ra=None, dec=None,
-                      maskbits=None, primary=None, south=True):
+                      maskbits=None, primary=None, south=True, phot=None):
     """Definition of QSO target for highz (z>2.0) faint QSOs. Returns a boolean array.
 
     Parameters
@@ -708,6 +751,10 @@ def isQSO_highz_faint(gflux=None, rflux=None, zflux=None, w1flux=None,
     south : :class:`boolean`, defaults to ``True``
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS) if ``south=False``,
         otherwise use cuts appropriate to the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.sv1.sv1_cuts.set_target_bits()`. Built
+        on-the-fly from the passed fluxes if not sent.
 
     Returns
     -------
@@ -727,11 +774,15 @@ def isQSO_highz_faint(gflux=None, rflux=None, zflux=None, w1flux=None,
     nFeatures = 11  # Number of attributes describing each object to be classified by the rf.
     nbEntries = rflux.size
     # ADM shift the northern photometry to the southern system.
-    if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          w1flux=w1flux, w2flux=w2flux)
+    gflux, rflux, zflux = [phot.flux(band, shift=not south) for band in "grz"]
 
     # ADM photOK here should ensure (g > 0.) & (r > 0.) & (z > 0.) & (W1 > 0.) & (W2 > 0.).
-    colors, r, photOK = _getColors(nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux)
+    colors, r, photOK = phot.cached(
+        _getColors, nbEntries, nFeatures, gflux, rflux, zflux, w1flux, w2flux,
+        key=not south)
     r = np.atleast_1d(r)
 
     # ADM Preselection to speed up the process.
@@ -826,7 +877,7 @@ def isQSOz5_cuts(gflux=None, rflux=None, zflux=None,
                  gnobs=None, rnobs=None, znobs=None,
                  w1flux=None, w2flux=None, w1snr=None, w2snr=None,
                  dchisq=None, maskbits=None, objtype=None, primary=None,
-                 south=True):
+                 south=True, phot=None):
     """Definition of z~5 QSO targets from color cuts. Returns a boolean array.
 
     Parameters
@@ -834,6 +885,10 @@ def isQSOz5_cuts(gflux=None, rflux=None, zflux=None,
     south : :class:`boolean`, defaults to ``True``
         Use cuts appropriate to the Northern imaging surveys (BASS/MzLS) if ``south=False``,
         otherwise use cuts appropriate to the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.sv1.sv1_cuts.set_target_bits()`. Built
+        on-the-fly from the passed fluxes if not sent.
 
     Returns
     -------
@@ -846,7 +901,11 @@ def isQSOz5_cuts(gflux=None, rflux=None, zflux=None,
     - See :func:`~desitarget.cuts.set_target_bits` for other parameters.
     """
     if not south:
-        gflux, rflux, zflux = shift_photo_north(gflux, rflux, zflux)
+        if phot is None:
+            phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+        # ADM copy, as isQSOz5_colors() modifies the fluxes in-place.
+        gflux, rflux, zflux = [phot.flux(band, shift=True).copy()
+                               for band in "grz"]
 
     if primary is None:
         primary = np.ones_like(rflux, dtype='?')
@@ -1094,7 +1153,7 @@ def isBGS_colors(rflux=None, rfiberflux=None, south=True, targtype=None, primary
 def isELG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
           gsnr=None, rsnr=None, zsnr=None, gfiberflux=None,
           gnobs=None, rnobs=None, znobs=None,
-          maskbits=None, south=True, primary=None):
+          maskbits=None, south=True, primary=None, phot=None):
     """Definition of ELG target classes. Returns a boolean array.
 
     Parameters
@@ -1102,6 +1161,10 @@ def isELG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
     south : :class:`boolean`, defaults to ``True``
         If ``False``, use cuts for the Northern imaging (BASS/MzLS)
         otherwise use cuts for the Southern imaging survey (DECaLS).
+    phot : :class:`~desitarget.cuts.Photometry`, optional
+        Cached photometric quantities for the passed fluxes, as built by
+        :func:`~desitarget.sv1.sv1_cuts.set_target_bits()`. Built
+        on-the-fly from the passed fluxes if not sent.
 
     Returns
     -------
@@ -1122,7 +1185,7 @@ def isELG(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
 
     svgtot, svgfib, fdrgtot, fdrgfib = isELG_colors(
         gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux, w2flux=w2flux,
-        gfiberflux=gfiberflux, south=south, primary=elg
+        gfiberflux=gfiberflux, south=south, primary=elg, phot=phot
     )
 
     return svgtot, svgfib, fdrgtot, fdrgfib
@@ -1150,7 +1213,7 @@ def notinELG_mask(maskbits=None, gsnr=None, rsnr=None, zsnr=None,
 
 
 def isELG_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
-                 gfiberflux=None, primary=None, south=True):
+                 gfiberflux=None, primary=None, south=True, phot=None):
     """Color cuts for ELG target selection classes
     (see, e.g., :func:`desitarget.cuts.set_target_bits` for parameters).
     """
@@ -1173,14 +1236,18 @@ def isELG_colors(gflux=None, rflux=None, zflux=None, w1flux=None, w2flux=None,
         gfibfaint_fdr = 24.2
         lowzcut_zp = -0.35
 
+    if phot is None:
+        phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux,
+                          gfiberflux=gfiberflux)
+
     # ADM work in magnitudes not fluxes. THIS IS ONLY OK AS the snr cuts
     # ADM in notinELG_mask ENSURE positive fluxes in all of g, r and z.
-    g = 22.5 - 2.5*np.log10(gflux.clip(1e-16))
-    r = 22.5 - 2.5*np.log10(rflux.clip(1e-16))
-    z = 22.5 - 2.5*np.log10(zflux.clip(1e-16))
+    g = phot.mag("g")
+    r = phot.mag("r")
+    z = phot.mag("z")
 
     # ADM gfiberflux can be zero but is never negative. So this is safe.
-    gfib = 22.5 - 2.5*np.log10(gfiberflux.clip(1e-16))
+    gfib = phot.mag("gfiber")
 
     # ADM these are safe as the snr cuts in notinELG_mask ENSURE positive
     # ADM fluxes in all of g, r and z...so things near colors of zero but
@@ -1461,7 +1528,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
                     gaiagmag, gaiabmag, gaiarmag, gaiaaen, gaiadupsource,
                     gaiaparamssolved, gaiabprpfactor, gaiasigma5dmax, galb,
                     tcnames, qso_optical_cuts, qso_selection,
-                    maskbits, Grr, refcat, primary, resolvetargs=True):
+                    maskbits, Grr, refcat, primary, resolvetargs=True,
+                    partition=False, blocksize=None, missing=None):
     """Perform target selection on parameters, return target mask arrays.
 
     Returns
@@ -1489,6 +1557,22 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     # ADM default for target classes we WON'T process is all False.
     tcfalse = primary & False
 
+    # ADM magnitudes, colors, etc. shared by the target classes.
+    phot = Photometry(gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
+                      w2flux=w2flux, gfiberflux=gfiberflux,
+                      rfiberflux=rfiberflux, zfiberflux=zfiberflux)
+
+    # ADM functions to apply the north/south cuts, limited to only the
+    # ADM northern/southern sources if partition is set.
+    cutters = {south: _photsys_cutter(photsys_south, south,
+                                      partition=resolvetargs and partition,
+                                      phot=phot, blocksize=blocksize,
+                                      missing=missing)
+               for south in south_cuts}
+    # ADM and to apply the cuts that don't depend on north/south.
+    blockcutter = _photsys_cutter(photsys_south, True, phot=phot,
+                                  blocksize=blocksize, missing=missing)
+
     # ADM initially set everything to arrays of False for the LRG selection
     # ADM the zeroth element stores the northern targets bits (south=False).
     lrg_classes = [[tcfalse, tcfalse, tcfalse, tcfalse],
@@ -1496,12 +1580,13 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     if "LRG" in tcnames:
         # ADM run the LRG target types (potentially) for both north and south.
         for south in south_cuts:
-            lrg_classes[int(south)] = isLRG(
+            lrg_classes[int(south)] = cutters[south](
+                isLRG,
                 primary=primary, south=south,
                 gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux,
                 zfiberflux=zfiberflux, rfluxivar=rfluxivar, zfluxivar=zfluxivar,
                 w1fluxivar=w1fluxivar, gnobs=gnobs, rnobs=rnobs, znobs=znobs,
-                maskbits=maskbits
+                maskbits=maskbits, phot=phot
             )
     lrg_opt_n, lrg_ir_n, lrg_sv_opt_n, lrg_sv_ir_n = lrg_classes[0]
     lrg_opt_s, lrg_ir_s, lrg_sv_opt_s, lrg_sv_ir_s = lrg_classes[1]
@@ -1521,11 +1606,12 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
                    [tcfalse, tcfalse, tcfalse, tcfalse]]
     if "ELG" in tcnames:
         for south in south_cuts:
-            elg_classes[int(south)] = isELG(
+            elg_classes[int(south)] = cutters[south](
+                isELG,
                 primary=primary, gflux=gflux, rflux=rflux, zflux=zflux,
                 gsnr=gsnr, rsnr=rsnr, zsnr=zsnr, gfiberflux=gfiberflux,
                 gnobs=gnobs, rnobs=rnobs, znobs=znobs, maskbits=maskbits,
-                south=south
+                south=south, phot=phot
             )
 
     elgsvgtot_n, elgsvgfib_n, elgfdrgtot_n, elgfdrgfib_n = elg_classes[0]
@@ -1548,13 +1634,14 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
         for south in south_cuts:
             qso_store = []
             qso_store.append(
-                isQSO_cuts(
+                cutters[south](
+                    isQSO_cuts,
                     primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
                     w1flux=w1flux, w2flux=w2flux,
                     gnobs=gnobs, rnobs=rnobs, znobs=znobs,
                     dchisq=dchisq, maskbits=maskbits,
                     objtype=objtype, w1snr=w1snr, w2snr=w2snr,
-                    south=south
+                    south=south, phot=phot
                 )
             )
             # ADM SV mock selection needs to apply only the color cuts
@@ -1564,39 +1651,43 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
                 qso_store.append(tcfalse)
             else:
                 qso_store.append(
-                    isQSO_randomforest(
+                    cutters[south](
+                        isQSO_randomforest,
                         primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
                         w1flux=w1flux, w2flux=w2flux,
                         gnobs=gnobs, rnobs=rnobs, znobs=znobs,
                         dchisq=dchisq, maskbits=maskbits,
                         ra=ra, dec=dec,
-                        objtype=objtype, south=south
+                        objtype=objtype, south=south, phot=phot
                     )
                 )
                 qso_store.append(
-                    isQSO_highz_faint(
+                    cutters[south](
+                        isQSO_highz_faint,
                         primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
                         w1flux=w1flux, w2flux=w2flux,
                         gnobs=gnobs, rnobs=rnobs, znobs=znobs,
                         dchisq=dchisq, maskbits=maskbits,
                         ra=ra, dec=dec,
-                        objtype=objtype, south=south
+                        objtype=objtype, south=south, phot=phot
                     )
                 )
             qso_store.append(
-                isQSO_color_high_z(
+                cutters[south](
+                    isQSO_color_high_z,
                     gflux=gflux, rflux=rflux, zflux=zflux,
-                    w1flux=w1flux, w2flux=w2flux, south=south
+                    w1flux=w1flux, w2flux=w2flux, south=south, phot=phot
                 )
             )
             qso_store.append(
-                isQSOz5_cuts(
+                cutters[south](
+                    isQSOz5_cuts,
                     primary=primary, gflux=gflux, rflux=rflux, zflux=zflux,
                     gsnr=gsnr, rsnr=rsnr, zsnr=zsnr,
                     gnobs=gnobs, rnobs=rnobs, znobs=znobs,
                     w1flux=w1flux, w2flux=w2flux, w1snr=w1snr, w2snr=w2snr,
                     dchisq=dchisq, maskbits=maskbits, objtype=objtype,
-                    south=south
+                    south=south, phot=phot
                 )
             )
             qso_classes[int(south)] = qso_store
@@ -1635,7 +1726,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
             bgs_store = []
             for targtype in ["bright", "faint", "faint_ext", "lowq", "fibmag"]:
                 bgs_store.append(
-                    isBGS(
+                    cutters[south](
+                        isBGS,
                         gflux=gflux, rflux=rflux, zflux=zflux, w1flux=w1flux, w2flux=w2flux,
                         rfiberflux=rfiberflux, gnobs=gnobs, rnobs=rnobs, znobs=znobs,
                         gfracmasked=gfracmasked, rfracmasked=rfracmasked, zfracmasked=zfracmasked,
@@ -1662,13 +1754,15 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     mws_classes = [[tcfalse, tcfalse], [tcfalse, tcfalse]]
     mws_nearby = tcfalse
     if "MWS" in tcnames:
-        mws_nearby = isMWS_nearby(
+        mws_nearby = blockcutter(
+            isMWS_nearby,
             gaia=gaia, gaiagmag=gaiagmag, parallax=parallax,
             parallaxerr=parallaxerr
         )
         # ADM run the MWS_MAIN target types for both north and south
         for south in south_cuts:
-            mws_classes[int(south)] = isMWS_main_sv(
+            mws_classes[int(south)] = cutters[south](
+                    isMWS_main_sv,
                     gaia=gaia, gaiaaen=gaiaaen, gaiadupsource=gaiadupsource,
                     gflux=gflux, rflux=rflux, obs_rflux=obs_rflux, objtype=objtype,
                     gnobs=gnobs, rnobs=rnobs,
@@ -1685,7 +1779,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
     # APC assignment std_wd = mws_wd could be done here rather than below.
     mws_wd = tcfalse
     if "MWS" in tcnames or "STD" in tcnames:
-        mws_wd = isMWS_WD(
+        mws_wd = blockcutter(
+            isMWS_WD,
             gaia=gaia, galb=galb, astrometricexcessnoise=gaiaaen,
             pmra=pmra, pmdec=pmdec, parallax=parallax, parallaxovererror=parallaxovererror,
             photbprpexcessfactor=gaiabprpfactor, astrometricsigma5dmax=gaiasigma5dmax,
@@ -1703,7 +1798,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
         std_classes = []
         for bright in [False, True]:
             std_classes.append(
-                isSTD(
+                blockcutter(
+                    isSTD,
                     primary=primary, zflux=zflux, rflux=rflux, gflux=gflux,
                     gfracflux=gfracflux, rfracflux=rfracflux, zfracflux=zfracflux,
                     gfracmasked=gfracmasked, rfracmasked=rfracmasked, objtype=objtype,
@@ -1711,7 +1807,8 @@ def set_target_bits(photsys_north, photsys_south, obs_rflux,
                     gfluxivar=gfluxivar, rfluxivar=rfluxivar, zfluxivar=zfluxivar,
                     gaia=gaia, astrometricexcessnoise=gaiaaen, paramssolved=gaiaparamssolved,
                     pmra=pmra, pmdec=pmdec, parallax=parallax, dupsource=gaiadupsource,
-                    gaiagmag=gaiagmag, gaiabmag=gaiabmag, gaiarmag=gaiarmag, bright=bright
+                    gaiagmag=gaiagmag, gaiabmag=gaiabmag, gaiarmag=gaiarmag, bright=bright,
+                    phot=phot
                 )
             )
         std_faint, std_bright = std_classes
@@ -0,0 +1,191 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""Test desitarget.brickimages.
+"""
+import unittest
+from unittest.mock import patch
+from pkg_resources import resource_filename
+import os
+import numpy as np
+import fitsio
+from glob import glob
+
+from desitarget.brickimages import BrickImages
+from desitarget.brickimages import aperture_weights, aperture_photometry
+from desitarget import randoms, skyfibers
+from desitarget.skyutilities.legacypipe.util import LegacySurveyData
+
+
+class TestBRICKIMAGES(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.drdir = resource_filename('desitarget.test', 'dr6')
+        cls.brickname = '0959p805'
+        cls.imfns = sorted(glob("{}/coadd/*/{}/*.fits.fz".format(
+            cls.drdir, cls.brickname)))
+        cls.blobfn = glob("{}/metrics/*/blobs-{}.fits.gz".format(
+            cls.drdir, cls.brickname))[0]
+        rng = np.random.RandomState(616)
+        cls.x, cls.y = rng.randint(0, 3600, (2, 200))
+
+    def test_values(self):
+        """Test look-ups from tiles match look-ups in the full image.
+        """
+        for fn in self.imfns:
+            img = fitsio.read(fn)
+            images = BrickImages()
+            vals = images.values(fn, self.x, self.y)
+            self.assertTrue(np.all(vals == img[self.y, self.x]))
+            # ADM only some tiles were read, not the full image.
+            key = list(images.nread)[0]
+            self.assertTrue(0 < len(images._tiles[key]) < 1296)
+            self.assertEqual(len(images._images), 0)
+            # ADM already-read tiles aren't read again.
+            vals = images.values(fn, self.x[:10], self.y[:10])
+            self.assertTrue(np.all(vals == img[self.y[:10], self.x[:10]]))
+            self.assertEqual(images.nread[key], 1)
+            # ADM touching most tiles reads the full image.
+            images = BrickImages(tilefrac=0.01)
+            vals = images.values(fn, self.x, self.y)
+            self.assertTrue(np.all(vals == img[self.y, self.x]))
+            self.assertEqual(len(images._images), 1)
+
+    def test_keep(self):
+        """Test a cache that doesn't keep images returns the same values.
+        """
+        for fn in self.imfns[:2]:
+            img = fitsio.read(fn)
+            for tilefrac in 0.2, 0.01:
+                images = BrickImages(tilefrac=tilefrac, keep=False)
+                vals = images.values(fn, self.x, self.y)
+                self.assertTrue(np.all(vals == img[self.y, self.x]))
+                self.assertTrue(np.all(images.image(fn) == img))
+                self.assertEqual(len(images._images), 0)
+                self.assertEqual(len(images._tiles), 0)
+
+    def test_wcs(self):
+        """Test the WCS is shared by images on the same pixel grid.
+        """
+        images = BrickImages()
+        wcs = images.wcs(self.blobfn)
+        for fn in self.imfns:
+            self.assertTrue(images.wcs(fn) is wcs)
+        ras, decs = wcs.all_pix2world(self.x, self.y, 0)
+        x, y = images.world2pix(self.imfns[0], ras, decs)
+        self.assertTrue(np.allclose(x, self.x) and np.allclose(y, self.y))
+        self.assertTrue(images.world2pix(self.imfns[1], ras, decs)[0] is x)
+
+    def test_shared_reads(self):
+        """Test several look-ups in a brick only read each image once.
+        """
+        ras, decs = randoms.randoms_in_a_brick_from_edges(
+            95.83, 96.07, 80.375, 80.625, density=10000, wrap=False)
+        q = randoms.quantities_at_positions_in_a_brick(
+            ras, decs, self.brickname, self.drdir, aprad=0)
+        images = BrickImages()
+        for fn in self.imfns:
+            _ = images.image(fn)
+        qshared = randoms.quantities_at_positions_in_a_brick(
+            ras, decs, self.brickname, self.drdir, aprad=0, images=images)
+        for key in q:
+            self.assertTrue(np.all(q[key] == qshared[key]))
+        self.assertEqual(set(images.nread.values()), set([1]))
+        with images:
+            pass
+        self.assertEqual(len(images._images), 0)
+
+    def test_randoms_and_skies(self):
+        """Test randoms and skies for a brick read each coadd once.
+        """
+        survey = LegacySurveyData(self.drdir)
+        edges = 95.83, 96.07, 80.375, 80.625
+        skyargs = {"nskiespersqdeg": 64, "apertures_arcsec": [0.75]}
+        # ADM the dust maps aren't part of the test data, and E(B-V)
+        # ADM doesn't depend on the images of the brick.
+        with patch.object(randoms, "get_dust",
+                          side_effect=lambda ras, decs, **kw: np.zeros(len(ras))):
+            rands = randoms.get_quantities_in_a_brick(
+                *edges, self.brickname, density=10000, drdir=self.drdir)
+            skies = skyfibers.make_skies_for_a_brick(
+                survey, self.brickname, **skyargs)
+            images = BrickImages()
+            rands2, skies2 = randoms.randoms_and_skies_in_a_brick(
+                *edges, self.brickname, survey, density=10000,
+                drdir=self.drdir, images=images, **skyargs)
+        self.assertTrue(np.all(rands == rands2))
+        self.assertTrue(np.all(skies == skies2))
+        # ADM each coadd was read, and read only once.
+        for fn in self.imfns:
+            self.assertTrue(any(key[0] == os.path.abspath(fn)
+                                for key in images.nread))
+        self.assertEqual(set(images.nread.values()), set([1]))
+
+    def test_aperture_weights(self):
+        """Test aperture weights sum to the area of the aperture.
+        """
+        rng = np.random.RandomState(616)
+        dx, dy = rng.uniform(-0.5, 0.5, (2, 20))
+        for radius in [0.3, 1., 2.86, 7.6]:
+            w = aperture_weights(dx, dy, radius)
+            self.assertTrue(np.all((w >= 0) & (w <= 1 + 1e-12)))
+            self.assertTrue(np.allclose(w.sum(axis=(1, 2)), np.pi*radius**2))
+
+    def test_aperture_photometry(self):
+        """Test aperture photometry on constant and off-image apertures.
+        """
+        image = np.ones((50, 60))
+        ivar = np.full_like(image, 4.)
+        x = np.array([30., 30.3, -0.5, -0.5, -20.])
+        y = np.array([25., 24.8, 25., -0.5, 0.])
+        radius = 5.
+        flux, err = aperture_photometry(image, x, y, radius, ivar=ivar)
+        area = np.pi*radius**2
+        # ADM apertures on the image sum to their area, with
+        # ADM a variance of 1/ivar per unit area...
+        self.assertTrue(np.allclose(flux[:2], area))
+        self.assertTrue(np.allclose(err[:2], np.sqrt(area/4.)))
+        # ADM ...apertures on the edge (the image starts at -0.5) only
+        # ADM sum to the part of their area on the image...
+        self.assertTrue(np.allclose(flux[2:4], [area/2, area/4]))
+        # ADM ...and apertures off the image are NaN.
+        self.assertTrue(np.isnan(flux[4]) and np.isnan(err[4]))
+        # ADM only the flux is returned if ivar isn't passed.
+        self.assertTrue(np.all(aperture_photometry(image, x, y, radius)[:4]
+                               == flux[:4]))
+
+    def test_aperture_photometry_photutils(self):
+        """Test aperture photometry matches photutils, where installed.
+        """
+        try:
+            from photutils.aperture import CircularAperture
+            from photutils.aperture import aperture_photometry as apphot
+        except ImportError:
+            self.skipTest("photutils is not installed")
+        img = fitsio.read(self.imfns[0])
+        rng = np.random.RandomState(616)
+        x, y = rng.uniform(-5, 3605, (2, 100))
+        ivar = rng.uniform(0, 1, img.shape)
+        ivar[ivar < 0.1] = 0
+        with np.errstate(divide='ignore'):
+            sigma = np.where(ivar > 0, 1./np.sqrt(ivar), 0)
+        for radius in [0.75, 2.86, 7.6]:
+            flux, err = aperture_photometry(img, x, y, radius, ivar=ivar)
+            aper = CircularAperture(np.vstack((x, y)).T, radius)
+            p = apphot(img, aper, error=sigma)
+            self.assertTrue(np.allclose(flux, p['aperture_sum'],
+                                        rtol=1e-9, atol=1e-9))
+            self.assertTrue(np.allclose(err, p['aperture_sum_err'],
+                                        rtol=1e-6))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+def test_suite():
+    """Allows testing of only this module with the command:
+
+        python setup.py test -m desitarget.test.test_brickimages
+    """
+    return unittest.defaultTestLoader.loadTestsFromName(__name__)
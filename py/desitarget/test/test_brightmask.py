@@ -15,7 +15,7 @@ import healpy as hp
 import tempfile
 import shutil
 
-from desitarget import brightmask, io
+from desitarget import brightmask, geomask, io
 from desitarget.targetmask import desi_mask, targetid_mask
 
 from desiutil import brick
@@ -197,6 +197,52 @@ class TestBRIGHTMASK(unittest.TestCase):
         # ADM none of the targets should be in a mask.
         self.assertTrue(np.all(mxtargs["DESI_TARGET"] == 0))
 
+    def test_is_in_bright_mask(self):
+        """Test targets in circular and elliptical masks of many radii.
+        """
+        # ADM invent masks with radii spanning several orders of
+        # ADM magnitude, about half of which are ellipses.
+        np.random.seed(626)
+        nmask, ntarg = 200, 20000
+        mask = np.zeros(nmask, dtype=brightmask.maskdatamodel.dtype)
+        mask["RA"] = np.random.uniform(0, 0.5, nmask)
+        mask["DEC"] = np.random.uniform(60, 60.5, nmask)
+        mask["IN_RADIUS"] = 10**np.random.uniform(0, 2.5, nmask)
+        mask["NEAR_RADIUS"] = 2*mask["IN_RADIUS"]
+        ell = np.random.random(nmask) < 0.5
+        mask["E1"][ell] = np.random.uniform(-0.6, 0.6, np.sum(ell))
+        mask["E2"][ell] = np.random.uniform(-0.6, 0.6, np.sum(ell))
+        mask["TYPE"] = np.where(ell, 'DEV', 'PSF')
+        targs = np.zeros(ntarg, dtype=[('RA', '>f8'), ('DEC', '>f8')])
+        targs["RA"] = np.random.uniform(0, 0.5, ntarg)
+        targs["DEC"] = np.random.uniform(60, 60.5, ntarg)
+
+        (inm, nearm), (usedin, usednear) = brightmask.is_in_bright_mask(
+            targs, mask)
+
+        # ADM check against testing every target against every mask.
+        for ismask, used, radius in zip([inm, nearm], [usedin, usednear],
+                                        ["IN_RADIUS", "NEAR_RADIUS"]):
+            brute = np.zeros((nmask, ntarg), dtype=bool)
+            ctargs = SkyCoord(targs["RA"]*u.degree, targs["DEC"]*u.degree)
+            for i, m in enumerate(mask):
+                if ell[i]:
+                    brute[i] = geomask.is_in_ellipse(
+                        targs["RA"], targs["DEC"], m["RA"], m["DEC"],
+                        m[radius], m["E1"], m["E2"])
+                else:
+                    cmask = SkyCoord(m["RA"]*u.degree, m["DEC"]*u.degree)
+                    brute[i] = ctargs.separation(cmask).arcsec < m[radius]
+            self.assertTrue(np.any(brute[ell]))
+            self.assertTrue(np.all(ismask == np.any(brute, axis=0)))
+            self.assertTrue(np.all(used == np.any(brute, axis=1)))
+
+        # ADM only calculating the IN_RADIUS gives the same answer.
+        (inonly, ), (usedinonly, ) = brightmask.is_in_bright_mask(
+            targs, mask, inonly=True)
+        self.assertTrue(np.all(inonly == inm))
+        self.assertTrue(np.all(usedinonly == usedin))
+
     def test_safe_locations(self):
         """Test SAFE/BADSKY locations are equidistant from mask centers.
         """
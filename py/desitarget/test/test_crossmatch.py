@@ -0,0 +1,106 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""Test desitarget.crossmatch.
+"""
+import unittest
+import numpy as np
+from astropy.coordinates import SkyCoord
+from astropy import units as u
+
+from desitarget import crossmatch
+
+
+class TestCROSSMATCH(unittest.TestCase):
+
+    def setUp(self):
+        # ADM random locations in a small patch, with some near the pole
+        # ADM and across RA=0 to test the spherical geometry.
+        np.random.seed(616)
+        n1, n2 = 2000, 3000
+        self.ra1 = np.random.uniform(-0.05, 0.05, n1) % 360
+        self.dec1 = np.random.uniform(-0.05, 0.05, n1)
+        self.ra2 = np.random.uniform(-0.05, 0.05, n2) % 360
+        self.dec2 = np.random.uniform(-0.05, 0.05, n2)
+        self.ra1[:100] = np.random.uniform(0, 360, 100)
+        self.dec1[:100] = np.random.uniform(89.99, 90, 100)
+        self.ra2[:100] = np.random.uniform(0, 360, 100)
+        self.dec2[:100] = np.random.uniform(89.99, 90, 100)
+        self.c1 = SkyCoord(self.ra1*u.degree, self.dec1*u.degree)
+        self.c2 = SkyCoord(self.ra2*u.degree, self.dec2*u.degree)
+
+    def test_conversions(self):
+        """Test conversions between separations and chords.
+        """
+        sep = np.array([0., 0.1, 1., 3600., 180*3600.])
+        chord = crossmatch.sep2chord(sep)
+        self.assertTrue(np.allclose(chord[-1], 2.))
+        self.assertTrue(np.allclose(crossmatch.chord2sep(chord), sep))
+        xyz = crossmatch.radec2xyz(self.ra1, self.dec1)
+        self.assertTrue(np.allclose(np.sum(xyz**2, axis=1), 1.))
+
+    def test_match_nearest(self):
+        """Test nearest matches are the same as astropy matches.
+        """
+        idx, d2d, _ = self.c1.match_to_catalog_sky(self.c2)
+        idx2, d2d2 = crossmatch.match_nearest(
+            self.ra1, self.dec1, self.ra2, self.dec2)
+        self.assertTrue(np.all(idx == idx2))
+        self.assertTrue(np.allclose(d2d.arcsec, d2d2, rtol=0, atol=1e-6))
+
+        # ADM restricting the separation should flag unmatched objects.
+        sep = 2.
+        idx2, d2d2 = crossmatch.match_nearest(
+            self.ra1, self.dec1, self.ra2, self.dec2, sep=sep)
+        ii = d2d.arcsec < sep
+        self.assertTrue(np.all(idx2[ii] == idx[ii]))
+        self.assertTrue(np.all(idx2[~ii] == len(self.ra2)))
+        self.assertTrue(np.all(np.isinf(d2d2[~ii])))
+
+        # ADM an empty catalog means no matches.
+        idx2, d2d2 = crossmatch.match_nearest(
+            self.ra1, self.dec1, [], [], sep=sep)
+        self.assertTrue(np.all(idx2 == 0))
+        self.assertTrue(np.all(np.isinf(d2d2)))
+
+    def test_search_around(self):
+        """Test pairs of matches are the same as astropy matches.
+        """
+        sep = 5.
+        i1, i2, d2d, _ = self.c2.search_around_sky(self.c1, sep*u.arcsec)
+        j1, j2, d2d2 = crossmatch.search_around(
+            self.ra1, self.dec1, self.ra2, self.dec2, sep)
+        self.assertTrue(len(j1) > 0)
+        ii = np.lexsort([i2, i1])
+        self.assertTrue(np.all(i1[ii] == j1))
+        self.assertTrue(np.all(i2[ii] == j2))
+        self.assertTrue(np.allclose(d2d.arcsec[ii], d2d2, rtol=0, atol=1e-6))
+
+        # ADM matching a set of objects to itself includes self-matches.
+        j1, j2, d2d2 = crossmatch.search_around(
+            self.ra1, self.dec1, self.ra1, self.dec1, sep)
+        self.assertTrue(np.all(np.isin(np.arange(len(self.ra1)), j1[j1 == j2])))
+
+    def test_search_around_variable(self):
+        """Test pairs within a per-object radius.
+        """
+        sep2 = np.random.uniform(1, 10, len(self.ra2))
+        j1, j2, d2d = crossmatch.search_around_variable(
+            self.ra1, self.dec1, self.ra2, self.dec2, sep2)
+        self.assertTrue(len(j1) > 0)
+        self.assertTrue(np.all(d2d < sep2[j2]))
+        # ADM check against a brute-force calculation.
+        i1, i2, d2da, _ = self.c2.search_around_sky(self.c1, 10*u.arcsec)
+        ii = d2da.arcsec < sep2[i2]
+        self.assertEqual(set(zip(i1[ii], i2[ii])), set(zip(j1, j2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+def test_suite():
+    """Allows testing of only this module with the command:
+
+        python setup.py test -m desitarget.test.test_crossmatch
+    """
+    return unittest.defaultTestLoader.loadTestsFromName(__name__)
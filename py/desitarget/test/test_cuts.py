@@ -5,6 +5,8 @@
 import unittest
 from pkg_resources import resource_filename
 import os.path
+import shutil
+import tempfile
 from uuid import uuid4
 import numbers
 import warnings
@@ -16,7 +18,9 @@ import numpy as np
 import healpy as hp
 
 from desitarget import io, cuts
-from desitarget.targetmask import desi_mask
+from desitarget.gaiamatch import gaia_dr_from_ref_cat
+from desitarget.targets import finalize
+from desitarget.targetmask import desi_mask, bgs_mask, mws_mask
 from desitarget.geomask import hp_in_box, pixarea2nside, box_area
 
 
@@ -52,6 +56,12 @@ class TestCuts(unittest.TestCase):
         # treat some specific warnings as errors so we can find and fix
         # (could turn off if this becomes problematic)
         warnings.filterwarnings('error', '.*Calling nonzero on 0d arrays.*')
+        # ADM a directory for any files written by the tests.
+        self.testdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        if os.path.exists(self.testdir):
+            shutil.rmtree(self.testdir, ignore_errors=True)
 
     def test_unextinct_fluxes(self):
         """Test function that unextincts fluxes
@@ -66,6 +76,35 @@ class TestCuts(unittest.TestCase):
             self.assertIn(col, t2.dtype.names)
             self.assertTrue(np.all(t1[col] == t2[col]))
 
+    def test_photometry_cache(self):
+        """Test the shared Photometry cache matches direct calculations
+        """
+        targets = io.read_tractor(self.sweepfiles[0])
+        flux = cuts.unextinct_fluxes(targets)
+        gflux, rflux, zflux = flux['GFLUX'], flux['RFLUX'], flux['ZFLUX']
+        phot = cuts.Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+
+        # ADM magnitudes and colors are calculated once and cached.
+        gmag = phot.mag("g")
+        self.assertIs(gmag, phot.mag("g"))
+        self.assertTrue(np.all(gmag == 22.5-2.5*np.log10(gflux.clip(1e-16))))
+        rz = 2.5*np.log10(zflux.clip(1e-7) / rflux.clip(1e-7))
+        self.assertTrue(np.all(phot.color("r", "z", clip=1e-7) == rz))
+
+        # ADM shifted fluxes match shift_photo_north().
+        gs, rs, zs = cuts.shift_photo_north(gflux, rflux, zflux)
+        for band, shifted in zip("grz", [gs, rs, zs]):
+            self.assertTrue(np.all(phot.flux(band, shift=True) == shifted))
+        self.assertIs(phot.flux("g", shift=True), phot.flux("g", shift=True))
+
+        # ADM passing the cache doesn't change the selection.
+        elg = cuts.isELG_colors(gflux=gflux, rflux=rflux, zflux=zflux,
+                                south=False)
+        phot = cuts.Photometry(gflux=gflux, rflux=rflux, zflux=zflux)
+        elgphot = cuts.isELG_colors(gflux=gflux, rflux=rflux, zflux=zflux,
+                                    south=False, phot=phot)
+        self.assertTrue(np.all(elg == elgphot))
+
     def test_cuts_basic(self):
         """Test cuts work with either data or filenames
         """
@@ -299,6 +338,86 @@ class TestCuts(unittest.TestCase):
 
                 self.assertTrue(np.all(t1[col][notNaN] == t2[col][notNaN]))
 
+    def test_partition(self):
+        """Test partitioning sources into north/south for the cuts
+        """
+        objects = io.read_tractor(self.sweepfiles[0])
+        # ADM mix up northern and southern sources.
+        isn = np.arange(len(objects)) % 2 == 1
+        objects["PHOTSYS"][isn] = "N"
+        objects["PHOTSYS"][~isn] = "S"
+
+        # ADM set BGS_FAINT_HIP per source, so it doesn't depend on
+        # ADM which sources are passed together.
+        kw = {"qso_selection": "colorcuts", "hipradec": True}
+        mix = cuts.apply_cuts(objects, **kw)
+        part = cuts.apply_cuts(objects, partition=True, **kw)
+        north = cuts.apply_cuts(objects[isn], **kw)
+        south = cuts.apply_cuts(objects[~isn], **kw)
+
+        for mask, m, p, n, s in zip([desi_mask, bgs_mask, mws_mask],
+                                    mix, part, north, south):
+            # ADM the bits that are specific to north/south imaging.
+            hemi = sum([mask[bit] for bit in mask.names()
+                        if bit[-6:] in ["_NORTH", "_SOUTH"]])
+            # ADM the combined bits are unchanged by partitioning...
+            self.assertTrue(np.all(p & ~hemi == m & ~hemi))
+            # ADM ...and all bits match passing north/south separately.
+            self.assertTrue(np.all(p[isn] == n))
+            self.assertTrue(np.all(p[~isn] == s))
+
+        # ADM partitioning works if no sources are from one of the
+        # ADM photometric systems.
+        objects["PHOTSYS"] = "N"
+        part = cuts.apply_cuts(objects, partition=True, **kw)
+        for p, n in zip(part, cuts.apply_cuts(objects, **kw)):
+            self.assertTrue(np.all(p == n))
+
+    def test_bgs_faint_hip_seed(self):
+        """Test BGS_FAINT_HIP draws don't depend on how sources are split
+        """
+        rng = np.random.RandomState(1)
+        ra, dec = rng.uniform(0, 360, 100000), rng.uniform(-90, 90, 100000)
+        u = cuts._uniform_from_radec(ra, dec)
+        self.assertTrue(np.all((u >= 0) & (u < 1)))
+        self.assertTrue(np.abs(np.mean(u < 0.1) - 0.1) < 0.005)
+        # ADM the same for subsets of sources and for single sources.
+        self.assertTrue(np.all(u[::7] == cuts._uniform_from_radec(ra[::7],
+                                                                   dec[::7])))
+        self.assertEqual(u[3], cuts._uniform_from_radec(ra[3], dec[3]))
+
+        # ADM by default, exactly 10% of BGS_FAINT sources are BGS_FAINT_HIP.
+        faint = rng.uniform(size=len(ra)) < 0.3
+        zflux = rng.uniform(0, 10, len(ra))
+        hip = cuts._bgs_faint_hip(faint, zflux, ra, dec)
+        self.assertEqual(np.sum(hip), np.sum(faint)//10)
+        self.assertTrue(np.all(faint[hip]))
+        self.assertTrue(np.all(hip == cuts._bgs_faint_hip(faint, zflux, ra, dec)))
+        # ADM with hipradec, the draws come from RA/Dec.
+        hip = cuts._bgs_faint_hip(faint, zflux, ra, dec, hipradec=True)
+        self.assertTrue(np.all(hip == (faint & (u < 0.1))))
+
+    def test_blocksize(self):
+        """Test applying the cuts in blocks of objects doesn't change bits
+        """
+        for fn in self.tractorfiles[0], self.sweepfiles[0]:
+            objects = io.read_tractor(fn)
+            for survey in "main", "sv1":
+                kw = {"qso_selection": "colorcuts", "survey": survey}
+                bits = cuts.apply_cuts(objects, **kw)
+                # ADM include a block size that doesn't divide the objects.
+                for blocksize in 2, 3, len(objects):
+                    blockbits = cuts.apply_cuts(objects, blocksize=blocksize, **kw)
+                    for b, bb in zip(bits, blockbits):
+                        self.assertTrue(np.all(b == bb))
+                # ADM and combined with partitioning into north/south.
+                objects["PHOTSYS"][::2] = "N"
+                part = cuts.apply_cuts(objects, partition=True, **kw)
+                blockpart = cuts.apply_cuts(objects, partition=True,
+                                            blocksize=2, **kw)
+                for p, bp in zip(part, blockpart):
+                    self.assertTrue(np.all(p == bp))
+
     def test_qso_selection_options(self):
         """Test the QSO selection options are passed correctly
         """
@@ -352,6 +471,153 @@ class TestCuts(unittest.TestCase):
                 bgs2 = targets['BGS_TARGET'] != 0
                 self.assertTrue(np.all(bgs1 == bgs2))
 
+    def test_chunked_and_spooled_select(self):
+        """Test reading in chunks and spooling to disk recovers same targets
+        """
+        # ADM only test the ELG, BGS cuts for speed.
+        tc = ["ELG", "BGS"]
+        infiles = self.sweepfiles
+
+        # ADM set backup to False as the Gaia unit test
+        # ADM files only cover a limited pixel range. Set BGS_FAINT_HIP
+        # ADM per source, so it doesn't depend on the chunks.
+        targets = cuts.select_targets(infiles, numproc=1, tcnames=tc,
+                                      backup=False, hipradec=True)
+        t1 = cuts.select_targets(infiles, numproc=1, tcnames=tc,
+                                 backup=False, chunksize=100, hipradec=True)
+        self.assertEqual(targets.dtype, t1.dtype)
+        for col in targets.dtype.names:
+            self.assertTrue(np.all(targets[col] == t1[col]))
+
+        spooldir = os.path.join(self.testdir, "spool")
+        spool = cuts.select_targets(infiles, numproc=2, tcnames=tc,
+                                    backup=False, chunksize=100,
+                                    nside=self.nside, spooldir=spooldir,
+                                    hipradec=True)
+        t2 = np.concatenate([spool.read(pix) for pix in spool.pixels()])
+        spool.cleanup()
+        self.assertEqual(len(targets), len(t2))
+        t2 = t2[np.argsort(t2["TARGETID"])]
+        ii = np.argsort(targets["TARGETID"])
+        for col in targets.dtype.names:
+            if col[-7:] == "_TARGET" or col == "TARGETID":
+                self.assertTrue(np.all(targets[col][ii] == t2[col]))
+
+    def test_prepared_cache(self):
+        """Test caching the processed sweeps recovers the same targets
+        """
+        # ADM only test the ELG, BGS, MWS cuts for speed.
+        tc = ["ELG", "BGS", "MWS"]
+        infiles = self.sweepfiles
+        cachedir = os.path.join(self.testdir, "cache")
+
+        # ADM set backup to False as the Gaia unit test
+        # ADM files only cover a limited pixel range.
+        targets = cuts.select_targets(infiles, numproc=1, tcnames=tc,
+                                      backup=False)
+        # ADM the first run writes the cache, the second reads it.
+        for i in range(2):
+            t = cuts.select_targets(infiles, numproc=1, tcnames=tc,
+                                    backup=False, cachedir=cachedir)
+            self.assertEqual(targets.dtype, t.dtype)
+            for col in targets.dtype.names:
+                self.assertTrue(np.all(targets[col] == t[col]))
+            self.assertEqual(len(os.listdir(cachedir)), len(infiles))
+
+        # ADM the cached arrays are the same as processing the sweeps...
+        objs, prepared = cuts.read_prepared_sweep(infiles[0], cachedir)
+        objs2, prepared2 = cuts.read_prepared_sweep(infiles[0])
+        self.assertTrue(np.all(objs == objs2))
+        self.assertEqual(set(prepared), set(prepared2))
+        for name in prepared:
+            self.assertTrue(np.all(prepared[name] == prepared2[name]))
+
+        # ADM ...and a change in the processing creates a new cache entry.
+        objs, prepared = cuts.read_prepared_sweep(infiles[0], cachedir,
+                                                  mask=False)
+        self.assertEqual(len(os.listdir(cachedir)), len(infiles) + 1)
+
+        # ADM a passed checksum gives the same key as reading the file.
+        key = cuts._prepared_sweep_key(infiles[0], gaiamatch=True)
+        checksum = io.get_sha256sum(infiles[0])
+        self.assertEqual(key, cuts._prepared_sweep_key(
+            infiles[0], gaiamatch=True, checksum=checksum))
+        # ADM the key changes with the Gaia directory if matching to Gaia.
+        os.environ["GAIA_DIR"] = self.testdir
+        try:
+            self.assertNotEqual(key, cuts._prepared_sweep_key(
+                infiles[0], gaiamatch=True, checksum=checksum))
+            self.assertEqual(
+                cuts._prepared_sweep_key(infiles[0], checksum=checksum),
+                cuts._prepared_sweep_key(infiles[0]))
+        finally:
+            os.environ["GAIA_DIR"] = resource_filename('desitarget.test', 't4')
+
+    def test_checkpoint(self):
+        """Test a resumed run recovers the targets of an uninterrupted run
+        """
+        # ADM only test the ELG, BGS, MWS cuts for speed.
+        tc = ["ELG", "BGS", "MWS"]
+        infiles = self.sweepfiles
+        ckdir = os.path.join(self.testdir, "checkpoint")
+        manifest = os.path.join(ckdir, "manifest.txt")
+
+        # ADM set backup to False as the Gaia unit test
+        # ADM files only cover a limited pixel range.
+        targets = cuts.select_targets(infiles, numproc=1, tcnames=tc,
+                                      backup=False)
+        # ADM an "interrupted" run that only completed the first file.
+        _ = cuts.select_targets(infiles[:1], numproc=1, tcnames=tc,
+                                backup=False, checkpointdir=ckdir)
+        with open(manifest) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+        # ADM resume the run, which only processes the remaining files.
+        for numproc in [1, 2]:
+            t = cuts.select_targets(infiles, numproc=numproc, tcnames=tc,
+                                    backup=False, checkpointdir=ckdir)
+            with open(manifest) as f:
+                self.assertEqual(len(f.readlines()), len(infiles))
+            self.assertEqual(targets.dtype, t.dtype)
+            for col in targets.dtype.names:
+                self.assertTrue(np.all(targets[col] == t[col]))
+
+        # ADM different settings don't reuse the checkpointed targets.
+        t = cuts.select_targets(infiles, numproc=1, tcnames=["ELG"],
+                                backup=False, checkpointdir=ckdir)
+        with open(manifest) as f:
+            self.assertEqual(len(f.readlines()), 2*len(infiles))
+
+    def test_pruned_columns(self):
+        """Test reading only the needed columns recovers the same targets
+        """
+        for tc in ["LRG"], ["QSO"], ["MWS", "STD"]:
+            columns = cuts.columns_for_tcnames(tc)
+            for col in cuts.basecolumns:
+                self.assertTrue(col in columns)
+            for survey in "main", "sv1":
+                targets = cuts.select_targets(self.sweepfiles, numproc=1,
+                                              tcnames=tc, survey=survey,
+                                              backup=False)
+                # ADM including when reading the files in chunks.
+                for chunksize in None, 4:
+                    t1 = cuts.select_targets(self.sweepfiles, numproc=1,
+                                             tcnames=tc, survey=survey,
+                                             backup=False, prunecols=True,
+                                             chunksize=chunksize)
+                    # ADM the targets have the full data model.
+                    self.assertEqual(targets.dtype, t1.dtype)
+                    for col in t1.dtype.names:
+                        self.assertTrue(np.all(targets[col] == t1[col]))
+
+        # ADM a class can't be passed quantities from unread columns.
+        objects = io.read_tractor(self.sweepfiles[0])
+        columns = [col for col in objects.dtype.names if col != "FLUX_IVAR_R"]
+        objects = objects[columns]
+        with self.assertRaises(ValueError):
+            cuts.apply_cuts(objects, tcnames=["ELG"])
+        cuts.apply_cuts(objects, tcnames=["MWS"])
+
     def test_backup(self):
         """Test BACKUP targets are selected.
         """
@@ -373,6 +639,79 @@ class TestCuts(unittest.TestCase):
             bgs2 = targets['BGS_TARGET'] != 0
             self.assertTrue(np.all(bgs1 == bgs2))
 
+    def test_spooled_backup_across_pixels(self):
+        """Test spooled BACKUP targets aren't duplicated across pixels.
+        """
+        def _finalize(objects, desi_target, bgs_target, mws_target,
+                      gaiadr=None):
+            keep = desi_target != 0
+            return finalize(objects[keep], desi_target[keep],
+                            bgs_target[keep], mws_target[keep],
+                            darkbright=True, gaiadr=gaiadr[keep])
+
+        # ADM a backup target from the Gaia unit test files.
+        desi_target, bgs_target, mws_target, gaiaobjs = cuts.apply_cuts_gaia(
+            numproc=1, nside=self.nside, pixlist=self.pix)
+        gaiadr = gaia_dr_from_ref_cat(gaiaobjs["REF_CAT"])
+        star = _finalize(gaiaobjs, desi_target, bgs_target, mws_target,
+                         gaiadr=gaiadr)[:1].copy()
+
+        # ADM spool the star from the "sweeps" in a neighboring pixel
+        # ADM to its Gaia position, at a finer nside than the Gaia files.
+        nside = 4*self.nside
+        theta, phi = np.radians(90-star["DEC"]), np.radians(star["RA"])
+        gaiapix = hp.ang2pix(nside, theta, phi, nest=True)[0]
+        sweeppix = hp.get_all_neighbours(nside, gaiapix, nest=True)[0]
+        theta, phi = hp.pix2ang(nside, sweeppix, nest=True)
+        star["RA"], star["DEC"] = np.degrees(phi), 90-np.degrees(theta)
+        spool = io.HEALPixSpool(os.path.join(self.testdir, "spool"), nside)
+        spool.append(star)
+
+        nadded = cuts._spool_backup_targets(spool, numproc=1,
+                                            finalizer=_finalize)
+        targets = np.concatenate([spool.read(pix) for pix in spool.pixels()])
+        self.assertEqual(len(targets), nadded + 1)
+        ii = targets["REF_ID"] == star["REF_ID"][0]
+        self.assertEqual(np.sum(ii), 1)
+        self.assertEqual(targets["RA"][ii][0], star["RA"][0])
+
+    def test_spooled_duplicate_refid(self):
+        """Test spooled targets with duplicate REF_IDs match a default run
+        """
+        tc = ["BGS", "MWS"]
+        # ADM a sweep file with a second copy of a target from Gaia.
+        objs = fitsio.read(self.sweepfiles[0], upper=True)
+        targets = cuts.select_targets(self.sweepfiles[0], numproc=1,
+                                      tcnames=tc, backup=False)
+        targets = targets[targets["REF_ID"] > 0]
+        self.assertTrue(len(targets) > 0)
+        refid = targets["REF_ID"][0]
+        ii = np.where((objs["BRICKID"] == targets["BRICKID"][0]) &
+                      (objs["OBJID"] == targets["BRICK_OBJID"][0]))[0]
+        dup = objs[ii].copy()
+        dup["OBJID"] = np.max(objs["OBJID"]) + 1
+        sweepfn = os.path.join(self.testdir,
+                               os.path.basename(self.sweepfiles[0]))
+        fitsio.write(sweepfn, np.concatenate([objs, dup]))
+
+        # ADM limit to pixels covered in the Gaia unit test files.
+        targets = cuts.select_targets(sweepfn, numproc=1, tcnames=tc,
+                                      nside=self.nside, pixlist=self.pix)
+        spool = cuts.select_targets(sweepfn, numproc=1, tcnames=tc,
+                                    nside=self.nside, pixlist=self.pix,
+                                    spooldir=os.path.join(self.testdir, "spool"))
+        t = np.concatenate([spool.read(pix) for pix in spool.pixels()])
+        spool.cleanup()
+        # ADM the first copy of the target is retained.
+        ii = t["REF_ID"] == refid
+        self.assertEqual(np.sum(ii), 1)
+        self.assertNotEqual(t["BRICK_OBJID"][ii][0], dup["OBJID"][0])
+        self.assertEqual(len(targets), len(t))
+        targets = targets[np.argsort(targets["TARGETID"])]
+        t = t[np.argsort(t["TARGETID"])]
+        for col in targets.dtype.names:
+            self.assertTrue(np.all(targets[col] == t[col]))
+
     def test_targets_spatial(self):
         """Test applying RA/Dec/HEALpixel inputs to sweeps recovers same targets
         """
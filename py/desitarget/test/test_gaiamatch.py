@@ -0,0 +1,139 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""Test desitarget.gaiamatch.
+"""
+import unittest
+from pkg_resources import resource_filename
+import os
+import shutil
+import tempfile
+import fitsio
+import numpy as np
+from glob import glob
+from astropy.coordinates import SkyCoord
+from astropy import units as u
+
+from desitarget import gaiamatch
+from desitarget.crossmatch import radec2xyz, sep2chord
+
+
+class TestGAIAMATCH(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # ADM set up the necessary environment variables.
+        cls.gaiadir_orig = os.getenv("GAIA_DIR")
+        gaiadir = resource_filename('desitarget.test', 't4')
+        os.environ["GAIA_DIR"] = gaiadir
+        cls.gaiafiles = sorted(glob(os.path.join(gaiadir, 'healpix', '*')))
+
+    @classmethod
+    def tearDownClass(cls):
+        # ADM reset the environment variables.
+        if cls.gaiadir_orig is not None:
+            os.environ["GAIA_DIR"] = cls.gaiadir_orig
+
+    def tearDown(self):
+        # ADM reset the cache to its default size.
+        gaiamatch.set_gaia_cache_size(2*1024**3)
+
+    def test_cached_read(self):
+        """Test the cache of Gaia files and KD-trees.
+        """
+        fn = self.gaiafiles[0]
+        gaia, tree = gaiamatch.read_gaia_file_cached(fn)
+        self.assertTrue(np.all(gaia == gaiamatch.read_gaia_file(fn)))
+        self.assertEqual(tree.n, len(gaia))
+        # ADM cached data is read-only.
+        with self.assertRaises(ValueError):
+            gaia["REF_ID"][0] = -1
+
+        # ADM a second read should use the cache.
+        gaia2, tree2 = gaiamatch.read_gaia_file_cached(fn)
+        self.assertTrue(gaia2 is gaia)
+        self.assertTrue(tree2 is tree)
+
+        # ADM a cache with no room should be cleared and not reused.
+        gaiamatch.set_gaia_cache_size(0)
+        gaia3, _ = gaiamatch.read_gaia_file_cached(fn)
+        self.assertFalse(gaia3 is gaia)
+        self.assertTrue(np.all(gaia3 == gaia))
+
+    def test_cache_shared_by(self):
+        """Test the cache size is shared between parallel processes.
+        """
+        fn = self.gaiafiles[0]
+        gaia, tree = gaiamatch.read_gaia_file_cached(fn)
+        nbytes = gaia.nbytes + tree.data.nbytes + tree.indices.nbytes
+        # ADM room for the file in one process, but not in each of two.
+        gaiamatch.set_gaia_cache_size(nbytes + nbytes//2)
+        self.assertTrue(gaiamatch.read_gaia_file_cached(fn)[0] is gaia)
+        with gaiamatch.gaia_cache_shared_by(2):
+            gaia2, _ = gaiamatch.read_gaia_file_cached(fn)
+            self.assertFalse(gaia2 is gaia)
+            self.assertFalse(gaiamatch.read_gaia_file_cached(fn)[0] is gaia2)
+        # ADM the full size is restored outside of the pool.
+        gaia3, _ = gaiamatch.read_gaia_file_cached(fn)
+        self.assertTrue(gaiamatch.read_gaia_file_cached(fn)[0] is gaia3)
+
+    def test_tree_matches(self):
+        """Test KD-tree matches are the same as astropy matches.
+        """
+        gaia, tree = gaiamatch.read_gaia_file_cached(self.gaiafiles[0])
+        # ADM offset locations by ~0.5" from each Gaia source.
+        ra, dec = gaia["GAIA_RA"] + 0.5/3600, gaia["GAIA_DEC"]
+        xyz = radec2xyz(ra, dec)
+        for sep in 0.1, 1., 10.:
+            d, idgaia = tree.query(xyz, distance_upper_bound=sep2chord(sep))
+            idobjs = np.where(idgaia < len(gaia))[0]
+            cobjs = SkyCoord(ra*u.degree, dec*u.degree)
+            cgaia = SkyCoord(gaia["GAIA_RA"]*u.degree, gaia["GAIA_DEC"]*u.degree)
+            idx, d2d, _ = cobjs.match_to_catalog_sky(cgaia)
+            ii = d2d < sep*u.arcsec
+            self.assertTrue(np.all(idobjs == np.where(ii)[0]))
+            self.assertTrue(np.all(idgaia[idobjs] == idx[ii]))
+
+    def test_nearest_match(self):
+        """Test the nearest Gaia source within matchrad is the match.
+        """
+        # ADM two Gaia sources, 3" and 2" from the first of two objects.
+        objs = np.zeros(2, dtype=[('RA', '>f8'), ('DEC', '>f8')])
+        objs["RA"], objs["DEC"] = [150., 150.1], [20., 20.]
+        cosdec = np.cos(np.radians(20.))
+        gaia = fitsio.read(self.gaiafiles[0], upper=True,
+                           columns=list(gaiamatch.ingaiadatamodel.dtype.names))
+        gaia = gaia[:2].copy()
+        gaia["SOURCE_ID"] = [1, 2]
+        gaia["RA"], gaia["DEC"] = 150. + np.array([3., 2.])/3600/cosdec, 20.
+
+        # ADM write the sources to a temporary Gaia directory. Files for
+        # ADM neighboring pixels only contain a distant source.
+        gaiadir = tempfile.mkdtemp()
+        os.environ["GAIA_DIR"] = gaiadir
+        try:
+            os.makedirs(os.path.join(gaiadir, 'healpix'))
+            fn = gaiamatch.find_gaia_files(objs[:1], neighbors=False)[0]
+            for nfn in gaiamatch.find_gaia_files(objs):
+                if nfn == fn:
+                    fitsio.write(nfn, gaia)
+                else:
+                    far = gaia[:1].copy()
+                    far["RA"] += 30
+                    fitsio.write(nfn, far)
+            gaiainfo = gaiamatch.match_gaia_to_primary(objs, matchrad=5.)
+        finally:
+            os.environ["GAIA_DIR"] = resource_filename('desitarget.test', 't4')
+            shutil.rmtree(gaiadir)
+        self.assertEqual(list(gaiainfo["REF_ID"]), [2, -1])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+def test_suite():
+    """Allows testing of only this module with the command:
+
+        python setup.py test -m desitarget.test.test_gaiamatch
+    """
+    return unittest.defaultTestLoader.loadTestsFromName(__name__)
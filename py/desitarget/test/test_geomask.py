@@ -30,6 +30,27 @@ class TestGEOMASK(unittest.TestCase):
                                     surveydirs=[self.surveydir, self.surveydir2])
         self.assertTrue(foo is None)
 
+    def test_split_pixels(self):
+        """
+        Test HEALPixels are split into balanced groups
+        """
+        # ADM pixel 3 is touched by 4 files, pixel 5 by 2, etc.
+        pixnum = np.array([3, 3, 3, 3, 5, 5, 7, 9, 11, 11, 7])
+        groups = geomask.split_pixels(pixnum, 2)
+        self.assertEqual(len(groups), 2)
+        # ADM every pixel appears in exactly one group.
+        allpix = np.concatenate(groups)
+        self.assertTrue(np.all(np.sort(allpix) == np.unique(pixnum)))
+        # ADM the workloads are balanced.
+        loads = [np.sum(np.isin(pixnum, group)) for group in groups]
+        self.assertEqual(sorted(loads), [5, 6])
+        # ADM the split is deterministic.
+        for group, group2 in zip(groups, geomask.split_pixels(pixnum, 2)):
+            self.assertTrue(np.all(group == group2))
+        # ADM more groups than pixels leaves some groups empty.
+        groups = geomask.split_pixels(pixnum, 8)
+        self.assertEqual(sum([len(group) == 0 for group in groups]), 3)
+
 
 if __name__ == '__main__':
     unittest.main()
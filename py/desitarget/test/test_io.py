@@ -7,13 +7,52 @@ from pkg_resources import resource_filename
 import shutil
 import os.path
 from uuid import uuid4
+import json
 from astropy.io import fits
 import numpy as np
 import fitsio
+import healpy as hp
 
 from desitarget import io
 
 
+def _read_tractor_reference(filename, columns=None):
+    """The original, column-by-column, io.read_tractor()."""
+    indata = fitsio.read(filename, upper=True, columns=columns)
+    if "FRACDEV" in indata.dtype.names:
+        addedcols = io.dr8addedcols
+    else:
+        addedcols = io.dr9addedcols
+    tsdatamodel = np.array(
+        [], dtype=io.basetsdatamodel.dtype.descr + addedcols.dtype.descr)
+    from desitarget.gaiamatch import gaiadatamodel
+    from desitarget.gaiamatch import pop_gaia_coords, pop_gaia_columns
+    gaiadatamodel = pop_gaia_coords(gaiadatamodel)
+    for gaiacol in ['GAIA_PHOT_BP_RP_EXCESS_FACTOR',
+                    'GAIA_ASTROMETRIC_SIGMA5D_MAX',
+                    'GAIA_ASTROMETRIC_PARAMS_SOLVED', 'REF_CAT']:
+        if gaiacol not in indata.dtype.names:
+            gaiadatamodel = pop_gaia_columns(gaiadatamodel, [gaiacol])
+    dt = tsdatamodel.dtype.descr + gaiadatamodel.dtype.descr
+    dtnames = tsdatamodel.dtype.names + gaiadatamodel.dtype.names
+    if columns is not None:
+        dt = [d for d, name in zip(dt, dtnames) if name in columns]
+
+    data = np.zeros(len(indata), dtype=dt)
+    if "REF_ID" in data.dtype.names:
+        data['REF_ID'] = -1
+    for col in set(indata.dtype.names).intersection(set(data.dtype.names)):
+        data[col] = indata[col]
+    if "BRIGHTSTARINBLOB" in indata.dtype.names:
+        if "MASKBITS" in data.dtype.names:
+            data["MASKBITS"] = indata["BRIGHTSTARINBLOB"] << 1
+    for colname in data.dtype.names:
+        if data[colname].dtype.kind in 'US':
+            data[colname] = np.char.rstrip(data[colname])
+
+    return io.add_photsys(data)
+
+
 class TestIO(unittest.TestCase):
 
     @classmethod
@@ -124,6 +163,151 @@ class TestIO(unittest.TestCase):
             else:
                 self.assertTrue(np.all(data[column] == d2[column]))
 
+    def test_rstrip_in_place(self):
+        """Test trailing whitespace is stripped from string columns.
+        """
+        data = np.zeros(4, dtype=[('A', 'S4'), ('B', '>f4'), ('C', '<U3')])
+        data['A'] = [b'PSF ', b'  ', b'A B ', b'REX']
+        data['C'] = ['G2 ', ' ', 'a b', '']
+        data['B'] = np.arange(4)
+        strip = data.copy()
+        for col in 'A', 'C':
+            strip[col] = np.char.rstrip(strip[col])
+        io._rstrip_in_place(data)
+        for col in data.dtype.names:
+            self.assertTrue(np.all(data[col] == strip[col]))
+
+        # ADM check that strings read from sweeps files are stripped.
+        sweepfile = io.list_sweepfiles(self.datadir)[0]
+        data = io.read_tractor(sweepfile)
+        for col in 'BRICKNAME', 'TYPE', 'REF_CAT', 'PHOTSYS':
+            self.assertTrue(np.all(data[col] == np.char.rstrip(data[col])))
+
+    def test_read_tractor_reference(self):
+        """Test read_tractor matches the original column-by-column code.
+        """
+        infiles = io.list_sweepfiles(self.datadir) + \
+            io.list_tractorfiles(self.datadir)
+        for fn in infiles:
+            for columns in None, ["RA", "DEC", "RELEASE", "TYPE"], ["RA", "DEC"]:
+                ref = _read_tractor_reference(fn, columns=columns)
+                data = io.read_tractor(fn, columns=columns)
+                # ADM the same columns, in the same order, with the
+                # ADM same types and (byte-for-byte) values...
+                self.assertEqual(data.dtype, ref.dtype)
+                self.assertEqual(data.tobytes(), ref.tobytes())
+                self.assertEqual("PHOTSYS" in data.dtype.names,
+                                 "RELEASE" in data.dtype.names)
+                # ADM ...also when reading a subset of rows.
+                rows = np.arange(1, len(ref), 2)
+                data = io.read_tractor(fn, columns=columns, rows=rows)
+                self.assertEqual(data.dtype, ref.dtype)
+                self.assertEqual(data.tobytes(), ref[rows].tobytes())
+
+    def test_hp_target_dir(self):
+        """Test the HEALPixel index of a directory of targets.
+        """
+        sweepfile = io.list_sweepfiles(self.datadir)[0]
+        data = io.read_tractor(sweepfile)
+        for pixlist in [1, 2, 3], [4]:
+            _, filename = io.write_targets(self.testdir, data, nsidefile=2,
+                                           hpxlist=pixlist, indir=self.datadir)
+        hpdirname = os.path.dirname(filename)
+        indexfn = os.path.join(hpdirname, io.hpindexname)
+        self.assertTrue(os.path.exists(indexfn))
+
+        nside, pixdict = io.check_hp_target_dir(hpdirname)
+        self.assertEqual(nside, 2)
+        self.assertEqual(sorted(pixdict), [1, 2, 3, 4])
+        self.assertEqual(pixdict[4], filename)
+
+        # ADM the result is the same without the index or the memo.
+        io._hpdirmemo.clear()
+        os.remove(indexfn)
+        self.assertEqual(io.check_hp_target_dir(hpdirname), (nside, pixdict))
+        self.assertTrue(os.path.exists(indexfn))
+
+        # ADM the index is used instead of reading the headers...
+        with open(indexfn) as f:
+            index = json.load(f)
+        index[os.path.basename(filename)]["pixels"] = [7]
+        with open(indexfn, "w") as f:
+            json.dump(index, f)
+        io._hpdirmemo.clear()
+        nside, pixdict = io.check_hp_target_dir(hpdirname)
+        self.assertEqual(sorted(pixdict), [1, 2, 3, 7])
+
+        # ADM ...unless the file changed since it was indexed.
+        mtime = os.stat(filename).st_mtime_ns + 10**9
+        os.utime(filename, ns=(mtime, mtime))
+        nside, pixdict = io.check_hp_target_dir(hpdirname)
+        self.assertEqual(sorted(pixdict), [1, 2, 3, 4])
+
+        # ADM a corrupted index is rebuilt.
+        with open(indexfn, "w") as f:
+            f.write("blat")
+        io._hpdirmemo.clear()
+        nside, pixdict = io.check_hp_target_dir(hpdirname)
+        self.assertEqual(sorted(pixdict), [1, 2, 3, 4])
+        with open(indexfn) as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+        # ADM a duplicated pixel is caught.
+        shutil.copy(filename, os.path.join(hpdirname, "blat.fits"))
+        with self.assertRaises(AssertionError):
+            io.check_hp_target_dir(hpdirname)
+
+    def test_read_targets_in_hp(self):
+        """Test reading targets from many HEALPixel-split files at once.
+        """
+        sweepfiles = io.list_sweepfiles(self.datadir)
+        data = np.concatenate([io.read_tractor(fn) for fn in sweepfiles])
+        hpdirname = os.path.join(self.testdir, "read-in-hp")
+        nside = 1024
+        theta, phi = np.radians(90-data["DEC"]), np.radians(data["RA"])
+        pixnum = hp.ang2pix(nside, theta, phi, nest=True)
+        pixlist = np.unique(pixnum)
+        self.assertTrue(len(pixlist) > 2)
+        for pix in pixlist:
+            _, filename = io.write_targets(
+                hpdirname, data[pixnum == pix], nsidefile=nside,
+                hpxlist=[pix], indir=self.datadir)
+        hpdirname = os.path.dirname(filename)
+        _, filedict = io.check_hp_target_dir(hpdirname)
+        infiles = sorted(set(filedict.values()))
+
+        # ADM the row counts are in the index of the directory.
+        self.assertEqual(io._hp_file_nrows(infiles),
+                         [len(io.read_target_files(fn)) for fn in infiles])
+
+        for columns in None, ["RA", "BRICKNAME"]:
+            serial = io.read_targets_in_hp(hpdirname, nside, pixlist,
+                                           columns=columns, numthreads=0)
+            threaded, hdr = io.read_targets_in_hp(
+                hpdirname, nside, pixlist, columns=columns, header=True,
+                numthreads=3)
+            self.assertEqual(len(serial), len(data))
+            self.assertTrue(np.all(serial == threaded))
+            self.assertEqual(hdr["FILENSID"], nside)
+            # ADM the same targets as reading the files one-by-one.
+            targs = np.concatenate(
+                [io.read_target_files(fn, columns=columns) for fn in infiles])
+            self.assertTrue(np.all(threaded == targs))
+
+        # ADM downsampling matches downsampling each file, and works
+        # ADM without the row counts in the index.
+        os.remove(os.path.join(hpdirname, io.hpindexname))
+        self.assertEqual(io._hp_file_nrows(infiles), [None]*len(infiles))
+        threaded = io.read_targets_in_hp(hpdirname, nside, pixlist,
+                                         downsample=2)
+        targs = np.concatenate(
+            [io.read_target_files(fn, downsample=2) for fn in infiles])
+        self.assertTrue(np.all(threaded == targs))
+
+        # ADM no files means no targets.
+        notargs = io.read_targets_in_hp(hpdirname, nside, np.max(pixlist)+1)
+        self.assertEqual(len(notargs), 0)
+
     def test_brickname(self):
         self.assertEqual(io.brickname_from_filename('tractor-3301m002.fits'), '3301m002')
         self.assertEqual(io.brickname_from_filename('tractor-3301p002.fits'), '3301p002')
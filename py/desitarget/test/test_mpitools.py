@@ -0,0 +1,99 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""Test desitarget.mpitools.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from pkg_resources import resource_filename
+import numpy as np
+import fitsio
+
+from desitarget import io, mpitools
+
+try:
+    from mpi4py import MPI
+    havempi = True
+except ImportError:
+    havempi = False
+
+
+@unittest.skipUnless(havempi, 'mpi4py not installed; skipping MPI tests')
+class TestMPITOOLS(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.datadir = resource_filename('desitarget.test', 't')
+        cls.sweepfiles = sorted(io.list_sweepfiles(cls.datadir))
+        cls.testdir = tempfile.mkdtemp()
+        cls.comm = MPI.COMM_SELF
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.testdir):
+            shutil.rmtree(cls.testdir)
+
+    def test_split_pixels_across_ranks(self):
+        """Test a single rank processes every HEALPixel.
+        """
+        pixnum = mpitools.sweep_pixnum(32, self.sweepfiles)
+        pixlist = mpitools.split_pixels_across_ranks(self.comm, pixnum)
+        self.assertEqual(pixlist, list(np.unique(pixnum)))
+
+        # ADM restricting to a list of HEALPixels.
+        pixnum = mpitools.sweep_pixnum(32, self.sweepfiles,
+                                       pixlist=[4669, 4671, 0])
+        self.assertEqual(set(pixnum), set([4669, 4671]))
+
+    def test_gather_outputs(self):
+        """Test output headers and checksums are aggregated.
+        """
+        outfiles = []
+        for i in range(2):
+            fn = os.path.join(self.testdir, "out{}.fits".format(i))
+            hdr = fitsio.FITSHDR()
+            hdr["DEPNAM00"], hdr["DEPVER00"] = "desitarget", "1.0"
+            fitsio.write(fn, np.zeros(i+1, dtype=[("A", "i4")]),
+                         header=hdr, clobber=True)
+            outfiles.append(fn)
+
+        shatab = io.get_checksums(self.sweepfiles)
+        # ADM missing (empty) files are skipped.
+        missing = os.path.join(self.testdir, "blat.fits")
+        out = mpitools.gather_outputs(self.comm, outfiles + [missing],
+                                      infiles=shatab)
+        self.assertEqual(out["OUTFILES"], outfiles)
+        self.assertEqual(out["NROWS"], 3)
+        self.assertTrue(np.all(out["INFILES"] == np.sort(shatab)))
+
+        # ADM the summary file records what was gathered.
+        summaryfile = os.path.join(self.testdir, "summary.fits")
+        mpitools.gather_outputs(self.comm, outfiles, infiles=shatab,
+                                summaryfile=summaryfile)
+        outtab, hdr = fitsio.read(summaryfile, "OUTFILES", header=True)
+        self.assertEqual(list(outtab["FILENAME"]), outfiles)
+        self.assertEqual(list(outtab["NROWS"]), [1, 2])
+        self.assertEqual(hdr["NROWS"], 3)
+        self.assertEqual(hdr["DEPVER00"], "1.0")
+        intab = fitsio.read(summaryfile, "INFILES")
+        self.assertTrue(np.all(intab["SHA256"] == np.sort(shatab)["SHA256"]))
+
+        # ADM different versions of a dependency raise an error.
+        fitsio.write(outfiles[1], np.zeros(1, dtype=[("A", "i4")]),
+                     header={"DEPNAM00": "desitarget", "DEPVER00": "2.0"},
+                     clobber=True)
+        with self.assertRaises(IOError):
+            mpitools.gather_outputs(self.comm, outfiles)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+def test_suite():
+    """Allows testing of only this module with the command:
+
+        python setup.py test -m desitarget.test.test_mpitools
+    """
+    return unittest.defaultTestLoader.loadTestsFromName(__name__)
@@ -4,12 +4,16 @@
 """
 import os
 import unittest
+import tempfile
+import shutil
 import numpy as np
 from astropy.table import Table, join
 
 from desitarget.targetmask import desi_mask as Mx
 from desitarget.targetmask import bgs_mask, obsconditions
 from desitarget.mtl import make_mtl, mtldatamodel
+from desitarget.mtl import make_ledger_in_hp, update_ledger, convert_ledger
+from desitarget import io
 from desitarget.targets import initial_priority_numobs, main_cmx_or_sv
 from desitarget.targets import switch_main_cmx_or_sv
 
@@ -174,6 +178,174 @@ class TestMTL(unittest.TestCase):
         # ADM all BGS targets should always have NUMOBS_MORE=1.
         self.assertTrue(np.all(bgszcat["NUMOBS_MORE"] == 1))
 
+    def test_ledger_formats(self):
+        """Test MTL ledgers in each file format, including binary ledgers.
+        """
+        nside, obscon = 32, "DARK"
+        # ADM put the targets in two HEALPixels.
+        t = self.targets.copy()
+        t["RA"], t["DEC"] = [10., 10., 10., 100., 100.], [5., 5., 5., -5, -5]
+        pixlist = [4537, 5513]
+        tmpdir = tempfile.mkdtemp()
+        try:
+            mtls = {}
+            for form in ["ecsv", "fits", "bin"]:
+                outdir = os.path.join(tmpdir, form)
+                make_ledger_in_hp(t.copy(), outdir, nside, pixlist,
+                                  obscon=obscon, ledgerform=form)
+                hpdirname = io.find_target_files(outdir, dr=0, flavor="mtl",
+                                                 obscon=obscon)
+                self.assertEqual(io.find_mtl_ledger_format(hpdirname), form)
+                # ADM update the ledger twice, so some targets have
+                # ADM three entries.
+                for i in range(2):
+                    update_ledger(hpdirname, t.copy(), self.zcat.copy(),
+                                  obscon=obscon)
+                allmtl = io.read_mtl_in_hp(hpdirname, nside, pixlist,
+                                           unique=False)
+                mtl = io.read_mtl_in_hp(hpdirname, nside, pixlist)
+                self.assertEqual(len(allmtl), len(t) + 2*len(self.zcat))
+                self.assertEqual(len(mtl), len(t))
+                mtls[form] = mtl, allmtl, hpdirname
+
+            # ADM every format should contain the same information (the
+            # ADM TIMESTAMP differs, as each ledger was made separately).
+            for form in ["fits", "bin"]:
+                for ref, test in zip(mtls["ecsv"][:2], mtls[form][:2]):
+                    for col in set(ref.dtype.names) - set(["TIMESTAMP"]):
+                        # ADM some versions of fitsio return strings
+                        # ADM as unicode rather than as bytes.
+                        testcol = test[col].astype(ref[col].dtype)
+                        self.assertTrue(np.all(ref[col] == testcol))
+
+            # ADM converting a ledger retains every entry.
+            hpdirname = mtls["ecsv"][-1]
+            outdir = os.path.join(tmpdir, "converted")
+            fns = convert_ledger(hpdirname, outdir, ledgerform="bin")
+            self.assertEqual(len(fns), len(pixlist))
+            allmtl = io.read_mtl_in_hp(outdir, nside, pixlist, unique=False)
+            self.assertTrue(np.all(allmtl == mtls["ecsv"][1]))
+            self.assertEqual(io.read_keyword_from_mtl_header(outdir, "OBSCON"),
+                             obscon)
+
+            # ADM partial records from interrupted appends are ignored.
+            fn = fns[0]
+            nrows = len(io.read_binary_ledger(fn))
+            with open(fn, "ab") as f:
+                f.write(b"partial")
+            self.assertEqual(len(io.read_binary_ledger(fn)), nrows)
+            nappend = io.append_binary_ledger(fn, allmtl[:1])
+            self.assertEqual(nappend, nrows + 1)
+            self.assertTrue(np.all(io.read_binary_ledger(fn)[-1] == allmtl[0]))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_ledger_index(self):
+        """Test the index of the latest entry for each target in a ledger.
+        """
+        nside, obscon = 32, "DARK"
+        pix = 4537
+        t = self.targets.copy()
+        t["RA"], t["DEC"] = 10., 5.
+        tmpdir = tempfile.mkdtemp()
+        try:
+            make_ledger_in_hp(t.copy(), tmpdir, nside, pix,
+                              obscon=obscon, ledgerform="bin")
+            hpdirname = io.find_target_files(tmpdir, dr=0, flavor="mtl",
+                                             obscon=obscon)
+            fn = io.find_mtl_file_format_from_header(hpdirname).format(pix)
+            idxfn = fn.replace(".bin", ".idx")
+            for i in range(2):
+                update_ledger(hpdirname, t.copy(), self.zcat.copy(),
+                              obscon=obscon)
+
+            def brute():
+                """The latest entries from the full ledger"""
+                ledger = np.flip(io.read_mtl_ledger(fn, unique=False))
+                _, ii = np.unique(ledger["TARGETID"], return_index=True)
+                return ledger[ii]
+
+            # ADM the index should be up-to-date after updating a ledger.
+            _, hdr = io.read_binary_ledger(idxfn, header=True)
+            nrows = len(t) + 2*len(self.zcat)
+            self.assertEqual(hdr["NROWS"], nrows)
+            self.assertTrue(np.all(io.read_mtl_ledger(fn) == brute()))
+
+            # ADM an out-of-date or missing index is still correct.
+            new = io.read_mtl_ledger(fn)[:2]
+            new["PRIORITY"] = -99
+            io.append_binary_ledger(fn, new)
+            mtl = io.read_mtl_ledger(fn)
+            self.assertTrue(np.all(mtl == brute()))
+            self.assertEqual(np.sum(mtl["PRIORITY"] == -99), 2)
+            _, hdr = io.read_binary_ledger(idxfn, header=True)
+            self.assertEqual(hdr["NROWS"], nrows)
+            os.remove(idxfn)
+            self.assertTrue(np.all(io.read_mtl_ledger(fn) == brute()))
+
+            # ADM an index for a longer (rewritten) ledger is rebuilt.
+            index = io.read_mtl_ledger_index(fn, update=True)
+            self.assertEqual(len(index), len(t))
+            ledger = io.read_mtl_ledger(fn, unique=False)
+            io.write_binary_ledger(fn, np.array(ledger[:len(t)]))
+            self.assertTrue(np.all(io.read_mtl_ledger(fn) == brute()))
+
+            # ADM as is an index for a ledger rewritten with more rows.
+            ledger = np.array(io.read_mtl_ledger(fn, unique=False))[:3]
+            ledger["TARGETID"] = [10, 20, 30]
+            io.write_binary_ledger(fn, ledger)
+            io.read_mtl_ledger_index(fn, update=True)
+            rewrite = np.concatenate([ledger, ledger[:2]])
+            rewrite["TARGETID"] = [5, 10, 15, 20, 30]
+            rewrite["PRIORITY"] = np.arange(5)
+            io.write_binary_ledger(fn, rewrite)
+            self.assertTrue(np.all(io.read_mtl_ledger(fn) == rewrite))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_update_ledger_parallel(self):
+        """Test dry runs and parallel updates of HEALPixel-split ledgers.
+        """
+        nside, obscon = 32, "DARK"
+        t = self.targets.copy()
+        t["RA"], t["DEC"] = [10., 10., 10., 100., 100.], [5., 5., 5., -5, -5]
+        pixlist = [4537, 5513]
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for form in ["ecsv", "fits", "bin"]:
+                mtls = []
+                for numproc in [1, 2]:
+                    outdir = os.path.join(tmpdir, "{}{}".format(form, numproc))
+                    make_ledger_in_hp(t.copy(), outdir, nside, pixlist,
+                                      obscon=obscon, ledgerform=form)
+                    hpdirname = io.find_target_files(
+                        outdir, dr=0, flavor="mtl", obscon=obscon)
+                    # ADM a dry run reports rows per file, but doesn't
+                    # ADM touch the ledgers.
+                    nadded = update_ledger(hpdirname, t.copy(),
+                                           self.zcat.copy(), obscon=obscon,
+                                           dryrun=True)
+                    fileform = io.find_mtl_file_format_from_header(hpdirname)
+                    self.assertEqual(
+                        nadded, {fileform.format(4537): 3,
+                                 fileform.format(5513): 1})
+                    allmtl = io.read_mtl_in_hp(hpdirname, nside, pixlist,
+                                               unique=False)
+                    self.assertEqual(len(allmtl), len(t))
+                    # ADM a real update adds the reported rows.
+                    done = update_ledger(hpdirname, t.copy(), self.zcat.copy(),
+                                         obscon=obscon, numproc=numproc)
+                    self.assertEqual(done, nadded)
+                    allmtl = io.read_mtl_in_hp(hpdirname, nside, pixlist,
+                                               unique=False)
+                    self.assertEqual(len(allmtl), len(t) + len(self.zcat))
+                    mtls.append(allmtl)
+                # ADM parallel and serial updates should agree.
+                for col in set(mtls[0].dtype.names) - set(["TIMESTAMP"]):
+                    self.assertTrue(np.all(mtls[0][col] == mtls[1][col]))
+        finally:
+            shutil.rmtree(tmpdir)
+
 
 if __name__ == '__main__':
     unittest.main()
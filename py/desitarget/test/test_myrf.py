@@ -0,0 +1,71 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""Test desitarget.myRF.
+"""
+import unittest
+from pkg_resources import resource_filename
+import numpy as np
+
+from desitarget import myRF as rfmodule
+from desitarget.myRF import myRF
+
+
+class TestMYRF(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rffile = resource_filename('desitarget', 'data/rf_model_dr7_HighZ.npz')
+        cls.ntrees = 500
+
+        # ADM colors in roughly the range expected by the RF.
+        np.random.seed(626)
+        cls.colors = np.random.normal(scale=2., size=(2000, 11))
+        cls.colors[:, 10] = np.random.uniform(17.5, 22.7, 2000)
+        # ADM a NaN should be treated the same way on both code paths.
+        cls.colors[0, 3] = np.nan
+
+    def test_packed_matches_recursive(self):
+        """Test the packed forest is bit-identical to the recursive code.
+        """
+        rf = myRF(self.colors, '', numberOfTrees=self.ntrees, version=2)
+        rf.loadForest(self.rffile)
+        pfast = rf.predict_proba()
+
+        rf = myRF(self.colors, '', numberOfTrees=self.ntrees, version=2)
+        rf.loadForest(self.rffile)
+        pslow = rf.predict_proba_recursive()
+
+        self.assertTrue(np.all(pfast == pslow))
+
+    def test_batches(self):
+        """Test the output doesn't depend on how rows are batched.
+        """
+        forest, packed = rfmodule.load_forest(self.rffile, self.ntrees)
+        pall = packed.predict_proba(self.colors)
+        maxpairs = rfmodule._max_pairs
+        try:
+            rfmodule._max_pairs = self.ntrees*7
+            pbatch = packed.predict_proba(self.colors)
+        finally:
+            rfmodule._max_pairs = maxpairs
+
+        self.assertTrue(np.all(pall == pbatch))
+
+    def test_forest_cache(self):
+        """Test forests are only read and packed once.
+        """
+        _, packed1 = rfmodule.load_forest(self.rffile, self.ntrees)
+        _, packed2 = rfmodule.load_forest(self.rffile, self.ntrees)
+        self.assertTrue(packed1 is packed2)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+def test_suite():
+    """Allows testing of only this module with the command:
+
+        python setup.py test -m desitarget.test.test_myrf
+    """
+    return unittest.defaultTestLoader.loadTestsFromName(__name__)
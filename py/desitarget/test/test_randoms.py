@@ -0,0 +1,195 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""Test desitarget.randoms.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import fitsio
+import healpy as hp
+
+from desitarget import randoms
+
+
+class TestRANDOMS(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.testdir = tempfile.mkdtemp()
+        cls.density = 40000
+        # ADM some ranked randoms in three HEALPixel-split files.
+        cls.infiles, rands = [], []
+        for pix, decmin in enumerate([0., 0.25, 0.5]):
+            ras, decs, ranks = randoms.randoms_in_a_brick_from_edges(
+                0., 0.25, decmin, decmin+0.25, density=cls.density, rank=True)
+            rand = np.zeros(len(ras), dtype=[('RA', '>f8'), ('DEC', 'f8'),
+                                             ('RANK', '>f8')])
+            rand["RA"], rand["DEC"], rand["RANK"] = ras, decs, ranks
+            hdr = fitsio.FITSHDR()
+            hdr["DENSITY"], hdr["SEED"], hdr["FILEHPX"] = cls.density, 1, pix
+            fn = os.path.join(cls.testdir, "randoms-hp-{}.fits".format(pix))
+            fitsio.write(fn, rand, extname="RANDOMS", header=hdr, clobber=True)
+            cls.infiles.append(fn)
+            rands.append(rand)
+        cls.randoms = np.concatenate(rands)
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.testdir):
+            shutil.rmtree(cls.testdir)
+
+    def test_rank(self):
+        """Test ranks are uniform and don't change the random positions.
+        """
+        edges = (0., 0.25, 0., 0.25)
+        ras, decs = randoms.randoms_in_a_brick_from_edges(*edges)
+        rras, rdecs, ranks = randoms.randoms_in_a_brick_from_edges(
+            *edges, rank=True)
+        self.assertTrue(np.all(ras == rras) and np.all(decs == rdecs))
+        self.assertTrue(np.all((ranks >= 0) & (ranks < 1)))
+        self.assertTrue(np.abs(np.mean(ranks < 0.25) - 0.25) < 0.01)
+
+    def test_downsample_randoms(self):
+        """Test downsampling ranked randoms to a lower density.
+        """
+        rands = randoms.downsample_randoms(self.randoms, 10000, self.density)
+        self.assertTrue(np.all(rands["RANK"] < 0.25))
+        self.assertEqual(len(rands), np.sum(self.randoms["RANK"] < 0.25))
+        with self.assertRaises(ValueError):
+            randoms.downsample_randoms(self.randoms, 2*self.density,
+                                       self.density)
+
+    def test_split_randoms_by_rank(self):
+        """Test streaming randoms into files by ranges of rank.
+        """
+        nchunks = 4
+        ranges = [(i/nchunks, (i+1)/nchunks) for i in range(nchunks)]
+        outfiles = [os.path.join(self.testdir, "split-{}.fits".format(i))
+                    for i in range(nchunks)]
+        # ADM use a small chunksize to read each file in pieces.
+        nrands = randoms.split_randoms_by_rank(
+            self.infiles, outfiles, ranges, chunksize=1000)
+        # ADM the outputs are disjoint and cover all of the randoms.
+        outs = [fitsio.read(fn, header=True) for fn in outfiles]
+        self.assertEqual(list(nrands), [len(out) for out, hdr in outs])
+        rands = np.concatenate([out for out, hdr in outs])
+        self.assertTrue(np.all(np.sort(rands["RANK"]) ==
+                               np.sort(self.randoms["RANK"])))
+        for (rankmin, rankmax), (out, hdr) in zip(ranges, outs):
+            self.assertTrue(np.all((out["RANK"] >= rankmin) &
+                                   (out["RANK"] < rankmax)))
+            self.assertEqual(hdr["DENSITY"], self.density // nchunks)
+            self.assertEqual(hdr["FILEHPX"], "0,1,2")
+
+        # ADM nested catalogs at lower densities.
+        outfiles = [os.path.join(self.testdir, "dens-{}.fits".format(i))
+                    for i in range(2)]
+        nrands = randoms.split_randoms_by_rank(
+            self.infiles, outfiles, [(0., 0.5), (0., 0.1)])
+        out0, out1 = [fitsio.read(fn) for fn in outfiles]
+        self.assertTrue(np.all(np.isin(out1["RANK"], out0["RANK"])))
+        self.assertEqual(len(out1), len(randoms.downsample_randoms(
+            self.randoms, 0.1*self.density, self.density)))
+
+        # ADM ranges outside of [0, 1] would write a false DENSITY.
+        for ranges in [(0., 2.), (0.5, 0.5), (-0.1, 0.5)]:
+            with self.assertRaises(ValueError):
+                randoms.split_randoms_by_rank(self.infiles, outfiles[:1],
+                                              [ranges])
+
+    def test_median_in_pixels(self):
+        """Test medians in HEALPixels match np.median, including NaNs.
+        """
+        rng = np.random.RandomState(1)
+        pixnums = rng.randint(0, 50, 5000)
+        for dtype in ['>f4', 'f8']:
+            values = rng.normal(0, 1, 5000).astype(dtype)
+            values[::97] = np.nan
+            pixels, medians = randoms._median_in_pixels(pixnums, values)
+            self.assertTrue(np.all(pixels == np.unique(pixnums)))
+            expected = [np.median(values[pixnums == pix]) for pix in pixels]
+            self.assertTrue(np.array_equal(medians, expected, equal_nan=True))
+
+    def test_pixmap_randoms(self):
+        """Test streaming randoms from files gives the in-memory results.
+        """
+        nside, nrand = 64, 20000
+        rng = np.random.RandomState(2)
+        dt = [('RA', '>f8'), ('DEC', '>f8'), ('NOBS_G', '>i2'),
+              ('NOBS_R', '>i2'), ('NOBS_Z', '>i2'), ('MASKBITS', '>i2')]
+        rands = np.zeros(nrand, dtype=dt + [(col, '>f4')
+                                            for col in randoms.pixmapcols])
+        rands["RA"] = rng.uniform(10, 20, nrand)
+        rands["DEC"] = rng.uniform(-5, 5, nrand)
+        for col in ["NOBS_G", "NOBS_R", "NOBS_Z"]:
+            rands[col] = rng.randint(0, 3, nrand)
+        rands["MASKBITS"] = 2**rng.randint(0, 14, nrand)
+        for col in randoms.pixmapcols:
+            rands[col] = rng.normal(20, 1, nrand)
+        # ADM write the randoms to files that overlap in HEALPixels.
+        fns = []
+        for i in range(3):
+            fn = os.path.join(self.testdir, "pixmap-{}.fits".format(i))
+            fitsio.write(fn, rands[i::3], extname="RANDOMS", clobber=True)
+            fns.append(fn)
+
+        spooldir = os.path.join(self.testdir, "spool")
+        fracarea, medians = randoms.pixmap_randoms(
+            fns, 1000, nside=nside, spooldir=spooldir, chunksize=3000)
+        # ADM the spool files are cleaned up.
+        self.assertEqual(os.listdir(spooldir), [])
+
+        self.assertTrue(np.all(fracarea[0] == randoms.pixweight(
+            rands, 1000, nside=nside)))
+        pixnums = hp.ang2pix(nside, np.radians(90.-rands["DEC"]),
+                             np.radians(rands["RA"]), nest=True)
+        for col in randoms.pixmapcols:
+            for pix in np.unique(pixnums)[::10]:
+                self.assertEqual(medians[col][pix],
+                                 np.median(rands[col][pixnums == pix]))
+            self.assertTrue(np.all(medians[col][np.bincount(
+                pixnums, minlength=len(medians[col])) == 0] == -1))
+
+    def test_pixweight_files(self):
+        """Test pixweight streams files, lists and directories of randoms.
+        """
+        nside, nrand = 32, 10000
+        rng = np.random.RandomState(3)
+        rands = np.zeros(nrand, dtype=[
+            ('RA', '>f8'), ('DEC', '>f8'), ('NOBS_G', '>i2'),
+            ('NOBS_R', '>i2'), ('NOBS_Z', '>i2'), ('MASKBITS', '>i2')])
+        rands["RA"] = rng.uniform(10, 20, nrand)
+        rands["DEC"] = rng.uniform(-5, 5, nrand)
+        for col in ["NOBS_G", "NOBS_R", "NOBS_Z"]:
+            rands[col] = rng.randint(0, 3, nrand)
+        rands["MASKBITS"] = 2**rng.randint(0, 14, nrand)
+        pixdir = os.path.join(self.testdir, "pixweight")
+        os.makedirs(pixdir)
+        fns = []
+        for i in range(3):
+            fn = os.path.join(pixdir, "pixweight-{}.fits".format(i))
+            fitsio.write(fn, rands[i::3], extname="RANDOMS")
+            fns.append(fn)
+        allfn = os.path.join(self.testdir, "pixweight-all.fits")
+        fitsio.write(allfn, rands, extname="RANDOMS")
+
+        for kwargs in [{}, {"nobsgrz": [1, 0, -1]}, {"maskbits": 7}]:
+            weight = randoms.pixweight(rands, 1000, nside=nside, **kwargs)
+            self.assertTrue(np.any(weight > 0))
+            for rfiles in [fns, pixdir, allfn]:
+                self.assertTrue(np.all(weight == randoms.pixweight(
+                    rfiles, 1000, nside=nside, chunksize=1500, **kwargs)))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+def test_suite():
+    """Allows testing of only this module with the command:
+
+        python setup.py test -m desitarget.test.test_randoms
+    """
+    return unittest.defaultTestLoader.loadTestsFromName(__name__)
@@ -0,0 +1,107 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+# -*- coding: utf-8 -*-
+"""Test desitarget.internal.sharedmem.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from time import sleep
+import numpy as np
+
+from desitarget.internal import sharedmem
+
+
+class TestSHAREDMEM(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # ADM write some files of different sizes.
+        cls.testdir = tempfile.mkdtemp()
+        cls.sizes = [10, 1000, 100, 1000, 5]
+        cls.files = []
+        for i, size in enumerate(cls.sizes):
+            fn = os.path.join(cls.testdir, "file{}.bin".format(i))
+            with open(fn, "wb") as f:
+                f.write(b"x" * size)
+            cls.files.append(fn)
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(cls.testdir):
+            shutil.rmtree(cls.testdir)
+
+    def test_schedule(self):
+        """Test work is scheduled largest first with ties in input order.
+        """
+        pool = sharedmem.MapReduce(np=2)
+        # ADM scheduling by file size.
+        self.assertEqual(pool._schedule(self.files, "size"), [1, 3, 2, 0, 4])
+        # ADM scheduling with a callable.
+        self.assertEqual(pool._schedule(self.sizes, lambda x: -x),
+                         [4, 0, 2, 1, 3])
+        # ADM no scheduling.
+        self.assertEqual(pool._schedule(self.files, None), [0, 1, 2, 3, 4])
+        with self.assertRaises(ValueError):
+            pool._schedule(self.files, "blat")
+
+    def test_map_cost(self):
+        """Test results are in input order, whatever the schedule.
+        """
+        for numproc in 0, 2:
+            for cost in None, "size":
+                pool = sharedmem.MapReduce(np=numproc)
+                with pool:
+                    sizes = pool.map(os.path.getsize, self.files, cost=cost)
+                self.assertEqual(sizes, self.sizes)
+                self.assertEqual(len(pool.timings), len(self.files))
+                self.assertTrue(numproc == 0 or cost is None or
+                                pool.order == [1, 3, 2, 0, 4])
+
+        # ADM the slowest items are reported, slowest first.
+        pool = sharedmem.MapReduce(np=2)
+        with pool:
+            _ = pool.map(lambda x: sleep(x/1e4), self.sizes,
+                         cost=lambda x: x)
+        slowest = pool.slowest(2)
+        self.assertEqual(set([i for i, _ in slowest]), set([1, 3]))
+        self.assertTrue(slowest[0][1] >= slowest[1][1])
+
+    def test_map_shared(self):
+        """Test array results returned through shared memory.
+        """
+        dt = [("A", ">f8"), ("B", "S4"), ("C", "i2", (3,))]
+
+        def _work(n):
+            arr = np.zeros(n, dtype=dt)
+            arr["A"] = np.arange(n)
+            arr["B"] = "blat"
+            # ADM also check tuples, non-arrays and empty arrays.
+            return arr, n, None
+
+        sizes = [0, 10, 1000, 7]
+        pool = sharedmem.MapReduce(np=2)
+        with pool:
+            shared = pool.map(_work, sizes, shared=True)
+        with pool:
+            pickled = pool.map(_work, sizes)
+        for s, p, n in zip(shared, pickled, sizes):
+            self.assertEqual(s[0].dtype, p[0].dtype)
+            self.assertTrue(np.all(s[0] == p[0]))
+            self.assertEqual(len(s[0]), n)
+            self.assertEqual(s[1:], (n, None))
+        # ADM results must remain writable.
+        shared[1][0]["A"] = -1
+        self.assertEqual(shared[1][0]["A"][0], -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+def test_suite():
+    """Allows testing of only this module with the command:
+
+        python setup.py test -m desitarget.test.test_sharedmem
+    """
+    return unittest.defaultTestLoader.loadTestsFromName(__name__)
@@ -5,6 +5,7 @@
 import unittest
 from pkg_resources import resource_filename
 import numpy as np
+from scipy.ndimage import binary_dilation, binary_erosion, gaussian_filter
 
 from desitarget import skyfibers
 from desitarget.targetmask import desi_mask
@@ -67,6 +68,36 @@ class TestSKYFIBERS(unittest.TestCase):
         self.assertTrue(modelhi/modello == 10)
         self.assertTrue(hi/lo == 5)
 
+    def test_sky_fiber_locations(self):
+        """
+        Test sky locations are the peaks of the distance from blobs
+        """
+        rng = np.random.RandomState(616)
+        skypix = np.ones((95, 130), bool)
+        skypix[rng.randint(0, 95, 40), rng.randint(0, 130, 40)] = False
+        skypix = ~binary_dilation(~skypix, iterations=2)
+
+        # ADM the distance-from-blobs map by iterated erosions.
+        nerosions = np.zeros(skypix.shape, np.int16)
+        eroded = skypix.copy()
+        while np.any(eroded):
+            nerosions += eroded
+            eroded = binary_erosion(eroded, structure=np.ones((3, 3)))
+        nerosions = gaussian_filter(nerosions.astype(np.float32), 1.0)
+
+        x, y, blobdist = skyfibers.sky_fiber_locations(skypix, gridsize=30)
+        # ADM 4 x 5 grid cells (of 23-24 x 26 pixels).
+        self.assertEqual(len(x), 20)
+        self.assertTrue(np.all(blobdist == nerosions[y, x]))
+        yy = np.round(np.linspace(0, 95, 5)).astype(int)
+        xx = np.round(np.linspace(0, 130, 6)).astype(int)
+        for i, (ylo, yhi) in enumerate(zip(yy, yy[1:])):
+            for j, (xlo, xhi) in enumerate(zip(xx, xx[1:])):
+                k = i*5 + j
+                self.assertTrue(ylo <= y[k] < yhi and xlo <= x[k] < xhi)
+                self.assertEqual(blobdist[k],
+                                 np.max(nerosions[ylo:yhi, xlo:xhi]))
+
     def test_make_skies_for_a_brick(self):
         """
         Test the production of a few sky locations from a survey object